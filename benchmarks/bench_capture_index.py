@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 录制文件索引基准测试，测量建索引的速度，以及按时间和报文ID查询与顺序扫描分帧的耗时对比
+
+用法:
+    python benchmarks/bench_capture_index.py [--frames 500000] [--chunk 184] [--capture 已有录制文件]
+
+生成的录制文件按921600波特率满载的时间戳写入临时目录，结束后删除；指定--capture时直接使用已有录制文件
+（会在其旁边生成.idx索引文件）。查询取录制中间的一段时间，统计出现次数最多的报文ID。
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+from collections import Counter
+
+from bench_common import load_protocols
+from bench_replay import build_capture
+from capture_index import CaptureIndex, CaptureIndexer
+from framer import Framer
+from raw_capture import iter_capture_records
+
+
+def scan_linear(path, protocols, start_ns, end_ns, message_id):
+    """
+    不使用索引，从头顺序读取并分帧，取出时间范围内指定ID的报文
+
+    Returns:
+        list: 报文
+    """
+    framers = {}
+    frames = []
+    with open(path, 'rb', buffering=1 << 20) as f:
+        for record in iter_capture_records(f):
+            key = (record.port_id, record.direction)
+            framer = framers.get(key)
+            if framer is None:
+                framer = framers[key] = Framer()
+                framer.set_protocols(protocols)
+            for frame, _ in framer.feed(record.data):
+                if start_ns <= record.wall_ns < end_ns and frame[2] == message_id:
+                    frames.append(frame)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制文件索引基准测试")
+    parser.add_argument('--frames', type=int, default=500000, help="生成的录制文件中的报文数")
+    parser.add_argument('--chunk', type=int, default=184, help="数据块大小(字节)")
+    parser.add_argument('--capture', help="使用已有的录制文件")
+    parser.add_argument('--window', type=float, default=0.1, help="查询的时间范围占录制时长的比例")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    protocols = load_protocols()
+    path = args.capture
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.ydcap')
+        os.close(fd)
+        start = time.perf_counter()
+        build_capture(path, protocols, args.frames, args.chunk, random.Random(args.seed))
+        print(f"生成录制文件: {args.frames} 帧 {os.path.getsize(path) / 1024 / 1024:.1f} MB，"
+              f"耗时 {time.perf_counter() - start:.2f} 秒")
+    index_path = path + '.idx'
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    try:
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        indexer = CaptureIndexer(path, protocols)
+        start = time.perf_counter()
+        count = indexer.update()
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        indexer.update()
+        idle = time.perf_counter() - start
+        indexer.close()
+        print(f"建索引: {count} 帧 {elapsed:.2f} 秒，{count / elapsed:,.0f} 帧/秒，{size_mb / elapsed:.1f} MB/s，"
+              f"索引 {os.path.getsize(index_path) / 1024 / 1024:.1f} MB；无新数据时更新 {idle * 1000:.2f} ms")
+
+        start = time.perf_counter()
+        index = CaptureIndex(path, update=False)
+        index.refresh()
+        opened = time.perf_counter() - start
+        first_ns = index.entry(0).wall_ns
+        last_ns = index.entry(len(index) - 1).wall_ns
+        rng = random.Random(args.seed)
+        seeks = [rng.randint(first_ns, last_ns) for _ in range(10000)]
+        start = time.perf_counter()
+        for wall_ns in seeks:
+            index.bisect_time(wall_ns)
+        seek_us = (time.perf_counter() - start) / len(seeks) * 1e6
+        print(f"打开索引 {opened * 1000:.2f} ms，按时间定位 {seek_us:.1f} us/次")
+
+        span = last_ns - first_ns
+        start_ns = first_ns + int(span * (0.5 - args.window / 2))
+        end_ns = start_ns + int(span * args.window)
+        message_id = Counter(entry.message_id for entry in index.select(start_ns, end_ns)).most_common(1)[0][0]
+
+        start = time.perf_counter()
+        indexed = [frame for _, frame in index.frames(start_ns, end_ns, message_id)]
+        indexed_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        linear = scan_linear(path, protocols, start_ns, end_ns, message_id)
+        linear_elapsed = time.perf_counter() - start
+        index.close()
+        print(f"查询 {args.window * 100:.0f}% 时间范围内的 {message_id:02X}h: {len(indexed)} 帧，"
+              f"索引 {indexed_elapsed * 1000:.1f} ms，顺序扫描 {linear_elapsed * 1000:.0f} ms "
+              f"({linear_elapsed / indexed_elapsed:.0f} 倍)，结果{'一致' if indexed == linear else '不一致'}")
+    finally:
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        if args.capture is None:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 基准测试公共函数，加载自带的yd_g392协议并构造测试报文
+"""
+
+import os
+import sys
+import json
+import glob
+import random
+import logging
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import log_manager
+
+# 基准测试中只保留警告以上的日志，避免调试输出影响计时
+log_manager.logger.setLevel(logging.WARNING)
+
+PLUGINS_DIR = os.path.join(ROOT_DIR, 'plugins', 'yd_g392')
+
+
+def load_protocols(plugins_dir=PLUGINS_DIR):
+    """
+    直接加载插件目录下的协议JSON，协议ID取报文ID
+
+    Returns:
+        dict: 协议信息字典 {protocol_id: protocol_data}
+    """
+    protocols = {}
+    for json_path in sorted(glob.glob(os.path.join(plugins_dir, '*.json'))):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            protocol_data = json.load(f)
+        protocol_id = protocol_data.get('message_id', os.path.basename(json_path))
+        protocol_data['protocol_id'] = protocol_id
+        protocols[protocol_id] = protocol_data
+    return protocols
+
+
+def crc16_modbus(data):
+    """逐位计算CRC16(Modbus)，作为基准测试中的参考实现"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc
+
+
+def build_frame(protocol_data, data=None, rng=random):
+    """
+    按协议的message_format构造一帧报文，数据部分默认随机填充
+
+    Args:
+        protocol_data (dict): 协议数据
+        data (bytes): 数据部分，None时随机生成
+        rng (random.Random): 随机数发生器
+
+    Returns:
+        bytes: 报文
+    """
+    message_format = protocol_data.get('message_format', {})
+    start_bytes = bytes(int(b, 16) for b in message_format.get('start_bytes', ["0x59", "0x44"]))
+    end_bytes = bytes(int(b, 16) for b in message_format.get('end_bytes', ["0x4B", "0x4A"]))
+    message_id = int(message_format.get('message_id', "0x00"), 16)
+    length_bytes = message_format.get('length_bytes', 1)
+    data_length = int(message_format.get('data_length', "0"), 16)
+
+    if data is None:
+        data = bytes(rng.randrange(256) for _ in range(data_length))
+
+    body = bytes([message_id]) + len(data).to_bytes(length_bytes, 'little') + data
+    crc = crc16_modbus(body)
+    return start_bytes + body + crc.to_bytes(2, 'big') + end_bytes
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: CRC16(Modbus)吞吐量基准测试，对比逐位计算、单字节查表和双字节查表的MB/s
+
+用法:
+    python benchmarks/bench_crc.py [--size 65536] [--repeat 5]
+"""
+
+import os
+import time
+import argparse
+
+from bench_common import crc16_modbus as crc16_bitwise
+from crc16 import crc16_modbus, crc16_modbus_table, crc16_modbus_slice2
+
+
+def throughput(func, data, repeat):
+    """
+    测量吞吐量，取多次中最好的一次
+
+    Returns:
+        float: MB/s
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return len(data) / best / 1e6
+
+
+def frame_rate(func, frame, count):
+    """
+    测量单帧校验速度
+
+    Returns:
+        float: 帧/秒
+    """
+    start = time.perf_counter()
+    for _ in range(count):
+        func(frame)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CRC16(Modbus)吞吐量基准测试")
+    parser.add_argument('--size', type=int, default=65536, help="大块数据的字节数")
+    parser.add_argument('--repeat', type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+
+    data = os.urandom(args.size)
+    candidates = [
+        ("逐位计算", crc16_bitwise),
+        ("单字节查表", crc16_modbus_table),
+        ("双字节查表", crc16_modbus_slice2),
+        ("自动选择", crc16_modbus),
+    ]
+
+    # 先确认各实现结果一致
+    expected = crc16_bitwise(data)
+    for name, func in candidates:
+        assert func(data) == expected, f"{name} 结果不一致"
+
+    print(f"大块数据 {args.size} 字节:")
+    for name, func in candidates:
+        print(f"  {name:<8}{throughput(func, data, args.repeat):>10.2f} MB/s")
+
+    # 典型报文长度（D0h数据27字节 + ID + 长度，B4h数据75字节 + ID + 长度）
+    for length in (30, 78):
+        frame = os.urandom(length)
+        print(f"{length} 字节报文:")
+        for name, func in candidates:
+            print(f"  {name:<8}{frame_rate(func, frame, 20000):>12,.0f} 帧/秒")
+
+
+if __name__ == "__main__":
+    main()
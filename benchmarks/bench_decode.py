@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 解码吞吐量基准测试，使用自带的yd_g392协议测量ProtocolParser每秒可解析的帧数
+
+用法:
+    python benchmarks/bench_decode.py [--frames 20000]
+"""
+
+import time
+import random
+import argparse
+
+from bench_common import load_protocols, build_frame
+from protocol_parser import ProtocolParser
+
+
+def measure(func, items):
+    """
+    对每个输入调用一次func
+
+    Returns:
+        float: 每秒处理数
+    """
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    elapsed = time.perf_counter() - start
+    return len(items) / elapsed if elapsed > 0 else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="协议解码吞吐量基准测试")
+    parser.add_argument('--frames', type=int, default=20000, help="混合流量的总帧数")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    protocols = load_protocols()
+
+    protocol_parser = ProtocolParser()
+    start = time.perf_counter()
+    protocol_parser.set_protocols(protocols)
+    print(f"加载 {len(protocols)} 个协议，编译耗时 {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    # 单协议吞吐量
+    print(f"{'协议':<6}{'字段数':>8}{'帧/秒':>14}")
+    per_protocol = max(1, args.frames // len(protocols))
+    for protocol_id, protocol_data in protocols.items():
+        frames = [build_frame(protocol_data, rng=rng) for _ in range(per_protocol)]
+        rate = measure(protocol_parser.parse_message, frames)
+        print(f"{protocol_id:<6}{len(protocol_data.get('fields', [])):>8}{rate:>14,.0f}")
+
+    # 混合流量
+    protocol_list = list(protocols.values())
+    frames = [build_frame(rng.choice(protocol_list), rng=rng) for _ in range(args.frames)]
+    rate = measure(protocol_parser.parse_message, frames)
+    print(f"混合流量 {args.frames} 帧: {rate:,.0f} 帧/秒")
+
+
+if __name__ == "__main__":
+    main()
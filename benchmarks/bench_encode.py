@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 编码吞吐量基准测试，使用自带的yd_g392协议测量ProtocolParser.generate_message每秒可生成的帧数
+
+用法:
+    python benchmarks/bench_encode.py [--frames 20000]
+
+全部字段  给出所有字段的值（协议界面发送）
+单个字段  只给出一个字段的值（定时报文更新单个字段）
+生成的报文与原来逐字段解析协议JSON的实现(reference_generate_message)逐帧比对。
+最后测量动态定时报文（D0h的时钟、计数、随机字段）在调度线程中每次发送前生成报文的速度。
+"""
+
+import time
+import random
+import argparse
+
+from bench_common import load_protocols, crc16_modbus
+from protocol_parser import ProtocolParser
+from message_transceiver import TimedMessage
+
+
+def random_field_values(protocol_data, rng):
+    """按字段的max_hex随机生成全部字段的十六进制取值"""
+    field_values = {}
+    for field in protocol_data.get('fields', []):
+        try:
+            max_value = int(field.get('max_hex', '0xFF'), 16)
+        except (TypeError, ValueError):
+            max_value = 0xFF
+        field_values[field.get('id', '')] = f"0x{rng.randint(0, max_value):X}"
+    return field_values
+
+
+def reference_generate_message(protocol_data, field_values):
+    """每次生成时逐字段解析协议JSON，作为基准测试中的参考实现（预编译编码模板之前的generate_message）"""
+    message_format = protocol_data.get('message_format', {})
+    start_bytes = message_format.get('start_bytes', ["0x59", "0x44"])
+    message_id = message_format.get('message_id', "0x00")
+    end_bytes = message_format.get('end_bytes', ["0x4B", "0x4A"])
+    length_bytes = message_format.get('length_bytes', 1)
+    fields = protocol_data.get('fields', [])
+
+    data_length = 0
+    if "data_length" in message_format:
+        data_length = int(message_format.get('data_length', "0"), 16)
+    else:
+        for field in fields:
+            byte_position = field.get('byte_position', [])
+            if isinstance(byte_position, list) and byte_position:
+                data_length = max(data_length, max(byte_position) + 1)
+            elif isinstance(byte_position, int):
+                data_length = max(data_length, byte_position + 1)
+
+    message_bytes = bytearray(len(start_bytes) + 1 + length_bytes + data_length + 2 + len(end_bytes))
+    for i, b in enumerate(start_bytes):
+        message_bytes[i] = int(b, 16)
+    message_bytes[len(start_bytes)] = int(message_id, 16)
+    length_pos = len(start_bytes) + 1
+    if length_bytes == 1:
+        message_bytes[length_pos] = data_length
+    else:
+        message_bytes[length_pos] = data_length & 0xFF
+        message_bytes[length_pos + 1] = (data_length >> 8) & 0xFF
+    data_start = len(start_bytes) + 1 + length_bytes
+    data_end = data_start + data_length
+
+    for field in fields:
+        field_value = field_values.get(field.get('id', ''))
+        if field_value is None or field.get('type', 'Unsigned') not in ['Unsigned', 'Signed']:
+            continue
+        field_length = field.get('length', 1)
+        precision = field.get('precision', 1)
+        offset = field.get('offset', 0)
+        byte_position = field.get('byte_position', [])
+        bit_position = field.get('bit_position', None)
+        try:
+            try:
+                if not field_value or field_value.strip() == '':
+                    numeric_value = 0
+                elif field_value.startswith('0x'):
+                    numeric_value = int(field_value, 16)
+                else:
+                    numeric_value = float(field_value)
+                    if precision != 1 or offset != 0:
+                        numeric_value = (numeric_value - offset) / precision
+                    numeric_value = int(round(numeric_value))
+            except ValueError:
+                numeric_value = 0
+            value_bytes = [(numeric_value >> (i * 8)) & 0xFF for i in range(field_length)]
+
+            if isinstance(byte_position, list):
+                for i, pos in enumerate(byte_position):
+                    if i < len(value_bytes) and data_start + pos < len(message_bytes):
+                        message_bytes[data_start + pos] = value_bytes[i]
+            elif isinstance(byte_position, int):
+                index = data_start + byte_position
+                if index >= len(message_bytes):
+                    continue
+                if bit_position:
+                    if isinstance(bit_position, list):
+                        mask = 0
+                        for bit in bit_position:
+                            mask |= (1 << bit)
+                        message_bytes[index] &= ~mask
+                        message_bytes[index] |= ((numeric_value << min(bit_position)) & mask)
+                    elif isinstance(bit_position, int):
+                        message_bytes[index] &= ~(1 << bit_position)
+                        if numeric_value:
+                            message_bytes[index] |= (1 << bit_position)
+                else:
+                    message_bytes[index] = value_bytes[0]
+        except Exception:
+            continue
+
+    crc = crc16_modbus(message_bytes[len(start_bytes):data_end])
+    message_bytes[data_end] = (crc >> 8) & 0xFF
+    message_bytes[data_end + 1] = crc & 0xFF
+    for i, b in enumerate(end_bytes):
+        message_bytes[data_end + 2 + i] = int(b, 16)
+    return bytes(message_bytes)
+
+
+def measure(func, items):
+    """
+    对每个输入调用一次func
+
+    Returns:
+        float: 每秒处理数
+    """
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    elapsed = time.perf_counter() - start
+    return len(items) / elapsed if elapsed > 0 else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="协议编码吞吐量基准测试")
+    parser.add_argument('--frames', type=int, default=20000, help="每个协议每种方式生成的帧数")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    protocols = load_protocols()
+
+    protocol_parser = ProtocolParser()
+    start = time.perf_counter()
+    protocol_parser.set_protocols(protocols)
+    print(f"加载 {len(protocols)} 个协议，编译耗时 {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    print(f"{'协议':<6}{'字段数':>8}{'全部字段':>16}{'单个字段':>16}  (帧/秒)")
+    totals = [0.0, 0.0]
+    for protocol_id, protocol_data in protocols.items():
+        values = [random_field_values(protocol_data, rng) for _ in range(min(args.frames, 1000))]
+        values = (values * (args.frames // len(values) + 1))[:args.frames]
+        first_field = next(iter(values[0]), None)
+        single = [{first_field: field_values[first_field]} if first_field else {} for field_values in values]
+
+        # 与参考实现生成的报文一致
+        for field_values in values[:100] + single[:100]:
+            assert protocol_parser.generate_message(protocol_id, field_values) == \
+                reference_generate_message(protocol_data, field_values), f"{protocol_id} 生成的报文不一致"
+
+        rates = [
+            measure(lambda field_values: protocol_parser.generate_message(protocol_id, field_values), values),
+            measure(lambda field_values: protocol_parser.generate_message(protocol_id, field_values), single),
+        ]
+        for i, rate in enumerate(rates):
+            totals[i] += 1 / rate
+        print(f"{protocol_id:<6}{len(protocol_data.get('fields', [])):>8}"
+              f"{rates[0]:>16,.0f}{rates[1]:>16,.0f}")
+
+    # 各协议各生成一帧的平均帧率
+    count = len(protocols)
+    print(f"{'平均':<6}{'':>8}{count / totals[0]:>16,.0f}{count / totals[1]:>16,.0f}")
+
+    # 动态定时报文
+    if 'D0h' in protocols:
+        generator_specs = {'B0': {'kind': 'clock', 'part': 'year'}, 'B1': {'kind': 'clock', 'part': 'month'},
+                           'B2': {'kind': 'clock', 'part': 'day'}, 'B3': {'kind': 'clock', 'part': 'hour'},
+                           'B4': {'kind': 'clock', 'part': 'minute'}, 'B5': {'kind': 'clock', 'part': 'second'},
+                           'B23': {'kind': 'counter', 'start': 0, 'step': 1}, 'B25': {'kind': 'random'}}
+        timed_message = TimedMessage("D0h", protocol_id='D0h', generator_specs=generator_specs)
+        timed_message.bind_protocol(protocols['D0h'])
+        encode_plan = protocol_parser.encode_plans['D0h']
+        rate = measure(lambda _: timed_message.next_message(encode_plan), range(args.frames))
+        print(f"动态报文 D0h ({len(generator_specs)}个生成字段): {rate:,.0f} 帧/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 轮询主站基准测试，在pty回环上模拟节点应答，测量不同换向间隔下的轮询周期和响应率(仅限Linux)
+
+用法:
+    python benchmarks/bench_polling.py [--duration 2] [--baud 9600] [--delay 3]
+
+轮询表为A4h(期望B1h、B2h)和C4h(期望D0h、D1h、D3h)，模拟节点收到请求后等待--delay毫秒回复，
+其中D3h每隔一次不回复，用于观察超时对轮询周期的影响。
+请求按--baud的线路时间逐帧发送，节点的回复直接写入pty（不模拟波特率）。
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+from bench_common import load_protocols, build_frame
+
+import serial
+from PyQt5.QtCore import QCoreApplication
+from message_transceiver import MessageSender, MessageReceiver, PRIORITY_RESPONSE
+from line_timing import LineTiming
+from poller import PollEntry, PollingMaster
+from protocol_codec import EncodePlan
+
+POLL_TABLE = (('A4h', ('B1h', 'B2h')), ('C4h', ('D0h', 'D1h', 'D3h')))
+FLAKY_RESPONSE = 'D3h'  # 每隔一次不回复的响应
+
+
+def simulate_nodes(master_fd, protocols, delay, stop):
+    """模拟节点：从pty主端读取请求，按轮询表回复"""
+    requests = {int(protocols[request_id]['message_format']['message_id'], 16): responses
+                for request_id, responses in POLL_TABLE}
+    frames = {protocol_id: build_frame(protocols[protocol_id]) for _, responses in POLL_TABLE
+              for protocol_id in responses}
+    counts = {}
+    buffer = bytearray()
+    while not stop.is_set():
+        try:
+            buffer.extend(os.read(master_fd, 4096))
+        except OSError:
+            break
+        while len(buffer) >= 5:
+            length = 9 + buffer[3] + (buffer[4] << 8)
+            if len(buffer) < length:
+                break
+            message_id = buffer[2]
+            del buffer[:length]
+            responses = requests.get(message_id)
+            if not responses:
+                continue
+            counts[message_id] = counts.get(message_id, 0) + 1
+            time.sleep(delay / 1000.0)
+            reply = b''.join(frames[protocol_id] for protocol_id in responses
+                             if protocol_id != FLAKY_RESPONSE or counts[message_id] % 2)
+            os.write(master_fd, reply)
+
+
+def read_port(port, receiver, poller, stop):
+    """读取串口并分帧，交给轮询主站"""
+    while not stop.is_set():
+        try:
+            data = port.read(port.in_waiting or 1)
+        except (OSError, serial.SerialException):
+            break
+        if data:
+            arrival_ns = time.monotonic_ns()
+            for message, crc_ok in receiver.extract(data):
+                if crc_ok:
+                    poller.on_received(message, arrival_ns)
+
+
+def run(protocols, turnaround_ms, timeout_ms, duration, baud, delay):
+    """
+    以一种换向间隔运行轮询
+
+    Returns:
+        dict: PollingMaster.snapshot()
+    """
+    master_fd, slave_fd = os.openpty()
+    port = serial.Serial(os.ttyname(slave_fd), baud, timeout=0.05)
+    stop = threading.Event()
+
+    sender = MessageSender()
+    sender.set_line_timing(LineTiming(baudrate=baud, gap_chars=3.5))
+    sender.set_serial(port)
+    poller = PollingMaster(lambda message, name: sender.add_message(message, name, PRIORITY_RESPONSE))
+    sender.add_observer(poller.on_sent)
+    poller.set_protocols(protocols)
+    receiver = MessageReceiver()
+    receiver.set_protocols(protocols)
+
+    threads = [threading.Thread(target=simulate_nodes, args=(master_fd, protocols, delay, stop), daemon=True),
+               threading.Thread(target=read_port, args=(port, receiver, poller, stop), daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    # 请求报文使用协议的默认值
+    poller.set_entries([PollEntry(request_id, EncodePlan(protocols[request_id]).encode({}, use_defaults=True),
+                                  responses, timeout_ms, protocol_id=request_id)
+                        for request_id, responses in POLL_TABLE])
+    poller.set_timing(turnaround_ms)
+    poller.start()
+    time.sleep(duration)
+    poller.stop()
+    snapshot = poller.snapshot()
+
+    sender.set_serial(None)
+    stop.set()
+    port.close()
+    os.close(slave_fd)
+    os.close(master_fd)
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="轮询主站基准测试(pty回环)")
+    parser.add_argument('--duration', type=float, default=2.0, help="每种换向间隔的运行时间(秒)")
+    parser.add_argument('--baud', type=int, default=9600, help="模拟的线路波特率")
+    parser.add_argument('--delay', type=float, default=3.0, help="节点的应答延迟(ms)")
+    parser.add_argument('--timeout', type=float, default=50.0, help="响应超时(ms)")
+    args = parser.parse_args()
+
+    if os.name != 'posix':
+        print("该基准测试依赖pty，仅支持Linux/macOS")
+        return
+
+    app = QCoreApplication(sys.argv)
+    protocols = load_protocols()
+    print(f"{args.baud}波特8N1，帧间隔3.5字符，应答延迟 {args.delay:g} ms，超时 {args.timeout:g} ms")
+    print(f"{'换向(ms)':<10}{'周期数':>8}{'平均周期(ms)':>14}{'最大周期(ms)':>14}{'周期/秒':>10}  各节点响应率")
+    for turnaround_ms in (0, 5, 10, 20):
+        snapshot = run(protocols, turnaround_ms, args.timeout, args.duration, args.baud, args.delay)
+        cycles = snapshot['cycles']
+        rates = "  ".join(f"{node['response_id']}={node['response_rate'] * 100:.0f}%" for node in snapshot['nodes'])
+        per_second = 1000.0 / cycles['mean_ms'] if cycles['mean_ms'] else 0.0
+        print(f"{turnaround_ms:<10}{cycles['count']:>8}{cycles['mean_ms']:>14.2f}{cycles['max_ms']:>14.2f}"
+              f"{per_second:>10.2f}  {rates}")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 原始数据录制基准测试，测量CaptureWriter在满载串口数据流下的CPU占用和最大写入速度
+
+用法:
+    python benchmarks/bench_raw_capture.py [--baud 921600] [--seconds 5] [--chunk 184]
+
+实时：按波特率(10位/字节)的满载速率，以--chunk字节的数据块调用write（默认184字节，约为921600波特率下
+2ms接收延迟合并的数据量），每10块中有1块为发送方向，统计进程CPU占用，并减去不录制时同样定时循环的CPU占用；
+满速：不限速连续写入，统计每块的开销和可达到的数据速率。录制文件写入临时目录，结束后删除。
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_common  # noqa: F401 基准测试中只保留警告以上的日志
+from raw_capture import CaptureWriter, iter_capture_records, DIR_RX, DIR_TX
+
+
+def run_paced(path, byte_rate, seconds, chunk_size):
+    """
+    按指定速率写入，path为None时只运行定时循环，作为CPU占用的基准
+
+    Returns:
+        tuple: (数据块数, 墙钟时间(秒), CPU时间(秒), 录制统计)
+    """
+    data = os.urandom(chunk_size)
+    interval = chunk_size / byte_rate
+    writer = CaptureWriter(path, [{'name': 'bench', 'baudrate': byte_rate * 10}]) if path else None
+    chunks = int(seconds / interval)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for index in range(chunks):
+        # 按绝对时间表写入，睡眠不占用CPU
+        delay = start + index * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if writer is not None:
+            writer.write(0, DIR_TX if index % 10 == 9 else DIR_RX, data)
+    if writer is not None:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    return chunks, elapsed, cpu, writer.stats() if writer is not None else None
+
+
+def run_unpaced(path, chunks, chunk_size):
+    """
+    不限速写入
+
+    Returns:
+        tuple: (墙钟时间(秒), 录制统计)
+    """
+    data = os.urandom(chunk_size)
+    writer = CaptureWriter(path, [{'name': 'bench'}])
+    start = time.perf_counter()
+    for index in range(chunks):
+        writer.write(0, DIR_RX, data)
+    writer.close()
+    return time.perf_counter() - start, writer.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="原始数据录制基准测试")
+    parser.add_argument('--baud', type=int, default=921600, help="模拟的波特率")
+    parser.add_argument('--seconds', type=float, default=5, help="实时写入的时长(秒)")
+    parser.add_argument('--chunk', type=int, default=184, help="数据块大小(字节)")
+    parser.add_argument('--chunks', type=int, default=500000, help="满速写入的数据块数")
+    args = parser.parse_args()
+
+    byte_rate = args.baud / 10
+    fd, path = tempfile.mkstemp(suffix='.ydcap')
+    os.close(fd)
+    try:
+        _, base_elapsed, base_cpu, _ = run_paced(None, byte_rate, args.seconds, args.chunk)
+        chunks, elapsed, cpu, stats = run_paced(path, byte_rate, args.seconds, args.chunk)
+        with open(path, 'rb') as f:
+            recorded = sum(1 for _ in iter_capture_records(f))
+        capture_cpu = cpu / elapsed - base_cpu / base_elapsed
+        print(f"实时 {args.baud}波特率: {chunks} 块 {stats['data_bytes'] / elapsed / 1024:.1f} KB/s, "
+              f"CPU {cpu / elapsed * 100:.2f}% (定时循环 {base_cpu / base_elapsed * 100:.2f}%, "
+              f"录制 {capture_cpu * 100:.2f}%), 文件 {stats['file_bytes'] / 1024:.0f} KB, "
+              f"读回 {recorded} 块, 丢弃 {stats['dropped_chunks']} 块")
+
+        elapsed, stats = run_unpaced(path, args.chunks, args.chunk)
+        rate = stats['data_bytes'] / elapsed
+        print(f"满速: {args.chunks} 块 {elapsed * 1000:.0f} ms, {elapsed / args.chunks * 1e6:.2f} us/块, "
+              f"{rate / 1024 / 1024:.1f} MB/s (满载{args.baud}波特率的 {rate / byte_rate:.0f} 倍), "
+              f"丢弃 {stats['dropped_chunks']} 块")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 接收延迟基准测试，在pty回环上对比轮询与事件驱动两种接收模式从写入到receive_signal的延迟(仅限Linux)
+
+用法:
+    python benchmarks/bench_receive_latency.py [--frames 200] [--latency 2]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serial
+from PyQt5.QtCore import QCoreApplication, Qt
+from tyw_serial import SerialReceiveThread
+
+# 一帧D0h报文，长度与实际周期报文相当
+FRAME = bytes.fromhex("5944D01B00" + "FF" * 27 + "0000" + "4B4A")
+
+
+def run_mode(read_mode, frames, read_latency, interval):
+    """
+    在pty回环上测量一种接收模式的延迟
+
+    Args:
+        read_mode (str): 接收模式
+        frames (int): 发送帧数
+        read_latency (int): 接收延迟(ms)
+        interval (float): 帧间隔(秒)
+
+    Returns:
+        list: 每帧的延迟(毫秒)
+    """
+    master, slave = os.openpty()
+    port = serial.Serial(os.ttyname(slave), 115200, timeout=0.1)
+
+    latencies = []
+    received = threading.Event()
+    state = {'sent_at': 0.0, 'pending': 0}
+
+    def on_receive(data):
+        state['pending'] -= len(data)
+        if state['pending'] <= 0:
+            latencies.append((time.perf_counter() - state['sent_at']) * 1000)
+            received.set()
+
+    thread = SerialReceiveThread(port, read_mode=read_mode, read_latency=read_latency)
+    # 直接连接，在接收线程中记录时间，排除事件循环的影响
+    thread.receive_signal.connect(on_receive, Qt.DirectConnection)
+    thread.start()
+    time.sleep(0.05)
+
+    try:
+        for _ in range(frames):
+            received.clear()
+            state['pending'] = len(FRAME)
+            state['sent_at'] = time.perf_counter()
+            os.write(master, FRAME)
+            received.wait(1.0)
+            time.sleep(interval)
+    finally:
+        thread.stop()
+        port.close()
+        os.close(master)
+        os.close(slave)
+
+    return latencies
+
+
+def report(name, latencies):
+    """打印统计结果"""
+    if not latencies:
+        print(f"{name:<24} 未收到数据")
+        return
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name:<24} 帧数={len(latencies):<5} 平均={statistics.mean(latencies):7.3f}ms "
+          f"中位={statistics.median(latencies):7.3f}ms P99={p99:7.3f}ms 最大={ordered[-1]:7.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接收延迟基准测试(pty回环)")
+    parser.add_argument('--frames', type=int, default=200, help="每种模式发送的帧数")
+    parser.add_argument('--latency', type=int, default=2, help="事件驱动模式的接收延迟(ms)")
+    parser.add_argument('--interval', type=float, default=0.013, help="帧间隔(秒)")
+    args = parser.parse_args()
+
+    if os.name != 'posix':
+        print("该基准测试依赖pty，仅支持Linux/macOS")
+        return
+
+    app = QCoreApplication(sys.argv)
+
+    report("轮询(10ms)", run_mode(SerialReceiveThread.MODE_POLLING, args.frames, 0, args.interval))
+    report("事件驱动(延迟0ms)", run_mode(SerialReceiveThread.MODE_BLOCKING, args.frames, 0, args.interval))
+    report(f"事件驱动(延迟{args.latency}ms)",
+           run_mode(SerialReceiveThread.MODE_BLOCKING, args.frames, args.latency, args.interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 录制回放吞吐量基准测试，生成一个混合协议流量的录制文件，不限速回放并测量端到端的帧/秒
+
+用法:
+    python benchmarks/bench_replay.py [--frames 200000] [--chunk 184] [--capture 已有录制文件]
+
+两条路径:
+- 核心: CaptureReplayer -> SerialEngine.feed（FrameReceiver分帧 + ProtocolDecoder解码），即replay.py的路径
+- 界面: CaptureReplayThread -> ReceiveWorker（MessageReceiver分帧 + ProtocolParser解码）-> results_batch信号，
+  直到接收处理线程处理完全部数据并提交所有结果
+生成的录制文件按921600波特率满载的时间戳写入临时目录，结束后删除；指定--capture时直接使用已有录制文件。
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from bench_common import load_protocols, build_frame
+from raw_capture import CaptureWriter, DIR_RX
+from replay import CaptureReplayer, SPEED_MAX
+from engine import SerialEngine
+
+
+def build_capture(path, protocols, frames, chunk_size, rng, byte_rate=92160):
+    """
+    生成录制文件，混合协议的报文流按chunk_size切块，报文从预先构造的报文池中随机选取
+
+    Returns:
+        int: 报文数
+    """
+    protocol_list = list(protocols.values())
+    pool = [build_frame(rng.choice(protocol_list), rng=rng) for _ in range(min(frames, 2000))]
+    stream = b''.join(rng.choice(pool) for _ in range(frames))
+    writer = CaptureWriter(path, [{'name': 'bench', 'baudrate': byte_rate * 10}])
+    mono_ns = time.monotonic_ns()
+    wall_ns = time.time_ns()
+    for offset in range(0, len(stream), chunk_size):
+        chunk = stream[offset:offset + chunk_size]
+        writer.write(0, DIR_RX, chunk, mono_ns, wall_ns)
+        step = int(len(chunk) / byte_rate * 1e9)
+        mono_ns += step
+        wall_ns += step
+    writer.close()
+    return frames
+
+
+def run_core(path, protocols):
+    """
+    核心路径不限速回放
+
+    Returns:
+        tuple: (帧数, 秒, 引擎统计)
+    """
+    engine = SerialEngine(protocols)
+    replayer = CaptureReplayer(path, SPEED_MAX)
+    start = time.perf_counter()
+    replayer.run(engine.feed)
+    elapsed = time.perf_counter() - start
+    stats = engine.stats()
+    return stats['frames'], elapsed, stats
+
+
+def run_gui(path, protocols):
+    """
+    界面接收流水线不限速回放
+
+    Returns:
+        tuple: (帧数, 秒, 提交的结果条数, 丢弃的结果条数)
+    """
+    from PyQt5.QtCore import QCoreApplication, Qt
+    from message_transceiver import MessageReceiver
+    from protocol_parser import ProtocolParser
+    from receive_pipeline import ReceiveWorker
+    from tyw_serial import CaptureReplayThread
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    message_receiver = MessageReceiver()
+    message_receiver.set_protocols(protocols)
+    protocol_parser = ProtocolParser()
+    protocol_parser.set_protocols(protocols)
+    worker = ReceiveWorker(message_receiver, protocol_parser)
+    posted = [0]
+
+    def on_batch(batch):
+        # 直接连接，在接收处理线程中确认，模拟界面及时处理完每一批
+        posted[0] += len(batch)
+        worker.batch_done()
+
+    worker.results_batch.connect(on_batch, Qt.DirectConnection)
+    replay_thread = CaptureReplayThread(path, worker, SPEED_MAX)
+    worker.add_frame_observer(replay_thread.count_frame)
+
+    start = time.perf_counter()
+    worker.start()
+    replay_thread.start()
+    replay_thread.wait()
+    worker.stop()
+    elapsed = time.perf_counter() - start
+    app.processEvents()
+    _, _, dropped_results = worker.take_stats()
+    return replay_thread.frames, elapsed, posted[0], dropped_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制回放吞吐量基准测试")
+    parser.add_argument('--frames', type=int, default=200000, help="生成的录制文件中的报文数")
+    parser.add_argument('--chunk', type=int, default=184, help="数据块大小(字节)")
+    parser.add_argument('--capture', help="使用已有的录制文件")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    protocols = load_protocols()
+    path = args.capture
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.ydcap')
+        os.close(fd)
+        start = time.perf_counter()
+        build_capture(path, protocols, args.frames, args.chunk, random.Random(args.seed))
+        print(f"生成录制文件: {args.frames} 帧 {os.path.getsize(path) / 1024 / 1024:.1f} MB，"
+              f"耗时 {time.perf_counter() - start:.2f} 秒")
+
+    try:
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        frames, elapsed, stats = run_core(path, protocols)
+        print(f"核心(SerialEngine): {frames} 帧 {elapsed:.2f} 秒，{frames / elapsed:,.0f} 帧/秒，"
+              f"{size_mb / elapsed:.1f} MB/s，CRC错误 {stats['crc_errors']}，未识别 {stats['unknown']}")
+
+        frames, elapsed, posted, dropped = run_gui(path, protocols)
+        print(f"界面(ReceiveWorker): {frames} 帧 {elapsed:.2f} 秒，{frames / elapsed:,.0f} 帧/秒，"
+              f"{size_mb / elapsed:.1f} MB/s，提交结果 {posted} 条，丢弃 {dropped} 条")
+    finally:
+        if args.capture is None:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 发送优先级基准测试，在pty回环上测量周期报文过载时手动报文的发送延迟和发送队列深度(仅限Linux)
+
+用法:
+    python benchmarks/bench_send_priority.py [--duration 3] [--baud 9600]
+
+pty没有波特率限制，测试时设置帧间隔，写线程按--baud的线路时间逐帧发送。
+周期报文的总负载超过线路能力，对比三种方式：
+    单队列      所有报文按先后顺序发送（原方式）
+    优先级      手动报文优先发送，不丢弃过期的周期报文
+    优先级+丢弃 手动报文优先发送，同一周期报文在队列中只保留最新一帧
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serial
+from PyQt5.QtCore import QCoreApplication
+from message_transceiver import MessageSender, PRIORITY_INTERACTIVE, PRIORITY_PERIODIC
+from line_timing import LineTiming
+from scheduler import PeriodicScheduler
+
+# 各周期报文的周期(ms)
+INTERVALS = {0xD0: 10, 0xD1: 20, 0xD2: 50, 0xD3: 100}
+MANUAL_ID = 0xA4
+MANUAL_INTERVAL = 0.2  # 手动报文的发送间隔(秒)
+
+
+def build_frame(message_id):
+    """构造一帧固定长度的测试报文"""
+    return bytes([0x59, 0x44, message_id, 0x1B, 0x00]) + b'\xFF' * 27 + b'\x4B\x4A'
+
+
+def drain_reader(master, stop):
+    """读取pty主端，避免写入阻塞"""
+    while not stop.is_set():
+        try:
+            os.read(master, 65536)
+        except OSError:
+            break
+
+
+def run_mode(app, mode, duration, baud):
+    """
+    运行一种发送方式
+
+    Returns:
+        tuple: (手动报文延迟列表ms, 周期报文延迟列表ms, 最大排队数)
+    """
+    master, slave = os.openpty()
+    port = serial.Serial(os.ttyname(slave), baud)
+    stop = threading.Event()
+    reader = threading.Thread(target=drain_reader, args=(master, stop), daemon=True)
+    reader.start()
+
+    sender = MessageSender()
+    sender.drop_stale = mode == 'drop'
+    sender.set_line_timing(LineTiming(baudrate=baud, gap_chars=3.5))
+    manual, periodic = [], []
+
+    def on_sent(sent):
+        for message, name, latency_ms, priority in sent:
+            (manual if message[2] == MANUAL_ID else periodic).append(latency_ms)
+
+    sender.messages_sent.connect(on_sent)
+    sender.set_serial(port)
+
+    # 单队列方式下所有报文使用同一优先级
+    periodic_priority = PRIORITY_INTERACTIVE if mode == 'fifo' else PRIORITY_PERIODIC
+    scheduler = PeriodicScheduler()
+    for message_id, interval in INTERVALS.items():
+        frame = build_frame(message_id)
+        scheduler.schedule(message_id, interval,
+                           lambda key, m=frame: sender.add_message(m, "periodic", periodic_priority, replace_key=key))
+    scheduler.start()
+
+    manual_frame = build_frame(MANUAL_ID)
+    end = time.perf_counter() + duration
+    next_manual = time.perf_counter() + MANUAL_INTERVAL
+    while time.perf_counter() < end:
+        if time.perf_counter() >= next_manual:
+            sender.add_message(manual_frame, "manual", PRIORITY_INTERACTIVE)
+            next_manual += MANUAL_INTERVAL
+        app.processEvents()
+        time.sleep(0.001)
+
+    scheduler.stop()
+    max_depth = max(lane['max_depth'] for lane in sender.lane_stats())
+    sender.set_serial(None)
+    app.processEvents()
+    stop.set()
+    port.close()
+    os.close(slave)
+    os.close(master)
+    return manual, periodic, max_depth
+
+
+def percentile(values, ratio):
+    """计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="发送优先级基准测试(pty回环)")
+    parser.add_argument('--duration', type=float, default=3.0, help="每种方式的运行时间(秒)")
+    parser.add_argument('--baud', type=int, default=9600, help="模拟的线路波特率")
+    args = parser.parse_args()
+
+    if os.name != 'posix':
+        print("该基准测试依赖pty，仅支持Linux/macOS")
+        return
+
+    app = QCoreApplication(sys.argv)
+    line_timing = LineTiming(baudrate=args.baud, gap_chars=3.5)
+    load = line_timing.bus_load([(len(build_frame(message_id)), interval) for message_id, interval in INTERVALS.items()])
+    print(f"{args.baud}波特8N1，帧间隔3.5字符，周期报文负载 {load * 100:.0f}%")
+
+    for mode, name in (('fifo', "单队列"), ('priority', "优先级"), ('drop', "优先级+丢弃")):
+        manual, periodic, max_depth = run_mode(app, mode, args.duration, args.baud)
+        print(f"{name:<10} 手动报文 {len(manual):>3}帧 延迟中位={percentile(manual, 0.5):8.2f}ms "
+              f"最大={percentile(manual, 1.0):8.2f}ms  周期报文 {len(periodic):>4}帧 "
+              f"延迟中位={percentile(periodic, 0.5):8.2f}ms  最大排队={max_depth}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 发送吞吐量基准测试，在pty回环上对比原10ms定时器逐帧发送与写线程合并发送的帧率和延迟(仅限Linux)
+
+用法:
+    python benchmarks/bench_send_throughput.py [--frames 2000] [--baud 115200]
+
+pty没有波特率限制，结果与--baud对应的线路理论帧率对比，帧率高于理论值即可跑满线路。
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serial
+from PyQt5.QtCore import QCoreApplication, QTimer
+from message_transceiver import MessageSender
+
+# 一帧D0h报文
+FRAME = bytes.fromhex("5944D01B00" + "FF" * 27 + "0000" + "4B4A")
+
+
+class LegacySender:
+    """原MessageSender的发送方式：10ms定时器每次发送队列中的一帧"""
+
+    def __init__(self, port):
+        self.port = port
+        self.queue = []
+        self.latencies = []
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.process_queue)
+        self.timer.start(10)
+
+    def add_message(self, message):
+        self.queue.append((message, time.monotonic_ns()))
+
+    def process_queue(self):
+        if self.queue:
+            message, enqueue_ns = self.queue.pop(0)
+            self.port.write(message)
+            self.latencies.append((time.monotonic_ns() - enqueue_ns) / 1e6)
+
+
+def drain_reader(master, total, done):
+    """读取pty主端，收到total字节后置位done"""
+    received = 0
+    while received < total:
+        try:
+            received += len(os.read(master, 65536))
+        except OSError:
+            break
+    done.set()
+
+
+def run_mode(app, mode, frames, timeout):
+    """
+    发送frames帧并等待全部到达
+
+    Returns:
+        tuple: (耗时秒数, 延迟列表ms)，未在超时内完成时耗时为None
+    """
+    master, slave = os.openpty()
+    port = serial.Serial(os.ttyname(slave), 115200)
+    done = threading.Event()
+    threading.Thread(target=drain_reader, args=(master, frames * len(FRAME), done), daemon=True).start()
+
+    latencies = []
+    start = time.perf_counter()
+    if mode == 'legacy':
+        sender = LegacySender(port)
+        for _ in range(frames):
+            sender.add_message(FRAME)
+    else:
+        sender = MessageSender()
+        sender.messages_sent.connect(lambda sent: latencies.extend(entry[2] for entry in sent))
+        sender.set_serial(port)
+        for _ in range(frames):
+            sender.add_message(FRAME, "bench")
+
+    deadline = time.perf_counter() + timeout
+    while not done.is_set() and time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start if done.is_set() else None
+
+    # 处理剩余的跨线程信号
+    app.processEvents()
+    if mode == 'legacy':
+        sender.timer.stop()
+        latencies = sender.latencies
+    else:
+        sender.set_serial(None)
+    port.close()
+    os.close(slave)
+    os.close(master)
+    return elapsed, latencies
+
+
+def report(name, frames, elapsed, latencies):
+    """打印统计结果"""
+    if elapsed is None:
+        print(f"{name:<12} 超时，已发送 {len(latencies)} 帧")
+        return
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2] if ordered else 0.0
+    print(f"{name:<12} 帧率={frames / elapsed:>10,.0f} 帧/秒  吞吐={frames * len(FRAME) / elapsed / 1024:>9.1f} KB/s  "
+          f"延迟中位={p50:8.2f}ms 最大={ordered[-1] if ordered else 0.0:8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="发送吞吐量基准测试(pty回环)")
+    parser.add_argument('--frames', type=int, default=2000, help="发送帧数")
+    parser.add_argument('--baud', type=int, default=115200, help="对比的线路波特率")
+    args = parser.parse_args()
+
+    if os.name != 'posix':
+        print("该基准测试依赖pty，仅支持Linux/macOS")
+        return
+
+    app = QCoreApplication(sys.argv)
+
+    # 8N1每字节10位
+    line_rate = args.baud / 10 / len(FRAME)
+    print(f"{args.baud}波特8N1线路理论帧率: {line_rate:,.0f} 帧/秒 ({len(FRAME)}字节/帧)")
+
+    legacy_frames = min(args.frames, 300)
+    report("原10ms定时器", legacy_frames, *run_mode(app, 'legacy', legacy_frames, legacy_frames * 0.02 + 5))
+    report("写线程", args.frames, *run_mode(app, 'writer', args.frames, 30))
+
+
+if __name__ == "__main__":
+    main()
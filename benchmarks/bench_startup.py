@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 启动基准测试，比较命令行采集工具与图形界面加载同一配置文件的启动时间和内存占用(仅限Linux/macOS)
+
+用法:
+    python benchmarks/bench_startup.py [--repeat 5] [--config YD-G392.ini]
+
+每次在新进程中启动：命令行采集工具执行 capture.py --list（导入、加载并编译协议后退出）；
+图形界面使用offscreen平台创建主窗口并加载同一配置文件后退出。记录进程运行时间和最大常驻内存(RSS)，
+并检查capture.py是否导入了PyQt5。
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GUI_SCRIPT = """
+import sys
+from PyQt5.QtWidgets import QApplication
+from tyw_serial import SerialToolUI
+app = QApplication(sys.argv)
+window = SerialToolUI()
+window.config_path.setText(sys.argv[1])
+window.load_config()
+app.processEvents()
+"""
+
+QT_CHECK_SCRIPT = "import sys, capture; print(any(name.startswith('PyQt5') for name in sys.modules))"
+
+
+def run_process(command, env):
+    """
+    运行一个进程直到退出
+
+    Returns:
+        tuple: (运行时间(ms), 最大RSS(MB), 退出码)
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # Linux的ru_maxrss单位为KB，macOS为字节
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return elapsed_ms, rss_mb, process.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="命令行采集与图形界面的启动基准测试")
+    parser.add_argument('--repeat', type=int, default=5, help="每种方式启动的次数")
+    parser.add_argument('--config', default=os.path.join(ROOT_DIR, 'YD-G392.ini'), help="INI配置文件")
+    args = parser.parse_args()
+
+    if os.name != 'posix':
+        print("该基准测试依赖os.wait4，仅支持Linux/macOS")
+        return
+
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen', PYTHONPATH=ROOT_DIR)
+    config = os.path.abspath(args.config)
+    cases = [
+        ("capture --list", [sys.executable, os.path.join(ROOT_DIR, 'capture.py'), '--config', config, '--list']),
+        ("图形界面", [sys.executable, '-c', GUI_SCRIPT, config]),
+    ]
+
+    print(f"{'方式':<16}{'启动(ms)中位数':>16}{'最小(ms)':>12}{'RSS(MB)':>10}")
+    for name, command in cases:
+        times = []
+        rss = []
+        for _ in range(args.repeat):
+            elapsed_ms, rss_mb, returncode = run_process(command, env)
+            if returncode != 0:
+                print(f"{name}: 进程退出码 {returncode}")
+                break
+            times.append(elapsed_ms)
+            rss.append(rss_mb)
+        if times:
+            print(f"{name:<16}{statistics.median(times):>16.1f}{min(times):>12.1f}{max(rss):>10.1f}")
+
+    result = subprocess.run([sys.executable, '-c', QT_CHECK_SCRIPT], cwd=ROOT_DIR, env=env,
+                            capture_output=True, text=True)
+    print(f"capture.py 导入PyQt5: {result.stdout.strip() or result.stderr.strip()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 定时发送精度基准测试，在pty回环上对比原10ms轮询方式与周期调度器的发送抖动和累积漂移(仅限Linux)
+
+用法:
+    python benchmarks/bench_timed_send.py [--duration 5] [--busy 0]
+
+抖动为到达时间与理想时间表(第一帧到达时间 + k × 周期)中最近时刻之差，
+累积漂移为按帧序号计算的最后一帧偏差(少发的帧也会计入漂移)。
+--busy N 表示界面线程每100ms忙碌N毫秒，模拟界面刷新等负载。
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serial
+from PyQt5.QtCore import QCoreApplication, QTimer
+from message_transceiver import MessageSender, TimedMessage
+from scheduler import PeriodicScheduler
+
+# 各定时报文的周期(ms)，报文ID用于区分
+INTERVALS = {0xD0: 10, 0xD1: 20, 0xD2: 50, 0xD3: 100}
+FRAME_LENGTH = 34
+
+
+def build_frame(message_id):
+    """构造一帧固定长度的测试报文"""
+    return bytes([0x59, 0x44, message_id, 0x1B, 0x00]) + b'\xFF' * 27 + b'\x4B\x4A'
+
+
+class ArrivalRecorder(threading.Thread):
+    """在pty主端读取报文并记录每帧的到达时间"""
+
+    def __init__(self, master):
+        super().__init__(daemon=True)
+        self.master = master
+        self.arrivals = {message_id: [] for message_id in INTERVALS}
+        self.is_running = True
+
+    def run(self):
+        buffer = b''
+        while self.is_running:
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                break
+            now = time.monotonic_ns()
+            buffer += data
+            while len(buffer) >= FRAME_LENGTH:
+                message_id = buffer[2]
+                if message_id in self.arrivals:
+                    self.arrivals[message_id].append(now)
+                buffer = buffer[FRAME_LENGTH:]
+
+
+def legacy_check(timed_messages, sender):
+    """原TimedMessagesManager.check_messages的逻辑：每次发送后以实际时间作为下一周期的起点"""
+    current_time = int(time.time() * 1000)
+    for message in timed_messages:
+        if message.last_sent == 0 or current_time - message.last_sent >= message.interval:
+            message.last_sent = current_time
+            sender.add_message(message.message, message.name)
+
+
+def run_mode(app, mode, duration, busy):
+    """
+    在pty回环上运行一种定时方式
+
+    Returns:
+        dict: {message_id: [到达时间(ns)]}
+    """
+    master, slave = os.openpty()
+    port = serial.Serial(os.ttyname(slave), 115200)
+    recorder = ArrivalRecorder(master)
+    recorder.start()
+
+    sender = MessageSender()
+    sender.set_serial(port)
+    timed_messages = [TimedMessage(f"{message_id:02X}h", build_frame(message_id), interval, True)
+                      for message_id, interval in INTERVALS.items()]
+
+    timers = []
+    scheduler = None
+    if mode == 'legacy':
+        poll_timer = QTimer()
+        poll_timer.timeout.connect(lambda: legacy_check(timed_messages, sender))
+        poll_timer.start(10)
+        timers.append(poll_timer)
+    else:
+        scheduler = PeriodicScheduler()
+        for message in timed_messages:
+            scheduler.schedule(message.name, message.interval,
+                               lambda key, m=message: sender.write_message(m.message, m.name))
+        scheduler.start()
+
+    if busy:
+        def busy_loop():
+            end = time.perf_counter() + busy / 1000.0
+            while time.perf_counter() < end:
+                pass
+
+        busy_timer = QTimer()
+        busy_timer.timeout.connect(busy_loop)
+        busy_timer.start(100)
+        timers.append(busy_timer)
+
+    QTimer.singleShot(int(duration * 1000), app.quit)
+    app.exec_()
+
+    if scheduler:
+        scheduler.stop()
+    for timer in timers:
+        timer.stop()
+    sender.set_serial(None)
+    time.sleep(0.05)
+    recorder.is_running = False
+    port.close()
+    os.close(slave)
+    recorder.join(0.5)
+    os.close(master)
+    return recorder.arrivals
+
+
+def report(mode, arrivals):
+    """打印每个周期的帧数、抖动和漂移"""
+    print(f"{mode}:")
+    for message_id, interval in INTERVALS.items():
+        times = arrivals[message_id]
+        if len(times) < 2:
+            print(f"  周期{interval:>4}ms  帧数不足")
+            continue
+
+        # 相位偏差：到达时间与最近一个理想时刻之差，跳过的周期不影响
+        period_ns = interval * 1000000
+        phases = sorted(abs((t - times[0]) - round((t - times[0]) / period_ns) * period_ns) / 1e6 for t in times)
+        p99 = phases[min(len(phases) - 1, int(len(phases) * 0.99))]
+        expected = (times[-1] - times[0]) // period_ns + 1
+        # 累积漂移：按帧序号计算的最后一帧偏差，少发的帧也计入
+        drift = (times[-1] - times[0] - (len(times) - 1) * period_ns) / 1e6
+        print(f"  周期{interval:>4}ms  帧数={len(times):<5} 应发={expected:<5} "
+              f"P99抖动={p99:8.3f}ms 最大抖动={phases[-1]:8.3f}ms 累积漂移={drift:9.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="定时发送精度基准测试(pty回环)")
+    parser.add_argument('--duration', type=float, default=5.0, help="每种方式的运行时间(秒)")
+    parser.add_argument('--busy', type=int, default=0, help="界面线程每100ms忙碌的毫秒数")
+    args = parser.parse_args()
+
+    if os.name != 'posix':
+        print("该基准测试依赖pty，仅支持Linux/macOS")
+        return
+
+    app = QCoreApplication(sys.argv)
+    report("原10ms轮询", run_mode(app, 'legacy', args.duration, args.busy))
+    report("周期调度器", run_mode(app, 'scheduler', args.duration, args.busy))
+
+
+if __name__ == "__main__":
+    main()
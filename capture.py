@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 命令行采集工具，不依赖Qt，打开一个或多个串口，按配置文件中的协议分帧解码，输出到标准输出或文件
+
+用法:
+    python capture.py --port COM3 [--port COM4:115200] [--config YD-G392.ini] [--baud 9600]
+                      [--format text|jsonl|binary] [--output 文件] [--duration 秒] [--count 帧数]
+    python capture.py --config YD-G392.ini --list
+
+--port 可以重复，每个串口可以用"串口:波特率"单独指定波特率。text和jsonl每帧一行，默认输出到标准输出；
+binary按raw_capture的格式录制每个串口收到的原始数据块，不做解码，需要--output，录制文件可以用replay.py回放、
+用capture_index.py建索引查找。日志和统计输出到标准错误，Ctrl+C或到达--duration/--count后停止。
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import logging
+import argparse
+import threading
+from datetime import datetime
+
+import serial
+
+import log_manager
+from log_manager import log_error
+from config_parser import ConfigParser
+from protocol_decoder import ProtocolDecoder
+from framer import Framer
+from raw_capture import CaptureWriter, DIR_RX, describe_port
+from serial_reader import SerialReader
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'YD-G392.ini')
+PARITY_NAMES = {'N': serial.PARITY_NONE, 'E': serial.PARITY_EVEN, 'O': serial.PARITY_ODD,
+                'M': serial.PARITY_MARK, 'S': serial.PARITY_SPACE}
+
+
+def parse_port_spec(spec, default_baud):
+    """
+    解析串口参数
+
+    Args:
+        spec (str): "串口"或"串口:波特率"
+        default_baud (int): 默认波特率
+
+    Returns:
+        tuple: (port, baudrate)
+    """
+    name, sep, baud = spec.rpartition(':')
+    if sep and name and baud.isdigit():
+        return name, int(baud)
+    return spec, default_baud
+
+
+class CapturePort:
+    """
+    一个采集串口
+
+    独立线程用SerialReader读取串口并分帧，每次读到的报文作为一批放入公共队列 (port_index, mono_ns, wall_ns, [(message, crc_ok)])。
+    """
+
+    def __init__(self, index, port, baudrate, protocols, records, bytesize=8, parity='N', stopbits=1):
+        """
+        Args:
+            index (int): 串口序号，记录中用于区分串口
+            port (str): 串口名
+            baudrate (int): 波特率
+            protocols (dict): 协议信息字典，用于分帧
+            records (queue.Queue): 输出队列
+        """
+        self.index = index
+        self.port = port
+        self.baudrate = baudrate
+        self.bytesize = bytesize
+        self.parity = parity
+        self.stopbits = stopbits
+        self.records = records
+        self.framer = Framer()
+        self.framer.set_protocols(protocols)
+        self.serial = None
+        self.reader = None
+        self.thread = None
+        self.is_running = False
+        self.error = ""
+
+        self.received_bytes = 0
+        self.frames = 0
+        self.crc_errors = 0
+
+    def open(self):
+        """打开串口，失败时抛出serial.SerialException"""
+        self.serial = serial.Serial(self.port, self.baudrate, bytesize=self.bytesize,
+                                    parity=PARITY_NAMES.get(self.parity, self.parity),
+                                    stopbits=self.stopbits, timeout=0.05)
+        self.reader = SerialReader(self.serial)
+
+    def start(self):
+        """启动读取线程"""
+        self.is_running = True
+        self.thread = threading.Thread(target=self.run, name=f"Capture-{self.port}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止读取线程并关闭串口"""
+        self.is_running = False
+        if self.reader is not None:
+            self.reader.stop()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.serial is not None:
+            self.serial.close()
+            self.serial = None
+
+    def running(self):
+        """
+        读取线程是否在运行
+
+        Returns:
+            bool: 串口出错后返回False
+        """
+        return self.is_running
+
+    def run(self):
+        self.reader.read_loop(self.on_data, self.on_error)
+        self.is_running = False
+
+    def on_data(self, data):
+        """读取线程中分帧"""
+        mono_ns = time.monotonic_ns()
+        wall_ns = time.time_ns()
+        self.received_bytes += len(data)
+        frames = self.framer.feed(data)
+        if frames:
+            self.frames += len(frames)
+            self.crc_errors += sum(1 for _, crc_ok in frames if not crc_ok)
+            self.records.put((self.index, mono_ns, wall_ns, frames))
+
+    def on_error(self, error):
+        """读取出错，停止该串口"""
+        self.error = str(error)
+        log_error(f"读取串口 {self.port} 失败: {self.error}")
+
+
+class TextWriter:
+    """文本输出，每帧一行：时间 串口 协议 报文 字段"""
+
+    def __init__(self, stream, ports, decoder, show_fields=True):
+        self.stream = stream
+        self.ports = ports
+        self.decoder = decoder
+        self.show_fields = show_fields
+
+    def write(self, port_index, mono_ns, wall_ns, message, crc_ok):
+        timestamp = datetime.fromtimestamp(wall_ns / 1e9).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        if not crc_ok:
+            label, fields = "CRC错误", None
+        else:
+            protocol_id, parsed_data = self.decoder.decode_message(message)
+            label = protocol_id or "未知"
+            fields = parsed_data['fields'] if parsed_data else None
+
+        line = f"{timestamp} {self.ports[port_index]} {label} {message.hex(' ').upper()}"
+        if fields and self.show_fields:
+            values = []
+            for field in fields.values():
+                description = field.get('description')
+                values.append(f"{field['name']}={field['value']}" + (f"({description})" if description else ""))
+            line += " | " + "; ".join(values)
+        self.stream.write(line + "\n")
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class JsonlWriter:
+    """JSON Lines输出，每帧一个JSON对象"""
+
+    def __init__(self, stream, ports, decoder):
+        self.stream = stream
+        self.ports = ports
+        self.decoder = decoder
+
+    def write(self, port_index, mono_ns, wall_ns, message, crc_ok):
+        record = {
+            'time': datetime.fromtimestamp(wall_ns / 1e9).strftime('%Y-%m-%d %H:%M:%S.%f'),
+            'mono_ns': mono_ns,
+            'port': self.ports[port_index],
+            'crc_ok': crc_ok,
+            'protocol_id': None,
+            'raw': message.hex(' ').upper(),
+        }
+        if crc_ok:
+            protocol_id, parsed_data = self.decoder.decode_message(message)
+            if parsed_data:
+                record['protocol_id'] = protocol_id
+                record['protocol_name'] = parsed_data['protocol_name']
+                record['fields'] = {field_id: {'name': field['name'], 'value': field['value'],
+                                               'hex': field['hex'], 'description': field.get('description')}
+                                    for field_id, field in parsed_data['fields'].items()}
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class BinaryWriter:
+    """
+    原始数据录制输出，与界面的录制文件格式相同（见raw_capture.py）
+
+    每个串口读到的数据块由SerialReader的数据钩子交给CaptureWriter，串口序号即录制文件中的串口编号，
+    分帧后的报文只用于计数。
+    """
+
+    def __init__(self, path, ports, config_path):
+        """
+        Args:
+            path (str): 录制文件路径
+            ports (list): 已打开的CapturePort
+            config_path (str): 配置文件路径，写入文件头
+        """
+        self.capture_writer = CaptureWriter(path, [describe_port(port.serial) for port in ports],
+                                            info={'config': config_path})
+        for port in ports:
+            port.reader.add_data_hook(self.capture_writer.hook(port.index, DIR_RX))
+
+    def write(self, port_index, mono_ns, wall_ns, message, crc_ok):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.capture_writer.close()
+        stats = self.capture_writer.stats()
+        if stats['dropped_chunks'] or stats['error']:
+            print(f"录制: 丢弃 {stats['dropped_chunks']} 个数据块" + (f"，错误: {stats['error']}" if stats['error'] else ""),
+                  file=sys.stderr)
+
+
+def configure_logging(verbose):
+    """控制台日志默认只输出警告以上，--verbose时输出调试日志"""
+    level = logging.DEBUG if verbose else logging.WARNING
+    for handler in log_manager.logger.handlers:
+        if not isinstance(handler, logging.FileHandler):
+            handler.setLevel(level)
+
+
+def create_writer(args, stream, ports, decoder):
+    """按输出格式创建输出器，ports为已打开的CapturePort"""
+    if args.format == 'binary':
+        return BinaryWriter(args.output, ports, os.path.abspath(args.config))
+    names = [port.port for port in ports]
+    if args.format == 'jsonl':
+        return JsonlWriter(stream, names, decoder)
+    return TextWriter(stream, names, decoder, show_fields=not args.no_fields)
+
+
+def capture(args, protocols):
+    """
+    采集直到停止
+
+    Returns:
+        int: 退出码
+    """
+    decoder = ProtocolDecoder()
+    decoder.set_protocols(protocols)
+    decoder.set_heuristic_mode(args.heuristic)
+
+    records = queue.Queue()
+    specs = [parse_port_spec(spec, args.baud) for spec in args.port]
+    ports = [CapturePort(index, name, baudrate, protocols, records, args.bytesize, args.parity, args.stopbits)
+             for index, (name, baudrate) in enumerate(specs)]
+    for port in ports:
+        try:
+            port.open()
+        except (OSError, serial.SerialException) as e:
+            print(f"打开串口 {port.port} 失败: {str(e)}", file=sys.stderr)
+            for opened in ports:
+                opened.stop()
+            return 2
+
+    if args.format == 'binary':
+        stream = None
+    elif args.output:
+        stream = open(args.output, 'w', encoding='utf-8')
+    else:
+        stream = sys.stdout
+    try:
+        writer = create_writer(args, stream, ports, decoder)
+    except OSError as e:
+        print(f"无法创建输出文件 {args.output}: {str(e)}", file=sys.stderr)
+        for port in ports:
+            port.stop()
+        return 2
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    for port in ports:
+        port.start()
+    print("采集: " + ", ".join(f"{port.port}@{port.baudrate}" for port in ports), file=sys.stderr)
+
+    start = time.monotonic()
+    deadline = start + args.duration if args.duration > 0 else None
+    written = 0
+    try:
+        while not stop.is_set() and any(port.running() for port in ports):
+            timeout = 0.2 if deadline is None else max(0.0, min(0.2, deadline - time.monotonic()))
+            try:
+                batch = records.get(timeout=timeout)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                writer.flush()
+                continue
+
+            port_index, mono_ns, wall_ns, frames = batch
+            for message, crc_ok in frames:
+                if not crc_ok and not args.crc_errors:
+                    continue
+                writer.write(port_index, mono_ns, wall_ns, message, crc_ok)
+                written += 1
+                if args.count and written >= args.count:
+                    stop.set()
+                    break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+    except BrokenPipeError:
+        # 输出被管道另一端关闭（例如 | head）
+        stop.set()
+    finally:
+        for port in ports:
+            port.stop()
+        try:
+            writer.close()
+        except BrokenPipeError:
+            pass
+        if args.output and stream is not None:
+            stream.close()
+
+    elapsed = time.monotonic() - start
+    print(f"结束: {elapsed:.1f} 秒，输出 {written} 帧，未识别 {decoder.unknown_count}", file=sys.stderr)
+    for port in ports:
+        print(f"  {port.port}: 接收 {port.received_bytes} 字节，{port.frames} 帧，CRC错误 {port.crc_errors}"
+              + (f"，错误: {port.error}" if port.error else ""), file=sys.stderr)
+    return 1 if any(port.error for port in ports) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="串口报文采集(命令行，不依赖Qt)")
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help="INI配置文件")
+    parser.add_argument('--port', action='append', default=[], help="串口，可重复，可写作 串口:波特率")
+    parser.add_argument('--baud', type=int, default=9600, help="默认波特率")
+    parser.add_argument('--bytesize', type=int, default=8, choices=(5, 6, 7, 8), help="数据位")
+    parser.add_argument('--parity', default='N', choices=sorted(PARITY_NAMES), help="校验位")
+    parser.add_argument('--stopbits', type=float, default=1, choices=(1, 1.5, 2), help="停止位")
+    parser.add_argument('--format', default='text', choices=('text', 'jsonl', 'binary'), help="输出格式")
+    parser.add_argument('--output', help="输出文件，默认为标准输出，binary格式必须指定")
+    parser.add_argument('--duration', type=float, default=0, help="采集时间(秒)，0表示直到Ctrl+C")
+    parser.add_argument('--count', type=int, default=0, help="输出多少帧后停止，0表示不限")
+    parser.add_argument('--crc-errors', action='store_true', help="同时输出CRC错误的报文")
+    parser.add_argument('--heuristic', action='store_true', help="按报文ID无法解析时尝试所有协议")
+    parser.add_argument('--no-fields', action='store_true', help="text格式不输出字段")
+    parser.add_argument('--list', action='store_true', help="列出配置文件中的协议后退出")
+    parser.add_argument('--verbose', action='store_true', help="在标准错误输出调试日志")
+    args = parser.parse_args(argv)
+
+    configure_logging(args.verbose)
+
+    config_parser = ConfigParser(interactive=False)
+    if not os.path.exists(args.config):
+        print(f"配置文件不存在: {args.config}", file=sys.stderr)
+        return 2
+    loaded = config_parser.load_config(args.config)
+    for error in config_parser.get_validation_errors():
+        print(error, file=sys.stderr)
+    if not loaded:
+        print(f"加载配置文件失败: {args.config}", file=sys.stderr)
+        return 2
+    protocols = config_parser.get_protocols()
+
+    if args.list:
+        for protocol_id, protocol_data in protocols.items():
+            print(f"{protocol_id}\t{protocol_data.get('protocol_name', '')}")
+        return 0
+    if not args.port:
+        parser.error("至少需要一个 --port")
+    if args.format == 'binary' and not args.output:
+        parser.error("binary格式需要 --output")
+
+    return capture(args, protocols)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,652 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 录制文件索引，不依赖Qt，为原始数据录制文件(.ydcap)建立报文索引(.ydcap.idx)，按时间和报文ID快速查找报文
+
+用法:
+    python capture_index.py capture.ydcap [--from 02:00] [--to 02:05] [--id B4h] [--port-id 0]
+                            [--direction rx|tx] [--count] [--follow] [--config YD-G392.ini]
+
+索引文件(小端):
+    文件头(INDEX_DATA_OFFSET字节): INDEX_MAGIC + uint64 已索引的录制文件长度 + uint64 条目数
+                                   + uint32 续建状态长度 + 续建状态(JSON)
+    条目(INDEX_ENTRY): int64 系统时间(ns) + int64 单调时钟(ns) + uint64 报文首字节所在记录的偏移
+                       + uint32 首字节在记录数据中的位置 + uint32 报文长度 + uint8 报文ID + uint8 串口编号
+                       + uint8 方向 + uint8 标志
+
+条目按报文完整到达的顺序排列，时间取报文最后一块数据的时间戳。索引只追加，先写条目再更新条目数，
+录制和建索引的同时可以查询。--from/--to只写时间时取录制开始的日期，早于录制开始时间的视为第二天。
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from framer import Framer
+from raw_capture import RAW_FILE_MAGIC, RAW_FILE_HEADER, RAW_RECORD, DIR_RX, DIR_TX, DIRECTION_NAMES
+
+INDEX_MAGIC = b'YDIDX001'
+INDEX_HEADER = struct.Struct('<QQI')  # (indexed_offset, entry_count, state_length)，之后为续建状态JSON
+INDEX_DATA_OFFSET = 4096  # 条目起始位置，之前为文件头和续建状态
+INDEX_ENTRY = struct.Struct('<qqQIIBBBB')  # 见模块说明
+ENTRY_MESSAGE_ID_OFFSET = 32  # 条目中报文ID的偏移
+FLAG_CRC_OK = 0x01
+
+# 一条索引，index为条目序号
+IndexEntry = namedtuple('IndexEntry', ['index', 'wall_ns', 'mono_ns', 'record_offset', 'skip', 'length',
+                                       'message_id', 'port_id', 'direction', 'crc_ok'])
+
+
+def index_path_for(capture_path):
+    """索引文件路径"""
+    return capture_path + '.idx'
+
+
+def parse_message_id(text):
+    """
+    解析报文ID
+
+    Args:
+        text: 整数，或"B4h"、"0xB4"、"B4"形式的字符串
+
+    Returns:
+        int: 报文ID
+    """
+    if isinstance(text, int):
+        return text
+    text = text.strip()
+    if text.lower().startswith('0x'):
+        return int(text, 16)
+    return int(text.rstrip('hH'), 16)
+
+
+def to_ns(value):
+    """把datetime或纳秒时间戳转换为纳秒时间戳，None保持不变"""
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1e9)
+    return value
+
+
+def read_capture_info(capture_map):
+    """
+    读取录制文件头
+
+    Returns:
+        tuple: (JSON头信息, 第一条记录的偏移)
+
+    Raises:
+        ValueError: 不是录制文件
+    """
+    if (capture_map[:len(RAW_FILE_MAGIC)] != RAW_FILE_MAGIC or
+            len(capture_map) < len(RAW_FILE_MAGIC) + RAW_FILE_HEADER.size):
+        raise ValueError("不是原始数据录制文件")
+    header_length, = RAW_FILE_HEADER.unpack_from(capture_map, len(RAW_FILE_MAGIC))
+    start = len(RAW_FILE_MAGIC) + RAW_FILE_HEADER.size
+    return json.loads(bytes(capture_map[start:start + header_length]).decode('utf-8')), start + header_length
+
+
+def map_file(path):
+    """
+    只读映射文件的当前内容
+
+    Returns:
+        mmap.mmap: 映射，文件为空时返回None
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return None
+        return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+
+class IndexStream:
+    """一个串口一个方向的数据流的分帧状态"""
+
+    __slots__ = ('framer', 'tail', 'pieces')
+
+    def __init__(self, framer):
+        self.framer = framer
+        self.tail = b''  # 尚未分出报文的数据（最多为分帧缓冲区容量）
+        self.pieces = []  # tail中各段数据的来源 [[record_offset, skip, length]]
+
+
+class CaptureIndexer:
+    """
+    索引构建器
+
+    update对录制文件做一次流式扫描，只处理上次之后新追加的完整记录，按串口和方向分别分帧，
+    新的条目追加到索引文件。分帧状态（未完成报文所在的位置）保存在索引文件头中，
+    之后在其他进程中继续更新时从未完成报文处重新分帧，不会漏掉跨越两次更新的报文。
+    同一索引文件同时只能由一个构建器更新。
+    """
+
+    def __init__(self, capture_path, protocols=None, index_path=None):
+        """
+        Args:
+            capture_path (str): 录制文件路径
+            protocols (dict): 协议信息字典，按其中的报文格式分帧，None时使用默认格式
+            index_path (str): 索引文件路径，默认为录制文件路径加.idx
+        """
+        self.capture_path = capture_path
+        self.index_path = index_path or index_path_for(capture_path)
+        self.protocols = protocols
+        self.streams = {}  # {(port_id, direction): IndexStream}
+        self.indexed_offset = 0  # 已处理的录制文件长度
+        self.entry_count = 0
+        self.resume = {}  # 续建时各数据流的起点 {(port_id, direction): (record_offset, skip)}
+        self.capture_id = None  # 录制文件标识，索引与录制文件不匹配时重建
+        self.file = None
+        self.headers = []  # 报文头，较长的在前
+
+    def new_framer(self):
+        """按协议创建分帧器"""
+        framer = Framer()
+        if self.protocols:
+            framer.set_protocols(self.protocols)
+        if not self.headers:
+            self.headers = sorted(framer.headers, key=len, reverse=True)
+        return framer
+
+    def open(self, capture_info, data_start):
+        """打开索引文件，与录制文件不匹配或损坏时重建"""
+        self.capture_id = capture_info.get('created')
+        exists = os.path.exists(self.index_path)
+        self.file = open(self.index_path, 'r+b' if exists else 'w+b')
+        if exists and self.load_state():
+            return
+        self.file.truncate(0)
+        self.indexed_offset = data_start
+        self.entry_count = 0
+        self.resume = {}
+        self.write_header()
+
+    def load_state(self):
+        """
+        读取索引文件头中的续建状态
+
+        Returns:
+            bool: 是否可以在现有索引上继续
+        """
+        self.file.seek(0)
+        header = self.file.read(INDEX_DATA_OFFSET)
+        if len(header) < INDEX_DATA_OFFSET or not header.startswith(INDEX_MAGIC):
+            return False
+        indexed_offset, entry_count, state_length = INDEX_HEADER.unpack_from(header, len(INDEX_MAGIC))
+        start = len(INDEX_MAGIC) + INDEX_HEADER.size
+        try:
+            state = json.loads(header[start:start + state_length].decode('utf-8'))
+        except ValueError:
+            return False
+        if state.get('capture') != self.capture_id or indexed_offset > os.path.getsize(self.capture_path):
+            return False
+
+        self.indexed_offset = indexed_offset
+        self.entry_count = entry_count
+        self.resume = {(port_id, direction): (record_offset, skip)
+                       for port_id, direction, record_offset, skip in state.get('streams', [])}
+        # 丢弃上次更新中写了一半的条目
+        self.file.truncate(INDEX_DATA_OFFSET + entry_count * INDEX_ENTRY.size)
+        return True
+
+    def write_header(self):
+        """写入条目数和续建状态，在条目写入之后调用"""
+        streams = [[port_id, direction] + stream.pieces[0][:2]
+                   for (port_id, direction), stream in self.streams.items() if stream.pieces]
+        # 尚未重新读到的数据流保留原来的续建位置
+        streams += [[port_id, direction, record_offset, skip]
+                    for (port_id, direction), (record_offset, skip) in self.resume.items()
+                    if (port_id, direction) not in self.streams]
+        state = json.dumps({'capture': self.capture_id, 'streams': streams}).encode('utf-8')
+        header = INDEX_MAGIC + INDEX_HEADER.pack(self.indexed_offset, self.entry_count, len(state)) + state
+        if len(header) > INDEX_DATA_OFFSET:
+            raise ValueError("数据流过多，续建状态超出索引文件头")
+        self.file.seek(0)
+        self.file.write(header.ljust(INDEX_DATA_OFFSET, b'\0'))
+        self.file.flush()
+
+    def update(self):
+        """
+        索引新追加的记录
+
+        Returns:
+            int: 新增的条目数
+        """
+        capture_map = map_file(self.capture_path)
+        if capture_map is None:
+            return 0
+        try:
+            capture_info, data_start = read_capture_info(capture_map)
+            if self.file is None:
+                self.open(capture_info, data_start)
+            return self.scan(capture_map)
+        finally:
+            capture_map.close()
+
+    def scan(self, capture_map):
+        """扫描映射中的完整记录"""
+        size = len(capture_map)
+        # 续建时从未完成报文最早的记录开始，已经索引过的报文不重复写入
+        position = min([self.indexed_offset] + [offset for offset, _ in self.resume.values()])
+        indexed_offset = self.indexed_offset
+        entry_count = self.entry_count
+        entries = []
+        header_size = RAW_RECORD.size
+        unpack_record = RAW_RECORD.unpack_from
+
+        while position + header_size <= size:
+            mono_ns, wall_ns, port_id, direction, length = unpack_record(capture_map, position)
+            data_end = position + header_size + length
+            if data_end > size:
+                break
+
+            key = (port_id, direction)
+            stream = self.streams.get(key)
+            skip = 0
+            if stream is None:
+                resume = self.resume.get(key)
+                if resume is not None and position < resume[0]:
+                    position = data_end
+                    continue
+                stream = self.streams[key] = IndexStream(self.new_framer())
+                if resume is not None and position == resume[0]:
+                    skip = resume[1]
+                self.resume.pop(key, None)
+
+            data = capture_map[position + header_size + skip:data_end]
+            if data:
+                self.feed(stream, position, skip, data, wall_ns, mono_ns, port_id, direction,
+                          entries if position >= indexed_offset else None)
+            position = data_end
+            if len(entries) >= 65536:
+                self.flush_entries(entries, max(position, self.indexed_offset))
+
+        self.flush_entries(entries, max(position, self.indexed_offset))
+        return self.entry_count - entry_count
+
+    def flush_entries(self, entries, indexed_offset):
+        """写入条目并更新文件头"""
+        if entries:
+            self.file.seek(INDEX_DATA_OFFSET + self.entry_count * INDEX_ENTRY.size)
+            self.file.write(b''.join(entries))
+            self.file.flush()
+            self.entry_count += len(entries)
+        self.indexed_offset = indexed_offset
+        self.write_header()
+        entries.clear()
+
+    def feed(self, stream, record_offset, skip, data, wall_ns, mono_ns, port_id, direction, entries):
+        """
+        对一个数据块分帧，把报文的位置追加到entries
+
+        报文按在数据流中的先后顺序输出且互不重叠，从上一帧结束处查找报文内容即可得到报文的起始位置。
+        entries为None时只更新分帧状态（续建时重新处理已经索引过的记录）。
+        """
+        framer = stream.framer
+        tail = stream.tail
+        window = tail + data if tail else data
+        pieces = stream.pieces
+        pieces.append([record_offset, skip, len(data)])
+        base = len(window) - len(data)  # 本数据块在window中的起始位置
+
+        default_header_length = len(self.headers[0])
+        multiple_headers = len(self.headers) > 1
+        cursor = 0
+        for frame, crc_ok in framer.feed(data):
+            position = window.find(frame, cursor)
+            if position < 0:
+                continue
+            cursor = position + len(frame)
+            if entries is None:
+                continue
+
+            # 报文首字节所在的记录，通常就是本数据块
+            if position >= base:
+                frame_record, frame_skip = record_offset, skip + position - base
+            else:
+                frame_record, frame_skip = self.locate(pieces, position)
+
+            header_length = default_header_length
+            if multiple_headers:
+                header_length = next((len(header) for header in self.headers if frame.startswith(header)),
+                                     header_length)
+            message_id = frame[header_length] if len(frame) > header_length else 0
+            entries.append(INDEX_ENTRY.pack(wall_ns, mono_ns, frame_record, frame_skip, len(frame), message_id,
+                                            port_id, direction, FLAG_CRC_OK if crc_ok else 0))
+
+        # 保留上一帧之后的数据（不超过分帧缓冲区容量），记录各段的来源
+        keep_from = max(cursor, len(window) - framer.buffer.capacity)
+        stream.tail = window[keep_from:]
+        offset = 0
+        kept = []
+        for piece_record, piece_skip, piece_length in pieces:
+            piece_end = offset + piece_length
+            if piece_end > keep_from:
+                cut = max(0, keep_from - offset)
+                kept.append([piece_record, piece_skip + cut, piece_length - cut])
+            offset = piece_end
+        stream.pieces = kept
+
+    @staticmethod
+    def locate(pieces, position):
+        """把window中的位置转换为(记录偏移, 记录数据中的位置)"""
+        offset = 0
+        for piece_record, piece_skip, piece_length in pieces:
+            if position < offset + piece_length:
+                return piece_record, piece_skip + position - offset
+            offset += piece_length
+        return pieces[-1][0], pieces[-1][1]
+
+    def close(self):
+        """关闭索引文件"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class CaptureIndex:
+    """
+    录制文件索引查询
+
+    第一次查询时才打开并映射索引文件，条目不读入内存；按时间查找在映射上二分，按报文ID查找时
+    一次切片取出范围内所有条目的报文ID再逐个查找，不需要解码报文。update为True时每次refresh
+    先用CaptureIndexer索引新追加的记录，录制中的文件调用refresh即可查询到最新的报文。
+    """
+
+    def __init__(self, capture_path, protocols=None, update=True, index_path=None):
+        """
+        Args:
+            capture_path (str): 录制文件路径
+            protocols (dict): 协议信息字典，建索引时按其中的报文格式分帧
+            update (bool): 是否在refresh时更新索引，False时只读取已有的索引文件
+            index_path (str): 索引文件路径，默认为录制文件路径加.idx
+        """
+        self.capture_path = capture_path
+        self.index_path = index_path or index_path_for(capture_path)
+        self.indexer = CaptureIndexer(capture_path, protocols, self.index_path) if update else None
+        self.index_map = None
+        self.capture_map = None
+        self.count = 0
+        self.loaded = False
+
+    def refresh(self):
+        """
+        更新索引并重新映射，之后的查询包含录制文件中新追加的报文
+
+        Returns:
+            int: 条目数
+        """
+        if self.indexer is not None:
+            self.indexer.update()
+        self.close_maps()
+        self.loaded = True
+        if not os.path.exists(self.index_path):
+            self.count = 0
+            return 0
+        self.index_map = map_file(self.index_path)
+        self.capture_map = map_file(self.capture_path)
+        if self.index_map is None or len(self.index_map) < INDEX_DATA_OFFSET:
+            self.count = 0
+            return 0
+        _, entry_count, _ = INDEX_HEADER.unpack_from(self.index_map, len(INDEX_MAGIC))
+        # 条目数在条目写入之后更新，映射中可能已有更多条目，只使用文件头中的条目数
+        self.count = min(entry_count, (len(self.index_map) - INDEX_DATA_OFFSET) // INDEX_ENTRY.size)
+        return self.count
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.refresh()
+
+    def __len__(self):
+        self.ensure_loaded()
+        return self.count
+
+    def entry(self, index):
+        """
+        读取一条索引
+
+        Returns:
+            IndexEntry: 条目
+        """
+        self.ensure_loaded()
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        (wall_ns, mono_ns, record_offset, skip, length, message_id, port_id, direction,
+         flags) = INDEX_ENTRY.unpack_from(self.index_map, INDEX_DATA_OFFSET + index * INDEX_ENTRY.size)
+        return IndexEntry(index, wall_ns, mono_ns, record_offset, skip, length, message_id, port_id, direction,
+                          bool(flags & FLAG_CRC_OK))
+
+    def wall_ns(self, index):
+        """第index条的系统时间"""
+        return struct.unpack_from('<q', self.index_map, INDEX_DATA_OFFSET + index * INDEX_ENTRY.size)[0]
+
+    def bisect_time(self, wall_ns, low=0, high=None):
+        """
+        二分查找第一条时间不早于wall_ns的条目
+
+        Args:
+            wall_ns: 纳秒时间戳或datetime
+            low (int): 查找范围的起始序号
+            high (int): 查找范围的结束序号（不含），None表示到最后
+
+        Returns:
+            int: 条目序号，范围内全部早于wall_ns时为high
+        """
+        self.ensure_loaded()
+        wall_ns = to_ns(wall_ns)
+        if high is None:
+            high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.wall_ns(middle) < wall_ns:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def select(self, start=None, end=None, message_id=None, port_id=None, direction=None, low=0, high=None):
+        """
+        查找条目，时间范围与序号范围同时限制
+
+        Args:
+            start: 起始时间（含），纳秒时间戳或datetime，None表示从头开始
+            end: 结束时间（不含），None表示到最后
+            message_id: 报文ID，整数或"B4h"形式，None表示全部
+            port_id (int): 串口编号，None表示全部
+            direction (int): 方向 (DIR_RX/DIR_TX)，None表示全部
+            low (int): 起始序号，跟踪新增报文时只查找上次之后的条目
+            high (int): 结束序号（不含），None表示到最后
+
+        Yields:
+            IndexEntry: 条目
+        """
+        self.ensure_loaded()
+        low = max(0, low)
+        high = self.count if high is None else min(high, self.count)
+        if start is not None:
+            low = self.bisect_time(start, low, high)
+        if end is not None:
+            high = self.bisect_time(end, low, high)
+        if low >= high:
+            return
+
+        if message_id is None:
+            candidates = range(low, high)
+        else:
+            candidates = self.find_message_id(parse_message_id(message_id), low, high)
+        for index in candidates:
+            entry = self.entry(index)
+            if port_id is not None and entry.port_id != port_id:
+                continue
+            if direction is not None and entry.direction != direction:
+                continue
+            yield entry
+
+    def find_message_id(self, message_id, low, high):
+        """在[low, high)范围内查找报文ID相同的条目序号"""
+        size = INDEX_ENTRY.size
+        start = INDEX_DATA_OFFSET + low * size + ENTRY_MESSAGE_ID_OFFSET
+        column = self.index_map[start:INDEX_DATA_OFFSET + high * size:size]
+        target = bytes([message_id])
+        position = column.find(target)
+        while position >= 0:
+            yield low + position
+            position = column.find(target, position + 1)
+
+    def read_frame(self, entry):
+        """
+        从录制文件中读取条目对应的报文，报文跨越多个数据块时依次拼接同一数据流的后续记录
+
+        Returns:
+            bytes: 报文
+        """
+        capture_map = self.capture_map
+        header_size = RAW_RECORD.size
+        position = entry.record_offset
+        skip = entry.skip
+        parts = []
+        remaining = entry.length
+        while remaining > 0 and position + header_size <= len(capture_map):
+            _, _, port_id, direction, length = RAW_RECORD.unpack_from(capture_map, position)
+            data_start = position + header_size
+            if port_id == entry.port_id and direction == entry.direction:
+                part = capture_map[data_start + skip:data_start + min(length, skip + remaining)]
+                parts.append(part)
+                remaining -= len(part)
+                skip = 0
+            position = data_start + length
+        return b''.join(parts)
+
+    def frames(self, start=None, end=None, message_id=None, port_id=None, direction=None, low=0, high=None):
+        """
+        查找报文，参数见select
+
+        Yields:
+            tuple: (IndexEntry, 报文)
+        """
+        for entry in self.select(start, end, message_id, port_id, direction, low, high):
+            yield entry, self.read_frame(entry)
+
+    def close_maps(self):
+        if self.index_map is not None:
+            self.index_map.close()
+            self.index_map = None
+        if self.capture_map is not None:
+            self.capture_map.close()
+            self.capture_map = None
+
+    def close(self):
+        """关闭映射和索引构建器"""
+        self.close_maps()
+        if self.indexer is not None:
+            self.indexer.close()
+        self.loaded = False
+
+
+def parse_time(text, reference_ns):
+    """
+    解析查询时间
+
+    Args:
+        text (str): "YYYY-MM-DD HH:MM[:SS]"，或只有"HH:MM[:SS]"
+        reference_ns (int): 录制开始时间，只写时间时取该日期，早于该时间的视为第二天
+
+    Returns:
+        datetime: 时间
+    """
+    for time_format in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S'):
+        try:
+            return datetime.strptime(text, time_format)
+        except ValueError:
+            pass
+    clock = None
+    for time_format in ('%H:%M:%S.%f', '%H:%M:%S', '%H:%M'):
+        try:
+            clock = datetime.strptime(text, time_format).time()
+            break
+        except ValueError:
+            pass
+    if clock is None:
+        raise argparse.ArgumentTypeError(f"无法解析时间: {text}")
+    reference = datetime.fromtimestamp(reference_ns / 1e9)
+    value = datetime.combine(reference.date(), clock)
+    if value < reference.replace(microsecond=0) - timedelta(seconds=1):
+        value += timedelta(days=1)
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="录制文件索引与查询(命令行，不依赖Qt)")
+    parser.add_argument('capture', help="录制文件(.ydcap)")
+    parser.add_argument('--config', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'YD-G392.ini'),
+                        help="INI配置文件，按其中的报文格式分帧，不存在时使用默认格式")
+    parser.add_argument('--from', dest='start', help="起始时间，HH:MM[:SS]或YYYY-MM-DD HH:MM[:SS]")
+    parser.add_argument('--to', dest='end', help="结束时间（不含）")
+    parser.add_argument('--id', dest='message_id', help="报文ID，例如B4h")
+    parser.add_argument('--port-id', type=int, help="串口编号")
+    parser.add_argument('--direction', choices=('rx', 'tx'), help="方向")
+    parser.add_argument('--count', action='store_true', help="只输出匹配的报文数")
+    parser.add_argument('--follow', action='store_true', help="录制中的文件：持续更新索引并输出新的报文，Ctrl+C结束")
+    parser.add_argument('--interval', type=float, default=1.0, help="--follow的刷新周期(秒)")
+    args = parser.parse_args(argv)
+
+    from capture import configure_logging
+    configure_logging(False)
+
+    protocols = None
+    if os.path.exists(args.config):
+        from replay import load_protocols
+        protocols = load_protocols(args.config)
+
+    index = CaptureIndex(args.capture, protocols)
+    try:
+        count = index.refresh()
+    except (OSError, ValueError) as e:
+        print(f"无法索引录制文件 {args.capture}: {str(e)}", file=sys.stderr)
+        return 2
+    print(f"索引: {count} 帧 ({index.index_path})", file=sys.stderr)
+    if count == 0 and not args.follow:
+        return 0
+
+    reference_ns = index.entry(0).wall_ns if count else 0
+    start = parse_time(args.start, reference_ns) if args.start else None
+    end = parse_time(args.end, reference_ns) if args.end else None
+    direction = {'rx': DIR_RX, 'tx': DIR_TX}.get(args.direction)
+    query = dict(start=start, end=end, message_id=args.message_id, port_id=args.port_id, direction=direction)
+
+    if args.count:
+        print(sum(1 for _ in index.select(**query)))
+        return 0
+
+    def output(entries):
+        for entry, frame in entries:
+            timestamp = datetime.fromtimestamp(entry.wall_ns / 1e9).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+            print(f"{timestamp}\t{entry.port_id}\t{DIRECTION_NAMES.get(entry.direction, entry.direction)}\t"
+                  f"{entry.message_id:02X}h\t{'' if entry.crc_ok else 'CRC错误 '}{frame.hex(' ').upper()}")
+
+    try:
+        output(index.frames(**query))
+        if args.follow:
+            import time
+            shown = index.count
+            while True:
+                time.sleep(args.interval)
+                count = index.refresh()
+                if count > shown:
+                    output(index.frames(**query, low=shown, high=count))
+                    shown = count
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
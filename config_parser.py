@@ -8,19 +8,29 @@
 import os
 import json
 import configparser
-from PyQt5.QtWidgets import QMessageBox
-from log_manager import log_debug, log_info, log_error
+from log_manager import log_debug, log_info, log_warning, log_error
+from correlator import load_correlation_rules
 
 
 class ConfigParser:
-    """配置文件解析器，用于解析INI配置文件和JSON协议文件"""
+    """
+    配置文件解析器，用于解析INI配置文件和JSON协议文件
 
-    def __init__(self):
+    interactive为False时不依赖Qt，加载过程中的错误只写入日志和validation_errors，供命令行工具使用。
+    """
+
+    def __init__(self, interactive=True):
+        """
+        Args:
+            interactive (bool): 是否弹出对话框提示错误
+        """
+        self.interactive = interactive
         self.config = None  # INI配置对象
         self.protocols = {}  # 协议信息字典 {protocol_id: protocol_data}
         self.config_path = ""  # 配置文件路径
         self.plugins_dir = ""  # 插件目录
         self.validation_errors = []  # 验证错误列表
+        self.correlation_rules = []  # 请求/响应配对规则
 
     def load_config(self, config_path):
         """
@@ -34,7 +44,7 @@ class ConfigParser:
         """
         try:
             if not os.path.exists(config_path):
-                QMessageBox.warning(None, "错误", f"配置文件不存在: {config_path}")
+                self.show_message("错误", f"配置文件不存在: {config_path}")
                 return False
 
             self.config_path = config_path
@@ -43,6 +53,9 @@ class ConfigParser:
 
             # 获取插件目录
             self.plugins_dir = self.config.get('General', 'pluginsdir', fallback='plugins')
+            # 配置文件按Windows路径编写，在Linux测试台上运行时转换路径分隔符
+            if os.sep != '\\':
+                self.plugins_dir = self.plugins_dir.replace('\\', os.sep)
 
             # 确保插件目录是绝对路径
             if not os.path.isabs(self.plugins_dir):
@@ -55,15 +68,15 @@ class ConfigParser:
 
             # 加载各个协议文件
             for section in self.config.sections():
-                if section != 'General':
+                if section not in ('General', 'Correlation'):
                     protocol_id = section
                     json_file = self.config.get(section, 'file', fallback=None)
 
                     if json_file:
                         # 构建JSON文件的完整路径
-                        json_path = os.path.join(self.plugins_dir, json_file)
+                        json_path = self.find_protocol_file(json_file)
 
-                        if os.path.exists(json_path):
+                        if json_path:
                             # 加载并验证JSON协议文件
                             protocol_data = self.load_protocol_json(json_path)
                             if protocol_data:
@@ -87,25 +100,70 @@ class ConfigParser:
                             self.validation_errors.append(error)
                             log_error(error)
 
+            # 请求/响应配对，配置错误与协议加载错误一起显示
+            self.correlation_rules, correlation_errors = load_correlation_rules(self.config, self.protocols)
+            for error in correlation_errors:
+                self.validation_errors.append(error)
+                log_error(error)
+
             # 显示验证错误
             if self.validation_errors:
                 error_message = "部分协议加载失败:\n\n" + "\n".join(self.validation_errors)
-                QMessageBox.warning(None, "验证错误", error_message)
+                self.show_message("验证错误", error_message)
 
             # 验证协议兼容性
             is_compatible, compatibility_report = self.validate_protocol_compatibility()
             if not is_compatible:
-                QMessageBox.warning(None, "协议兼容性问题", compatibility_report)
+                self.show_message("协议兼容性问题", compatibility_report)
                 log_warning(compatibility_report)
 
             return len(self.protocols) > 0
 
         except Exception as e:
             error_msg = f"加载配置文件错误: {str(e)}"
-            QMessageBox.critical(None, "错误", error_msg)
             log_error(error_msg)
+            self.show_message("错误", error_msg, critical=True)
             return False
 
+    def show_message(self, title, text, critical=False):
+        """
+        提示错误，interactive为True时弹出对话框
+
+        Args:
+            title (str): 标题
+            text (str): 内容
+            critical (bool): 是否为严重错误
+        """
+        if not self.interactive:
+            return
+        from PyQt5.QtWidgets import QMessageBox
+        if critical:
+            QMessageBox.critical(None, title, text)
+        else:
+            QMessageBox.warning(None, title, text)
+
+    def find_protocol_file(self, json_file):
+        """
+        在插件目录中查找协议文件，文件系统区分大小写时按不区分大小写的文件名再查找一次
+
+        Args:
+            json_file (str): INI中配置的文件名
+
+        Returns:
+            str: 文件的完整路径，未找到则返回None
+        """
+        json_path = os.path.join(self.plugins_dir, json_file)
+        if os.path.exists(json_path):
+            return json_path
+        try:
+            names = os.listdir(self.plugins_dir)
+        except OSError:
+            return None
+        for name in names:
+            if name.lower() == json_file.lower():
+                return os.path.join(self.plugins_dir, name)
+        return None
+
     def load_protocol_json(self, json_path):
         """
         加载JSON协议文件
@@ -341,6 +399,15 @@ class ConfigParser:
         """
         return self.protocols.get(protocol_id, None)
 
+    def get_correlation_rules(self):
+        """
+        获取请求/响应配对规则
+
+        Returns:
+            list: CorrelationRule列表
+        """
+        return self.correlation_rules
+
     def get_config_path(self):
         """
         获取配置文件路径
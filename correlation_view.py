@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 应答统计界面模块，显示各请求/响应ID对的响应率、超时次数和往返延迟分布，可导出
+"""
+
+from PyQt5.QtCore import Qt, QRectF, QTimer
+from PyQt5.QtGui import QColor, QPainter, QPen, QBrush
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QAbstractItemView, QSplitter, QFileDialog, QMessageBox)
+from correlator import LatencyHistogram
+
+
+class HistogramWidget(QWidget):
+    """往返延迟直方图，每个桶一根柱子"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.title = ""
+        self.buckets = []
+        self.setMinimumHeight(140)
+
+    def set_histogram(self, title, buckets):
+        """
+        设置要绘制的直方图
+
+        Args:
+            title (str): 标题
+            buckets (list): 各桶的计数，与LatencyHistogram.bucket_labels()对应
+        """
+        self.title = title
+        self.buckets = list(buckets)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        painter.setPen(QPen(Qt.black))
+        painter.drawText(6, 16, self.title or "选择一行查看延迟分布")
+
+        labels = LatencyHistogram.bucket_labels()
+        if not self.buckets:
+            painter.end()
+            return
+
+        top, bottom = 24, self.height() - 20
+        plot_height = max(10, bottom - top - 14)
+        bar_width = max(8.0, (self.width() - 12) / len(labels))
+        peak = max(self.buckets) or 1
+        for index, (label, count) in enumerate(zip(labels, self.buckets)):
+            x = 6 + index * bar_width
+            height = count / peak * plot_height
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QBrush(QColor("#1f77b4")))
+            painter.drawRect(QRectF(x + 2, bottom - height, bar_width - 4, height))
+            painter.setPen(QPen(Qt.black))
+            if count:
+                painter.drawText(QRectF(x, bottom - height - 14, bar_width, 14), Qt.AlignCenter, str(count))
+            painter.drawText(QRectF(x, bottom + 2, bar_width, 16), Qt.AlignCenter, label)
+        painter.end()
+
+
+class CorrelationView(QWidget):
+    """
+    应答统计
+
+    每个请求/响应ID对一行，定时从配对器读取统计刷新。选中一行时在下方显示该ID对的往返延迟直方图。
+    """
+
+    HEADERS = ["请求", "响应", "期望", "响应数", "超时", "响应率", "平均(ms)", "P50(ms)", "P95(ms)", "最大(ms)"]
+
+    def __init__(self, correlator, parent=None):
+        """
+        Args:
+            correlator (ResponseCorrelator): 配对器
+        """
+        super().__init__(parent)
+        self.correlator = correlator
+        self.snapshot = None
+
+        layout = QVBoxLayout(self)
+
+        control_layout = QHBoxLayout()
+        self.summary_label = QLabel("未配置应答配对（INI的[Correlation]节或协议JSON的correlation）")
+        control_layout.addWidget(self.summary_label)
+        control_layout.addStretch()
+        self.reset_btn = QPushButton("统计清零")
+        self.reset_btn.clicked.connect(self.reset_stats)
+        control_layout.addWidget(self.reset_btn)
+        self.export_btn = QPushButton("导出")
+        self.export_btn.clicked.connect(self.export_stats)
+        control_layout.addWidget(self.export_btn)
+        layout.addLayout(control_layout)
+
+        splitter = QSplitter(Qt.Vertical)
+        layout.addWidget(splitter)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.itemSelectionChanged.connect(self.update_histogram)
+        splitter.addWidget(self.table)
+
+        self.histogram = HistogramWidget()
+        splitter.addWidget(self.histogram)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(500)
+
+    def refresh(self):
+        """从配对器读取统计并刷新表格"""
+        if not self.isVisible() and self.snapshot is not None:
+            return
+        self.snapshot = snapshot = self.correlator.snapshot()
+        pairs = snapshot['pairs']
+
+        if self.table.rowCount() != len(pairs):
+            self.table.setRowCount(len(pairs))
+        for row, pair in enumerate(pairs):
+            latency = pair['latency']
+            values = [pair['request_id'], pair['response_id'], str(pair['expected']), str(pair['matched']),
+                      str(pair['timeouts']), f"{pair['response_rate'] * 100:.1f}%",
+                      f"{latency['mean_ms']:.2f}", f"{latency['p50_ms']:.2f}", f"{latency['p95_ms']:.2f}",
+                      f"{latency['max_ms']:.2f}"]
+            for column, value in enumerate(values):
+                item = self.table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.table.setItem(row, column, item)
+                item.setText(value)
+            color = QColor("red") if pair['timeouts'] else QColor("black")
+            self.table.item(row, 4).setForeground(QBrush(color))
+
+        requests = snapshot['requests']
+        if requests:
+            parts = [f"{request['request_id']}: 请求{request['requests']} 重发{request['retried']} "
+                     f"失败{request['failed']} 等待{request['outstanding']}" for request in requests]
+            unmatched = sum(snapshot['unmatched'].values())
+            self.summary_label.setText("    ".join(parts) + f"    未配对响应: {unmatched}")
+            self.summary_label.setToolTip("\n".join(f"{request['request_id']} = {', '.join(request['responses'])}, "
+                                                    f"timeout={request['timeout_ms']:g}, retries={request['retries']}"
+                                                    for request in requests))
+        self.update_histogram()
+
+    def update_histogram(self):
+        """显示选中ID对的延迟直方图"""
+        row = self.table.currentRow()
+        if self.snapshot is None or not 0 <= row < len(self.snapshot['pairs']):
+            self.histogram.set_histogram("", [])
+            return
+        pair = self.snapshot['pairs'][row]
+        latency = pair['latency']
+        self.histogram.set_histogram(
+            f"{pair['request_id']} → {pair['response_id']} 往返延迟(ms)  "
+            f"最小 {latency['min_ms']:.2f}  P99 {latency['p99_ms']:.2f}  最大 {latency['max_ms']:.2f}",
+            latency['buckets'])
+
+    def reset_stats(self):
+        """清零统计"""
+        self.correlator.reset_stats()
+        self.refresh()
+
+    def export_stats(self):
+        """导出统计到CSV或JSON文件"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出应答统计", "", "CSV文件 (*.csv);;JSON文件 (*.json);;所有文件 (*.*)")
+        if not file_path:
+            return
+        try:
+            self.correlator.export(file_path)
+            QMessageBox.information(self, "成功", f"应答统计已导出到: {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导出应答统计失败: {str(e)}")
@@ -0,0 +1,577 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 请求/响应配对模块，按配置的报文ID对把收到的响应与未完成的请求配对，统计往返延迟分布和超时次数
+"""
+
+import bisect
+import csv
+import json
+import math
+import threading
+import time
+from protocol_codec import FrameIdentifier
+from log_manager import log_debug
+
+NS_PER_MS = 1000000
+DEFAULT_TIMEOUT_MS = 200  # 默认响应超时(ms)
+
+# 报文方向
+DIRECTION_TX = 'tx'  # 本机发送
+DIRECTION_RX = 'rx'  # 从总线接收
+
+
+class LatencyHistogram:
+    """
+    往返延迟直方图
+
+    桶按1-2-5对数刻度划分，第i个桶统计(BUCKET_EDGES_MS[i-1], BUCKET_EDGES_MS[i]]毫秒的延迟，
+    最后一个桶统计超过最大刻度的延迟。百分位数在所在桶内按线性插值估算（桶的边界用最小、最大值收窄），
+    平均、最小、最大值是精确的。
+    """
+
+    BUCKET_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+    BUCKET_EDGES_NS = tuple(edge * NS_PER_MS for edge in BUCKET_EDGES_MS)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清零统计"""
+        self.buckets = [0] * (len(self.BUCKET_EDGES_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+
+    def add(self, latency_ns):
+        """
+        记录一次往返延迟
+
+        Args:
+            latency_ns (int): 延迟(ns)
+        """
+        self.buckets[bisect.bisect_left(self.BUCKET_EDGES_NS, latency_ns)] += 1
+        if self.count == 0 or latency_ns < self.min_ns:
+            self.min_ns = latency_ns
+        if latency_ns > self.max_ns:
+            self.max_ns = latency_ns
+        self.count += 1
+        self.total_ns += latency_ns
+
+    def percentile(self, ratio):
+        """
+        估算百分位数
+
+        Args:
+            ratio (float): 0~1
+
+        Returns:
+            float: 延迟(ms)
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(ratio * self.count))
+        cumulative = 0
+        edges = self.BUCKET_EDGES_NS
+        for index, count in enumerate(self.buckets):
+            if cumulative + count >= rank:
+                low = max(edges[index - 1] if index > 0 else 0, self.min_ns)
+                high = min(edges[index] if index < len(edges) else self.max_ns, self.max_ns)
+                return (low + (high - low) * (rank - cumulative) / count) / NS_PER_MS
+            cumulative += count
+        return self.max_ns / NS_PER_MS
+
+    @classmethod
+    def bucket_labels(cls):
+        """
+        获取各桶的名称
+
+        Returns:
+            list: 如["≤1", "≤2", ..., ">5000"]，单位ms
+        """
+        return [f"≤{edge}" for edge in cls.BUCKET_EDGES_MS] + [f">{cls.BUCKET_EDGES_MS[-1]}"]
+
+    def snapshot(self):
+        """
+        获取统计结果
+
+        Returns:
+            dict: {count, mean_ms, min_ms, max_ms, p50_ms, p95_ms, p99_ms, buckets}
+        """
+        count = self.count
+        return {
+            'count': count,
+            'mean_ms': self.total_ns / count / NS_PER_MS if count else 0.0,
+            'min_ms': self.min_ns / NS_PER_MS,
+            'max_ms': self.max_ns / NS_PER_MS,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': list(self.buckets),
+        }
+
+
+class CorrelationRule:
+    """
+    请求/响应配对规则
+
+    请求发出（或在总线上收到）后，response_ids中的每个响应都应在timeout_ms内到达。
+    本机发送的请求超时后重发，最多重发retries次，所有重发都超时后未到达的响应计为超时。
+    """
+
+    def __init__(self, request_id, response_ids, timeout_ms=DEFAULT_TIMEOUT_MS, retries=0):
+        """
+        Args:
+            request_id (str): 请求报文的协议ID
+            response_ids (list): 响应报文的协议ID
+            timeout_ms (float): 响应超时(ms)
+            retries (int): 超时后的最多重发次数
+        """
+        self.request_id = request_id
+        self.response_ids = tuple(dict.fromkeys(response_ids))
+        self.timeout_ms = float(timeout_ms)
+        self.retries = int(retries)
+        if not self.response_ids:
+            raise ValueError(f"{request_id} 未指定响应报文")
+        if self.timeout_ms <= 0:
+            raise ValueError(f"{request_id} 的超时必须大于0")
+        if self.retries < 0:
+            raise ValueError(f"{request_id} 的重发次数不能小于0")
+
+    def describe(self):
+        """
+        获取配置文本，格式与INI中的配对相同
+
+        Returns:
+            str: 如"B1h, B2h, timeout=200, retries=1"
+        """
+        return ', '.join(self.response_ids) + f", timeout={self.timeout_ms:g}, retries={self.retries}"
+
+
+def parse_rule_text(request_id, text, timeout_ms=DEFAULT_TIMEOUT_MS, retries=0):
+    """
+    解析INI中的配对文本
+
+    格式为逗号分隔的响应ID，可以附带timeout=毫秒、retries=次数，未给出时使用参数中的默认值，
+    例如"B1h, B2h, timeout=500, retries=1"
+
+    Args:
+        request_id (str): 请求报文的协议ID
+        text (str): 配对文本
+        timeout_ms (float): 默认超时(ms)
+        retries (int): 默认重发次数
+
+    Returns:
+        CorrelationRule: 配对规则
+    """
+    response_ids = []
+    for part in text.replace('，', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '=' in part:
+            key, value = (item.strip() for item in part.split('=', 1))
+            if key.lower() == 'timeout':
+                timeout_ms = float(value)
+            elif key.lower() == 'retries':
+                retries = int(value)
+            else:
+                raise ValueError(f"{request_id} 的配对参数未知: {key}")
+        else:
+            response_ids.append(part)
+    return CorrelationRule(request_id, response_ids, timeout_ms, retries)
+
+
+def load_correlation_rules(config, protocols):
+    """
+    读取配对规则
+
+    规则来自两处，INI中的配置优先：
+    - INI的[Correlation]节：timeout、retries为所有配对的默认值，其余每项为"请求ID = 响应ID列表"；
+    - 请求报文JSON中的"correlation"对象：{"responses": [...], "timeout": 毫秒, "retries": 次数}。
+    协议ID不区分大小写，引用了未加载协议的配对不生效。
+
+    Args:
+        config (configparser.ConfigParser): INI配置，None表示只读取JSON
+        protocols (dict): 已加载的协议 {protocol_id: protocol_data}
+
+    Returns:
+        tuple: (rules, errors) 配对规则列表和错误信息列表
+    """
+    protocol_ids = {protocol_id.lower(): protocol_id for protocol_id in protocols}
+    rules = {}
+    errors = []
+
+    section = {}
+    timeout_ms, retries = DEFAULT_TIMEOUT_MS, 0
+    if config is not None and config.has_section('Correlation'):
+        section = dict(config.items('Correlation'))
+        try:
+            timeout_ms = float(section.pop('timeout', timeout_ms))
+            retries = int(section.pop('retries', retries))
+        except ValueError as e:
+            errors.append(f"应答配对的默认参数无效: {str(e)}")
+
+    for protocol_id, protocol_data in protocols.items():
+        spec = protocol_data.get('correlation')
+        if not spec:
+            continue
+        try:
+            rules[protocol_id] = CorrelationRule(protocol_id, spec.get('responses', []),
+                                                 spec.get('timeout', timeout_ms), spec.get('retries', retries))
+        except (AttributeError, TypeError, ValueError) as e:
+            errors.append(f"协议 {protocol_id} 的correlation配置无效: {str(e)}")
+
+    for key, text in section.items():
+        try:
+            rule = parse_rule_text(protocol_ids.get(key.lower(), key), text, timeout_ms, retries)
+        except ValueError as e:
+            errors.append(f"应答配对 {key} 无效: {str(e)}")
+            continue
+        rules[rule.request_id] = rule
+
+    result = []
+    for rule in rules.values():
+        unknown = [protocol_id for protocol_id in (rule.request_id,) + rule.response_ids
+                   if protocol_id.lower() not in protocol_ids]
+        if unknown:
+            errors.append(f"应答配对 {rule.request_id} 引用了未加载的协议: {', '.join(unknown)}")
+            continue
+        rule.response_ids = tuple(protocol_ids[protocol_id.lower()] for protocol_id in rule.response_ids)
+        result.append(rule)
+    return result, errors
+
+
+class PairStats:
+    """一个请求/响应ID对的统计"""
+
+    def __init__(self, request_id, response_id):
+        self.request_id = request_id
+        self.response_id = response_id
+        self.histogram = LatencyHistogram()
+        self.reset()
+
+    def reset(self):
+        """清零统计"""
+        self.expected = 0  # 期望的响应次数（每个请求事务一次）
+        self.timeouts = 0  # 所有重发都超时后仍未收到的次数
+        self.histogram.reset()
+
+    def snapshot(self):
+        """
+        获取统计结果
+
+        Returns:
+            dict: {request_id, response_id, expected, matched, timeouts, response_rate, latency}
+        """
+        latency = self.histogram.snapshot()
+        finished = latency['count'] + self.timeouts
+        return {
+            'request_id': self.request_id,
+            'response_id': self.response_id,
+            'expected': self.expected,
+            'matched': latency['count'],
+            'timeouts': self.timeouts,
+            'response_rate': latency['count'] / finished if finished else 0.0,
+            'latency': latency,
+        }
+
+
+class Transaction:
+    """一个未完成的请求事务"""
+
+    __slots__ = ('rule', 'message', 'direction', 'sent_ns', 'deadline_ns', 'pending', 'attempts', 'resend_pending')
+
+    def __init__(self, rule, message, direction, sent_ns):
+        self.rule = rule
+        self.message = message
+        self.direction = direction
+        self.sent_ns = sent_ns  # 最近一次发送的时间，往返延迟从此开始计算
+        self.deadline_ns = sent_ns + int(rule.timeout_ms * NS_PER_MS)
+        self.pending = set(rule.response_ids)  # 尚未收到的响应
+        self.attempts = 1  # 已发送次数
+        self.resend_pending = False  # 已提交重发，等待写线程发出
+
+
+class ResponseCorrelator:
+    """
+    请求/响应配对器
+
+    发送线程写出报文后调用on_sent，接收线程分帧后调用on_received，时间戳都取单调时钟(ns)。
+    请求报文（无论发送还是接收到的）打开一个事务，之后到达的响应与同一规则下最早的、仍在等待该响应的事务配对，
+    记录往返延迟；没有可配对事务的响应计为未配对。
+
+    超时由独立线程按最早的截止时间检查：本机发送的请求还有重发次数时调用resend(message, rule)重发，
+    重发的报文写出后重新计时；否则事务结束，未到达的响应各计一次超时。
+    所有方法都可以在任意线程中调用。
+    """
+
+    def __init__(self, resend=None):
+        """
+        Args:
+            resend (callable): 重发回调 resend(message, rule)，None表示不重发
+        """
+        self.resend = resend
+        self.condition = threading.Condition()
+        self.rules = {}  # {request_id: CorrelationRule}
+        self.response_rules = {}  # {response_id: [CorrelationRule]}
+        self.identifier = FrameIdentifier()  # 按报文头和报文ID识别协议
+        self.pairs = {}  # {(request_id, response_id): PairStats}
+        self.outstanding = []  # 未完成的事务，按打开顺序排列
+        self.thread = None
+        self.is_running = False
+        self.reset_counters()
+
+    def reset_counters(self):
+        """清零规则级别的计数，调用时需持有锁或尚未启动"""
+        self.requests = {request_id: 0 for request_id in self.rules}  # 打开的事务数
+        self.retries = {request_id: 0 for request_id in self.rules}  # 重发次数
+        self.failed = {request_id: 0 for request_id in self.rules}  # 有响应超时的事务数
+        self.unmatched = {}  # 没有可配对请求的响应 {response_id: count}
+
+    def set_rules(self, rules, protocols):
+        """
+        设置配对规则，清除未完成的事务和统计
+
+        Args:
+            rules (list): CorrelationRule列表
+            protocols (dict): 已加载的协议，用于从报文头和报文ID识别协议
+        """
+        identifier = FrameIdentifier(protocols)
+        with self.condition:
+            self.rules = {rule.request_id: rule for rule in rules}
+            self.response_rules = {}
+            self.pairs = {}
+            for rule in rules:
+                for response_id in rule.response_ids:
+                    self.response_rules.setdefault(response_id, []).append(rule)
+                    self.pairs[(rule.request_id, response_id)] = PairStats(rule.request_id, response_id)
+            self.identifier = identifier
+            self.outstanding = []
+            self.reset_counters()
+            self.condition.notify()
+
+    def on_sent(self, message, now_ns=None):
+        """
+        本机报文写出后调用
+
+        Args:
+            message (bytes): 报文
+            now_ns (int): 写出完成的单调时钟时间(ns)，None表示当前时间
+        """
+        self.on_frame(message, DIRECTION_TX, now_ns)
+
+    def on_received(self, message, now_ns=None):
+        """
+        收到完整报文后调用
+
+        Args:
+            message (bytes): 报文
+            now_ns (int): 收到报文的单调时钟时间(ns)，None表示当前时间
+        """
+        self.on_frame(message, DIRECTION_RX, now_ns)
+
+    def on_frame(self, message, direction, now_ns=None):
+        """
+        处理一帧报文
+
+        Args:
+            message (bytes): 报文
+            direction (str): DIRECTION_TX 或 DIRECTION_RX
+            now_ns (int): 单调时钟时间(ns)
+        """
+        if not self.rules:
+            return
+        protocol_id = self.identifier.identify(message)
+        if protocol_id is None:
+            return
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+
+        with self.condition:
+            rule = self.rules.get(protocol_id)
+            if rule is not None:
+                self.open_transaction(rule, message, direction, now_ns)
+
+            response_rules = self.response_rules.get(protocol_id)
+            if response_rules and not self.match_response(protocol_id, response_rules, now_ns):
+                self.unmatched[protocol_id] = self.unmatched.get(protocol_id, 0) + 1
+
+    def open_transaction(self, rule, message, direction, now_ns):
+        """打开请求事务，重发的报文写出时重新计时，调用时需持有锁"""
+        if direction == DIRECTION_TX:
+            for transaction in self.outstanding:
+                if transaction.resend_pending and transaction.rule is rule and transaction.message == message:
+                    transaction.resend_pending = False
+                    transaction.sent_ns = now_ns
+                    transaction.deadline_ns = now_ns + int(rule.timeout_ms * NS_PER_MS)
+                    self.condition.notify()
+                    return
+
+        self.outstanding.append(Transaction(rule, message, direction, now_ns))
+        self.requests[rule.request_id] += 1
+        for response_id in rule.response_ids:
+            self.pairs[(rule.request_id, response_id)].expected += 1
+        self.condition.notify()
+
+    def match_response(self, response_id, response_rules, now_ns):
+        """
+        把响应与最早的等待该响应的事务配对，调用时需持有锁
+
+        Returns:
+            bool: 是否配对成功
+        """
+        for index, transaction in enumerate(self.outstanding):
+            if transaction.rule in response_rules and response_id in transaction.pending:
+                transaction.pending.discard(response_id)
+                stats = self.pairs[(transaction.rule.request_id, response_id)]
+                stats.histogram.add(max(0, now_ns - transaction.sent_ns))
+                if not transaction.pending:
+                    del self.outstanding[index]
+                return True
+        return False
+
+    def expire(self, now_ns):
+        """
+        处理已超时的事务，调用时需持有锁
+
+        Returns:
+            list: 需要重发的 [(message, rule)]
+        """
+        resend = []
+        remaining = []
+        for transaction in self.outstanding:
+            if transaction.deadline_ns > now_ns:
+                remaining.append(transaction)
+                continue
+
+            rule = transaction.rule
+            if (transaction.direction == DIRECTION_TX and self.resend is not None
+                    and transaction.attempts <= rule.retries):
+                # 重发的报文写出前先按提交时间计时，报文被丢弃时也会超时
+                transaction.attempts += 1
+                transaction.resend_pending = True
+                transaction.deadline_ns = now_ns + int(rule.timeout_ms * NS_PER_MS)
+                self.retries[rule.request_id] += 1
+                resend.append((transaction.message, rule))
+                remaining.append(transaction)
+                continue
+
+            self.failed[rule.request_id] += 1
+            for response_id in transaction.pending:
+                self.pairs[(rule.request_id, response_id)].timeouts += 1
+        self.outstanding = remaining
+        return resend
+
+    def start(self):
+        """启动超时检查线程"""
+        with self.condition:
+            if self.is_running:
+                return
+            self.is_running = True
+        self.thread = threading.Thread(target=self.run, name="ResponseCorrelator", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止超时检查线程，丢弃未完成的事务（不计超时）"""
+        with self.condition:
+            self.is_running = False
+            self.outstanding = []
+            self.condition.notify()
+
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.thread = None
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.is_running:
+                    if not self.outstanding:
+                        self.condition.wait()
+                        continue
+                    wait_ns = min(transaction.deadline_ns for transaction in self.outstanding) - time.monotonic_ns()
+                    if wait_ns <= 0:
+                        break
+                    self.condition.wait(wait_ns / 1e9)
+
+                if not self.is_running:
+                    return
+                resend = self.expire(time.monotonic_ns())
+
+            # 在锁外重发，发送队列有自己的锁
+            for message, rule in resend:
+                try:
+                    self.resend(message, rule)
+                except Exception as e:
+                    log_debug(f"重发 {rule.request_id} 失败: {str(e)}")
+
+    def reset_stats(self):
+        """清零统计，未完成的事务继续等待"""
+        with self.condition:
+            for stats in self.pairs.values():
+                stats.reset()
+            self.reset_counters()
+
+    def snapshot(self):
+        """
+        获取统计结果
+
+        Returns:
+            dict: {
+                'pairs': [PairStats.snapshot()],
+                'requests': [{request_id, responses, timeout_ms, retries, requests, retried, failed, outstanding}],
+                'unmatched': {response_id: count},
+            }
+        """
+        with self.condition:
+            outstanding = {}
+            for transaction in self.outstanding:
+                request_id = transaction.rule.request_id
+                outstanding[request_id] = outstanding.get(request_id, 0) + 1
+            requests = [{
+                'request_id': request_id,
+                'responses': list(rule.response_ids),
+                'timeout_ms': rule.timeout_ms,
+                'retries': rule.retries,
+                'requests': self.requests[request_id],
+                'retried': self.retries[request_id],
+                'failed': self.failed[request_id],
+                'outstanding': outstanding.get(request_id, 0),
+            } for request_id, rule in self.rules.items()]
+            return {
+                'pairs': [stats.snapshot() for stats in self.pairs.values()],
+                'requests': requests,
+                'unmatched': dict(self.unmatched),
+            }
+
+    def export(self, file_path):
+        """
+        导出统计，扩展名为.json时导出完整结果，否则导出每个ID对一行的CSV
+
+        Args:
+            file_path (str): 文件路径
+        """
+        snapshot = self.snapshot()
+        if file_path.lower().endswith('.json'):
+            snapshot['bucket_labels_ms'] = LatencyHistogram.bucket_labels()
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=4, ensure_ascii=False)
+            return
+
+        labels = LatencyHistogram.bucket_labels()
+        with open(file_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["请求", "响应", "期望", "响应数", "超时", "响应率", "平均(ms)", "最小(ms)",
+                             "P50(ms)", "P95(ms)", "P99(ms)", "最大(ms)"] + [f"{label}ms" for label in labels])
+            for pair in snapshot['pairs']:
+                latency = pair['latency']
+                writer.writerow([pair['request_id'], pair['response_id'], pair['expected'], pair['matched'],
+                                 pair['timeouts'], f"{pair['response_rate']:.4f}",
+                                 f"{latency['mean_ms']:.3f}", f"{latency['min_ms']:.3f}", f"{latency['p50_ms']:.3f}",
+                                 f"{latency['p95_ms']:.3f}", f"{latency['p99_ms']:.3f}", f"{latency['max_ms']:.3f}"]
+                                + latency['buckets'])
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: CRC16(Modbus)校验模块，查表实现，供报文生成与接收校验共用
+"""
+
+import sys
+from array import array
+
+CRC16_MODBUS_POLY = 0xA001  # 0x8005的反射多项式
+CRC16_MODBUS_INIT = 0xFFFF
+
+# 数据长度不小于该值时使用双字节查表
+SLICE_BY_2_THRESHOLD = 64
+
+
+def _build_tables(poly):
+    """
+    生成查表
+
+    Args:
+        poly (int): 反射多项式
+
+    Returns:
+        tuple: (table, table2) table为单字节表，table2为双字节查表中首字节使用的表
+    """
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ poly
+            else:
+                crc >>= 1
+        table.append(crc)
+
+    # 字节后再经过一个全0字节的结果
+    table2 = [(table[i] >> 8) ^ table[table[i] & 0xFF] for i in range(256)]
+    return table, table2
+
+
+CRC16_MODBUS_TABLE, CRC16_MODBUS_TABLE2 = _build_tables(CRC16_MODBUS_POLY)
+
+
+def crc16_modbus_table(data, crc=CRC16_MODBUS_INIT):
+    """
+    单字节查表计算CRC16(Modbus)
+
+    Args:
+        data (bytes): 要计算的数据
+        crc (int): 初始值，分段计算时传入上一段的结果
+
+    Returns:
+        int: CRC16校验码
+    """
+    table = CRC16_MODBUS_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_modbus_slice2(data, crc=CRC16_MODBUS_INIT):
+    """
+    双字节查表(slice-by-2)计算CRC16(Modbus)，每次处理一个16位字，循环次数减半
+
+    Args:
+        data (bytes): 要计算的数据
+        crc (int): 初始值，分段计算时传入上一段的结果
+
+    Returns:
+        int: CRC16校验码
+    """
+    data = memoryview(data).cast('B')
+    even_length = len(data) & ~1
+
+    words = array('H')
+    words.frombytes(data[:even_length])
+    if sys.byteorder == 'big':
+        words.byteswap()
+
+    table = CRC16_MODBUS_TABLE
+    table2 = CRC16_MODBUS_TABLE2
+    for word in words:
+        x = crc ^ word
+        crc = table[x >> 8] ^ table2[x & 0xFF]
+
+    if even_length < len(data):
+        crc = (crc >> 8) ^ table[(crc ^ data[even_length]) & 0xFF]
+    return crc
+
+
+def crc16_modbus(data, crc=CRC16_MODBUS_INIT):
+    """
+    计算CRC16(Modbus)，按数据长度自动选择查表方式
+
+    Args:
+        data (bytes): 要计算的数据
+        crc (int): 初始值，分段计算时传入上一段的结果
+
+    Returns:
+        int: CRC16校验码
+    """
+    if len(data) >= SLICE_BY_2_THRESHOLD:
+        return crc16_modbus_slice2(data, crc)
+    return crc16_modbus_table(data, crc)
+
+
+def verify_frame_crc(frame, header_length=2, tail_length=2):
+    """
+    校验完整报文的CRC
+
+    校验范围为报文头之后到CRC之前的部分(报文ID、长度、数据)，CRC按高字节在前存放，
+    与ProtocolParser.generate_message生成的报文一致。
+
+    Args:
+        frame (bytes): 完整报文
+        header_length (int): 报文头长度
+        tail_length (int): 报文尾长度
+
+    Returns:
+        bool: 校验是否通过
+    """
+    crc_end = len(frame) - tail_length
+    crc_start = crc_end - 2
+    if crc_start < header_length:
+        return False
+
+    view = memoryview(frame)
+    expected = (view[crc_start] << 8) | view[crc_start + 1]
+    return crc16_modbus(view[header_length:crc_start]) == expected
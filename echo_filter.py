@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: RS485本地回波抑制模块，把接收数据与最近发送的数据按时间窗口比对，去掉半双工适配器回送的本机发送数据
+"""
+
+import threading
+import time
+
+NS_PER_MS = 1000000
+PROBE_LENGTH = 8  # 在数据块中间查找回波起点时比对的字节数
+
+
+def common_prefix_length(data, position, expected):
+    """
+    计算data[position:]与expected的公共前缀长度
+
+    Args:
+        data (bytes): 接收数据
+        position (int): 起始位置
+        expected (bytes): 期望的回波
+
+    Returns:
+        int: 公共前缀长度
+    """
+    length = min(len(data) - position, len(expected))
+    if data[position:position + length] == expected[:length]:
+        return length
+    # 回波被破坏的情况很少，二分查找第一个不一致的字节
+    low, high = 0, length - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if data[position:position + middle] == expected[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def partial_tail_length(data, position, probe):
+    """
+    计算data[position:]末尾与probe开头一致的最长长度（不含整个probe）
+
+    Args:
+        data (bytes): 接收数据
+        position (int): 起始位置
+        probe (bytes): 回波开头的若干字节
+
+    Returns:
+        int: 一致的字节数，没有时为0
+    """
+    for length in range(min(len(probe) - 1, len(data) - position), 0, -1):
+        if data.endswith(probe[:length]):
+            return length
+    return 0
+
+
+class EchoSegment:
+    """一次写入的数据，等待回波"""
+
+    __slots__ = ('data', 'offset', 'start_ns', 'deadline_ns')
+
+    def __init__(self, data, start_ns, deadline_ns):
+        self.data = data
+        self.offset = 0  # 已收到回波的字节数
+        self.start_ns = start_ns  # 开始写入的时间，之前到达的数据不可能是回波
+        self.deadline_ns = deadline_ns  # 超过该时间仍未收到的回波不再等待
+
+
+class EchoFilter:
+    """
+    本地回波过滤器
+
+    半双工RS485适配器会把本机发送的每个字节原样回送到接收端。写线程在写入前调用on_transmit记录发送的数据和时间，
+    接收处理线程在分帧前调用filter去掉回波：回波按发送顺序到达，每次写入的数据在开始写入之后、
+    线路传输时间加window_ms之内到达才被认为是回波。
+
+    回波从数据块开头开始，或在数据块中找到连续PROBE_LENGTH个字节（不足时为整段）与待回波数据一致时才开始比对，
+    避免把设备报文中与发送报文相同的报文头误认为回波。同一数据块中比对到一半不一致时，已比对的字节作为设备数据保留。
+    数据块末尾与回波开头一致但不足PROBE_LENGTH个字节时先暂存，与下一个数据块拼接后再比对，不一致时重新输出；
+    已确认的回波在之后的数据块中不一致时（总线冲突）丢弃这次写入剩余的回波并计数。
+    所有方法都可以在任意线程中调用。
+    """
+
+    def __init__(self, window_ms=20.0):
+        """
+        Args:
+            window_ms (float): 回波在发送完成后最晚到达的时间(ms)，包括USB适配器的延迟
+        """
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.window_ns = int(window_ms * NS_PER_MS)
+        self.line_timing = None
+        self.segments = []  # 等待回波的写入，按写入顺序排列
+        self.held = b''  # 数据块末尾暂存的可能是回波开头的字节
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清零统计"""
+        with self.lock:
+            self.suppressed_bytes = 0  # 去掉的回波字节数
+            self.echoed_writes = 0  # 回波完整收到的写入次数
+            self.mismatched_writes = 0  # 回波不一致而丢弃的写入次数
+            self.missing_bytes = 0  # 超时未收到回波的字节数
+
+    def set_enabled(self, enabled):
+        """
+        开启或关闭回波抑制，关闭时丢弃等待中的数据
+
+        Args:
+            enabled (bool): 是否开启
+        """
+        with self.lock:
+            self.enabled = enabled
+            self.segments = []
+            self.held = b''
+
+    def set_window(self, window_ms):
+        """
+        设置回波窗口
+
+        Args:
+            window_ms (float): 回波在发送完成后最晚到达的时间(ms)
+        """
+        with self.lock:
+            self.window_ns = int(window_ms * NS_PER_MS)
+
+    def set_line_timing(self, line_timing):
+        """
+        设置线路时间，用于计算每次写入的传输时间
+
+        Args:
+            line_timing (LineTiming): 线路时间，None时只按window_ms等待
+        """
+        with self.lock:
+            self.line_timing = line_timing
+
+    def on_transmit(self, data, start_ns=None):
+        """
+        写线程写入前调用
+
+        Args:
+            data (bytes): 要写入的数据
+            start_ns (int): 开始写入的单调时钟时间(ns)
+        """
+        if not self.enabled or not data:
+            return
+        if start_ns is None:
+            start_ns = time.monotonic_ns()
+        with self.lock:
+            line_timing = self.line_timing
+            transmit_ns = int(line_timing.frame_time_ns(len(data))) if line_timing is not None else 0
+            self.segments.append(EchoSegment(bytes(data), start_ns, start_ns + transmit_ns + self.window_ns))
+
+    def expire(self, now_ns):
+        """丢弃超时的写入，调用时需持有锁"""
+        segments = self.segments
+        while segments and segments[0].deadline_ns < now_ns:
+            segment = segments.pop(0)
+            self.missing_bytes += len(segment.data) - segment.offset
+
+    def filter(self, data, arrival_ns=None):
+        """
+        去掉数据块中的回波
+
+        Args:
+            data (bytes): 接收到的数据块
+            arrival_ns (int): 数据块到达的单调时钟时间(ns)
+
+        Returns:
+            bytes: 去掉回波后的数据
+        """
+        if not self.enabled or not (self.segments or self.held):
+            return data
+        if arrival_ns is None:
+            arrival_ns = time.monotonic_ns()
+
+        with self.lock:
+            if self.held:
+                data = self.held + data
+                self.held = b''
+            self.expire(arrival_ns)
+            output = []
+            position = 0
+            size = len(data)
+            segments = self.segments
+            while position < size and segments:
+                segment = segments[0]
+                if segment.start_ns > arrival_ns:
+                    # 数据块在这次写入之前到达
+                    break
+                expected = segment.data[segment.offset:]
+
+                start = position
+                if segment.offset == 0 and not data.startswith(expected[:1], position):
+                    # 回波未从当前位置开始，在数据块中查找回波起点
+                    start = data.find(expected[:PROBE_LENGTH], position)
+                    if start < 0:
+                        # 数据块末尾可能是回波的开头，暂存到下一个数据块
+                        held = partial_tail_length(data, position, expected[:PROBE_LENGTH])
+                        if held:
+                            output.append(data[position:size - held])
+                            self.held = data[size - held:]
+                            position = size
+                        break
+                matched = common_prefix_length(data, start, expected)
+                if matched < len(expected) and start + matched < size:
+                    # 比对到一半不一致
+                    if segment.offset == 0:
+                        # 本数据块中刚开始比对，已比对的字节是设备数据，在其后继续查找
+                        output.append(data[position:start + matched])
+                        position = start + matched
+                        continue
+                    # 回波中途被破坏（总线冲突），剩余的回波不再等待
+                    segments.pop(0)
+                    self.mismatched_writes += 1
+                    self.missing_bytes += len(segment.data) - segment.offset
+                    output.append(data[position:start])
+                    position = start
+                    continue
+                if matched < len(expected) and segment.offset == 0 and matched < PROBE_LENGTH:
+                    # 比对到数据块末尾，字节数不足以确认是回波，暂存到下一个数据块
+                    output.append(data[position:start])
+                    self.held = data[start:]
+                    position = size
+                    break
+
+                output.append(data[position:start])
+                segment.offset += matched
+                self.suppressed_bytes += matched
+                position = start + matched
+                if segment.offset >= len(segment.data):
+                    segments.pop(0)
+                    self.echoed_writes += 1
+
+            if position == 0:
+                return data
+            output.append(data[position:])
+            return b''.join(output)
+
+    def snapshot(self):
+        """
+        获取统计
+
+        Returns:
+            dict: {suppressed_bytes, echoed_writes, mismatched_writes, missing_bytes, pending_bytes}
+        """
+        with self.lock:
+            return {
+                'suppressed_bytes': self.suppressed_bytes,
+                'echoed_writes': self.echoed_writes,
+                'mismatched_writes': self.mismatched_writes,
+                'missing_bytes': self.missing_bytes,
+                'pending_bytes': sum(len(segment.data) - segment.offset for segment in self.segments),
+            }
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 串口收发引擎，不依赖Qt，组合分帧、解码、编码、发送队列和周期调度，提供回调和迭代器接口，供测试脚本嵌入使用
+
+用法:
+    from engine import SerialEngine
+
+    with SerialEngine.from_config('YD-G392.ini') as engine:
+        engine.open('COM3', 9600)
+        engine.send(engine.encode('A4h', {}))
+        engine.schedule('D0h', 100, lambda: engine.encode('D0h', {'B5': 1}))
+        for frame in engine.frames(timeout=1.0):
+            print(frame.protocol_id, frame.fields)
+
+界面中的MessageSender、MessageReceiver、ProtocolParser、SerialReceiveThread分别是本模块所用的
+FrameSender、FrameReceiver、ProtocolDecoder、SerialReader的Qt适配层。
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+from frame_sender import FrameSender, PRIORITY_INTERACTIVE, PRIORITY_PERIODIC
+from framer import FrameReceiver
+from line_timing import LineTiming
+from protocol_decoder import ProtocolDecoder
+from raw_capture import CaptureWriter, DIR_RX, DIR_TX, describe_port
+from scheduler import PeriodicScheduler
+from serial_reader import SerialReader
+
+# 接收到的一帧报文，只包含基本类型，可以在线程和进程之间传递
+# mono_ns/wall_ns为报文最后一块数据到达的单调时钟/系统时间(ns)，protocol_id和fields在未解码或未识别时为None
+Frame = namedtuple('Frame', ['mono_ns', 'wall_ns', 'message', 'crc_ok', 'protocol_id', 'fields'])
+
+
+class FrameSubscription:
+    """
+    报文订阅
+
+    引擎收到的报文依次放入订阅队列，队列满时丢弃最旧的报文并计数。可以在任意线程中调用get或迭代，
+    引擎关闭或取消订阅后，队列中剩余的报文取完即结束。
+    """
+
+    def __init__(self, max_pending=10000):
+        """
+        Args:
+            max_pending (int): 队列最多缓存的报文数
+        """
+        self.condition = threading.Condition()
+        self.queue = deque()
+        self.max_pending = max_pending
+        self.closed = False
+        self.dropped = 0  # 队列满丢弃的报文数
+
+    def put(self, frames):
+        """放入一批报文，由接收线程调用"""
+        with self.condition:
+            if self.closed:
+                return
+            self.queue.extend(frames)
+            overflow = len(self.queue) - self.max_pending
+            for _ in range(max(0, overflow)):
+                self.queue.popleft()
+            self.dropped += max(0, overflow)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """
+        取出一帧报文
+
+        Args:
+            timeout (float): 最长等待时间(秒)，None表示一直等待
+
+        Returns:
+            Frame: 报文，超时或已关闭时返回None
+        """
+        with self.condition:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self.queue and not self.closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+            return self.queue.popleft() if self.queue else None
+
+    def close(self):
+        """关闭订阅，唤醒等待中的get"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __iter__(self):
+        while True:
+            frame = self.get()
+            if frame is None:
+                return
+            yield frame
+
+
+class SerialEngine:
+    """
+    串口收发引擎
+
+    接收：读取线程把数据块交给feed，分帧、解码后在读取线程中依次调用报文回调，并放入所有订阅队列；
+    没有串口时也可以直接调用feed解码离线数据。发送：报文按优先级进入FrameSender的写线程，
+    周期报文由PeriodicScheduler按绝对时间表加入发送队列。
+
+    所有方法都可以在任意线程中调用。引擎不使用全局状态，多进程使用时在子进程中创建各自的引擎，
+    Frame和协议字典都可以直接在进程之间传递。
+    """
+
+    def __init__(self, protocols=None, decode=True, verify_crc=True):
+        """
+        Args:
+            protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+            decode (bool): 是否按协议解码，关闭时只分帧
+            verify_crc (bool): 是否校验报文CRC
+        """
+        self.decoder = ProtocolDecoder()
+        self.receiver = FrameReceiver()
+        self.receiver.set_verify_crc(verify_crc)
+        self.sender = FrameSender()
+        self.scheduler = PeriodicScheduler("EngineScheduler")
+        self.decode_enabled = decode
+        self.serial = None
+        self.reader = None
+        self.reader_thread = None
+        self.owns_serial = False  # 串口由引擎打开时关闭引擎同时关闭串口
+        self.lock = threading.Lock()
+        self.frame_callbacks = []  # 在接收线程中调用 callback(frame)
+        self.data_callbacks = []  # 在接收线程中调用 callback(data, mono_ns)，分帧之前的原始数据
+        self.subscriptions = []
+        self.capture_writer = None
+        self.capture_hooks = None
+        self.received_bytes = 0
+        self.frame_count = 0
+        if protocols:
+            self.set_protocols(protocols)
+
+    @classmethod
+    def from_config(cls, config_path, **kwargs):
+        """
+        按INI配置文件创建引擎
+
+        Args:
+            config_path (str): 配置文件路径
+
+        Returns:
+            SerialEngine: 引擎
+
+        Raises:
+            ValueError: 配置文件加载失败
+        """
+        from config_parser import ConfigParser
+        config_parser = ConfigParser(interactive=False)
+        if not config_parser.load_config(config_path):
+            raise ValueError(f"加载配置文件失败: {config_path} {config_parser.get_validation_errors()}")
+        return cls(config_parser.get_protocols(), **kwargs)
+
+    def set_protocols(self, protocols):
+        """
+        设置协议，同时更新分帧规则和解码表
+
+        Args:
+            protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+        """
+        self.decoder.set_protocols(protocols)
+        self.receiver.set_protocols(protocols)
+
+    def open(self, port, baudrate=9600, bytesize=8, parity='N', stopbits=1, gap_chars=0.0, **kwargs):
+        """
+        打开串口并开始收发
+
+        Args:
+            port (str): 串口名，也可以是pyserial支持的URL（例如loop://）
+            baudrate (int): 波特率
+            gap_chars (float): 发送帧间隔（字符时间数）
+            kwargs: 传给serial.serial_for_url的其他参数
+        """
+        import serial
+        kwargs.setdefault('timeout', 0.1)
+        serial_port = serial.serial_for_url(port, baudrate=baudrate, bytesize=bytesize, parity=parity,
+                                            stopbits=stopbits, **kwargs)
+        self.attach(serial_port, gap_chars)
+        self.owns_serial = True
+
+    def attach(self, serial_port, gap_chars=0.0, read_mode=SerialReader.MODE_BLOCKING, read_latency=2):
+        """
+        使用已打开的串口对象开始收发，关闭引擎时不关闭该串口
+
+        Args:
+            serial_port (serial.Serial): 已打开的串口对象，需要设置读取超时
+            gap_chars (float): 发送帧间隔（字符时间数）
+            read_mode (str): 接收模式 (SerialReader.MODE_BLOCKING/MODE_POLLING)
+            read_latency (int): 字节间隔超时(ms)
+        """
+        self.close()
+        with self.lock:
+            self.serial = serial_port
+            self.owns_serial = False
+            self.receiver.clear()
+            self.sender.set_line_timing(LineTiming.from_serial(serial_port, gap_chars))
+            self.sender.set_serial(serial_port)
+            self.reader = SerialReader(serial_port, read_mode, read_latency)
+            self.reader_thread = threading.Thread(target=self.reader.read_loop, args=(self.feed,),
+                                                  name="EngineReader", daemon=True)
+            self.reader_thread.start()
+            self.scheduler.start()
+
+    def close(self):
+        """停止收发，结束所有订阅"""
+        with self.lock:
+            self.scheduler.stop()
+            self.sender.set_serial(None)
+            if self.reader is not None:
+                self.reader.stop()
+                self.reader_thread.join()
+                self.reader = None
+                self.reader_thread = None
+            if self.serial is not None and self.owns_serial:
+                self.serial.close()
+            self.serial = None
+
+            subscriptions = self.subscriptions
+            self.subscriptions = []
+        for subscription in subscriptions:
+            subscription.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        self.stop_capture()
+
+    def is_open(self):
+        """
+        是否正在收发
+
+        Returns:
+            bool: 串口是否已打开
+        """
+        return self.serial is not None and self.serial.isOpen()
+
+    # ---------- 接收 ----------
+
+    def add_frame_callback(self, callback):
+        """
+        添加报文回调，在接收线程中调用，不能阻塞
+
+        Args:
+            callback (callable): callback(frame)
+        """
+        if callback not in self.frame_callbacks:
+            self.frame_callbacks = self.frame_callbacks + [callback]
+
+    def remove_frame_callback(self, callback):
+        """移除报文回调"""
+        self.frame_callbacks = [item for item in self.frame_callbacks if item != callback]
+
+    def add_data_callback(self, callback):
+        """
+        添加原始数据回调，在接收线程中分帧之前调用，不能阻塞
+
+        Args:
+            callback (callable): callback(data, mono_ns)
+        """
+        if callback not in self.data_callbacks:
+            self.data_callbacks = self.data_callbacks + [callback]
+
+    def remove_data_callback(self, callback):
+        """移除原始数据回调"""
+        self.data_callbacks = [item for item in self.data_callbacks if item != callback]
+
+    def subscribe(self, max_pending=10000):
+        """
+        订阅之后收到的报文
+
+        Args:
+            max_pending (int): 队列最多缓存的报文数
+
+        Returns:
+            FrameSubscription: 订阅，用完后调用unsubscribe
+        """
+        subscription = FrameSubscription(max_pending)
+        with self.lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """取消订阅"""
+        with self.lock:
+            self.subscriptions = [item for item in self.subscriptions if item is not subscription]
+        subscription.close()
+
+    def frames(self, timeout=None, max_pending=10000):
+        """
+        逐帧迭代之后收到的报文
+
+        Args:
+            timeout (float): 超过该时间(秒)没有收到报文时结束迭代，None表示直到引擎关闭
+            max_pending (int): 队列最多缓存的报文数
+
+        Yields:
+            Frame: 报文
+        """
+        subscription = self.subscribe(max_pending)
+        try:
+            while True:
+                frame = subscription.get(timeout)
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def feed(self, data, mono_ns=None):
+        """
+        处理一块接收数据：分帧、解码并分发给回调和订阅，接收线程调用，也可以直接输入离线数据
+
+        Args:
+            data (bytes): 数据
+            mono_ns (int): 数据到达的单调时钟时间(ns)，None时取当前时间
+
+        Returns:
+            list: 提取出的Frame列表
+        """
+        if mono_ns is None:
+            mono_ns = time.monotonic_ns()
+        self.received_bytes += len(data)
+        for callback in self.data_callbacks:
+            callback(data, mono_ns)
+
+        extracted = self.receiver.extract(data)
+        if not extracted:
+            return []
+
+        wall_ns = time.time_ns()
+        frames = []
+        for message, crc_ok in extracted:
+            protocol_id = fields = None
+            if crc_ok and self.decode_enabled:
+                protocol_id, parsed_data = self.decoder.decode_message(message)
+                if parsed_data:
+                    fields = parsed_data['fields']
+            frames.append(Frame(mono_ns, wall_ns, message, crc_ok, protocol_id, fields))
+        self.frame_count += len(frames)
+
+        for callback in self.frame_callbacks:
+            for frame in frames:
+                callback(frame)
+        for subscription in self.subscriptions:
+            subscription.put(frames)
+        return frames
+
+    def decode(self, message):
+        """
+        解码一帧报文
+
+        Args:
+            message (bytes): 报文
+
+        Returns:
+            tuple: (protocol_id, parsed_data)，未识别则返回(None, None)
+        """
+        return self.decoder.decode_message(message)
+
+    # ---------- 发送 ----------
+
+    def encode(self, protocol_id, field_values=None, use_defaults=True):
+        """
+        按协议生成报文
+
+        Args:
+            protocol_id (str): 协议ID
+            field_values (dict): 字段值 {field_id: value}，与界面输入相同："0x"开头的字符串为总线值，
+                                 其他字符串和数值为物理值
+            use_defaults (bool): 未给出的字段是否使用协议中的default_hex
+
+        Returns:
+            bytes: 报文，生成失败则返回None
+        """
+        field_values = {field_id: value if isinstance(value, str) else str(value)
+                        for field_id, value in (field_values or {}).items()}
+        return self.decoder.generate_message(protocol_id, field_values, use_defaults)
+
+    def send(self, message, name='', priority=PRIORITY_INTERACTIVE):
+        """
+        把报文加入发送队列
+
+        Args:
+            message (bytes): 报文
+            name (str): 报文名称
+            priority (int): 发送优先级
+
+        Returns:
+            bool: 是否成功加入队列，串口未打开时返回False
+        """
+        return self.sender.add_message(message, name, priority)
+
+    def add_sent_callback(self, callback):
+        """
+        添加写入完成回调，在写线程中调用，不能阻塞
+
+        Args:
+            callback (callable): callback(sent)，sent为 [(message, name, latency_ms, priority)]
+        """
+        self.sender.add_sent_callback(callback)
+
+    def remove_sent_callback(self, callback):
+        """移除写入完成回调"""
+        self.sender.remove_sent_callback(callback)
+
+    def schedule(self, key, interval_ms, message, offset_ms=0, priority=PRIORITY_PERIODIC):
+        """
+        添加或更新周期报文，上一帧还在排队时由新的一帧替换
+
+        Args:
+            key: 任务标识，同时作为报文名称
+            interval_ms (float): 周期(ms)
+            message: 报文bytes，或每次发送时调用的函数，返回bytes（返回None时跳过本次）
+            offset_ms (float): 相位偏移(ms)
+            priority (int): 发送优先级
+        """
+        def send(task_key):
+            data = message() if callable(message) else message
+            if data:
+                self.sender.add_message(data, str(task_key), priority, replace_key=task_key)
+
+        self.scheduler.schedule(key, interval_ms, send, offset_ms)
+
+    def unschedule(self, key):
+        """移除周期报文"""
+        self.scheduler.remove(key)
+
+    # ---------- 录制 ----------
+
+    def start_capture(self, path, port_info=None):
+        """
+        开始录制收发的原始数据，重新打开串口后继续录制，直到stop_capture
+
+        Args:
+            path (str): 录制文件路径
+            port_info (dict): 写入文件头的串口说明，None时取当前串口的参数
+
+        Returns:
+            CaptureWriter: 录制器
+        """
+        self.stop_capture()
+        if port_info is None:
+            port_info = describe_port(self.serial) if self.serial is not None else {}
+        writer = CaptureWriter(path, [port_info])
+        rx_hook, tx_hook = writer.hook(0, DIR_RX), writer.hook(0, DIR_TX)
+        self.add_data_callback(rx_hook)
+        self.sender.add_write_hook(tx_hook)
+        self.capture_writer = writer
+        self.capture_hooks = (rx_hook, tx_hook)
+        return writer
+
+    def stop_capture(self):
+        """
+        停止录制
+
+        Returns:
+            dict: 录制统计，见CaptureWriter.stats，未在录制时返回None
+        """
+        writer = self.capture_writer
+        if writer is None:
+            return None
+        rx_hook, tx_hook = self.capture_hooks
+        self.remove_data_callback(rx_hook)
+        self.sender.remove_write_hook(tx_hook)
+        self.capture_writer = None
+        self.capture_hooks = None
+        writer.close()
+        return writer.stats()
+
+    def stats(self):
+        """
+        获取统计
+
+        Returns:
+            dict: {received_bytes, frames, crc_errors, unknown, dropped, send_latency, lanes}
+        """
+        return {
+            'received_bytes': self.received_bytes,
+            'frames': self.frame_count,
+            'crc_errors': self.receiver.crc_error_count,
+            'unknown': self.decoder.unknown_count,
+            'dropped': sum(subscription.dropped for subscription in self.subscriptions),
+            'send_latency': self.sender.latency_stats.snapshot(),
+            'lanes': self.sender.lane_stats(),
+        }
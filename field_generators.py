@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 字段生成器模块，定时报文每次发送时为字段生成新的取值（计数、斜坡、时钟、随机、列表回放）
+"""
+
+import time
+import random
+from datetime import datetime
+
+# 生成方式 {kind: 显示名称}
+GENERATOR_KINDS = {
+    'counter': "计数",
+    'ramp': "斜坡",
+    'clock': "时钟",
+    'random': "随机",
+    'replay': "列表",
+}
+
+# 各生成方式的参数格式说明
+GENERATOR_HINTS = {
+    'counter': "起始,步长（总线值，为空时从最小值开始、步长1，超出范围回绕）",
+    'ramp': "起始,结束[,步长]（物理值，越过结束值后回到起始值）",
+    'clock': "年/月/日/时/分/秒/周/时间戳",
+    'random': "最小,最大（物理值，为空时使用字段范围）",
+    'replay': "值1,值2,...（格式同固定值，依次循环发送）",
+}
+
+# 时钟取值 {part: 显示名称}
+CLOCK_PARTS = {
+    'year': "年",
+    'month': "月",
+    'day': "日",
+    'hour': "时",
+    'minute': "分",
+    'second': "秒",
+    'weekday': "周",
+    'timestamp': "时间戳",
+}
+
+
+def field_bus_range(field):
+    """
+    计算字段总线值的取值范围
+
+    优先按min_value/max_value换算（总线值 = (物理值 - 偏移量) / 精度），否则按位数或字节数计算。
+
+    Args:
+        field (dict): 字段定义
+
+    Returns:
+        tuple: (最小总线值, 最大总线值)
+    """
+    precision = field.get('precision', 1) or 1
+    offset = field.get('offset', 0)
+    try:
+        low = int(round((float(field['min_value']) - offset) / precision))
+        high = int(round((float(field['max_value']) - offset) / precision))
+        if low <= high:
+            return low, high
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    bit_position = field.get('bit_position')
+    byte_position = field.get('byte_position', [])
+    if isinstance(bit_position, list) and bit_position:
+        bits = len(bit_position)
+    elif isinstance(bit_position, int) and not isinstance(bit_position, bool):
+        bits = 1
+    elif isinstance(byte_position, list) and byte_position:
+        bits = 8 * len(byte_position)
+    else:
+        bits = 8
+    return 0, (1 << bits) - 1
+
+
+def bus_value_text(bus_value, field):
+    """
+    把总线值转换为generate_message使用的字段值文本
+
+    非负值用十六进制直接表示总线值，负值换算为物理值
+
+    Args:
+        bus_value (int): 总线值
+        field (dict): 字段定义
+
+    Returns:
+        str: 字段值
+    """
+    if bus_value >= 0:
+        return f"0x{bus_value:X}"
+    return repr(bus_value * field.get('precision', 1) + field.get('offset', 0))
+
+
+def _split_params(text):
+    """按逗号拆分参数文本，去掉空白"""
+    return [part.strip() for part in text.replace('，', ',').split(',') if part.strip()]
+
+
+class FieldGenerator:
+    """
+    字段生成器基类
+
+    next_value()在调度线程中每次发送前调用，返回字段值文本，与协议界面输入的格式相同。
+    """
+
+    kind = ''
+
+    def __init__(self, field=None):
+        """
+        Args:
+            field (dict): 字段定义，用于确定取值范围、精度和偏移
+        """
+        self.field = field or {}
+
+    def next_value(self):
+        """
+        生成下一个字段值
+
+        Returns:
+            str: 字段值
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """从头开始生成"""
+
+    def params(self):
+        """
+        获取生成参数
+
+        Returns:
+            dict: 参数，用于保存配置
+        """
+        return {}
+
+    def params_text(self):
+        """
+        获取参数文本，用于界面编辑
+
+        Returns:
+            str: 参数文本
+        """
+        return ''
+
+    def describe(self):
+        """
+        获取生成方式的简短说明
+
+        Returns:
+            str: 说明
+        """
+        text = self.params_text()
+        return f"{GENERATOR_KINDS[self.kind]}({text})" if text else GENERATOR_KINDS[self.kind]
+
+    def to_dict(self):
+        """
+        转换为字典，用于保存配置
+
+        Returns:
+            dict: 配置字典
+        """
+        data = {'kind': self.kind}
+        data.update(self.params())
+        return data
+
+
+class CounterGenerator(FieldGenerator):
+    """计数：总线值从start开始每次增加step，超出字段范围后回绕"""
+
+    kind = 'counter'
+
+    def __init__(self, field=None, start=None, step=1):
+        super().__init__(field)
+        self.low, self.high = field_bus_range(self.field)
+        self.start = self.low if start is None else int(start)
+        self.step = int(step)
+        self.reset()
+
+    @classmethod
+    def from_text(cls, text, field=None):
+        """从"起始,步长"文本创建，起始为空时从字段最小值开始"""
+        parts = _split_params(text)
+        start = int(parts[0], 0) if parts else None
+        step = int(parts[1], 0) if len(parts) > 1 else 1
+        return cls(field, start, step)
+
+    def reset(self):
+        self.value = self.start
+
+    def next_value(self):
+        value = self.value
+        span = self.high - self.low + 1
+        self.value = self.low + (value + self.step - self.low) % span
+        return bus_value_text(value, self.field)
+
+    def params(self):
+        return {'start': self.start, 'step': self.step}
+
+    def params_text(self):
+        return f"{self.start},{self.step}"
+
+
+class RampGenerator(FieldGenerator):
+    """斜坡：物理值从start开始每次增加step，越过end后回到start"""
+
+    kind = 'ramp'
+
+    def __init__(self, field=None, start=0.0, end=100.0, step=1.0):
+        super().__init__(field)
+        self.start = float(start)
+        self.end = float(end)
+        self.step = float(step)
+        if not self.step:
+            raise ValueError("斜坡步长不能为0")
+        self.reset()
+
+    @classmethod
+    def from_text(cls, text, field=None):
+        """从"起始,结束,步长"文本创建"""
+        parts = _split_params(text)
+        if len(parts) < 2:
+            raise ValueError("斜坡参数格式: 起始,结束[,步长]")
+        step = float(parts[2]) if len(parts) > 2 else 1.0
+        return cls(field, float(parts[0]), float(parts[1]), step)
+
+    def reset(self):
+        self.index = 0
+
+    def next_value(self):
+        value = self.start + self.index * self.step
+        if (self.step > 0 and value > self.end) or (self.step < 0 and value < self.end):
+            value = self.start
+            self.index = 0
+        self.index += 1
+        return repr(round(value, 9))
+
+    def params(self):
+        return {'start': self.start, 'end': self.end, 'step': self.step}
+
+    def params_text(self):
+        return f"{self.start:g},{self.end:g},{self.step:g}"
+
+
+class ClockGenerator(FieldGenerator):
+    """时钟：发送时刻的本地时间，年超出字段范围时取后两位，周为1~7（周一为1）"""
+
+    kind = 'clock'
+
+    def __init__(self, field=None, part='second'):
+        super().__init__(field)
+        if part not in CLOCK_PARTS:
+            raise ValueError(f"未知的时钟取值: {part}")
+        self.part = part
+        self.high = field_bus_range(self.field)[1]
+
+    @classmethod
+    def from_text(cls, text, field=None):
+        """从时钟取值名称（如"秒"或"second"）创建"""
+        text = text.strip()
+        for part, name in CLOCK_PARTS.items():
+            if text in (part, name):
+                return cls(field, part)
+        raise ValueError(f"时钟参数应为: {'/'.join(CLOCK_PARTS.values())}")
+
+    def next_value(self):
+        if self.part == 'timestamp':
+            return str(int(time.time()))
+
+        now = datetime.now()
+        if self.part == 'weekday':
+            value = now.isoweekday()
+        else:
+            value = getattr(now, self.part)
+            if self.part == 'year' and value > self.high:
+                value %= 100
+        return str(value)
+
+    def params(self):
+        return {'part': self.part}
+
+    def params_text(self):
+        return CLOCK_PARTS[self.part]
+
+
+class RandomGenerator(FieldGenerator):
+    """随机：在[low, high]物理值范围内均匀取值，未指定时使用字段的min_value/max_value"""
+
+    kind = 'random'
+
+    def __init__(self, field=None, low=None, high=None, seed=None):
+        super().__init__(field)
+        self.low = low
+        self.high = high
+        precision = self.field.get('precision', 1) or 1
+        offset = self.field.get('offset', 0)
+        bus_low, bus_high = field_bus_range(self.field)
+        if low is not None:
+            bus_low = int(round((float(low) - offset) / precision))
+        if high is not None:
+            bus_high = int(round((float(high) - offset) / precision))
+        self.bus_low, self.bus_high = min(bus_low, bus_high), max(bus_low, bus_high)
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_text(cls, text, field=None):
+        """从"最小,最大"文本创建，为空时使用字段范围"""
+        parts = _split_params(text)
+        if len(parts) == 1:
+            raise ValueError("随机参数格式: 最小,最大（为空时使用字段范围）")
+        if not parts:
+            return cls(field)
+        return cls(field, float(parts[0]), float(parts[1]))
+
+    def next_value(self):
+        return bus_value_text(self.rng.randint(self.bus_low, self.bus_high), self.field)
+
+    def params(self):
+        return {'low': self.low, 'high': self.high}
+
+    def params_text(self):
+        if self.low is None or self.high is None:
+            return ''
+        return f"{self.low:g},{self.high:g}"
+
+
+class ReplayGenerator(FieldGenerator):
+    """列表回放：依次发送列表中的值，结束后从头开始"""
+
+    kind = 'replay'
+
+    def __init__(self, field=None, values=()):
+        super().__init__(field)
+        self.values = [str(value) for value in values]
+        if not self.values:
+            raise ValueError("回放列表不能为空")
+        self.reset()
+
+    @classmethod
+    def from_text(cls, text, field=None):
+        """从逗号分隔的取值列表创建"""
+        return cls(field, _split_params(text))
+
+    def reset(self):
+        self.index = 0
+
+    def next_value(self):
+        value = self.values[self.index]
+        self.index = (self.index + 1) % len(self.values)
+        return value
+
+    def params(self):
+        return {'values': list(self.values)}
+
+    def params_text(self):
+        return ','.join(self.values)
+
+
+GENERATOR_CLASSES = {cls.kind: cls for cls in
+                     (CounterGenerator, RampGenerator, ClockGenerator, RandomGenerator, ReplayGenerator)}
+
+
+def create_generator(data, field=None):
+    """
+    从配置字典创建生成器
+
+    Args:
+        data (dict): FieldGenerator.to_dict()的结果
+        field (dict): 字段定义
+
+    Returns:
+        FieldGenerator: 生成器
+    """
+    params = dict(data)
+    kind = params.pop('kind', '')
+    if kind not in GENERATOR_CLASSES:
+        raise ValueError(f"未知的生成方式: {kind}")
+    return GENERATOR_CLASSES[kind](field, **params)
+
+
+def parse_generator(kind, text, field=None):
+    """
+    从界面输入的参数文本创建生成器
+
+    Args:
+        kind (str): 生成方式
+        text (str): 参数文本
+        field (dict): 字段定义
+
+    Returns:
+        FieldGenerator: 生成器
+    """
+    if kind not in GENERATOR_CLASSES:
+        raise ValueError(f"未知的生成方式: {kind}")
+    return GENERATOR_CLASSES[kind].from_text(text, field)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 接收缓冲区模块，提供带读写游标的定长压缩式字节缓冲区，用于报文分帧
+"""
+
+
+class FrameBuffer:
+    """
+    定长压缩式字节缓冲区
+
+    内部使用一块预分配的bytearray，通过读游标和写游标标记有效数据区间。
+    消费数据只移动读游标，不重新分配内存；只有写游标到达末尾时才把剩余数据
+    整体前移一次，因此每帧的分帧开销与缓冲区中的数据量无关。
+    """
+
+    def __init__(self, capacity=4096):
+        """
+        初始化缓冲区
+
+        Args:
+            capacity (int): 缓冲区容量(字节)，超出时丢弃最旧的数据
+        """
+        self.capacity = capacity
+        self._data = bytearray(capacity)
+        self._start = 0  # 读游标
+        self._end = 0  # 写游标
+        self.dropped_bytes = 0  # 因缓冲区溢出丢弃的字节数
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __getitem__(self, index):
+        """
+        获取指定偏移处的字节
+
+        Args:
+            index (int): 相对读游标的偏移
+
+        Returns:
+            int: 字节值
+        """
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("FrameBuffer index out of range")
+        return self._data[self._start + index]
+
+    def free_space(self):
+        """
+        获取剩余可写空间
+
+        Returns:
+            int: 剩余字节数
+        """
+        return self.capacity - len(self)
+
+    def write(self, data):
+        """
+        写入数据，空间不足时先压缩，仍不足则丢弃最旧的数据
+
+        Args:
+            data (bytes): 要写入的数据
+        """
+        size = len(data)
+        if size == 0:
+            return
+
+        # 数据本身超过容量，只保留最后capacity个字节
+        if size >= self.capacity:
+            self.dropped_bytes += len(self) + size - self.capacity
+            self._data[:] = data[size - self.capacity:]
+            self._start = 0
+            self._end = self.capacity
+            return
+
+        # 丢弃最旧的数据以腾出空间
+        overflow = len(self) + size - self.capacity
+        if overflow > 0:
+            self.dropped_bytes += overflow
+            self._start += overflow
+
+        # 写游标到达末尾，把有效数据前移
+        if self._end + size > self.capacity:
+            self._compact()
+
+        self._data[self._end:self._end + size] = data
+        self._end += size
+
+    def _compact(self):
+        """把有效数据移动到缓冲区起始位置"""
+        length = len(self)
+        if self._start:
+            self._data[:length] = self._data[self._start:self._end]
+        self._start = 0
+        self._end = length
+
+    def find(self, sub, start=0):
+        """
+        查找子串
+
+        Args:
+            sub (bytes): 要查找的字节串
+            start (int): 相对读游标的起始偏移
+
+        Returns:
+            int: 相对读游标的偏移，未找到返回-1
+        """
+        index = self._data.find(sub, self._start + start, self._end)
+        return index - self._start if index != -1 else -1
+
+    def search(self, pattern, start=0):
+        """
+        用编译好的正则表达式查找，一次扫描即可匹配多个候选子串
+
+        Args:
+            pattern (re.Pattern): 字节串正则表达式
+            start (int): 相对读游标的起始偏移
+
+        Returns:
+            tuple: (offset, match) 相对读游标的偏移和匹配到的字节串，未找到返回(-1, None)
+        """
+        match = pattern.search(self._data, self._start + start, self._end)
+        if match is None:
+            return -1, None
+        return match.start() - self._start, match.group()
+
+    def startswith(self, prefix, offset):
+        """
+        判断指定偏移处是否以prefix开头，不复制数据
+
+        Args:
+            prefix (bytes): 要比较的字节串
+            offset (int): 相对读游标的偏移
+
+        Returns:
+            bool: 是否匹配
+        """
+        begin = self._start + offset
+        if begin + len(prefix) > self._end:
+            return False
+        return self._data.startswith(prefix, begin)
+
+    def read_uint(self, offset, size):
+        """
+        读取小端无符号整数
+
+        Args:
+            offset (int): 相对读游标的偏移
+            size (int): 字节数
+
+        Returns:
+            int: 整数值
+        """
+        begin = self._start + offset
+        return int.from_bytes(self._data[begin:begin + size], byteorder='little')
+
+    def peek(self, offset, length):
+        """
+        获取指定区间的只读视图，不复制数据
+
+        视图只在下一次write之前有效。
+
+        Args:
+            offset (int): 相对读游标的偏移
+            length (int): 长度
+
+        Returns:
+            memoryview: 数据视图
+        """
+        begin = self._start + offset
+        return memoryview(self._data)[begin:min(begin + length, self._end)].toreadonly()
+
+    def read(self, offset, length):
+        """
+        复制指定区间的数据
+
+        Args:
+            offset (int): 相对读游标的偏移
+            length (int): 长度
+
+        Returns:
+            bytes: 数据
+        """
+        begin = self._start + offset
+        return bytes(memoryview(self._data)[begin:min(begin + length, self._end)])
+
+    def consume(self, length):
+        """
+        丢弃缓冲区前部的数据
+
+        Args:
+            length (int): 要丢弃的字节数
+        """
+        self._start = min(self._start + length, self._end)
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def clear(self):
+        """清空缓冲区"""
+        self._start = self._end = 0
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 报文发送队列模块，不依赖Qt，按优先级排队、合并写入并控制帧间隔
+"""
+
+import threading
+import time
+import weakref
+from collections import deque
+from log_manager import log_error
+from scheduler import JitterStats
+
+# 发送优先级，数值越小越优先
+PRIORITY_INTERACTIVE = 0  # 手动发送
+PRIORITY_RESPONSE = 1  # 应答与请求
+PRIORITY_PERIODIC = 2  # 定时报文
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "手动", PRIORITY_RESPONSE: "应答", PRIORITY_PERIODIC: "周期"}
+
+# 各串口对象的写锁，串口对象释放后自动移除
+_port_write_locks = weakref.WeakKeyDictionary()
+_port_write_locks_guard = threading.Lock()
+
+
+def port_write_lock(serial):
+    """
+    获取串口对象的写锁，写入同一串口的发送队列共用一个锁，不同串口互不影响
+
+    Args:
+        serial: 串口对象
+
+    Returns:
+        threading.Lock: 写锁，串口对象不支持弱引用时返回新的锁
+    """
+    with _port_write_locks_guard:
+        try:
+            lock = _port_write_locks.get(serial)
+            if lock is None:
+                lock = _port_write_locks[serial] = threading.Lock()
+            return lock
+        except TypeError:
+            return threading.Lock()
+
+
+class SendLane:
+    """一个优先级的发送队列及其统计"""
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.queue = deque()  # [[message, name, enqueue_ns, replace_key]]
+        self.pending = {}  # 队列中带replace_key的报文 {replace_key: entry}
+        self.latency_stats = JitterStats()  # 加入队列到写入完成的延迟
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清零统计"""
+        self.max_depth = len(self.queue)  # 最大排队数
+        self.enqueued = 0  # 加入队列的报文数
+        self.replaced = 0  # 被新报文替换而丢弃的过期报文数
+        self.latency_stats.reset()
+
+    def push(self, message, name, replace_key=None):
+        """
+        加入报文，replace_key相同的报文还在队列中时原位替换为新报文
+
+        Returns:
+            bool: 是否替换了过期报文
+        """
+        now = time.monotonic_ns()
+        self.enqueued += 1
+        if replace_key is not None:
+            entry = self.pending.get(replace_key)
+            if entry is not None:
+                # 保持原排队位置，内容和入队时间更新为新报文
+                entry[0], entry[1], entry[2] = message, name, now
+                self.replaced += 1
+                return True
+
+        entry = [message, name, now, replace_key]
+        self.queue.append(entry)
+        if replace_key is not None:
+            self.pending[replace_key] = entry
+        self.max_depth = max(self.max_depth, len(self.queue))
+        return False
+
+    def pop(self):
+        """取出最早的报文"""
+        entry = self.queue.popleft()
+        if entry[3] is not None:
+            self.pending.pop(entry[3], None)
+        return entry
+
+    def clear(self):
+        """清空队列"""
+        self.queue.clear()
+        self.pending.clear()
+
+    def snapshot(self):
+        """
+        获取统计
+
+        Returns:
+            dict: {priority, name, depth, max_depth, enqueued, replaced, latency}
+        """
+        return {
+            'priority': self.priority,
+            'name': PRIORITY_NAMES.get(self.priority, str(self.priority)),
+            'depth': len(self.queue),
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'replaced': self.replaced,
+            'latency': self.latency_stats.snapshot(),
+        }
+
+
+class FrameSender:
+    """
+    报文发送队列
+
+    报文放入发送队列后由独立的写线程连续发送，不占用界面线程。写线程每次取出队列中
+    已有的全部报文（不超过max_write_size字节）合并为一次write()，报文较多时串口可以满速发送。
+
+    发送队列按优先级分为手动、应答、周期三条，写线程总是先取高优先级的报文，手动发送的报文
+    不会排在大量定时报文之后。已知线路时间时，每次合并写入的长度还限制在max_write_time_ms毫秒
+    的传输量以内，高优先级报文最多等待一次写入的时间。周期报文可以指定replace_key，同一报文的
+    上一帧还在排队时直接用新的一帧替换，不会积压过期的数据。
+
+    每帧记录从加入队列到写入完成的延迟。drain为True时写入后等待串口驱动发送完毕(tcdrain)，
+    延迟即为加入队列到报文离开串口的时间，同时也避免操作系统发送缓冲区积压。
+
+    设置了带帧间隔的线路时间(LineTiming)后逐帧写入，每帧结束后至少间隔gap_ns才写入下一帧，
+    满足RS485等总线对帧间静默时间的要求。帧结束时间取tcdrain返回时间与按波特率计算的时间中较晚的一个。
+
+    不依赖Qt，写入完成后在写线程中调用回调；界面使用的MessageSender在此基础上把回调转换为信号。
+    """
+
+    def __init__(self, max_write_size=4096, drain=True, max_write_time_ms=10):
+        """
+        初始化发送队列
+
+        Args:
+            max_write_size (int): 合并写入的最大字节数
+            drain (bool): 每次写入后是否等待串口发送完毕
+            max_write_time_ms (float): 已知线路时间时，合并写入的最大传输时间(ms)
+        """
+        self.lanes = [SendLane(priority) for priority in sorted(PRIORITY_NAMES)]  # 按优先级排列
+        self.condition = threading.Condition()
+        self.max_write_size = max_write_size
+        self.max_write_time_ms = max_write_time_ms
+        self.drain = drain
+        self.drop_stale = True  # 是否用新的周期报文替换队列中同一报文的旧帧
+        self.serial = None
+        self.write_lock = threading.Lock()  # 串口的写锁，写入同一串口的发送队列之间报文不会交错
+        self.thread = None
+        self.is_running = False
+        self.latency_stats = JitterStats()  # 加入队列到写入完成的延迟
+        self.line_timing = None  # 线路时间，用于帧间隔
+        self.next_write_ns = 0  # 满足帧间隔的最早写入时间
+        self.observers = []  # 写入完成后在写线程中调用 observer(message, done_ns)
+        self.write_hooks = []  # 每次写入串口前调用 hook(data, start_ns)
+        self.sent_callbacks = []  # 每次写入完成后在写线程中调用 callback(sent)，sent为 [(message, name, latency_ms, priority)]
+
+    def set_line_timing(self, line_timing):
+        """
+        设置线路时间
+
+        Args:
+            line_timing (LineTiming): 线路时间，None表示不控制帧间隔
+        """
+        with self.condition:
+            self.line_timing = line_timing
+            self.next_write_ns = 0
+
+    def set_serial(self, serial):
+        """设置串口对象，串口打开时启动写线程，关闭时停止写线程并丢弃未发送的报文"""
+        self.stop()
+        self.serial = serial
+        if serial is not None:
+            self.write_lock = port_write_lock(serial)
+
+        if serial and serial.isOpen():
+            with self.condition:
+                self.is_running = True
+            self.thread = threading.Thread(target=self.run, name="MessageSender", daemon=True)
+            self.thread.start()
+
+    def add_observer(self, observer):
+        """
+        添加写入观察者，每帧写入完成后在写线程中调用，不能阻塞
+
+        Args:
+            observer (callable): observer(message, done_ns)，done_ns为写入完成的单调时钟时间
+        """
+        if observer not in self.observers:
+            self.observers = self.observers + [observer]
+
+    def remove_observer(self, observer):
+        """移除写入观察者"""
+        self.observers = [item for item in self.observers if item != observer]
+
+    def add_sent_callback(self, callback):
+        """
+        添加写入完成回调，每次写入完成后在写线程中调用一次，不能阻塞
+
+        Args:
+            callback (callable): callback(sent)，sent为本次写入的报文 [(message, name, latency_ms, priority)]
+        """
+        if callback not in self.sent_callbacks:
+            self.sent_callbacks = self.sent_callbacks + [callback]
+
+    def remove_sent_callback(self, callback):
+        """移除写入完成回调"""
+        self.sent_callbacks = [item for item in self.sent_callbacks if item != callback]
+
+    def add_write_hook(self, hook):
+        """
+        添加写入钩子，每次写入串口前在持有写锁的线程中调用，不能阻塞
+
+        Args:
+            hook (callable): hook(data, start_ns)，data为本次写入的全部数据，start_ns为开始写入的单调时钟时间
+        """
+        if hook not in self.write_hooks:
+            self.write_hooks = self.write_hooks + [hook]
+
+    def remove_write_hook(self, hook):
+        """移除写入钩子"""
+        self.write_hooks = [item for item in self.write_hooks if item != hook]
+
+    def stop(self):
+        """停止写线程，丢弃未发送的报文"""
+        with self.condition:
+            self.is_running = False
+            for lane in self.lanes:
+                lane.clear()
+            self.condition.notify()
+
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.thread = None
+
+    def add_message(self, message, name='', priority=PRIORITY_INTERACTIVE, replace_key=None):
+        """
+        添加报文到发送队列，可以在任意线程中调用
+
+        Args:
+            message (bytes): 要发送的报文
+            name (str): 报文名称
+            priority (int): 发送优先级
+            replace_key: 报文标识，drop_stale开启时同一标识的报文在队列中只保留最新的一帧
+
+        Returns:
+            bool: 是否成功添加到队列
+        """
+        if not self.serial or not self.serial.isOpen():
+            return False
+
+        with self.condition:
+            if not self.is_running:
+                return False
+            lane = self.lanes[min(max(priority, 0), len(self.lanes) - 1)]
+            lane.push(message, name, replace_key if self.drop_stale else None)
+            self.condition.notify()
+
+        return True
+
+    def lane_stats(self):
+        """
+        获取各优先级队列的统计
+
+        Returns:
+            list: 按优先级排列的 SendLane.snapshot()
+        """
+        with self.condition:
+            return [lane.snapshot() for lane in self.lanes]
+
+    def reset_stats(self):
+        """清零发送延迟和队列统计"""
+        with self.condition:
+            self.latency_stats.reset()
+            for lane in self.lanes:
+                lane.reset_stats()
+
+    def pending_count(self):
+        """
+        获取发送队列中等待发送的报文数
+
+        Returns:
+            int: 报文数
+        """
+        with self.condition:
+            return sum(len(lane.queue) for lane in self.lanes)
+
+    def write_limit(self):
+        """
+        一次合并写入的最大字节数，已知线路时间时不超过max_write_time_ms的传输量
+
+        Returns:
+            int: 字节数
+        """
+        limit = self.max_write_size
+        line_timing = self.line_timing
+        if line_timing is not None and self.max_write_time_ms > 0:
+            limit = min(limit, int(self.max_write_time_ms * 1000000 / line_timing.char_time_ns))
+        return limit
+
+    def take_batch(self):
+        """
+        取出一次写入的报文：按优先级从高到低取队列中已有的报文，总长度不超过write_limit()（至少一帧）
+
+        Returns:
+            list: [(lane, entry)]，停止时返回None
+        """
+        with self.condition:
+            while self.is_running and not any(lane.queue for lane in self.lanes):
+                self.condition.wait()
+            if not self.is_running:
+                return None
+
+            single = self.line_timing is not None and self.line_timing.gap_ns > 0
+            limit = self.write_limit()
+            batch = []
+            size = 0
+            for lane in self.lanes:
+                queue = lane.queue
+                while queue and (not batch or (not single and size + len(queue[0][0]) <= limit)):
+                    entry = lane.pop()
+                    size += len(entry[0])
+                    batch.append((lane, entry))
+                if batch and (single or queue):
+                    # 需要帧间隔时逐帧写入；高优先级队列未取完时不取低优先级的报文
+                    break
+            return batch
+
+    def wait_gap(self):
+        """
+        等待到满足帧间隔的最早写入时间
+
+        Returns:
+            bool: 是否仍在运行
+        """
+        with self.condition:
+            while self.is_running:
+                remaining = self.next_write_ns - time.monotonic_ns()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining / 1e9)
+            return self.is_running
+
+    def run(self):
+        while True:
+            # 先等到可以写入再取报文，等待期间加入的高优先级报文也能赶上这次写入
+            if not self.wait_gap():
+                break
+            batch = self.take_batch()
+            if batch is None:
+                break
+
+            data = b''.join(entry[0] for _, entry in batch)
+            start_ns = time.monotonic_ns()
+            if not self.write_data(data):
+                continue
+
+            # 同一次写入的报文以写入完成的时间计算延迟
+            done_ns = time.monotonic_ns()
+            line_timing = self.line_timing
+            if line_timing is not None and line_timing.gap_ns > 0:
+                self.next_write_ns = max(done_ns, start_ns + line_timing.frame_time_ns(len(data))) + line_timing.gap_ns
+            sent = []
+            with self.condition:
+                for lane, (message, name, enqueue_ns, _) in batch:
+                    latency_ns = done_ns - enqueue_ns
+                    self.latency_stats.add(latency_ns)
+                    lane.latency_stats.add(latency_ns)
+                    sent.append((message, name, latency_ns / 1e6, lane.priority))
+            for observer in self.observers:
+                for message, _, _, _ in sent:
+                    observer(message, done_ns)
+            for callback in self.sent_callbacks:
+                callback(sent)
+
+    def write_data(self, data):
+        """
+        写入串口，持有写锁
+
+        Args:
+            data (bytes): 要写入的数据
+
+        Returns:
+            bool: 是否写入成功
+        """
+        serial = self.serial
+        if not serial or not serial.isOpen():
+            return False
+
+        with self.write_lock:
+            try:
+                if self.write_hooks:
+                    start_ns = time.monotonic_ns()
+                    for hook in self.write_hooks:
+                        hook(data, start_ns)
+                serial.write(data)
+                if self.drain:
+                    serial.flush()
+                return True
+            except Exception as e:
+                log_error(f"发送报文失败: {str(e)}")
+                return False
+
+    def write_message(self, message, name=''):
+        """
+        立即写入报文，不经过发送队列，可以在任意线程中调用
+
+        Args:
+            message (bytes): 要发送的报文
+            name (str): 报文名称
+
+        Returns:
+            bool: 是否写入成功
+        """
+        return self.write_data(message)
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 分帧模块，按协议message_format中声明的报文头、长度字段和报文尾从字节流中切分报文
+"""
+
+import re
+import threading
+from frame_buffer import FrameBuffer
+from crc16 import verify_frame_crc
+from log_manager import log_debug
+from protocol_codec import parse_byte_list, parse_message_id
+
+# 未加载协议时使用的默认格式
+DEFAULT_START_BYTES = b'\x59\x44'
+DEFAULT_END_BYTES = b'\x4B\x4A'
+
+# 报文ID字节数与CRC字节数
+MESSAGE_ID_LENGTH = 1
+CRC_LENGTH = 2
+
+
+class FrameLayout:
+    """
+    报文格式
+
+    报文结构：报文头 + 报文ID(1) + 长度(length_bytes，小端) + 数据(n) + CRC(2) + 报文尾
+    """
+
+    def __init__(self, start_bytes=DEFAULT_START_BYTES, end_bytes=DEFAULT_END_BYTES, length_bytes=2,
+                 checksum="CRC16-modbus"):
+        """
+        初始化报文格式
+
+        Args:
+            start_bytes (bytes): 报文头
+            end_bytes (bytes): 报文尾
+            length_bytes (int): 长度字段字节数（小端）
+            checksum (str): 校验方式
+        """
+        self.start_bytes = bytes(start_bytes)
+        self.end_bytes = bytes(end_bytes)
+        self.length_bytes = length_bytes
+        self.checksum = checksum
+        self.verify_crc = checksum.upper().startswith("CRC16")  # 目前仅支持CRC16-modbus
+
+        # 长度字段的偏移和读完长度字段所需的字节数
+        self.length_offset = len(self.start_bytes) + MESSAGE_ID_LENGTH
+        self.head_length = self.length_offset + length_bytes
+        # 除数据部分以外的固定长度
+        self.overhead = self.head_length + CRC_LENGTH + len(self.end_bytes)
+
+    @classmethod
+    def from_protocol(cls, protocol_data):
+        """
+        从协议数据的message_format创建报文格式
+
+        Args:
+            protocol_data (dict): 协议数据
+
+        Returns:
+            FrameLayout: 报文格式
+        """
+        message_format = protocol_data.get('message_format', {})
+        return cls(
+            start_bytes=parse_byte_list(message_format.get('start_bytes', ["0x59", "0x44"])),
+            end_bytes=parse_byte_list(message_format.get('end_bytes', ["0x4B", "0x4A"])),
+            length_bytes=int(message_format.get('length_bytes', 1)),
+            checksum=message_format.get('checksum', "CRC16-modbus")
+        )
+
+    def key(self):
+        """格式的唯一标识，格式相同的协议共用一个对象"""
+        return self.start_bytes, self.end_bytes, self.length_bytes, self.verify_crc
+
+
+class HeaderEntry:
+    """同一报文头下的报文格式，按报文ID选择"""
+
+    def __init__(self, start_bytes):
+        self.start_bytes = start_bytes
+        self.by_message_id = {}  # {message_id: FrameLayout}
+        self.default = None  # 报文ID未登记时使用的格式
+        self.uniform = None  # 所有报文ID格式相同时的格式，分帧时无需读取ID
+
+    def add(self, layout, message_id):
+        """
+        登记报文格式
+
+        Args:
+            layout (FrameLayout): 报文格式
+            message_id (int): 报文ID，None表示不限ID
+        """
+        if self.default is None:
+            self.default = self.uniform = layout
+        elif layout is not self.uniform:
+            self.uniform = None
+        if message_id is not None:
+            self.by_message_id.setdefault(message_id, layout)
+
+    def layout_for(self, message_id):
+        """
+        获取报文ID对应的格式
+
+        同一报文头下格式都相同时不需要读取ID
+        """
+        return self.by_message_id.get(message_id, self.default)
+
+
+def compile_frame_layouts(protocols):
+    """
+    把已加载协议的message_format编译为按报文头索引的分帧表
+
+    Args:
+        protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+
+    Returns:
+        dict: {start_bytes: HeaderEntry}
+    """
+    layouts = {}  # 相同格式共用一个FrameLayout
+    headers = {}
+    for protocol_id, protocol_data in protocols.items():
+        try:
+            layout = FrameLayout.from_protocol(protocol_data)
+        except (TypeError, ValueError) as e:
+            log_debug(f"协议 {protocol_id} 的报文格式无法解析，不参与分帧: {str(e)}")
+            continue
+        if not layout.start_bytes:
+            log_debug(f"协议 {protocol_id} 没有报文头，不参与分帧")
+            continue
+
+        layout = layouts.setdefault(layout.key(), layout)
+        entry = headers.get(layout.start_bytes)
+        if entry is None:
+            entry = headers[layout.start_bytes] = HeaderEntry(layout.start_bytes)
+        entry.add(layout, parse_message_id(protocol_data))
+    return headers
+
+
+class Framer:
+    """
+    分帧器
+
+    不依赖Qt，输入字节流，输出完整报文。多个报文头编译为一个正则表达式，
+    在缓冲区上一次扫描即可找到最早出现的任意报文头；只有一种报文头时直接使用bytes.find。
+    """
+
+    def __init__(self, capacity=4096):
+        """
+        初始化分帧器
+
+        Args:
+            capacity (int): 接收缓冲区容量(字节)
+        """
+        self.buffer = FrameBuffer(capacity)
+        self.verify_crc = True  # 是否校验报文CRC
+        self.headers = {}
+        self._header_pattern = None
+        self._single_header = None
+        self._single_entry = None
+        self._keep_length = 0
+        self.set_layouts({DEFAULT_START_BYTES: self._default_entry(2)})
+
+    @staticmethod
+    def _default_entry(length_bytes):
+        """未加载协议时的默认格式"""
+        entry = HeaderEntry(DEFAULT_START_BYTES)
+        entry.add(FrameLayout(length_bytes=length_bytes), None)
+        return entry
+
+    def set_protocols(self, protocols):
+        """
+        按协议的message_format设置分帧格式，没有可用格式时使用默认格式
+
+        Args:
+            protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+        """
+        headers = compile_frame_layouts(protocols)
+        self.set_layouts(headers or {DEFAULT_START_BYTES: self._default_entry(2)})
+
+    def set_length_format(self, use_two_bytes=True):
+        """
+        设置默认格式的长度字段字节数，仅在未加载协议时使用
+
+        Args:
+            use_two_bytes (bool): 是否使用两字节长度
+        """
+        self.set_layouts({DEFAULT_START_BYTES: self._default_entry(2 if use_two_bytes else 1)})
+
+    def set_layouts(self, headers):
+        """
+        设置分帧表
+
+        Args:
+            headers (dict): {start_bytes: HeaderEntry}
+        """
+        self.headers = headers
+        if len(headers) == 1:
+            self._single_header, self._single_entry = next(iter(headers.items()))
+            self._header_pattern = None
+        else:
+            self._single_header = self._single_entry = None
+            # 较长的报文头放在前面，前缀相同时优先匹配长的
+            alternatives = sorted(headers, key=len, reverse=True)
+            self._header_pattern = re.compile(b'|'.join(re.escape(header) for header in alternatives))
+
+        # 没有找到报文头时保留的尾部字节数（可能是报文头的一部分）
+        self._keep_length = max(len(header) for header in headers) - 1
+
+    def _find_header(self, start):
+        """
+        查找最早出现的报文头
+
+        Returns:
+            tuple: (offset, HeaderEntry)，未找到时offset为-1
+        """
+        if self._single_header is not None:
+            return self.buffer.find(self._single_header, start), self._single_entry
+        offset, header = self.buffer.search(self._header_pattern, start)
+        return offset, self.headers.get(header)
+
+    def feed(self, data):
+        """
+        输入接收到的数据
+
+        Args:
+            data (bytes): 接收到的数据
+
+        Returns:
+            list: [(frame, crc_ok)] 提取出的完整报文及CRC校验结果
+        """
+        frames = []
+        buffer = self.buffer
+
+        # 按缓冲区剩余空间分段写入，大块数据中的报文不会因缓冲区溢出而丢失
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            # 缓冲区已满时写入会丢弃最旧的数据
+            size = buffer.free_space() or buffer.capacity
+            buffer.write(view[offset:offset + size])
+            offset += size
+
+            # 尝试提取完整报文
+            self.extract(frames)
+        return frames
+
+    def extract(self, frames):
+        """
+        从缓冲区提取完整报文
+
+        Args:
+            frames (list): 提取出的报文追加到该列表 [(frame, crc_ok)]
+        """
+        buffer = self.buffer
+        find_header = self._find_header
+        start_index, entry = find_header(0)
+
+        while start_index != -1:
+            header_length = len(entry.start_bytes)
+
+            layout = entry.uniform
+            if layout is None:
+                # 报文头后至少要有报文ID才能确定格式
+                if start_index + header_length + MESSAGE_ID_LENGTH > len(buffer):
+                    buffer.consume(start_index)
+                    break
+                layout = entry.layout_for(buffer[start_index + header_length])
+
+            # 检查缓冲区是否足够长，至少包含报文头、ID、长度字段
+            if start_index + layout.head_length > len(buffer):
+                buffer.consume(start_index)
+                break
+
+            total_length = layout.overhead + buffer.read_uint(start_index + layout.length_offset, layout.length_bytes)
+
+            # 长度超过缓冲区容量，不可能是有效报文，从下一个位置继续查找报文头
+            if total_length > buffer.capacity:
+                start_index, entry = find_header(start_index + 1)
+                continue
+
+            # 检查缓冲区是否包含完整报文
+            if start_index + total_length > len(buffer):
+                # 报文不完整，丢弃报文头之前的数据，等待更多数据
+                buffer.consume(start_index)
+                break
+
+            # 检查报文尾
+            end_length = len(layout.end_bytes)
+            if buffer.startswith(layout.end_bytes, start_index + total_length - end_length):
+                # 提取完整报文（仅复制一次），只移动读游标
+                frame = buffer.read(start_index, total_length)
+                buffer.consume(start_index + total_length)
+
+                crc_ok = (not self.verify_crc or not layout.verify_crc or
+                          verify_frame_crc(frame, header_length, end_length))
+                frames.append((frame, crc_ok))
+
+                # 继续查找下一个报文头
+                start_index, entry = find_header(0)
+            else:
+                # 报文尾不匹配，从下一个位置继续查找报文头
+                start_index, entry = find_header(start_index + 1)
+
+        # 如果没有找到报文头，丢弃无用数据，只保留可能是报文头一部分的尾部字节
+        if start_index == -1 and len(buffer) > self._keep_length:
+            buffer.consume(len(buffer) - self._keep_length)
+
+    def clear(self):
+        """清空接收缓冲区"""
+        self.buffer.clear()
+
+
+class FrameReceiver:
+    """
+    分帧接收器
+
+    可以在接收线程中调用extract分帧，修改分帧规则的方法可以在其他线程中调用，两者通过锁同步。
+    """
+
+    def __init__(self):
+        self.max_buffer_size = 4096  # 最大缓冲区大小
+        self.framer = Framer(self.max_buffer_size)  # 按协议报文格式分帧
+        self.buffer = self.framer.buffer
+        self.lock = threading.Lock()  # 保护分帧器
+        self.verify_crc = True  # 是否校验报文CRC
+        self.crc_error_count = 0  # CRC校验失败的报文数
+
+    def set_protocols(self, protocols):
+        """
+        按已加载协议的报文格式（报文头、长度字段、报文尾）设置分帧规则
+
+        Args:
+            protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+        """
+        with self.lock:
+            self.framer.set_protocols(protocols)
+
+    def set_verify_crc(self, enabled):
+        """
+        设置是否校验报文CRC
+
+        Args:
+            enabled (bool): 是否校验
+        """
+        self.verify_crc = enabled
+        self.framer.verify_crc = enabled
+
+    def set_length_format(self, use_two_bytes=True):
+        """
+        设置数据长度字段格式，仅在未加载协议时使用
+
+        Args:
+            use_two_bytes (bool): 是否使用两字节长度
+        """
+        with self.lock:
+            self.framer.set_length_format(use_two_bytes)
+
+    def clear(self):
+        """清空接收缓冲区中未成帧的数据"""
+        with self.lock:
+            self.framer.clear()
+
+    def extract(self, data):
+        """
+        分帧
+
+        Args:
+            data (bytes): 接收到的数据
+
+        Returns:
+            list: [(message, crc_ok)] 提取出的完整报文及CRC校验结果
+        """
+        with self.lock:
+            frames = self.framer.feed(data)
+
+        for message, crc_ok in frames:
+            if not crc_ok:
+                self.crc_error_count += 1
+        return frames
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 串口线路时间模块，按波特率、数据位、校验位和停止位计算报文在线路上的传输时间和总线负载率
+"""
+
+NS_PER_SECOND = 1000000000
+
+
+def bits_per_char(bytesize=8, parity='N', stopbits=1):
+    """
+    计算每个字符在线路上占用的位数
+
+    Args:
+        bytesize (int): 数据位
+        parity (str): 校验位，'N'表示无校验
+        stopbits (float): 停止位
+
+    Returns:
+        float: 起始位 + 数据位 + 校验位 + 停止位
+    """
+    return 1 + bytesize + (0 if parity == 'N' else 1) + stopbits
+
+
+class LineTiming:
+    """
+    串口线路时间
+
+    报文时间 = 字节数 × 每字符位数 / 波特率；帧间隔以字符时间为单位（如Modbus RTU要求3.5个字符），
+    波特率变化时帧间隔随之缩放。
+    """
+
+    def __init__(self, baudrate=115200, bytesize=8, parity='N', stopbits=1, gap_chars=0.0):
+        """
+        初始化线路时间
+
+        Args:
+            baudrate (int): 波特率
+            bytesize (int): 数据位
+            parity (str): 校验位
+            stopbits (float): 停止位
+            gap_chars (float): 帧间隔（字符时间数），0表示不需要帧间隔
+        """
+        self.baudrate = baudrate
+        self.bytesize = bytesize
+        self.parity = parity
+        self.stopbits = stopbits
+        self.gap_chars = gap_chars
+
+        self.char_bits = bits_per_char(bytesize, parity, stopbits)
+        self.char_time_ns = self.char_bits * NS_PER_SECOND / baudrate
+        self.gap_ns = int(gap_chars * self.char_time_ns)
+
+    @classmethod
+    def from_serial(cls, port, gap_chars=0.0):
+        """
+        从已打开的pyserial串口对象读取参数
+
+        Args:
+            port (serial.Serial): 串口对象
+            gap_chars (float): 帧间隔（字符时间数）
+
+        Returns:
+            LineTiming: 线路时间
+        """
+        return cls(baudrate=port.baudrate, bytesize=port.bytesize, parity=port.parity,
+                   stopbits=port.stopbits, gap_chars=gap_chars)
+
+    def frame_time_ns(self, length):
+        """
+        计算报文的传输时间（不含帧间隔）
+
+        Args:
+            length (int): 报文字节数
+
+        Returns:
+            int: 传输时间(ns)
+        """
+        return int(length * self.char_time_ns)
+
+    def slot_time_ns(self, length):
+        """
+        计算报文占用线路的时间（含帧间隔）
+
+        Args:
+            length (int): 报文字节数
+
+        Returns:
+            int: 占用时间(ns)
+        """
+        return self.frame_time_ns(length) + self.gap_ns
+
+    def bus_load(self, schedule):
+        """
+        计算一组周期报文的总线负载率
+
+        Args:
+            schedule (list): [(报文字节数, 周期ms)]
+
+        Returns:
+            float: 负载率，1.0表示线路满载
+        """
+        load = 0.0
+        for length, interval in schedule:
+            if interval > 0:
+                load += self.slot_time_ns(length) / (interval * 1000000)
+        return load
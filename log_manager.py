@@ -76,8 +76,8 @@ class LogManager:
         for handler in self.logger.handlers[:]:
             self.logger.removeHandler(handler)
 
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler(sys.stdout)
+        # 创建控制台处理器，输出到标准错误，命令行工具的标准输出只保留数据
+        console_handler = logging.StreamHandler(sys.stderr)
         console_handler.setLevel(console_level)
 
         # 创建文件处理器
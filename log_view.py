@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 通信日志显示模块，有行数上限的日志控件，追加按定时器合并，完整历史同步写入文件
+"""
+
+import os
+from datetime import datetime
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QColor, QBrush, QTextCharFormat, QFont, QTextCursor
+from PyQt5.QtWidgets import QPlainTextEdit
+from log_manager import log_error
+
+# 消息类型标签
+TYPE_LABELS = {
+    "send": "[发送] ",
+    "receive": "[接收] ",
+    "system": "[系统] ",
+    "error": "[错误] "
+}
+
+
+def create_log_format(message_type):
+    """
+    获取消息类型对应的日志格式
+
+    Args:
+        message_type (str): 消息类型（"send"/"receive"/"system"/"error"）
+
+    Returns:
+        QTextCharFormat: 日志格式
+    """
+    # 创建消息格式
+    format = QTextCharFormat()
+
+    # 设置不同消息类型的颜色
+    if message_type == "send":
+        format.setForeground(QBrush(QColor("blue")))
+    elif message_type == "receive":
+        format.setForeground(QBrush(QColor("green")))
+    elif message_type == "system":
+        format.setForeground(QBrush(QColor("gray")))
+
+        # 系统消息使用粗体
+        font = QFont()
+        font.setBold(True)
+        format.setFont(font)
+    elif message_type == "error":
+        format.setForeground(QBrush(QColor("red")))
+
+        # 错误消息使用粗体
+        font = QFont()
+        font.setBold(True)
+        format.setFont(font)
+    return format
+
+
+class CommLogView(QPlainTextEdit):
+    """
+    通信日志控件
+
+    - 通过setMaximumBlockCount限制行数，超出时由控件逐行丢弃最旧的行，追加的开销与已有行数无关
+    - 追加的消息先放入待显示列表，由定时器每个周期合并插入一次
+    - 所有消息同时写入历史文件，滚出控件的行不会丢失
+    """
+
+    def __init__(self, max_lines=5000, flush_interval=33, history_dir='logs', parent=None):
+        """
+        初始化日志控件
+
+        Args:
+            max_lines (int): 最多显示的行数
+            flush_interval (int): 合并插入的周期(ms)
+            history_dir (str): 历史文件目录，为空时不写历史文件
+            parent (QWidget): 父控件
+        """
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(max_lines)
+
+        self.show_time = True  # 是否显示时间
+        self.auto_scroll = True  # 是否自动滚动到底部
+        self.pending = []  # 待显示的消息 [(time, message, message_type)]
+        self.formats = {message_type: create_log_format(message_type) for message_type in TYPE_LABELS}
+        self.default_format = QTextCharFormat()
+
+        self.history_dir = history_dir
+        self.history_path = None
+        self.history_file = None
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(flush_interval)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def append_message(self, message, message_type="system"):
+        """
+        追加一条消息
+
+        Args:
+            message (str): 消息内容
+            message_type (str): 消息类型（"send"/"receive"/"system"/"error"）
+        """
+        self.append_messages([(message, message_type)])
+
+    def append_messages(self, messages):
+        """
+        追加一批消息，在下一个周期统一显示
+
+        Args:
+            messages (list): [(message, message_type)]
+        """
+        if not messages:
+            return
+
+        now = datetime.now()
+        self.pending.extend((now, message, message_type) for message, message_type in messages)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        """把待显示的消息写入历史文件并插入控件"""
+        pending = self.pending
+        if not pending:
+            return
+        self.pending = []
+
+        self.write_history(pending)
+
+        # 超出行数上限的部分插入后也会立即被丢弃，直接跳过
+        max_lines = self.maximumBlockCount()
+        if max_lines > 0 and len(pending) > max_lines:
+            pending = pending[-max_lines:]
+
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        first_line = self.document().isEmpty()
+        for timestamp, message, message_type in pending:
+            if first_line:
+                first_line = False
+            else:
+                cursor.insertBlock()
+
+            text = TYPE_LABELS.get(message_type, "") + message
+            if self.show_time:
+                text = f"[{timestamp.strftime('%H:%M:%S.%f')[:-3]}] {text}"
+            cursor.insertText(text, self.formats.get(message_type, self.default_format))
+        cursor.endEditBlock()
+
+        # 如果启用了自动滚动，滚动到底部
+        if self.auto_scroll:
+            scroll_bar = self.verticalScrollBar()
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def write_history(self, entries):
+        """
+        把消息追加到历史文件
+
+        Args:
+            entries (list): [(time, message, message_type)]
+        """
+        if not self.history_dir:
+            return
+
+        try:
+            if self.history_file is None:
+                os.makedirs(self.history_dir, exist_ok=True)
+                self.history_path = os.path.join(
+                    self.history_dir, f"comm_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+                self.history_file = open(self.history_path, 'a', encoding='utf-8')
+
+            self.history_file.write("".join(
+                f"[{timestamp.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}] {TYPE_LABELS.get(message_type, '')}{message}\n"
+                for timestamp, message, message_type in entries))
+            self.history_file.flush()
+        except Exception as e:
+            # 历史文件写入失败不影响显示
+            log_error(f"写入通信日志历史文件失败: {str(e)}")
+            self.history_dir = None
+
+    def save_history(self, file_path):
+        """
+        把完整历史保存到指定文件
+
+        Args:
+            file_path (str): 目标文件路径
+
+        Returns:
+            bool: 是否保存了完整历史（没有历史文件时保存当前显示的内容）
+        """
+        self.flush()
+        if self.history_path and self.history_file:
+            with open(self.history_path, 'r', encoding='utf-8') as src, open(file_path, 'w', encoding='utf-8') as dst:
+                for chunk in iter(lambda: src.read(1 << 20), ''):
+                    dst.write(chunk)
+            return True
+
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(self.toPlainText())
+        return False
+
+    def clear(self):
+        """清空显示，历史文件不受影响"""
+        self.flush()
+        super().clear()
+
+    def close_history(self):
+        """写入剩余消息并关闭历史文件"""
+        self.flush()
+        if self.history_file:
+            self.history_file.close()
+            self.history_file = None
@@ -14,62 +14,7 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGridLayout,
 from PyQt5.QtCore import Qt, QRegExp
 from PyQt5.QtGui import QRegExpValidator, QIntValidator, QDoubleValidator, QColor, QBrush, QFont, QValidator
 from message_transceiver import TimedMessage
-
-
-# 在message_transceiver.py中，确保TimedMessage类能够正确处理protocol_id
-
-class TimedMessage:
-    """定时发送报文"""
-
-    def __init__(self, name="", message=bytes(), interval=1000, enabled=False, protocol_id=""):
-        self.name = name  # 报文名称
-        self.message = message  # 报文内容
-        self.interval = interval  # 发送间隔(ms)
-        self.enabled = enabled  # 是否启用
-        self.last_sent = 0  # 上次发送时间
-        self.protocol_id = protocol_id  # 协议ID
-
-    def to_dict(self):
-        """
-        转换为字典，用于保存配置
-
-        Returns:
-            dict: 配置字典
-        """
-        return {
-            "name": self.name,
-            "message": " ".join([f"{b:02X}" for b in self.message]),
-            "interval": self.interval,
-            "enabled": self.enabled,
-            "protocol_id": self.protocol_id
-        }
-
-    @classmethod
-    def from_dict(cls, data):
-        """
-        从字典创建报文对象
-
-        Args:
-            data (dict): 配置字典
-
-        Returns:
-            TimedMessage: 报文对象
-        """
-        try:
-            # 将十六进制字符串转换为字节
-            message_str = data.get("message", "")
-            message_bytes = bytes.fromhex(message_str.replace(" ", ""))
-
-            return cls(
-                name=data.get("name", ""),
-                message=message_bytes,
-                interval=int(data.get("interval", 1000)),
-                enabled=bool(data.get("enabled", False)),
-                protocol_id=data.get("protocol_id", "")
-            )
-        except Exception as e:
-            print(f"加载定时报文错误: {str(e)}")
-            return cls()
+from field_generators import GENERATOR_KINDS, GENERATOR_HINTS, field_bus_range, parse_generator
 
 
 # 在message_dialog.py中，修改MessageDetailDialog类，添加定时发送功能
@@ -303,14 +248,10 @@ class MessageDetailDialog(QDialog):
                 main_window.timed_messages_manager.timed_messages.append(timed_message)
                 QMessageBox.information(self, "成功", f"已创建协议 {protocol_id} 的定时任务")
 
-            # 更新表格显示
+            # 检查总线负载，更新表格显示，同时同步到调度器
+            main_window.timed_messages_manager.confirm_bus_load([timed_message])
             main_window.timed_messages_manager.update_table()
 
-            # 如果串口已打开，启动定时器
-            if main_window.timed_messages_manager.timer and not main_window.timed_messages_manager.timer.isActive():
-                if main_window.serial and main_window.serial.isOpen():
-                    main_window.timed_messages_manager.timer.start(10)
-
         except Exception as e:
             QMessageBox.critical(self, "错误", f"添加定时任务失败: {str(e)}")
 
@@ -320,12 +261,13 @@ class MessageDetailDialog(QDialog):
 class MessagePreviewDialog(QDialog):
     """报文预览对话框"""
 
-    def __init__(self, message, protocol_id, parent=None):
+    def __init__(self, message, protocol_id, parent=None, field_values=None):
         super().__init__(parent)
         self.setWindowTitle(f"{protocol_id}报文预览")
         self.resize(500, 350)  # 增加一点高度来容纳新控件
         self.message = message
         self.protocol_id = protocol_id
+        self.field_values = field_values  # 生成报文使用的字段值，保存到定时任务中用于字段生成器
         self.init_ui()
 
     def init_ui(self):
@@ -439,7 +381,7 @@ class MessagePreviewDialog(QDialog):
             from message_transceiver import TimedMessage
 
             # 查找是否已存在相同协议ID的任务
-            found = False
+            timed_message = None
             for msg in main_window.timed_messages_manager.timed_messages:
                 if msg.protocol_id == protocol_id:
                     # 更新已存在的任务
@@ -447,7 +389,9 @@ class MessagePreviewDialog(QDialog):
                     msg.message = self.message
                     msg.interval = interval
                     msg.enabled = enabled
-                    found = True
+                    if self.field_values is not None:
+                        msg.field_values = dict(self.field_values)
+                    timed_message = msg
 
                     # 添加日志
                     if hasattr(main_window, 'add_log_message'):
@@ -457,13 +401,14 @@ class MessagePreviewDialog(QDialog):
                     break
 
             # 如果不存在则创建新任务
-            if not found:
+            if not timed_message:
                 timed_message = TimedMessage(
                     name=task_name,
                     message=self.message,
                     interval=interval,
                     enabled=enabled,
-                    protocol_id=protocol_id
+                    protocol_id=protocol_id,
+                    field_values=self.field_values
                 )
                 main_window.timed_messages_manager.timed_messages.append(timed_message)
 
@@ -473,14 +418,10 @@ class MessagePreviewDialog(QDialog):
                 else:
                     QMessageBox.information(self, "成功", f"已创建协议 {protocol_id} 的定时任务")
 
-            # 更新表格显示
+            # 检查总线负载，更新表格显示，同时同步到调度器
+            main_window.timed_messages_manager.confirm_bus_load([timed_message])
             main_window.timed_messages_manager.update_table()
 
-            # 如果串口已打开并且启用了任务，启动定时器
-            if enabled and main_window.timed_messages_manager.timer and not main_window.timed_messages_manager.timer.isActive():
-                if hasattr(main_window, 'serial') and main_window.serial and main_window.serial.isOpen():
-                    main_window.timed_messages_manager.timer.start(10)
-
             # 关闭对话框
             self.accept()
 
@@ -488,6 +429,104 @@ class MessagePreviewDialog(QDialog):
             QMessageBox.critical(self, "错误", f"添加定时任务失败: {str(e)}")
 
 
+class FieldGeneratorDialog(QDialog):
+    """
+    字段生成器对话框
+
+    设置动态定时报文各字段的固定值和生成方式，设置了生成方式的字段每次发送时取新值。
+    """
+
+    def __init__(self, timed_message, protocol_data, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"字段生成器 - {timed_message.name}")
+        self.resize(900, 500)
+        self.timed_message = timed_message
+        # 只有整数字段写入报文
+        self.fields = [field for field in protocol_data.get('fields', [])
+                       if field.get('type', 'Unsigned') in ('Unsigned', 'Signed')]
+        self.value_edits = []
+        self.kind_combos = []
+        self.param_edits = []
+        self.init_ui()
+
+    def init_ui(self):
+        """初始化UI"""
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("固定值与协议界面的输入格式相同（物理值或0x开头的总线值），为空时使用协议默认值"))
+
+        self.field_table = QTableWidget(len(self.fields), 5)
+        self.field_table.setHorizontalHeaderLabels(["字段", "范围(总线值)", "固定值", "生成方式", "参数"])
+        for column in range(4):
+            self.field_table.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        self.field_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        layout.addWidget(self.field_table)
+
+        for row, field in enumerate(self.fields):
+            field_id = field.get('id', '')
+            name_item = QTableWidgetItem(f"{field.get('name', '')} ({field_id})")
+            name_item.setFlags(name_item.flags() & ~Qt.ItemIsEditable)
+            self.field_table.setItem(row, 0, name_item)
+
+            low, high = field_bus_range(field)
+            range_item = QTableWidgetItem(f"{low} ~ {high}")
+            range_item.setFlags(range_item.flags() & ~Qt.ItemIsEditable)
+            self.field_table.setItem(row, 1, range_item)
+
+            # 固定值
+            value_edit = QLineEdit(str(self.timed_message.field_values.get(field_id, '')))
+            self.field_table.setCellWidget(row, 2, value_edit)
+            self.value_edits.append(value_edit)
+
+            # 生成方式和参数
+            param_edit = QLineEdit()
+            kind_combo = QComboBox()
+            kind_combo.addItem("固定", '')
+            for kind, kind_name in GENERATOR_KINDS.items():
+                kind_combo.addItem(kind_name, kind)
+            kind_combo.currentIndexChanged.connect(
+                lambda index, combo=kind_combo, edit=param_edit: edit.setPlaceholderText(
+                    GENERATOR_HINTS.get(combo.currentData(), '')))
+
+            generator = self.timed_message.generators.get(field_id)
+            if generator is not None:
+                kind_combo.setCurrentIndex(kind_combo.findData(generator.kind))
+                param_edit.setText(generator.params_text())
+
+            self.field_table.setCellWidget(row, 3, kind_combo)
+            self.field_table.setCellWidget(row, 4, param_edit)
+            self.kind_combos.append(kind_combo)
+            self.param_edits.append(param_edit)
+
+        # 按钮区域
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+    def accept(self):
+        """检查生成参数并保存到定时报文"""
+        field_values = {}
+        generators = {}
+        for row, field in enumerate(self.fields):
+            field_id = field.get('id', '')
+            value = self.value_edits[row].text().strip()
+            if value:
+                field_values[field_id] = value
+
+            kind = self.kind_combos[row].currentData()
+            if not kind:
+                continue
+            try:
+                generators[field_id] = parse_generator(kind, self.param_edits[row].text(), field)
+            except Exception as e:
+                QMessageBox.warning(self, "参数错误", f"字段 {field.get('name', '')}({field_id}): {str(e)}")
+                return
+
+        self.timed_message.field_values = field_values
+        self.timed_message.set_generators(generators)
+        super().accept()
+
+
 class ProtocolSelectDialog(QDialog):
     """协议选择对话框"""
 
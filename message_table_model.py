@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 接收报文表格模型模块，用有容量上限的只追加存储保存接收记录，只在显示时格式化可见的单元格
+"""
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+
+# 默认保留的记录条数
+DEFAULT_RETENTION = 100000
+
+
+class RecordStore:
+    """
+    有容量上限的只追加记录存储
+
+    内部是一个列表加读游标。丢弃最旧的记录只移动读游标，
+    被丢弃的部分超过一半时才整体删除一次，按下标访问和追加均为O(1)（均摊）。
+    """
+
+    def __init__(self, capacity=DEFAULT_RETENTION):
+        """
+        初始化存储
+
+        Args:
+            capacity (int): 最多保留的记录条数
+        """
+        self.capacity = max(1, capacity)
+        self._items = []
+        self._start = 0  # 读游标，之前的记录已丢弃
+
+    def __len__(self):
+        return len(self._items) - self._start
+
+    def __getitem__(self, index):
+        """
+        按下标获取记录
+
+        Args:
+            index (int): 0为最旧的记录
+
+        Returns:
+            记录
+        """
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("RecordStore index out of range")
+        return self._items[self._start + index]
+
+    def __iter__(self):
+        return iter(self._items[self._start:])
+
+    def overflow(self, count):
+        """
+        计算追加count条记录前需要丢弃的旧记录数
+
+        Args:
+            count (int): 要追加的记录数
+
+        Returns:
+            int: 需要丢弃的旧记录数
+        """
+        return min(max(len(self) + count - self.capacity, 0), len(self))
+
+    def drop_oldest(self, count):
+        """
+        丢弃最旧的记录
+
+        Args:
+            count (int): 丢弃的条数
+        """
+        count = max(0, min(count, len(self)))
+        if not count:
+            return
+        self._start += count
+        if self._start > len(self._items) // 2:
+            del self._items[:self._start]
+            self._start = 0
+
+    def extend(self, records):
+        """
+        追加记录，调用前需保证不超过容量
+
+        Args:
+            records (list): 记录列表
+        """
+        self._items.extend(records)
+
+    def set_capacity(self, capacity):
+        """
+        修改容量，保留最新的记录
+
+        Args:
+            capacity (int): 新容量
+        """
+        self.capacity = max(1, capacity)
+        if len(self) > self.capacity:
+            self.drop_oldest(len(self) - self.capacity)
+
+    def clear(self):
+        """清空存储"""
+        self._items = []
+        self._start = 0
+
+
+class RecordTableModel(QAbstractTableModel):
+    """
+    接收记录表格模型基类
+
+    记录以原始形式保存在RecordStore中，data()被视图调用时才格式化单元格，
+    因此只有可见的行会被格式化。子类实现format_cell。
+    """
+
+    headers = []  # 列标题
+
+    def __init__(self, retention=DEFAULT_RETENTION, parent=None):
+        """
+        初始化模型
+
+        Args:
+            retention (int): 最多保留的记录条数
+            parent (QObject): 父对象
+        """
+        super().__init__(parent)
+        self.store = RecordStore(retention)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            if orientation == Qt.Horizontal and section < len(self.headers):
+                return self.headers[section]
+            if orientation == Qt.Vertical:
+                return section + 1
+        return QVariant()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.store):
+            return QVariant()
+
+        if role == Qt.DisplayRole:
+            return self.format_cell(self.store[index.row()], index.column())
+        if role == Qt.ToolTipRole:
+            return self.cell_tooltip(self.store[index.row()], index.column())
+        return QVariant()
+
+    def format_cell(self, record, column):
+        """
+        格式化单元格
+
+        Args:
+            record: 记录
+            column (int): 列号
+
+        Returns:
+            str: 显示文本
+        """
+        raise NotImplementedError
+
+    def cell_tooltip(self, record, column):
+        """单元格提示，默认无"""
+        return QVariant()
+
+    def record(self, row):
+        """
+        获取指定行的记录
+
+        Args:
+            row (int): 行号
+
+        Returns:
+            记录，行号无效时返回None
+        """
+        if 0 <= row < len(self.store):
+            return self.store[row]
+        return None
+
+    def records(self):
+        """
+        获取所有记录，从旧到新
+
+        Returns:
+            list: 记录列表
+        """
+        return list(self.store)
+
+    def append_records(self, records):
+        """
+        追加一批记录，超出保留条数时先移除最旧的行
+
+        Args:
+            records (list): 记录列表
+        """
+        if not records:
+            return
+
+        store = self.store
+        if len(records) >= store.capacity:
+            # 整批超过保留条数，只保留最后的部分
+            self.beginResetModel()
+            store.clear()
+            store.extend(records[len(records) - store.capacity:])
+            self.endResetModel()
+            return
+
+        overflow = store.overflow(len(records))
+        if overflow:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            store.drop_oldest(overflow)
+            self.endRemoveRows()
+
+        row = len(store)
+        self.beginInsertRows(QModelIndex(), row, row + len(records) - 1)
+        store.extend(records)
+        self.endInsertRows()
+
+    def set_retention(self, retention):
+        """
+        设置最多保留的记录条数
+
+        Args:
+            retention (int): 记录条数
+        """
+        overflow = len(self.store) - max(1, retention)
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self.store.set_capacity(retention)
+            self.endRemoveRows()
+        else:
+            self.store.set_capacity(retention)
+
+    def clear(self):
+        """清空所有记录"""
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
+
+
+class GeneralMessageModel(RecordTableModel):
+    """
+    通用接收列表模型
+
+    记录格式：(timestamp, protocol_id, message_bytes)
+    """
+
+    headers = ["时间", "协议ID", "内容"]
+
+    def __init__(self, retention=DEFAULT_RETENTION, parent=None):
+        super().__init__(retention, parent)
+        self.protocol_names = {}  # {protocol_id: protocol_name}，用于提示
+
+    def format_cell(self, record, column):
+        if column == 0:
+            return record[0]
+        if column == 1:
+            return f"{record[1]}"
+        if column == 2:
+            return record[2].hex(' ').upper()
+        return QVariant()
+
+    def cell_tooltip(self, record, column):
+        if column == 1:
+            protocol_name = self.protocol_names.get(record[1])
+            if protocol_name:
+                return protocol_name
+        return QVariant()
+
+
+class ProtocolMessageModel(RecordTableModel):
+    """
+    协议接收列表模型
+
+    记录格式：解析后的报文数据字典
+    """
+
+    headers = ["时间", "报文ID", "类型", "字段"]
+
+    def format_cell(self, record, column):
+        if column == 0:
+            return record.get('timestamp', '')
+        if column == 1:
+            return record.get('message_id', '')
+        if column == 2:
+            return record.get('message_type', '')
+        if column == 3:
+            return format_fields(record.get('fields', {}))
+        return QVariant()
+
+
+def format_fields(fields):
+    """
+    把解析后的字段格式化为一行文本
+
+    Args:
+        fields (dict): {field_id: field_info}
+
+    Returns:
+        str: 如"字段1: 1 (描述), 字段2: 2"
+    """
+    parts = []
+    for field_id, field_info in fields.items():
+        field_name = field_info.get('name', field_id)
+        field_value = field_info.get('value', '')
+        description = field_info.get('description', '')
+
+        if description:
+            parts.append(f"{field_name}: {field_value} ({description})")
+        else:
+            parts.append(f"{field_name}: {field_value}")
+    return ", ".join(parts)
@@ -6,98 +6,137 @@
 @Description: 报文收发模块，负责报文的收发管理
 """
 
-import time
-from collections import deque
 from datetime import datetime
-from PyQt5.QtCore import QObject, QTimer, QMutex, pyqtSignal
+from PyQt5.QtCore import QObject, pyqtSignal
+from framer import FrameReceiver
+from frame_sender import (FrameSender, SendLane, PRIORITY_INTERACTIVE, PRIORITY_RESPONSE, PRIORITY_PERIODIC,
+                          PRIORITY_NAMES)
+from field_generators import create_generator
 
 
-class MessageSender(QObject):
-    """报文发送管理器"""
+class MessageSender(QObject, FrameSender):
+    """
+    报文发送管理器
 
-    message_sent = pyqtSignal(bytes, str)  # 报文发送完成信号 (message, name)
+    发送队列、写线程和帧间隔由FrameSender完成，本类把写入完成回调转换为Qt信号，供界面线程使用。
+    """
 
-    def __init__(self):
-        super().__init__()
-        self.queue = deque()
-        self.mutex = QMutex()
-        self.processing = False
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.process_queue)
-        self.timer.setInterval(10)
-        self.serial = None
+    message_sent = pyqtSignal(bytes, str)  # 报文发送完成信号 (message, name)，用于write_message
+    messages_sent = pyqtSignal(list)  # 一次写入完成的报文 [(message, name, latency_ms, priority)]
 
-    def set_serial(self, serial):
-        """设置串口对象"""
-        self.serial = serial
+    def __init__(self, max_write_size=4096, drain=True, max_write_time_ms=10):
+        """
+        初始化发送管理器
 
-        # 如果串口已关闭，停止定时器
-        if not serial or not serial.isOpen():
-            self.timer.stop()
-            self.queue.clear()
-            self.processing = False
+        Args:
+            max_write_size (int): 合并写入的最大字节数
+            drain (bool): 每次写入后是否等待串口发送完毕
+            max_write_time_ms (float): 已知线路时间时，合并写入的最大传输时间(ms)
+        """
+        # PyQt的多继承按关键字参数把构造参数转交给FrameSender
+        super().__init__(max_write_size=max_write_size, drain=drain, max_write_time_ms=max_write_time_ms)
+        self.add_sent_callback(self.messages_sent.emit)
 
-    def add_message(self, message, name=''):
+    def write_message(self, message, name=''):
         """
-        添加报文到发送队列
+        立即写入报文，不经过发送队列，可以在任意线程中调用
 
         Args:
             message (bytes): 要发送的报文
             name (str): 报文名称
 
         Returns:
-            bool: 是否成功添加到队列
+            bool: 是否写入成功
         """
-        if not self.serial or not self.serial.isOpen():
+        if not self.write_data(message):
             return False
 
-        self.mutex.lock()
-        self.queue.append((message, name))
-        self.mutex.unlock()
+        # 发送完成信号
+        self.message_sent.emit(message, name)
+        return True
 
-        # 如果定时器未启动，启动定时器
-        if not self.timer.isActive():
-            self.timer.start()
 
-        return True
+class TimedMessage:
+    """
+    定时发送报文
+
+    固定报文每次发送message。设置了protocol_id、field_values和字段生成器的报文为动态报文，
+    每次发送时由生成器更新对应字段，再通过协议的编码模板生成报文。
+    """
 
-    def process_queue(self):
-        """处理报文发送队列"""
-        if self.processing or not self.serial or not self.serial.isOpen():
-            return
+    def __init__(self, name="", message=bytes(), interval=1000, enabled=False, protocol_id="",
+                 field_values=None, generator_specs=None):
+        self.name = name  # 报文名称
+        self.message = message  # 报文内容，动态报文为最近一次生成的报文
+        self.interval = interval  # 发送间隔(ms)
+        self.enabled = enabled  # 是否启用
+        self.last_sent = 0  # 上次发送时间
+        self.protocol_id = protocol_id  # 协议ID
+        self.field_values = dict(field_values or {})  # 字段值 {field_id: value}
+        self.generator_specs = dict(generator_specs or {})  # 字段生成器配置 {field_id: FieldGenerator.to_dict()}
+        self.generators = {}  # 字段生成器 {field_id: FieldGenerator}，由bind_protocol创建
 
-        self.mutex.lock()
-        if not self.queue:
-            self.mutex.unlock()
-            self.timer.stop()
-            return
+    def is_dynamic(self):
+        """
+        是否为每次发送重新生成的动态报文
 
-        self.processing = True
-        message, name = self.queue.popleft()
-        self.mutex.unlock()
+        Returns:
+            bool: 是否为动态报文
+        """
+        return bool(self.protocol_id and self.generator_specs)
 
-        try:
-            # 发送报文
-            self.serial.write(message)
+    def set_generators(self, generators):
+        """
+        设置字段生成器
 
-            # 发送完成信号
-            self.message_sent.emit(message, name)
-        except Exception as e:
-            print(f"发送报文失败: {str(e)}")
+        Args:
+            generators (dict): {field_id: FieldGenerator}
+        """
+        self.generator_specs = {field_id: generator.to_dict() for field_id, generator in generators.items()}
+        # 整体替换，调度线程不会看到修改到一半的字典
+        self.generators = dict(generators)
 
-        self.processing = False
+    def bind_protocol(self, protocol_data):
+        """
+        按协议字段定义创建字段生成器，无法创建的生成器跳过
 
+        Args:
+            protocol_data (dict): 协议数据
 
-class TimedMessage:
-    """定时发送报文"""
+        Returns:
+            list: 无法创建的生成器 [(field_id, error)]
+        """
+        fields = {field.get('id', ''): field for field in protocol_data.get('fields', [])}
+        generators = {}
+        errors = []
+        for field_id, spec in self.generator_specs.items():
+            try:
+                generators[field_id] = create_generator(spec, fields.get(field_id))
+            except Exception as e:
+                errors.append((field_id, e))
+        self.generators = generators
+        return errors
+
+    def next_message(self, encode_plan=None):
+        """
+        获取本次发送的报文，可以在调度线程中调用
 
-    def __init__(self, name="", message=bytes(), interval=1000, enabled=False, protocol_id=""):
-        self.name = name  # 报文名称
-        self.message = message  # 报文内容
-        self.interval = interval  # 发送间隔(ms)
-        self.enabled = enabled  # 是否启用
-        self.last_sent = 0  # 上次发送时间
-        self.protocol_id = protocol_id  # 协议ID
+        Args:
+            encode_plan (EncodePlan): 协议的编码模板，动态报文需要
+
+        Returns:
+            bytes: 报文
+        """
+        generators = self.generators
+        if not generators or encode_plan is None:
+            return self.message
+
+        field_values = dict(self.field_values)
+        for field_id, generator in generators.items():
+            field_values[field_id] = generator.next_value()
+        # 未给出的字段使用协议的默认值
+        self.message = encode_plan.encode(field_values, use_defaults=True)
+        return self.message
 
     def to_dict(self):
         """
@@ -106,13 +145,18 @@ class TimedMessage:
         Returns:
             dict: 配置字典
         """
-        return {
+        data = {
             "name": self.name,
             "message": " ".join([f"{b:02X}" for b in self.message]),
             "interval": self.interval,
             "enabled": self.enabled,
             "protocol_id": self.protocol_id
         }
+        if self.field_values:
+            data["field_values"] = self.field_values
+        if self.generator_specs:
+            data["generators"] = self.generator_specs
+        return data
 
     @classmethod
     def from_dict(cls, data):
@@ -135,107 +179,42 @@ class TimedMessage:
                 message=message_bytes,
                 interval=int(data.get("interval", 1000)),
                 enabled=bool(data.get("enabled", False)),
-                protocol_id=data.get("protocol_id", "")
+                protocol_id=data.get("protocol_id", ""),
+                field_values=data.get("field_values"),
+                generator_specs=data.get("generators")
             )
         except Exception as e:
             print(f"加载定时报文错误: {str(e)}")
             return cls()
 
 
-class MessageReceiver(QObject):
-    """报文接收处理器"""
+class MessageReceiver(QObject, FrameReceiver):
+    """
+    报文接收处理器
+
+    分帧由FrameReceiver完成，可以在接收线程中调用extract；本类增加按批发送报文的信号。
+    """
 
-    message_received = pyqtSignal(bytes)  # 报文接收信号
+    messages_received = pyqtSignal(list)  # 一批完整报文 [message]
+    crc_errors_received = pyqtSignal(list)  # 一批CRC校验失败的报文 [message]
 
     def __init__(self):
         super().__init__()
-        self.buffer = bytearray()
-        self.max_buffer_size = 4096  # 最大缓冲区大小
-        self.use_two_byte_length = True  # 新增：是否使用两字节长度（小端格式）
-
-    def set_length_format(self, use_two_bytes=True):
-        """
-        设置数据长度字段格式
-
-        Args:
-            use_two_bytes (bool): 是否使用两字节长度
-        """
-        self.use_two_byte_length = use_two_bytes
 
     def process_data(self, data):
         """
-        处理接收到的数据
+        处理接收到的数据，提取出的报文按批发送信号，每次调用最多各发送一次
 
         Args:
             data (bytes): 接收到的数据
         """
-        # 添加数据到缓冲区
-        self.buffer.extend(data)
-
-        # 限制缓冲区大小
-        if len(self.buffer) > self.max_buffer_size:
-            self.buffer = self.buffer[-self.max_buffer_size:]
-
-        # 尝试提取完整报文
-        self.extract_messages()
-
-    def extract_messages(self):
-        """提取完整报文"""
-        # 查找报文头
-        start_index = self.buffer.find(b'\x59\x44')
-
-        while start_index != -1:
-            # 根据使用的长度字段格式决定处理方式
-            if self.use_two_byte_length:
-                # 两字节长度格式（小端）
-                # 检查缓冲区是否足够长，至少包含报文头、ID、长度字段(2字节)
-                if start_index + 5 > len(self.buffer):
-                    break
-
-                # 获取报文ID和长度
-                message_id = self.buffer[start_index + 2]
-                # 小端格式：低字节在前，高字节在后
-                data_length = self.buffer[start_index + 3] + (self.buffer[start_index + 4] << 8)
-
-                # 计算完整报文长度：报文头(2) + ID(1) + 长度(2) + 数据(n) + CRC(2) + 报文尾(2)
-                total_length = 2 + 1 + 2 + data_length + 2 + 2
-            else:
-                # 单字节长度格式
-                # 检查缓冲区是否足够长，至少包含报文头、ID、长度字段
-                if start_index + 4 > len(self.buffer):
-                    break
-
-                # 获取报文长度
-                message_id = self.buffer[start_index + 2]
-                data_length = self.buffer[start_index + 3]
-
-                # 计算完整报文长度：报文头(2) + ID(1) + 长度(1) + 数据(n) + CRC(2) + 报文尾(2)
-                total_length = 2 + 1 + 1 + data_length + 2 + 2
-
-            # 检查缓冲区是否包含完整报文
-            if start_index + total_length <= len(self.buffer):
-                # 检查报文尾
-                if self.buffer[start_index + total_length - 2:start_index + total_length] == b'\x4B\x4A':
-                    # 提取完整报文
-                    message = bytes(self.buffer[start_index:start_index + total_length])
-
-                    # 发送报文接收信号
-                    self.message_received.emit(message)
-
-                    # 从缓冲区中删除已处理的报文
-                    self.buffer = self.buffer[start_index + total_length:]
-
-                    # 继续查找下一个报文头
-                    start_index = self.buffer.find(b'\x59\x44')
-                else:
-                    # 报文尾不匹配，从下一个位置继续查找报文头
-                    start_index = self.buffer.find(b'\x59\x44', start_index + 1)
-            else:
-                # 报文不完整，等待更多数据
-                break
-
-        # 如果没有找到报文头或报文不完整，保留缓冲区
-        if start_index == -1:
-            # 清空缓冲区，但保留最后几个字节（可能是报文头的一部分）
-            if len(self.buffer) > 10:
-                self.buffer = self.buffer[-10:]
\ No newline at end of file
+        messages = []
+        crc_errors = []
+        for message, crc_ok in self.extract(data):
+            # CRC错误的报文单独上报，不参与协议解析
+            (messages if crc_ok else crc_errors).append(message)
+
+        if messages:
+            self.messages_received.emit(messages)
+        if crc_errors:
+            self.crc_errors_received.emit(crc_errors)
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 轮询主站模块，按轮询表依次发送请求，收到全部响应或超时后间隔一段时间再发送下一条，统计轮询周期和各节点的响应情况
+"""
+
+import threading
+import time
+from correlator import LatencyHistogram, DEFAULT_TIMEOUT_MS
+from protocol_codec import FrameIdentifier
+from scheduler import JitterStats
+from log_manager import log_debug
+
+NS_PER_MS = 1000000
+SEND_TIMEOUT_MS = 1000  # 请求在发送队列中等待写出的最长时间(ms)，超过后跳过该条
+
+
+class NodeStats:
+    """一条轮询的一个响应（节点）的统计"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.reset()
+
+    def reset(self):
+        """清零统计"""
+        self.polls = 0  # 期望该响应的轮询次数
+        self.histogram.reset()
+
+    def snapshot(self):
+        """
+        获取统计结果
+
+        Returns:
+            dict: {polls, responses, missed, response_rate, latency}
+        """
+        latency = self.histogram.snapshot()
+        return {
+            'polls': self.polls,
+            'responses': latency['count'],
+            'missed': self.polls - latency['count'],
+            'response_rate': latency['count'] / self.polls if self.polls else 0.0,
+            'latency': latency,
+        }
+
+
+class PollEntry:
+    """轮询表中的一条请求"""
+
+    def __init__(self, name, message, response_ids, timeout_ms=DEFAULT_TIMEOUT_MS, enabled=True, protocol_id=""):
+        """
+        Args:
+            name (str): 名称
+            message (bytes): 请求报文
+            response_ids (list): 期望的响应报文协议ID，为空表示不等待响应（广播）
+            timeout_ms (float): 响应超时(ms)，从请求写出完成开始计算
+            enabled (bool): 是否参与轮询
+            protocol_id (str): 请求报文的协议ID
+        """
+        self.name = name
+        self.message = message
+        self.response_ids = tuple(dict.fromkeys(response_ids))
+        self.timeout_ms = float(timeout_ms)
+        self.enabled = enabled
+        self.protocol_id = protocol_id
+        self.stats = {response_id: NodeStats() for response_id in self.response_ids}
+        self.skipped = 0  # 未能写出而跳过的次数
+
+    def set_response_ids(self, response_ids):
+        """
+        修改期望的响应，保留仍然存在的响应的统计
+
+        Args:
+            response_ids (list): 响应报文协议ID
+        """
+        self.response_ids = tuple(dict.fromkeys(response_ids))
+        self.stats = {response_id: self.stats.get(response_id) or NodeStats() for response_id in self.response_ids}
+
+    def to_dict(self):
+        """
+        转换为字典，用于保存配置
+
+        Returns:
+            dict: 配置字典
+        """
+        return {
+            "name": self.name,
+            "message": " ".join([f"{b:02X}" for b in self.message]),
+            "responses": list(self.response_ids),
+            "timeout": self.timeout_ms,
+            "enabled": self.enabled,
+            "protocol_id": self.protocol_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        从字典创建轮询条目
+
+        Args:
+            data (dict): 配置字典
+
+        Returns:
+            PollEntry: 轮询条目
+        """
+        return cls(
+            name=data.get("name", ""),
+            message=bytes.fromhex(data.get("message", "").replace(" ", "")),
+            response_ids=data.get("responses", []),
+            timeout_ms=float(data.get("timeout", DEFAULT_TIMEOUT_MS)),
+            enabled=bool(data.get("enabled", True)),
+            protocol_id=data.get("protocol_id", ""),
+        )
+
+
+class PollingMaster:
+    """
+    轮询主站
+
+    独立线程按轮询表顺序逐条轮询：请求交给send(message, name)发送（通常加入发送队列），写线程写出后
+    通过on_sent通知，从写出完成开始计算响应超时；分帧线程通过on_received通知收到的报文，期望的响应
+    全部到达或超时后，再等待turnaround_ms的总线换向间隔才发送下一条。轮询表走完一遍为一个轮询周期，
+    cycle_period_ms大于0时每个周期至少间隔该时间，否则立即开始下一周期。
+
+    总线上同一时刻只有一条请求在等待响应，响应不会与其他请求混淆。
+    """
+
+    def __init__(self, send, name="PollingMaster"):
+        """
+        Args:
+            send (callable): 发送函数 send(message, name)，返回是否成功加入发送
+            name (str): 线程名称
+        """
+        self.send = send
+        self.name = name
+        self.condition = threading.Condition()
+        self.entries = []
+        self.turnaround_ms = 10.0  # 收到响应或超时后到发送下一条请求的间隔(ms)
+        self.cycle_period_ms = 0.0  # 轮询周期的最小时长(ms)，0表示连续轮询
+        self.identifier = FrameIdentifier()
+        self.thread = None
+        self.is_running = False
+
+        # 正在进行的轮询，由写线程和分帧线程更新
+        self.current_message = None
+        self.sent_ns = None
+        self.pending = set()
+        self.arrivals = {}  # {response_id: arrival_ns}
+
+        self.cycle_stats = JitterStats()  # 轮询周期时长
+        self.complete_cycles = 0  # 所有响应都收到的周期数
+        self.last_cycle_ns = 0
+
+    def set_protocols(self, protocols):
+        """
+        设置协议，用于识别收到的响应
+
+        Args:
+            protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+        """
+        identifier = FrameIdentifier(protocols)
+        with self.condition:
+            self.identifier = identifier
+
+    def set_entries(self, entries):
+        """
+        设置轮询表，运行中修改时从下一个轮询周期开始生效
+
+        Args:
+            entries (list): PollEntry列表
+        """
+        with self.condition:
+            self.entries = list(entries)
+            self.condition.notify()
+
+    def set_timing(self, turnaround_ms, cycle_period_ms=0.0):
+        """
+        设置轮询间隔
+
+        Args:
+            turnaround_ms (float): 收到响应或超时后到发送下一条请求的间隔(ms)
+            cycle_period_ms (float): 轮询周期的最小时长(ms)，0表示连续轮询
+        """
+        with self.condition:
+            self.turnaround_ms = max(0.0, float(turnaround_ms))
+            self.cycle_period_ms = max(0.0, float(cycle_period_ms))
+            self.condition.notify()
+
+    def on_sent(self, message, done_ns):
+        """
+        写线程写出报文后调用
+
+        Args:
+            message (bytes): 报文
+            done_ns (int): 写出完成的单调时钟时间(ns)
+        """
+        with self.condition:
+            if self.sent_ns is None and message == self.current_message:
+                self.sent_ns = done_ns
+                self.condition.notify()
+
+    def on_received(self, message, arrival_ns):
+        """
+        分帧线程收到报文后调用
+
+        Args:
+            message (bytes): 报文
+            arrival_ns (int): 到达的单调时钟时间(ns)
+        """
+        if not self.pending:
+            return
+        protocol_id = self.identifier.identify(message)
+        with self.condition:
+            if protocol_id in self.pending:
+                self.pending.discard(protocol_id)
+                self.arrivals[protocol_id] = arrival_ns
+                if not self.pending:
+                    self.condition.notify()
+
+    def start(self):
+        """启动轮询线程"""
+        with self.condition:
+            if self.is_running:
+                return
+            self.is_running = True
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止轮询线程，正在进行的轮询不计入统计"""
+        with self.condition:
+            self.is_running = False
+            self.condition.notify()
+
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.thread = None
+
+    def running(self):
+        """
+        是否正在轮询
+
+        Returns:
+            bool: 是否正在轮询
+        """
+        return self.is_running
+
+    def wait_until(self, deadline_ns, predicate=None):
+        """
+        等待到截止时间、predicate()为真或停止，调用时需持有锁
+
+        Returns:
+            bool: 是否仍在运行
+        """
+        while self.is_running and (predicate is None or not predicate()):
+            remaining = deadline_ns - time.monotonic_ns()
+            if remaining <= 0:
+                break
+            self.condition.wait(remaining / 1e9)
+        return self.is_running
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.is_running and not any(entry.enabled for entry in self.entries):
+                    self.condition.wait()
+                if not self.is_running:
+                    return
+                entries = [entry for entry in self.entries if entry.enabled]
+
+            cycle_start = time.monotonic_ns()
+            complete = True
+            for entry in entries:
+                result = self.poll(entry)
+                if result is None:
+                    return
+                complete = complete and result
+
+            with self.condition:
+                cycle_ns = time.monotonic_ns() - cycle_start
+                self.cycle_stats.add(cycle_ns)
+                self.last_cycle_ns = cycle_ns
+                if complete:
+                    self.complete_cycles += 1
+                if not self.wait_until(cycle_start + int(self.cycle_period_ms * NS_PER_MS)):
+                    return
+
+    def poll(self, entry):
+        """
+        轮询一条请求
+
+        Args:
+            entry (PollEntry): 轮询条目
+
+        Returns:
+            bool: 是否收到全部响应，停止时返回None
+        """
+        with self.condition:
+            self.current_message = entry.message
+            self.sent_ns = None
+            self.arrivals = {}
+            self.pending = set(entry.response_ids)
+
+        try:
+            queued = self.send(entry.message, entry.name)
+        except Exception as e:
+            log_debug(f"轮询 {entry.name} 发送失败: {str(e)}")
+            queued = False
+
+        with self.condition:
+            try:
+                if queued:
+                    # 发送队列中的等待时间不计入响应超时
+                    self.wait_until(time.monotonic_ns() + SEND_TIMEOUT_MS * NS_PER_MS, lambda: self.sent_ns is not None)
+                if not self.is_running:
+                    return None
+                if self.sent_ns is None:
+                    entry.skipped += 1
+                    complete = False
+                else:
+                    # 期望的响应全部到达或超时
+                    self.wait_until(self.sent_ns + int(entry.timeout_ms * NS_PER_MS), lambda: not self.pending)
+                    if not self.is_running:
+                        return None
+                    for response_id in entry.response_ids:
+                        stats = entry.stats[response_id]
+                        stats.polls += 1
+                        arrival_ns = self.arrivals.get(response_id)
+                        if arrival_ns is not None:
+                            stats.histogram.add(max(0, arrival_ns - self.sent_ns))
+                    complete = not self.pending
+            finally:
+                self.current_message = None
+                self.pending = set()
+
+            # 总线换向间隔
+            if not self.wait_until(time.monotonic_ns() + int(self.turnaround_ms * NS_PER_MS)):
+                return None
+            return complete
+
+    def reset_stats(self):
+        """清零统计"""
+        with self.condition:
+            for entry in self.entries:
+                entry.skipped = 0
+                for stats in entry.stats.values():
+                    stats.reset()
+            self.cycle_stats.reset()
+            self.complete_cycles = 0
+            self.last_cycle_ns = 0
+
+    def snapshot(self):
+        """
+        获取统计结果
+
+        Returns:
+            dict: {
+                'cycles': {count, complete, last_ms, mean_ms, min_ms, max_ms, stdev_ms},
+                'nodes': [{entry, request_id, response_id, polls, responses, missed, response_rate, latency}],
+                'skipped': {entry_name: count},
+            }
+        """
+        with self.condition:
+            cycles = self.cycle_stats.snapshot()
+            cycles['complete'] = self.complete_cycles
+            cycles['last_ms'] = self.last_cycle_ns / NS_PER_MS
+            nodes = []
+            skipped = {}
+            for entry in self.entries:
+                if entry.skipped:
+                    skipped[entry.name] = entry.skipped
+                for response_id in entry.response_ids:
+                    node = entry.stats[response_id].snapshot()
+                    node.update({'entry': entry.name, 'request_id': entry.protocol_id, 'response_id': response_id})
+                    nodes.append(node)
+            return {'cycles': cycles, 'nodes': nodes, 'skipped': skipped}
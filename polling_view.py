@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 轮询主站界面模块，编辑轮询表、设置换向间隔和轮询周期，显示周期时长和各节点的响应率、漏答次数
+"""
+
+import json
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QColor, QBrush
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem,
+                             QHeaderView, QAbstractItemView, QSplitter, QDoubleSpinBox, QFileDialog, QMessageBox,
+                             QInputDialog)
+from correlator import DEFAULT_TIMEOUT_MS
+from poller import PollEntry, PollingMaster
+
+
+class PollingManager(QWidget):
+    """
+    轮询主站
+
+    轮询表中每条请求依次发送，收到全部期望的响应或超时后，间隔换向时间再发送下一条。
+    请求以应答优先级加入发送队列，与手动发送、定时报文共用同一串口。
+    表格中的名称、响应和超时可以双击修改，运行中修改从下一个轮询周期开始生效。
+    """
+
+    ENTRY_HEADERS = ["启用", "名称", "请求", "响应", "超时(ms)"]
+    NODE_HEADERS = ["名称", "响应", "节点", "轮询", "响应数", "漏答", "响应率", "平均(ms)", "最大(ms)"]
+
+    def __init__(self, send, parent=None):
+        """
+        Args:
+            send (callable): 发送函数 send(message, name)，返回是否成功加入发送
+        """
+        super().__init__(parent)
+        self.master = PollingMaster(send)
+        self.entries = []
+        self.protocols = {}
+        self.protocol_parser = None
+        self.correlation_rules = {}  # {request_id: CorrelationRule}，添加请求时作为默认响应和超时
+        self.serial_open = False
+        self.updating = False  # 刷新表格时不处理itemChanged
+
+        layout = QVBoxLayout(self)
+
+        # 轮询表
+        self.entry_table = QTableWidget(0, len(self.ENTRY_HEADERS))
+        self.entry_table.setHorizontalHeaderLabels(self.ENTRY_HEADERS)
+        self.entry_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.entry_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.entry_table.setEditTriggers(QAbstractItemView.DoubleClicked)
+        header = self.entry_table.horizontalHeader()
+        for column in range(len(self.ENTRY_HEADERS)):
+            header.setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.Stretch)
+        self.entry_table.itemChanged.connect(self.on_item_changed)
+
+        # 各节点统计
+        self.node_table = QTableWidget(0, len(self.NODE_HEADERS))
+        self.node_table.setHorizontalHeaderLabels(self.NODE_HEADERS)
+        self.node_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.node_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.entry_table)
+        splitter.addWidget(self.node_table)
+        layout.addWidget(splitter)
+
+        # 轮询表编辑
+        edit_layout = QHBoxLayout()
+        layout.addLayout(edit_layout)
+        self.add_button = QPushButton("添加请求")
+        self.add_button.clicked.connect(self.add_entry)
+        edit_layout.addWidget(self.add_button)
+        self.add_rules_button = QPushButton("按配对生成")
+        self.add_rules_button.setToolTip("为每个应答配对的请求添加一条轮询，响应和超时取自配对配置")
+        self.add_rules_button.clicked.connect(self.add_from_rules)
+        edit_layout.addWidget(self.add_rules_button)
+        self.remove_button = QPushButton("删除")
+        self.remove_button.clicked.connect(self.remove_entry)
+        edit_layout.addWidget(self.remove_button)
+        self.up_button = QPushButton("上移")
+        self.up_button.clicked.connect(lambda: self.move_entry(-1))
+        edit_layout.addWidget(self.up_button)
+        self.down_button = QPushButton("下移")
+        self.down_button.clicked.connect(lambda: self.move_entry(1))
+        edit_layout.addWidget(self.down_button)
+        self.save_button = QPushButton("保存")
+        self.save_button.clicked.connect(self.save_config)
+        edit_layout.addWidget(self.save_button)
+        self.load_button = QPushButton("加载")
+        self.load_button.clicked.connect(self.load_config)
+        edit_layout.addWidget(self.load_button)
+
+        # 轮询控制
+        control_layout = QHBoxLayout()
+        layout.addLayout(control_layout)
+        control_layout.addWidget(QLabel("换向(ms):"))
+        self.turnaround_spin = QDoubleSpinBox()
+        self.turnaround_spin.setRange(0, 10000)
+        self.turnaround_spin.setDecimals(1)
+        self.turnaround_spin.setValue(self.master.turnaround_ms)
+        self.turnaround_spin.setToolTip("收到全部响应或超时后，到发送下一条请求的间隔")
+        self.turnaround_spin.valueChanged.connect(self.update_timing)
+        control_layout.addWidget(self.turnaround_spin)
+        control_layout.addWidget(QLabel("周期(ms):"))
+        self.cycle_spin = QDoubleSpinBox()
+        self.cycle_spin.setRange(0, 600000)
+        self.cycle_spin.setDecimals(0)
+        self.cycle_spin.setSpecialValueText("连续")
+        self.cycle_spin.setToolTip("轮询周期的最小时长，0表示一轮结束后立即开始下一轮")
+        self.cycle_spin.valueChanged.connect(self.update_timing)
+        control_layout.addWidget(self.cycle_spin)
+        self.start_button = QPushButton("开始轮询")
+        self.start_button.setEnabled(False)
+        self.start_button.clicked.connect(self.toggle_polling)
+        control_layout.addWidget(self.start_button)
+        self.reset_button = QPushButton("统计清零")
+        self.reset_button.clicked.connect(self.reset_stats)
+        control_layout.addWidget(self.reset_button)
+
+        self.cycle_label = QLabel("轮询周期: -")
+        layout.addWidget(self.cycle_label)
+
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+
+    def set_protocols(self, protocols, protocol_parser, correlation_rules):
+        """
+        设置已加载的协议
+
+        Args:
+            protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+            protocol_parser (ProtocolParser): 协议解析器，用于生成请求报文
+            correlation_rules (list): CorrelationRule列表
+        """
+        self.protocols = protocols
+        self.protocol_parser = protocol_parser
+        self.correlation_rules = {rule.request_id: rule for rule in correlation_rules}
+        self.master.set_protocols(protocols)
+        self.update_stats()
+
+    def set_serial_open(self, is_open):
+        """
+        串口打开或关闭时调用，关闭时停止轮询
+
+        Args:
+            is_open (bool): 串口是否打开
+        """
+        self.serial_open = is_open
+        if not is_open and self.master.running():
+            self.stop_polling()
+        self.start_button.setEnabled(is_open)
+
+    def toggle_polling(self):
+        """开始或停止轮询"""
+        if self.master.running():
+            self.stop_polling()
+        else:
+            self.start_polling()
+
+    def start_polling(self):
+        """开始轮询"""
+        if not any(entry.enabled for entry in self.entries):
+            QMessageBox.warning(self, "错误", "轮询表中没有启用的请求!")
+            return
+        self.update_timing()
+        self.master.set_entries(self.entries)
+        self.master.start()
+        self.start_button.setText("停止轮询")
+        self.stats_timer.start(500)
+        self.log(f"开始轮询，共 {sum(entry.enabled for entry in self.entries)} 条请求")
+
+    def stop_polling(self):
+        """停止轮询"""
+        self.master.stop()
+        self.stats_timer.stop()
+        self.start_button.setText("开始轮询")
+        self.update_stats()
+        self.log("轮询已停止")
+
+    def update_timing(self):
+        """把换向间隔和轮询周期同步到轮询主站"""
+        self.master.set_timing(self.turnaround_spin.value(), self.cycle_spin.value())
+
+    def log(self, message, message_type="system"):
+        """写入主窗口的通信日志"""
+        main_window = self.window()
+        if hasattr(main_window, 'add_log_message'):
+            main_window.add_log_message(message, message_type)
+
+    def create_entry(self, protocol_id):
+        """
+        按协议默认值生成请求，响应和超时取自该请求的应答配对
+
+        Args:
+            protocol_id (str): 请求报文的协议ID
+
+        Returns:
+            PollEntry: 轮询条目，生成失败返回None
+        """
+        message = self.protocol_parser.generate_message(protocol_id, {}, use_defaults=True) \
+            if self.protocol_parser else None
+        if not message:
+            QMessageBox.warning(self, "错误", f"无法生成 {protocol_id} 报文!")
+            return None
+        rule = self.correlation_rules.get(protocol_id)
+        if rule is None:
+            return PollEntry(protocol_id, message, [], DEFAULT_TIMEOUT_MS, protocol_id=protocol_id)
+        return PollEntry(protocol_id, message, rule.response_ids, rule.timeout_ms, protocol_id=protocol_id)
+
+    def add_entry(self):
+        """选择协议添加一条请求，请求报文排在前面"""
+        if not self.protocols:
+            QMessageBox.warning(self, "错误", "请先加载协议配置!")
+            return
+        protocol_ids = sorted(self.protocols, key=lambda protocol_id: (
+            "请求" not in self.protocols[protocol_id].get('message_type', ''), protocol_id))
+        items = [f"{protocol_id} - {self.protocols[protocol_id].get('message_type', '')}" for protocol_id in protocol_ids]
+        item, ok = QInputDialog.getItem(self, "添加请求", "请求报文:", items, 0, False)
+        if not ok:
+            return
+        entry = self.create_entry(protocol_ids[items.index(item)])
+        if entry is not None:
+            self.entries.append(entry)
+            self.apply_entries()
+
+    def add_from_rules(self):
+        """为每个应答配对的请求添加一条轮询"""
+        if not self.correlation_rules:
+            QMessageBox.warning(self, "错误", "未配置应答配对（INI的[Correlation]节或协议JSON的correlation）!")
+            return
+        for protocol_id in self.correlation_rules:
+            entry = self.create_entry(protocol_id)
+            if entry is not None:
+                self.entries.append(entry)
+        self.apply_entries()
+
+    def remove_entry(self):
+        """删除选中的请求"""
+        row = self.entry_table.currentRow()
+        if 0 <= row < len(self.entries):
+            del self.entries[row]
+            self.apply_entries()
+
+    def move_entry(self, step):
+        """上移或下移选中的请求"""
+        row = self.entry_table.currentRow()
+        target = row + step
+        if 0 <= row < len(self.entries) and 0 <= target < len(self.entries):
+            self.entries[row], self.entries[target] = self.entries[target], self.entries[row]
+            self.apply_entries()
+            self.entry_table.selectRow(target)
+
+    def apply_entries(self):
+        """轮询表变化后同步到轮询主站并刷新"""
+        self.master.set_entries(self.entries)
+        self.update_table()
+        self.update_stats()
+
+    def update_table(self):
+        """刷新轮询表"""
+        self.updating = True
+        self.entry_table.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries):
+            enabled_item = QTableWidgetItem()
+            enabled_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+            enabled_item.setCheckState(Qt.Checked if entry.enabled else Qt.Unchecked)
+            self.entry_table.setItem(row, 0, enabled_item)
+
+            self.entry_table.setItem(row, 1, QTableWidgetItem(entry.name))
+
+            content = " ".join(f"{b:02X}" for b in entry.message)
+            message_item = QTableWidgetItem(content if len(content) <= 30 else content[:30] + "...")
+            message_item.setToolTip(content)
+            message_item.setFlags(message_item.flags() & ~Qt.ItemIsEditable)
+            self.entry_table.setItem(row, 2, message_item)
+
+            responses_item = QTableWidgetItem(", ".join(entry.response_ids))
+            responses_item.setToolTip("期望的响应报文ID，逗号分隔；为空表示不等待响应")
+            self.entry_table.setItem(row, 3, responses_item)
+
+            self.entry_table.setItem(row, 4, QTableWidgetItem(f"{entry.timeout_ms:g}"))
+        self.updating = False
+
+    def on_item_changed(self, item):
+        """修改轮询表中的启用、名称、响应或超时"""
+        row = item.row()
+        if self.updating or not 0 <= row < len(self.entries):
+            return
+
+        entry = self.entries[row]
+        column = item.column()
+        text = item.text().strip()
+        if column == 0:
+            entry.enabled = item.checkState() == Qt.Checked
+        elif column == 1:
+            entry.name = text
+        elif column == 3:
+            response_ids = [part.strip() for part in text.replace('，', ',').split(',') if part.strip()]
+            # 协议ID不区分大小写
+            protocol_ids = {protocol_id.lower(): protocol_id for protocol_id in self.protocols}
+            unknown = [response_id for response_id in response_ids if response_id.lower() not in protocol_ids]
+            if unknown:
+                QMessageBox.warning(self, "错误", f"未加载的协议: {', '.join(unknown)}")
+            else:
+                entry.set_response_ids([protocol_ids[response_id.lower()] for response_id in response_ids])
+        elif column == 4:
+            try:
+                timeout_ms = float(text)
+                if timeout_ms <= 0:
+                    raise ValueError(text)
+                entry.timeout_ms = timeout_ms
+            except ValueError:
+                QMessageBox.warning(self, "错误", "超时必须是大于0的数字!")
+        self.apply_entries()
+
+    def update_stats(self):
+        """刷新周期统计和各节点统计"""
+        snapshot = self.master.snapshot()
+        cycles = snapshot['cycles']
+        if cycles['count']:
+            self.cycle_label.setText(
+                f"轮询周期: {cycles['count']}次  完整 {cycles['complete'] / cycles['count'] * 100:.1f}%  "
+                f"当前 {cycles['last_ms']:.1f} ms  平均 {cycles['mean_ms']:.1f} ms  "
+                f"最小/最大 {cycles['min_ms']:.1f}/{cycles['max_ms']:.1f} ms")
+        else:
+            self.cycle_label.setText("轮询周期: -")
+        skipped = snapshot['skipped']
+        self.cycle_label.setToolTip("完整: 所有请求都收到全部响应的周期比例" + (
+            "\n未能写出而跳过: " + ", ".join(f"{name} {count}次" for name, count in skipped.items())
+            if skipped else ""))
+
+        nodes = snapshot['nodes']
+        self.node_table.setRowCount(len(nodes))
+        for row, node in enumerate(nodes):
+            protocol_data = self.protocols.get(node['response_id'], {})
+            latency = node['latency']
+            values = [node['entry'], node['response_id'], protocol_data.get('message_source', ''),
+                      str(node['polls']), str(node['responses']), str(node['missed']),
+                      f"{node['response_rate'] * 100:.1f}%" if node['polls'] else "-",
+                      f"{latency['mean_ms']:.2f}" if latency['count'] else "-",
+                      f"{latency['max_ms']:.2f}" if latency['count'] else "-"]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 5 and node['missed']:
+                    item.setForeground(QBrush(QColor("red")))
+                self.node_table.setItem(row, column, item)
+
+    def reset_stats(self):
+        """清零统计"""
+        self.master.reset_stats()
+        self.update_stats()
+
+    def save_config(self):
+        """保存轮询表和间隔设置"""
+        file_path, _ = QFileDialog.getSaveFileName(self, "保存轮询配置", "", "JSON文件 (*.json);;所有文件 (*.*)")
+        if not file_path:
+            return
+        try:
+            config = {
+                "turnaround": self.turnaround_spin.value(),
+                "cycle_period": self.cycle_spin.value(),
+                "poll_entries": [entry.to_dict() for entry in self.entries],
+            }
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=4, ensure_ascii=False)
+            self.log(f"轮询配置已保存到 {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "保存失败", f"保存轮询配置失败: {str(e)}")
+
+    def load_config(self):
+        """加载轮询表和间隔设置"""
+        file_path, _ = QFileDialog.getOpenFileName(self, "加载轮询配置", "", "JSON文件 (*.json);;所有文件 (*.*)")
+        if not file_path:
+            return
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            entries = [PollEntry.from_dict(data) for data in config.get("poll_entries", [])]
+            self.turnaround_spin.setValue(float(config.get("turnaround", self.turnaround_spin.value())))
+            self.cycle_spin.setValue(float(config.get("cycle_period", self.cycle_spin.value())))
+            self.entries = entries
+            self.apply_entries()
+            self.log(f"已加载 {len(entries)} 条轮询请求")
+        except Exception as e:
+            QMessageBox.critical(self, "加载失败", f"加载轮询配置失败: {str(e)}")
@@ -0,0 +1,720 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 协议编解码模块，在加载协议时把协议JSON预编译为解码计划和编码模板，避免每帧重复解析字段定义
+"""
+
+import struct
+from log_manager import log_debug, log_warning
+from crc16 import crc16_modbus
+
+# 按字节数选择的struct格式
+_UNSIGNED_FORMATS = {2: struct.Struct('<H'), 4: struct.Struct('<I')}
+_SIGNED_FORMATS = {1: struct.Struct('<b'), 2: struct.Struct('<h'), 4: struct.Struct('<i')}
+
+# 位字段取值范围内的十六进制文本
+_HEX_TEXT = [f"0x{value:X}" for value in range(256)]
+
+
+class ValueTable:
+    """
+    字段取值描述表
+
+    把values列表中的十六进制取值预先解析为字典。遇到无法解析的取值时，
+    只保留它之前的部分，未命中时再按原来的逐项方式继续比较，保证结果与逐项解析一致。
+    """
+
+    def __init__(self, values):
+        """
+        初始化描述表
+
+        Args:
+            values (list): 协议字段中的values列表
+        """
+        self.values = values
+        self.descriptions = {}
+        self.scan_from = None  # 无法预解析的起始位置，None表示全部解析成功
+
+        try:
+            for index, val_info in enumerate(values):
+                try:
+                    val = int(val_info.get('value', '0'), 16)
+                except Exception:
+                    self.scan_from = index
+                    break
+                self.descriptions.setdefault(val, val_info.get('description', ''))
+        except Exception:
+            # values本身不可遍历
+            self.scan_from = 0
+
+    def lookup(self, value):
+        """
+        查找取值对应的描述
+
+        Args:
+            value (int): 字段值
+
+        Returns:
+            str: 描述，未找到则返回None
+        """
+        description = self.descriptions.get(value)
+        if description is not None or self.scan_from is None:
+            return description
+
+        if value in self.descriptions:
+            return description
+
+        # 按原逻辑逐项比较剩余部分（会在无法解析的取值处抛出异常）
+        for val_info in self.values[self.scan_from:]:
+            val = int(val_info.get('value', '0'), 16)
+            if val == value:
+                return val_info.get('description', '')
+        return None
+
+
+def _compile_bit_field(field_id, field_name, byte_position, mask, shift, values):
+    """编译位字段解码函数"""
+    table = ValueTable(values)
+    lookup = table.lookup
+
+    def decode(data, fields):
+        value = (data[byte_position] & mask) >> shift
+        fields[field_id] = {
+            'name': field_name,
+            'value': value,
+            'hex': _HEX_TEXT[value],
+            'description': lookup(value)
+        }
+
+    return decode
+
+
+def _compile_byte_reader(byte_position):
+    """
+    编译字段字节提取函数
+
+    Returns:
+        tuple: (read_bytes, size, start) read_bytes返回字段字节，连续字段的start为起始位置，否则为None
+    """
+    if isinstance(byte_position, int):
+        position = byte_position
+        return (lambda data: bytes((data[position],))), 1, None
+
+    size = len(byte_position)
+    start = byte_position[0]
+    if start >= 0 and byte_position == list(range(start, start + size)):
+        end = start + size
+        return (lambda data: bytes(data[start:end])), size, start
+
+    positions = tuple(byte_position)
+    return (lambda data: bytes([data[pos] for pos in positions])), size, None
+
+
+def _compile_unsigned(field_id, field_name, byte_position, precision, offset, values):
+    """编译无符号整数字段解码函数"""
+    read_bytes, size, start = _compile_byte_reader(byte_position)
+    scaled = precision != 1 or offset != 0
+    lookup = ValueTable(values).lookup if values else None
+
+    # 按长度选择取值方式
+    if size == 1 and isinstance(byte_position, int):
+        position = byte_position
+
+        def read_value(data):
+            return data[position]
+    elif size in _UNSIGNED_FORMATS and start is not None:
+        unpack_from = _UNSIGNED_FORMATS[size].unpack_from
+
+        def read_value(data):
+            return unpack_from(data, start)[0]
+    elif size in _UNSIGNED_FORMATS:
+        unpack = _UNSIGNED_FORMATS[size].unpack
+
+        def read_value(data):
+            return unpack(read_bytes(data))[0]
+    elif size == 1:
+        def read_value(data):
+            return read_bytes(data)[0]
+    else:
+        def read_value(data):
+            return int.from_bytes(read_bytes(data), byteorder='little')
+
+    def decode(data, fields):
+        value = read_value(data)
+
+        # 应用精度和偏移
+        if scaled:
+            value = value * precision + offset
+            raw_value = None
+        else:
+            raw_value = value
+
+        description = lookup(value) if lookup else None
+
+        if scaled:
+            raw_value = round((value - offset) / precision)
+
+        fields[field_id] = {
+            'name': field_name,
+            'value': value,
+            'raw_value': raw_value,
+            'hex': f"0x{raw_value:X}",
+            'description': description
+        }
+
+    return decode
+
+
+def _compile_signed(field_id, field_name, byte_position, precision, offset):
+    """编译有符号整数字段解码函数"""
+    read_bytes, size, start = _compile_byte_reader(byte_position)
+    scaled = precision != 1 or offset != 0
+
+    if size in _SIGNED_FORMATS:
+        unpack = _SIGNED_FORMATS[size].unpack
+
+        def read_value(data):
+            return unpack(read_bytes(data))[0]
+    else:
+        bit_length = size * 8
+
+        def read_value(data):
+            unsigned_value = int.from_bytes(read_bytes(data), byteorder='little')
+            return unsigned_value if unsigned_value < (1 << (bit_length - 1)) else unsigned_value - (1 << bit_length)
+
+    def decode(data, fields):
+        value = read_value(data)
+
+        # 应用精度和偏移
+        if scaled:
+            value = value * precision + offset
+
+        fields[field_id] = {
+            'name': field_name,
+            'value': value,
+            'raw_value': value if not scaled else round((value - offset) / precision),
+            'hex': f"0x{value if not scaled else (value - offset) / precision:X}",
+            'description': None
+        }
+
+    return decode
+
+
+def _compile_raw(field_id, field_name, byte_position):
+    """编译其他类型字段（保存原始字节）的解码函数"""
+    read_bytes = _compile_byte_reader(byte_position)[0]
+
+    def decode(data, fields):
+        field_bytes = read_bytes(data)
+        fields[field_id] = {
+            'name': field_name,
+            'value': field_bytes.hex(' ').upper(),
+            'raw_value': field_bytes,
+            'hex': '0x' + field_bytes.hex().upper(),
+            'description': None
+        }
+
+    return decode
+
+
+def compile_field(field):
+    """
+    把单个字段定义编译为解码函数
+
+    Args:
+        field (dict): 字段定义
+
+    Returns:
+        tuple: (limit, decode) 数据长度必须大于limit才解码；字段无法解码时返回None
+
+    Raises:
+        ValueError: 字段定义有误
+    """
+    field_id = field.get('id', '')
+    field_name = field.get('name', '')
+    field_type = field.get('type', 'Unsigned')
+    precision = field.get('precision', 1)
+    offset = field.get('offset', 0)
+    byte_position = field.get('byte_position', [])
+    bit_position = field.get('bit_position', None)
+    values = field.get('values', [])
+
+    if isinstance(byte_position, list):
+        # 多字节字段
+        if not byte_position:
+            raise ValueError("byte_position为空")
+        if not all(isinstance(pos, int) and pos >= 0 for pos in byte_position):
+            raise ValueError(f"byte_position无效: {byte_position}")
+        limit = max(byte_position)
+
+    elif isinstance(byte_position, int):
+        # 单字节字段，但可能只使用部分位
+        if byte_position < 0:
+            raise ValueError(f"byte_position无效: {byte_position}")
+        limit = byte_position
+
+        if bit_position:
+            if isinstance(bit_position, list):
+                # 多位
+                mask = 0
+                for bit in bit_position:
+                    mask |= (1 << bit)
+                return limit, _compile_bit_field(field_id, field_name, byte_position, mask,
+                                                 min(bit_position), values)
+
+            elif isinstance(bit_position, int):
+                # 单位
+                return limit, _compile_bit_field(field_id, field_name, byte_position, 1 << bit_position,
+                                                 bit_position, values)
+    else:
+        return None
+
+    if field_type == 'Unsigned':
+        return limit, _compile_unsigned(field_id, field_name, byte_position, precision, offset, values)
+    elif field_type == 'Signed':
+        return limit, _compile_signed(field_id, field_name, byte_position, precision, offset)
+    else:
+        return limit, _compile_raw(field_id, field_name, byte_position)
+
+
+class DecodePlan:
+    """
+    协议解码计划
+
+    在加载协议时一次性编译：位字段的掩码和移位、多字节字段的struct格式、
+    取值描述的字典均预先计算好，解码时只做取值和查表。
+    """
+
+    def __init__(self, protocol_data):
+        """
+        编译协议
+
+        Args:
+            protocol_data (dict): 协议数据
+        """
+        self.protocol_data = protocol_data
+        self.protocol_id = protocol_data.get('protocol_id', '')
+        self.protocol_name = protocol_data.get('protocol_name', '')
+        self.message_id = protocol_data.get('message_id', '')
+        self.message_type = protocol_data.get('message_type', '')
+        self.decoders = []  # [(limit, decode, field_name, field_id)]
+
+        # 报文格式 (报文头, 报文ID, 报文尾, 长度字段字节数)，解析每帧时直接使用；无法解析时为None
+        message_format = protocol_data.get('message_format', {})
+        self.frame_format = None
+        self.format_error = None
+        try:
+            self.frame_format = (
+                parse_byte_list(message_format.get('start_bytes', ["0x59", "0x44"])),
+                int(message_format.get('message_id', "0x00"), 16),
+                parse_byte_list(message_format.get('end_bytes', ["0x4B", "0x4A"])),
+                message_format.get('length_bytes', 1)
+            )
+        except (AttributeError, TypeError, ValueError) as e:
+            self.format_error = e
+
+        for field in protocol_data.get('fields', []):
+            try:
+                compiled = compile_field(field)
+            except (TypeError, ValueError) as e:
+                log_warning(f"协议 {self.protocol_id} 的字段 {field.get('name', '')}({field.get('id', '')}) "
+                            f"定义有误，不参与解码: {str(e)}")
+                continue
+            if compiled:
+                limit, decode = compiled
+                self.decoders.append((limit, decode, field.get('name', ''), field.get('id', '')))
+
+    def decode(self, data_bytes):
+        """
+        解码数据部分
+
+        Args:
+            data_bytes (bytes): 数据部分字节
+
+        Returns:
+            dict: 字段解析结果 {field_id: field_info}
+        """
+        fields = {}
+        length = len(data_bytes)
+        for limit, decode, field_name, field_id in self.decoders:
+            # 字节位置超出数据范围的字段跳过
+            if limit >= length:
+                continue
+            try:
+                decode(data_bytes, fields)
+            except Exception as e:
+                log_debug(f"解析字段 {field_name}({field_id}) 错误: {str(e)}")
+        return fields
+
+
+def parse_byte_list(values):
+    """
+    把协议中的十六进制字节列表转换为字节串
+
+    Args:
+        values (list): 如["0x59", "0x44"]
+
+    Returns:
+        bytes: 字节串
+    """
+    return bytes(int(value, 16) for value in values)
+
+
+def parse_message_id(protocol_data):
+    """
+    获取协议的整数报文ID
+
+    优先使用顶层的message_id（如"D0h"），无法解析时使用message_format中的message_id（如"0xD0"）
+
+    Args:
+        protocol_data (dict): 协议数据
+
+    Returns:
+        int: 报文ID，无法解析则返回None
+    """
+    message_id = protocol_data.get('message_id', '')
+    if isinstance(message_id, str) and message_id[-1:] in ('h', 'H'):
+        try:
+            return int(message_id[:-1], 16)
+        except ValueError:
+            pass
+
+    message_format = protocol_data.get('message_format', {})
+    try:
+        return int(message_format.get('message_id', ''), 16)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_dispatch_table(protocols):
+    """
+    构建报文分发表
+
+    Args:
+        protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+
+    Returns:
+        dict: {(start_bytes, message_id): [(protocol_id, protocol_data), ...]}，同一键的多个协议按加载顺序排列
+    """
+    dispatch_table = {}
+    for protocol_id, protocol_data in protocols.items():
+        message_id = parse_message_id(protocol_data)
+        if message_id is None:
+            log_debug(f"协议 {protocol_id} 的报文ID无法解析，不加入分发表")
+            continue
+        try:
+            start_bytes = parse_byte_list(protocol_data.get('message_format', {}).get('start_bytes', ["0x59", "0x44"]))
+        except (TypeError, ValueError):
+            log_debug(f"协议 {protocol_id} 的报文头无法解析，不加入分发表")
+            continue
+        dispatch_table.setdefault((start_bytes, message_id), []).append((protocol_id, protocol_data))
+    return dispatch_table
+
+
+class FrameIdentifier:
+    """按报文头和报文ID识别协议，只看帧头不做解析，用于发送和接收线程中快速分类报文"""
+
+    def __init__(self, protocols=None):
+        """
+        Args:
+            protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+        """
+        self.frame_ids = {}  # {(start_bytes, message_id): protocol_id}
+        self.start_bytes = ()  # 报文头，较长的在前
+        if protocols:
+            for key, entries in build_dispatch_table(protocols).items():
+                self.frame_ids[key] = entries[0][0]
+            self.start_bytes = tuple(sorted({key[0] for key in self.frame_ids}, key=len, reverse=True))
+
+    def identify(self, message):
+        """
+        识别报文所属的协议，同一报文头和报文ID有多个协议时取先加载的一个
+
+        Args:
+            message (bytes): 报文
+
+        Returns:
+            str: 协议ID，未识别返回None
+        """
+        for start_bytes in self.start_bytes:
+            if len(message) > len(start_bytes) and message.startswith(start_bytes):
+                return self.frame_ids.get((start_bytes, message[len(start_bytes)]))
+        return None
+
+
+def parse_field_value(field_id, field_value, precision=1, offset=0):
+    """
+    把界面输入的字段值转换为总线值
+
+    空值为0；"0x"开头按十六进制总线值；否则按物理值换算（总线值 = (物理值 - 偏移量) / 精度，四舍五入），
+    无法转换时为0。field_value不是字符串时抛出异常，该字段不写入。
+
+    Args:
+        field_id (str): 字段ID
+        field_value (str): 字段值
+        precision (float): 精度
+        offset (float): 偏移量
+
+    Returns:
+        int: 总线值
+    """
+    try:
+        if not field_value or field_value.strip() == '':
+            return 0
+        elif field_value.startswith('0x'):
+            return int(field_value, 16)
+        numeric_value = float(field_value)
+        if precision != 1 or offset != 0:
+            numeric_value = (numeric_value - offset) / precision
+        return int(round(numeric_value))
+    except ValueError:
+        log_debug(f"无法将字段 {field_id} 的值 '{field_value}' 转换为数值，使用默认值0")
+        return 0
+
+
+def compile_field_encoder(field, data_start, total_length):
+    """
+    把单个字段定义编译为编码函数
+
+    Args:
+        field (dict): 字段定义
+        data_start (int): 数据部分在报文中的起始位置
+        total_length (int): 报文总长度
+
+    Returns:
+        tuple: (encode, positions) encode(message, field_value)把字段值写入报文，positions为可能写入的报文位置；
+               字段不需要写入时返回None
+
+    Raises:
+        ValueError: 字段定义有误
+    """
+    field_id = field.get('id', '')
+    field_type = field.get('type', 'Unsigned')
+    field_length = field.get('length', 1)
+    precision = field.get('precision', 1)
+    offset = field.get('offset', 0)
+    byte_position = field.get('byte_position', [])
+    bit_position = field.get('bit_position', None)
+
+    # 只有整数字段写入报文
+    if field_type not in ['Unsigned', 'Signed']:
+        return None
+
+    # 总线值按字段长度拆分为小端字节
+    if not isinstance(field_length, int) or isinstance(field_length, bool) or field_length < 1:
+        raise ValueError(f"length无效: {field_length!r}")
+
+    if isinstance(byte_position, list):
+        if not all(isinstance(pos, int) and pos >= 0 for pos in byte_position):
+            raise ValueError(f"byte_position无效: {byte_position}")
+
+        # 多字节字段：[(报文位置, 移位)]，超出报文长度的字节不写入
+        writes = [(data_start + pos, i * 8) for i, pos in enumerate(byte_position[:field_length])
+                  if data_start + pos < total_length]
+        if not writes:
+            return None
+
+        def encode(message, field_value):
+            value = parse_field_value(field_id, field_value, precision, offset)
+            for index, shift in writes:
+                message[index] = (value >> shift) & 0xFF
+
+        return encode, [index for index, _ in writes]
+
+    if not isinstance(byte_position, int):
+        return None
+    if byte_position < 0:
+        raise ValueError(f"byte_position无效: {byte_position}")
+    if data_start + byte_position >= total_length:
+        return None
+
+    # 单字节字段，但可能只使用部分位
+    index = data_start + byte_position
+    if bit_position:
+        if isinstance(bit_position, list):
+            # 多位
+            mask = 0
+            for bit in bit_position:
+                mask |= (1 << bit)
+            clear = ~mask
+            shift = min(bit_position)
+
+            def encode(message, field_value):
+                value = parse_field_value(field_id, field_value, precision, offset)
+                message[index] &= clear
+                message[index] |= ((value << shift) & mask)
+
+        elif isinstance(bit_position, int):
+            # 单位
+            bit = 1 << bit_position
+            clear = ~bit
+
+            def encode(message, field_value):
+                value = parse_field_value(field_id, field_value, precision, offset)
+                message[index] &= clear
+                if value:
+                    message[index] |= bit
+        else:
+            return None
+
+    else:
+        # 没有位定义，使用整个字节
+        def encode(message, field_value):
+            message[index] = parse_field_value(field_id, field_value, precision, offset) & 0xFF
+
+    return encode, [index]
+
+
+class EncodePlan:
+    """
+    协议编码模板
+
+    在加载协议时一次性生成报文模板：报文头、报文ID、长度字段和报文尾已经填好，数据部分全0；
+    另有一份按各字段default_hex填好数据的默认模板。编码时复制模板，只写入给定的字段，再计算CRC。
+    报文ID和长度字段不会被字段改写时，CRC从预先算好的中间值继续计算。
+    """
+
+    def __init__(self, protocol_data):
+        """
+        编译协议，报文格式有误时error为异常，encode()抛出该异常
+
+        Args:
+            protocol_data (dict): 协议数据
+        """
+        self.protocol_data = protocol_data
+        self.protocol_id = protocol_data.get('protocol_id', '')
+        self.encoders = []  # [(field_id, field_name, encode)]
+        self.error = None
+
+        try:
+            self.compile(protocol_data)
+        except Exception as e:
+            self.error = e
+
+    def compile(self, protocol_data):
+        """生成报文模板并编译各字段的编码函数"""
+        # 获取报文格式信息
+        message_format = protocol_data.get('message_format', {})
+        start_bytes = message_format.get('start_bytes', ["0x59", "0x44"])
+        message_id = message_format.get('message_id', "0x00")
+        end_bytes = message_format.get('end_bytes', ["0x4B", "0x4A"])
+        length_bytes = message_format.get('length_bytes', 1)  # 默认为1字节
+        fields = protocol_data.get('fields', [])
+
+        # 获取规定的数据长度
+        data_length = 0
+        if "data_length" in message_format:
+            data_length = int(message_format.get('data_length', "0"), 16)
+        else:
+            # 根据字段计算数据长度
+            for field in fields:
+                byte_position = field.get('byte_position', [])
+                if isinstance(byte_position, list) and byte_position:
+                    data_length = max(data_length, max(byte_position) + 1)
+                elif isinstance(byte_position, int):
+                    data_length = max(data_length, byte_position + 1)
+
+        # 报文头 + 报文ID + 长度字段 + 数据 + CRC校验 + 报文尾
+        header_length = len(start_bytes)
+        total_length = header_length + 1 + length_bytes + data_length + 2 + len(end_bytes)
+        template = bytearray(total_length)
+        for i, b in enumerate(start_bytes):
+            template[i] = int(b, 16)
+        template[header_length] = int(message_id, 16)
+
+        length_pos = header_length + 1
+        if length_bytes == 1:
+            template[length_pos] = data_length
+        else:
+            template[length_pos] = data_length & 0xFF  # 低字节
+            template[length_pos + 1] = (data_length >> 8) & 0xFF  # 高字节
+
+        data_start = header_length + 1 + length_bytes
+        self.header_length = header_length
+        self.data_start = data_start
+        self.crc_pos = data_start + data_length
+        self.tail = bytes(int(b, 16) for b in end_bytes)
+        template[self.crc_pos + 2:] = self.tail
+
+        # 编译字段编码函数
+        positions = set()
+        for field in fields:
+            field_id = field.get('id', '')
+            field_name = field.get('name', '')
+            try:
+                compiled = compile_field_encoder(field, data_start, total_length)
+            except (TypeError, ValueError) as e:
+                log_warning(f"协议 {self.protocol_id} 的字段 {field_name}({field_id}) 定义有误，不参与编码: {str(e)}")
+                continue
+            if compiled:
+                encode, field_positions = compiled
+                self.encoders.append((field_id, field_name, encode))
+                positions.update(field_positions)
+
+        # 字段写到CRC和报文尾时每次需要重写报文尾
+        self.tail_dirty = any(index >= self.crc_pos or index < 0 for index in positions)
+
+        # 报文ID和长度字段不会被改写时预先计算这部分的CRC
+        if self.crc_pos >= data_start and all(data_start <= index < self.crc_pos for index in positions):
+            self.prefix_crc = crc16_modbus(template[header_length:data_start])
+        else:
+            self.prefix_crc = None
+
+        self.template = bytes(template)
+        self.default_template = self.template
+        defaults = {field.get('id', ''): field['default_hex'] for field in fields
+                    if isinstance(field.get('default_hex'), str)}
+        if defaults:
+            self.default_template = bytes(self.patch(bytearray(template), defaults))
+
+    def patch(self, message, field_values):
+        """
+        把字段值写入报文，写入失败的字段跳过
+
+        Args:
+            message (bytearray): 报文
+            field_values (dict): 字段值字典 {field_id: value}
+
+        Returns:
+            bytearray: message
+        """
+        get = field_values.get
+        for field_id, field_name, encode in self.encoders:
+            field_value = get(field_id)
+            if field_value is None:
+                continue
+            try:
+                encode(message, field_value)
+            except Exception as e:
+                log_debug(f"设置字段 {field_id} 值时出错: {str(e)}")
+        return message
+
+    def encode(self, field_values, use_defaults=False):
+        """
+        按字段值生成报文
+
+        Args:
+            field_values (dict): 字段值字典 {field_id: value}，未给出的字段取模板中的值
+            use_defaults (bool): 未给出的字段是否使用default_hex，否则为0
+
+        Returns:
+            bytes: 报文
+        """
+        if self.error is not None:
+            raise self.error
+
+        message = self.patch(bytearray(self.default_template if use_defaults else self.template), field_values)
+
+        # 计算CRC校验（高字节在前）
+        crc_pos = self.crc_pos
+        if self.prefix_crc is not None:
+            crc = crc16_modbus(memoryview(message)[self.data_start:crc_pos], self.prefix_crc)
+        else:
+            crc = crc16_modbus(memoryview(message)[self.header_length:crc_pos])
+        message[crc_pos] = (crc >> 8) & 0xFF
+        message[crc_pos + 1] = crc & 0xFF
+        if self.tail_dirty:
+            message[crc_pos + 2:] = self.tail
+        return bytes(message)
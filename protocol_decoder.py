@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 报文解码模块，不依赖Qt，按协议定义解析和生成报文，供界面、命令行采集和其他线程使用
+"""
+
+from datetime import datetime
+from log_manager import log_debug
+from protocol_codec import DecodePlan, EncodePlan, build_dispatch_table
+from crc16 import crc16_modbus
+
+
+class ProtocolDecoder:
+    """
+    协议解码器
+
+    加载协议时预编译解码计划、编码模板和报文分发表，decode_message按报文头和报文ID查表解码。
+    不发送信号，可以在任意线程中使用；界面使用的ProtocolParser在此基础上增加解析完成信号。
+    """
+
+    def __init__(self):
+        self.protocols = {}  # 协议信息字典 {protocol_id: protocol_data}
+        self.decode_plans = {}  # 预编译的解码计划 {protocol_id: DecodePlan}
+        self.encode_plans = {}  # 预编译的编码模板 {protocol_id: EncodePlan}
+        self.dispatch_table = {}  # 报文分发表 {(start_bytes, message_id): [(protocol_id, protocol_data)]}
+        self.start_bytes = ()  # 已加载协议的报文头，较长的在前
+        self.heuristic_mode = False  # 启发式模式：按ID无法解析时依次尝试所有协议
+        self.unknown_count = 0  # 未能按报文ID解析而被拒绝的报文数
+
+    def set_protocols(self, protocols):
+        """
+        设置协议信息，并为每个协议预编译解码计划和编码模板
+
+        Args:
+            protocols (dict): 协议信息字典 {protocol_id: protocol_data}
+        """
+        # 先在局部变量中编译完成再整体替换，接收线程解析时不会看到编译到一半的状态
+        decode_plans = {}
+        encode_plans = {}
+        for protocol_id, protocol_data in protocols.items():
+            decode_plans[protocol_id] = DecodePlan(protocol_data)
+            encode_plans[protocol_id] = EncodePlan(protocol_data)
+        dispatch_table = build_dispatch_table(protocols)
+
+        self.protocols = protocols
+        self.decode_plans = decode_plans
+        self.encode_plans = encode_plans
+        self.dispatch_table = dispatch_table
+        self.start_bytes = tuple(sorted({key[0] for key in dispatch_table}, key=len, reverse=True))
+        self.unknown_count = 0
+
+    def set_heuristic_mode(self, enabled):
+        """
+        设置启发式解析模式
+
+        Args:
+            enabled (bool): 是否在按报文ID无法解析时依次尝试所有协议
+        """
+        self.heuristic_mode = enabled
+
+    def get_decode_plan(self, protocol_data):
+        """
+        获取协议对应的解码计划，未预编译的协议数据在此编译并缓存
+
+        Args:
+            protocol_data (dict): 协议数据
+
+        Returns:
+            DecodePlan: 解码计划
+        """
+        protocol_id = protocol_data.get('protocol_id', '')
+        plan = self.decode_plans.get(protocol_id)
+        if plan is None or plan.protocol_data is not protocol_data:
+            plan = DecodePlan(protocol_data)
+            if protocol_id in self.protocols and self.protocols[protocol_id] is protocol_data:
+                self.decode_plans[protocol_id] = plan
+        return plan
+
+    def get_encode_plan(self, protocol_id):
+        """
+        获取协议对应的编码模板，协议数据变化后重新编译
+
+        Args:
+            protocol_id (str): 协议ID
+
+        Returns:
+            EncodePlan: 编码模板，未找到协议则返回None
+        """
+        protocol_data = self.protocols.get(protocol_id)
+        if not protocol_data:
+            return None
+        plan = self.encode_plans.get(protocol_id)
+        if plan is None or plan.protocol_data is not protocol_data:
+            plan = EncodePlan(protocol_data)
+            self.encode_plans[protocol_id] = plan
+        return plan
+
+    def generate_message(self, protocol_id, field_values, use_defaults=False):
+        """
+        根据协议和字段值生成报文
+
+        复制加载协议时生成的报文模板，只写入给定的字段并计算CRC。
+
+        Args:
+            protocol_id (str): 协议ID
+            field_values (dict): 字段值字典 {field_id: value}
+            use_defaults (bool): 未给出的字段是否使用协议中的default_hex，否则为0
+
+        Returns:
+            bytes: 生成的报文数据，生成失败则返回None
+        """
+        try:
+            plan = self.get_encode_plan(protocol_id)
+            if plan is None:
+                log_debug("错误: 未找到协议数据")
+                return None
+            return plan.encode(field_values, use_defaults)
+
+        except Exception as e:
+            log_debug(f"生成报文错误: {str(e)}")
+            return None
+
+    def decode_message(self, message_bytes, heuristic=None):
+        """
+        解析报文，不发送信号，可以在任意线程中调用
+
+        Args:
+            message_bytes (bytes): 报文数据
+            heuristic (bool): 是否启用启发式解析，None时使用heuristic_mode
+
+        Returns:
+            tuple: (protocol_id, parsed_data) 协议ID和解析后的数据，未识别则返回(None, None)
+        """
+        try:
+            # 按报文头和报文ID查分发表
+            for start_bytes in self.start_bytes:
+                if len(message_bytes) > len(start_bytes) and message_bytes.startswith(start_bytes):
+                    key = (start_bytes, message_bytes[len(start_bytes)])
+                    for protocol_id, protocol_data in self.dispatch_table.get(key, ()):
+                        parsed_data = self.parse_protocol_message(protocol_data, message_bytes)
+                        if parsed_data:
+                            return protocol_id, parsed_data
+                    break
+
+            if heuristic is None:
+                heuristic = self.heuristic_mode
+
+            # 未知报文ID直接拒绝
+            if not heuristic:
+                self.unknown_count += 1
+                return None, None
+
+            # 启发式模式：尝试所有协议解析
+            for protocol_id, protocol_data in self.protocols.items():
+                parsed_data = self.parse_protocol_message(protocol_data, message_bytes)
+                if parsed_data:
+                    return protocol_id, parsed_data
+
+            return None, None
+
+        except Exception as e:
+            log_debug(f"解析报文错误: {str(e)}")
+            return None, None
+
+    def parse_protocol_message(self, protocol_data, message_bytes):
+        """
+        根据协议定义解析报文
+
+        Args:
+            protocol_data (dict): 协议数据
+            message_bytes (bytes): 报文数据
+
+        Returns:
+            dict: 解析结果，解析失败则返回None
+        """
+        try:
+            # 报文格式在加载协议时已解析
+            plan = self.get_decode_plan(protocol_data)
+            if plan.frame_format is None:
+                log_debug(f"解析协议报文错误: {str(plan.format_error)}")
+                return None
+            start_bytes_value, message_id_value, end_bytes_value, length_bytes = plan.frame_format
+
+            # 判断报文格式
+            # 情况1: 有报文头和报文尾
+            if (len(message_bytes) >= len(start_bytes_value) + len(end_bytes_value) + 4 and
+                    message_bytes.startswith(start_bytes_value) and
+                    message_bytes.endswith(end_bytes_value)):
+
+                # 提取数据部分（不含报文头、报文尾和校验码）
+                data_start = len(start_bytes_value)
+                data_end = len(message_bytes) - len(end_bytes_value) - 2  # 减去2字节CRC
+
+                # 检查报文ID
+                if message_bytes[data_start] == message_id_value:
+                    # 根据长度字节数提取数据
+                    if length_bytes == 1:
+                        # 单字节数据长度
+                        data_bytes = message_bytes[data_start:data_end]
+                        return self.parse_fields(protocol_data, data_bytes[2:], raw_message=message_bytes)
+                    else:
+                        # 两字节数据长度(小端格式)
+                        data_length = message_bytes[data_start + 1] + (message_bytes[data_start + 2] << 8)
+                        # 实际数据从第4个字节开始(报文头2字节+ID 1字节+长度2字节)
+                        data_bytes = message_bytes[data_start:data_start + 3 + data_length]
+                        return self.parse_fields(protocol_data, data_bytes[3:], raw_message=message_bytes)
+
+            # 情况2: 只有报文ID，没有完整的报文头尾
+            else:
+                # 尝试从任意位置查找报文ID
+                for i in range(len(message_bytes) - 2):
+                    if message_bytes[i] == message_id_value:
+                        if length_bytes == 1:
+                            # 单字节长度格式
+                            # 检查后面的一个字节是否是长度字段
+                            length = message_bytes[i + 1]
+
+                            # 如果剩余数据长度符合长度字段，尝试解析
+                            if i + 2 + length <= len(message_bytes):
+                                data_bytes = message_bytes[i + 2:i + 2 + length]
+                                return self.parse_fields(protocol_data, data_bytes,
+                                                         raw_message=message_bytes[i:i + 2 + length])
+                        else:
+                            # 两字节长度格式(小端)
+                            if i + 2 < len(message_bytes):
+                                # 读取两字节长度(小端格式)
+                                length = message_bytes[i + 1] + (message_bytes[i + 2] << 8)
+
+                                # 如果剩余数据长度符合长度字段，尝试解析
+                                if i + 3 + length <= len(message_bytes):
+                                    data_bytes = message_bytes[i + 3:i + 3 + length]
+                                    return self.parse_fields(protocol_data, data_bytes,
+                                                             raw_message=message_bytes[i:i + 3 + length])
+
+            return None
+
+        except Exception as e:
+            log_debug(f"解析协议报文错误: {str(e)}")
+            return None
+
+    def parse_fields(self, protocol_data, data_bytes, raw_message=None):
+        """
+        解析报文字段
+
+        Args:
+            protocol_data (dict): 协议数据
+            data_bytes (bytes): 数据部分字节
+            raw_message (bytes): 原始报文数据
+
+        Returns:
+            dict: 解析结果
+        """
+        plan = self.get_decode_plan(protocol_data)
+        return {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            'protocol_id': plan.protocol_id,
+            'protocol_name': plan.protocol_name,
+            'message_id': plan.message_id,
+            'message_type': plan.message_type,
+            'raw_message': raw_message.hex(' ').upper() if raw_message else '',
+            'fields': plan.decode(data_bytes)
+        }
+
+    def calculate_crc16(self, data):
+        """
+        计算CRC16校验码 (Modbus)
+
+        Args:
+            data (bytes): 要计算的数据
+
+        Returns:
+            int: CRC16校验码
+        """
+        return crc16_modbus(data)
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 原始数据录制模块，不依赖Qt，按数据块记录串口收发的原始字节、时间戳、方向和串口编号
+
+文件格式(小端):
+    文件头: RAW_FILE_MAGIC + uint32 JSON头信息长度 + JSON头信息(UTF-8)
+    记录:   int64 单调时钟(ns) + int64 系统时间(ns) + uint8 串口编号 + uint8 方向 + uint32 数据长度 + 数据
+
+记录按写入顺序追加，文件只追加不修改，录制中的文件也可以读取（末尾不完整的记录会被跳过）。
+"""
+
+import json
+import struct
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from log_manager import log_error
+
+RAW_FILE_MAGIC = b'YDRAW001'
+RAW_FILE_HEADER = struct.Struct('<I')  # JSON头信息长度
+RAW_RECORD = struct.Struct('<qqBBI')  # (mono_ns, wall_ns, port_id, direction, length)，之后为数据
+
+DIR_RX = 0  # 接收
+DIR_TX = 1  # 发送
+DIRECTION_NAMES = {DIR_RX: "RX", DIR_TX: "TX"}
+
+# 一个数据块，offset为记录在文件中的起始位置
+CaptureRecord = namedtuple('CaptureRecord', ['offset', 'mono_ns', 'wall_ns', 'port_id', 'direction', 'data'])
+
+
+def describe_port(serial_port):
+    """
+    生成写入录制文件头的串口说明
+
+    Args:
+        serial_port (serial.Serial): 串口对象
+
+    Returns:
+        dict: {name, baudrate, bytesize, parity, stopbits}
+    """
+    return {
+        'name': getattr(serial_port, 'port', None),
+        'baudrate': getattr(serial_port, 'baudrate', None),
+        'bytesize': getattr(serial_port, 'bytesize', None),
+        'parity': getattr(serial_port, 'parity', None),
+        'stopbits': getattr(serial_port, 'stopbits', None),
+    }
+
+
+def read_capture_header(stream):
+    """
+    读取录制文件头
+
+    Args:
+        stream: 以二进制方式打开的文件，读取后位于第一条记录
+
+    Returns:
+        dict: JSON头信息
+
+    Raises:
+        ValueError: 不是录制文件
+    """
+    if stream.read(len(RAW_FILE_MAGIC)) != RAW_FILE_MAGIC:
+        raise ValueError("不是原始数据录制文件")
+    header_length, = RAW_FILE_HEADER.unpack(stream.read(RAW_FILE_HEADER.size))
+    return json.loads(stream.read(header_length).decode('utf-8'))
+
+
+def iter_capture_records(stream, direction=None):
+    """
+    依次读取录制文件中的数据块
+
+    Args:
+        stream: 以二进制方式打开的文件
+        direction (int): 只返回该方向(DIR_RX/DIR_TX)的数据块，None表示全部
+
+    Yields:
+        CaptureRecord: 数据块
+    """
+    read_capture_header(stream)
+    offset = stream.tell()
+    while True:
+        record = stream.read(RAW_RECORD.size)
+        if len(record) < RAW_RECORD.size:
+            return
+        mono_ns, wall_ns, port_id, record_direction, length = RAW_RECORD.unpack(record)
+        data = stream.read(length)
+        if len(data) < length:
+            return
+        if direction is None or record_direction == direction:
+            yield CaptureRecord(offset, mono_ns, wall_ns, port_id, record_direction, data)
+        offset += RAW_RECORD.size + length
+
+
+class CaptureWriter:
+    """
+    原始数据录制
+
+    write可以在任意线程中调用，只打包记录头并放入待写列表；后台线程每flush_interval秒
+    （或待写数据超过flush_size字节时）把待写列表合并为一次写入并flush，接收和写线程不会阻塞在磁盘上。
+    磁盘跟不上导致待写数据超过max_pending_bytes时丢弃新数据块并计数。
+    """
+
+    def __init__(self, path, ports=None, info=None, flush_interval=0.1, flush_size=256 * 1024,
+                 max_pending_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            path (str): 录制文件路径，已存在时覆盖
+            ports (list): 串口说明，按串口编号排列，例如 [{'name': 'COM3', 'baudrate': 9600}]
+            info (dict): 写入文件头的其他信息
+            flush_interval (float): 后台写入周期(秒)
+            flush_size (int): 待写数据超过该字节数时立即写入
+            max_pending_bytes (int): 最多缓存的待写字节数
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_pending_bytes = max_pending_bytes
+        self.file = open(path, 'wb')
+        header = dict(info or {})
+        header.update({'ports': ports or [], 'created': datetime.now().isoformat()})
+        header = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        self.file.write(RAW_FILE_MAGIC + RAW_FILE_HEADER.pack(len(header)) + header)
+        self.file.flush()
+        self.file_bytes = self.file.tell()  # 已写入文件的字节数
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pending = []  # 待写的记录头和数据
+        self.pending_bytes = 0
+        self.closed = False
+        self.error = None  # 写入失败的原因
+        self.chunks = 0  # 录制的数据块数
+        self.data_bytes = 0  # 录制的数据字节数
+        self.dropped_chunks = 0
+        self.dropped_bytes = 0
+
+        self.thread = threading.Thread(target=self.run, name="CaptureWriter", daemon=True)
+        self.thread.start()
+
+    def write(self, port_id, direction, data, mono_ns=None, wall_ns=None):
+        """
+        记录一个数据块
+
+        Args:
+            port_id (int): 串口编号
+            direction (int): 方向 (DIR_RX/DIR_TX)
+            data (bytes): 数据
+            mono_ns (int): 单调时钟时间(ns)，None时取当前时间
+            wall_ns (int): 系统时间(ns)，None时取当前时间
+
+        Returns:
+            bool: 是否已记录，已关闭或缓存满时返回False
+        """
+        if mono_ns is None:
+            mono_ns = time.monotonic_ns()
+        if wall_ns is None:
+            wall_ns = time.time_ns()
+        length = len(data)
+        record = RAW_RECORD.pack(mono_ns, wall_ns, port_id, direction, length)
+
+        with self.lock:
+            if self.closed:
+                return False
+            if self.pending_bytes + length > self.max_pending_bytes:
+                self.dropped_chunks += 1
+                self.dropped_bytes += length
+                return False
+            self.pending.append(record)
+            self.pending.append(bytes(data))
+            self.pending_bytes += RAW_RECORD.size + length
+            self.chunks += 1
+            self.data_bytes += length
+            wake = self.pending_bytes >= self.flush_size
+
+        if wake:
+            self.wakeup.set()
+        return True
+
+    def hook(self, port_id, direction):
+        """
+        生成数据钩子，供SerialReader.add_data_hook和FrameSender.add_write_hook使用
+
+        Args:
+            port_id (int): 串口编号
+            direction (int): 方向 (DIR_RX/DIR_TX)
+
+        Returns:
+            callable: hook(data, mono_ns)
+        """
+        def record(data, mono_ns):
+            self.write(port_id, direction, data, mono_ns)
+        return record
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            with self.lock:
+                pending = self.pending
+                self.pending = []
+                self.pending_bytes = 0
+                closed = self.closed
+
+            if pending and self.error is None:
+                try:
+                    data = b''.join(pending)
+                    self.file.write(data)
+                    self.file.flush()
+                    self.file_bytes += len(data)
+                except OSError as e:
+                    log_error(f"写入录制文件失败: {str(e)}")
+                    self.error = str(e)
+                    with self.lock:
+                        self.closed = True
+            if closed:
+                break
+
+    def close(self):
+        """写入剩余数据并关闭文件"""
+        with self.lock:
+            if self.closed and self.thread is None:
+                return
+            self.closed = True
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.file.close()
+
+    def stats(self):
+        """
+        获取统计
+
+        Returns:
+            dict: {chunks, data_bytes, file_bytes, pending_bytes, dropped_chunks, dropped_bytes, error}
+        """
+        with self.lock:
+            return {
+                'chunks': self.chunks,
+                'data_bytes': self.data_bytes,
+                'file_bytes': self.file_bytes,
+                'pending_bytes': self.pending_bytes,
+                'dropped_chunks': self.dropped_chunks,
+                'dropped_bytes': self.dropped_bytes,
+                'error': self.error,
+            }
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 接收流水线模块，在独立线程中完成分帧和协议解析，结果按批通过信号交给界面线程显示
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from PyQt5.QtCore import QThread, pyqtSignal
+from log_manager import log_debug
+
+# 接收结果类型
+RESULT_DATA = 'data'  # 原始数据块 (RESULT_DATA, timestamp, data)
+RESULT_FRAME = 'frame'  # 完整报文 (RESULT_FRAME, timestamp, message, protocol_id, parsed_data)
+RESULT_CRC_ERROR = 'crc_error'  # CRC校验失败的报文 (RESULT_CRC_ERROR, timestamp, message)
+
+
+class ReceiveWorker(QThread):
+    """
+    接收处理线程
+
+    流水线：串口接收线程 -> 输入队列 -> 本线程分帧、解析 -> 待提交队列 -> 批量信号 -> 界面线程。
+
+    结果按批提交：攒满max_batch_size条，或最早的一条已等待max_batch_delay毫秒时发送一批。
+    界面线程处理完一批后调用batch_done确认，已发送未确认的批次最多max_inflight_batches个，
+    因此Qt事件队列中积压的结果也是有上限的。
+
+    两个队列都有上限，背压策略如下：
+    - 输入队列按字节数限制。串口接收线程永远不会被阻塞（阻塞会导致串口驱动缓冲区溢出），
+      队列满时丢弃最旧的数据块并计数，分帧器会在下一个报文头处重新同步。
+    - 待提交队列按条数限制。界面来不及显示时本线程继续分帧和解析，丢弃最旧的未显示结果并计数，
+      接收字节数等统计不受影响。
+    - 录制回放等可以等待的数据源使用put_data_wait，在输入队列积压超过上限的1/16（一次分帧产生的结果
+      不会超出待提交队列的剩余空间）或待提交队列积压超过一半时阻塞，速度受界面显示速度限制而不丢弃数据。
+    """
+
+    results_batch = pyqtSignal(list)  # 一批接收结果
+
+    def __init__(self, message_receiver, protocol_parser, max_batch_size=500, max_batch_delay=50,
+                 max_inflight_batches=2, max_pending_bytes=1 << 20, max_pending_results=20000):
+        """
+        初始化接收处理线程
+
+        Args:
+            message_receiver (MessageReceiver): 分帧器
+            protocol_parser (ProtocolParser): 协议解析器
+            max_batch_size (int): 每批最多的结果条数
+            max_batch_delay (int): 结果最长等待时间(ms)，超过后不足一批也立即提交
+            max_inflight_batches (int): 已发送但界面尚未处理完的最大批次数
+            max_pending_bytes (int): 输入队列最多缓存的字节数
+            max_pending_results (int): 待提交队列最多缓存的条数
+        """
+        super().__init__()
+        self.message_receiver = message_receiver
+        self.protocol_parser = protocol_parser
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        self.max_inflight_batches = max_inflight_batches
+        self.max_pending_bytes = max_pending_bytes
+        self.max_pending_results = max_pending_results
+        self.parse_enabled = True  # 是否解析，关闭时只转交原始数据（有报文观察者时仍然分帧）
+        self.frame_observers = []  # 分帧后在本线程中调用 observer(message, arrival_ns)，只包含CRC正确的报文
+        self.echo_filter = None  # 本地回波过滤器(EchoFilter)，在显示和分帧前去掉本机发送的回波
+
+        lock = threading.Lock()
+        self.condition = threading.Condition(lock)
+        self.space_available = threading.Condition(lock)  # 队列积压减少，唤醒put_data_wait
+        self.is_running = False
+        self.input_queue = deque()
+        self.pending_bytes = 0
+        self.results = deque()  # 待提交的结果
+        self.first_result_time = 0.0  # 待提交队列中最早一条结果的时间
+        self.inflight_batches = 0
+
+        # 自上次take_stats以来的统计
+        self.received_bytes = 0  # 接收的字节数
+        self.dropped_bytes = 0  # 输入队列溢出丢弃的字节数
+        self.dropped_results = 0  # 待提交队列溢出丢弃的条数
+
+    def set_batch_options(self, max_batch_size, max_batch_delay):
+        """
+        设置批量提交参数
+
+        Args:
+            max_batch_size (int): 每批最多的结果条数
+            max_batch_delay (int): 结果最长等待时间(ms)
+        """
+        with self.condition:
+            self.max_batch_size = max(1, max_batch_size)
+            self.max_batch_delay = max(0, max_batch_delay)
+            self.condition.notify()
+
+    def add_frame_observer(self, observer):
+        """
+        添加报文观察者，每帧分帧完成后在本线程中调用，不能阻塞
+
+        Args:
+            observer (callable): observer(message, arrival_ns)，arrival_ns为报文最后一块数据到达的单调时钟时间
+        """
+        if observer not in self.frame_observers:
+            self.frame_observers = self.frame_observers + [observer]
+
+    def remove_frame_observer(self, observer):
+        """移除报文观察者"""
+        self.frame_observers = [item for item in self.frame_observers if item != observer]
+
+    def put_data(self, data):
+        """
+        接收线程提交数据，不会阻塞
+
+        Args:
+            data (bytes): 接收到的数据
+        """
+        arrival_ns = time.monotonic_ns()
+        with self.condition:
+            self.input_queue.append((arrival_ns, data))
+            self.pending_bytes += len(data)
+
+            # 超出上限时丢弃最旧的数据块（至少保留刚提交的数据）
+            while self.pending_bytes > self.max_pending_bytes and len(self.input_queue) > 1:
+                _, dropped = self.input_queue.popleft()
+                self.pending_bytes -= len(dropped)
+                self.dropped_bytes += len(dropped)
+                self.received_bytes += len(dropped)
+
+            self.condition.notify()
+
+    def queue_full(self):
+        """put_data_wait是否需要等待，调用时需持有锁"""
+        return self.is_running and (self.pending_bytes > self.max_pending_bytes // 16 or
+                                    len(self.results) > self.max_pending_results // 2)
+
+    def put_data_wait(self, data, timeout=None):
+        """
+        提交数据，队列积压较多时等待，用于录制回放等可以暂停的数据源
+
+        Args:
+            data (bytes): 数据
+            timeout (float): 最长等待秒数，None表示一直等待
+
+        Returns:
+            bool: 是否已提交，超时未提交时返回False
+        """
+        with self.condition:
+            if not self.space_available.wait_for(lambda: not self.queue_full(), timeout):
+                return False
+        self.put_data(data)
+        return True
+
+    def batch_done(self):
+        """界面线程处理完一批结果后调用"""
+        with self.condition:
+            self.inflight_batches = max(0, self.inflight_batches - 1)
+            self.condition.notify()
+
+    def take_stats(self):
+        """
+        取出自上次调用以来的统计
+
+        Returns:
+            tuple: (received_bytes, dropped_bytes, dropped_results)
+        """
+        with self.condition:
+            stats = (self.received_bytes, self.dropped_bytes, self.dropped_results)
+            self.received_bytes = self.dropped_bytes = self.dropped_results = 0
+        return stats
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.is_running and not self.input_queue:
+                    timeout = self.flush_timeout()
+                    if timeout == 0:
+                        break
+                    self.condition.wait(timeout)
+
+                chunks = list(self.input_queue)
+                self.input_queue.clear()
+                self.pending_bytes = 0
+                finished = not self.is_running and not chunks
+                self.space_available.notify_all()
+
+            if chunks:
+                try:
+                    self.post_results(*self.process_chunks(chunks))
+                except Exception as e:
+                    log_debug(f"接收处理错误: {str(e)}")
+
+            # 停止时不受未确认批次数限制，全部提交
+            for batch in self.take_batches(force=finished):
+                self.results_batch.emit(batch)
+
+            if finished:
+                break
+
+    def flush_timeout(self):
+        """
+        计算距离下一次提交的等待时间，调用时需持有锁
+
+        Returns:
+            float: 等待秒数，0表示应立即提交，None表示无需定时
+        """
+        if not self.results or self.inflight_batches >= self.max_inflight_batches:
+            return None
+        if len(self.results) >= self.max_batch_size:
+            return 0
+        remaining = self.first_result_time + self.max_batch_delay / 1000.0 - time.monotonic()
+        return max(remaining, 0)
+
+    def take_batches(self, force=False):
+        """
+        取出可以提交的批次
+
+        Args:
+            force (bool): 是否忽略延迟和未确认批次数，取出全部结果
+
+        Returns:
+            list: 批次列表
+        """
+        batches = []
+        with self.condition:
+            while self.results and (force or self.flush_timeout() == 0):
+                size = min(len(self.results), self.max_batch_size)
+                batches.append([self.results.popleft() for _ in range(size)])
+                self.inflight_batches += 1
+                if self.results:
+                    # 剩余结果视为已超时，尽快提交
+                    self.first_result_time = 0.0
+            if batches:
+                self.space_available.notify_all()
+        return batches
+
+    def process_chunks(self, chunks):
+        """
+        分帧并解析一批数据块
+
+        Args:
+            chunks (list): [(arrival_ns, data)] 数据块列表
+
+        Returns:
+            tuple: (results, received_bytes)
+        """
+        results = []
+        received_bytes = 0
+        parse_enabled = self.parse_enabled
+        extract = self.message_receiver.extract
+        decode_message = self.protocol_parser.decode_message
+        frame_observers = self.frame_observers
+        echo_filter = self.echo_filter
+
+        for arrival_ns, data in chunks:
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+            received_bytes += len(data)
+            if echo_filter is not None:
+                data = echo_filter.filter(data, arrival_ns)
+                if not data:
+                    continue
+            results.append((RESULT_DATA, timestamp, data))
+
+            if not parse_enabled and not frame_observers:
+                continue
+
+            for message, crc_ok in extract(data):
+                if crc_ok:
+                    for observer in frame_observers:
+                        observer(message, arrival_ns)
+                    if parse_enabled:
+                        protocol_id, parsed_data = decode_message(message)
+                        results.append((RESULT_FRAME, timestamp, message, protocol_id, parsed_data))
+                elif parse_enabled:
+                    results.append((RESULT_CRC_ERROR, timestamp, message))
+
+        return results, received_bytes
+
+    def post_results(self, results, received_bytes):
+        """
+        把结果放入待提交队列
+
+        Args:
+            results (list): 结果列表
+            received_bytes (int): 接收的字节数
+        """
+        with self.condition:
+            if not self.results:
+                self.first_result_time = time.monotonic()
+            self.results.extend(results)
+            self.received_bytes += received_bytes
+
+            overflow = len(self.results) - self.max_pending_results
+            if overflow > 0:
+                for _ in range(overflow):
+                    self.results.popleft()
+                self.dropped_results += overflow
+
+    def start(self, *args, **kwargs):
+        with self.condition:
+            self.is_running = True
+            self.inflight_batches = 0
+        super().start(*args, **kwargs)
+
+    def stop(self):
+        """停止线程，输入队列中剩余的数据处理完并全部提交后退出"""
+        with self.condition:
+            self.is_running = False
+            self.condition.notify()
+            self.space_available.notify_all()
+        self.wait()
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 录制回放工具，不依赖Qt，把原始数据录制文件(.ydcap)中的接收数据按原始时间、N倍速或不限速重新送入分帧和解码，
+              可以同时从串口发出
+
+用法:
+    python replay.py capture.ydcap [--speed 1|N|max] [--config YD-G392.ini] [--port COM5[:波特率]]
+                     [--port-id 0] [--direction rx|tx] [--no-decode] [--print]
+
+按录制时的单调时钟间隔回放，--speed 2表示2倍速，--speed max表示不限速（吞吐量测试）。指定--port时
+数据块同时写入该串口（真实串口或虚拟串口），未指定波特率时使用录制文件头中的波特率。
+结束后在标准错误输出回放的数据量、帧数和端到端的帧/秒。
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+
+import serial
+
+from capture import configure_logging, parse_port_spec
+from raw_capture import iter_capture_records, read_capture_header, DIR_RX, DIR_TX
+
+SPEED_MAX = 0  # 不限速
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'YD-G392.ini')
+
+
+def parse_speed(text):
+    """
+    解析回放速度
+
+    Args:
+        text (str): "max"或倍数
+
+    Returns:
+        float: 倍数，SPEED_MAX表示不限速
+    """
+    if text.lower() in ('max', '0'):
+        return SPEED_MAX
+    speed = float(text)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("速度必须大于0，或为max")
+    return speed
+
+
+class CaptureReplayer:
+    """
+    录制回放
+
+    run在调用线程中依次读出录制文件中的数据块，按录制时的单调时钟间隔除以speed等待后调用callback，
+    speed为SPEED_MAX时不等待。callback阻塞（例如写入串口、等待下游处理）会推迟后续数据块，
+    推迟的时间计入滞后统计，之后的数据块仍按原时间表追赶。
+    """
+
+    def __init__(self, path, speed=1.0, direction=DIR_RX, port_id=None):
+        """
+        Args:
+            path (str): 录制文件路径
+            speed (float): 回放倍速，SPEED_MAX表示不限速
+            direction (int): 回放的方向 (DIR_RX/DIR_TX)，None表示全部
+            port_id (int): 只回放该串口编号的数据，None表示全部
+        """
+        self.path = path
+        self.speed = speed
+        self.direction = direction
+        self.port_id = port_id
+        self.stop_event = threading.Event()
+        with open(path, 'rb') as f:
+            self.header = read_capture_header(f)
+
+        self.chunks = 0  # 已回放的数据块数
+        self.bytes = 0  # 已回放的字节数
+        self.max_lag_ms = 0.0  # 数据块晚于计划时间的最大值
+
+    def stop(self):
+        """停止回放，可以在其他线程中调用"""
+        self.stop_event.set()
+
+    def run(self, callback):
+        """
+        回放直到文件结束或stop
+
+        Args:
+            callback (callable): callback(data)，在本线程中调用
+
+        Returns:
+            bool: 是否回放到文件结束
+        """
+        self.stop_event.clear()
+        speed = self.speed
+        first_ns = None
+        start = time.perf_counter()
+        with open(self.path, 'rb', buffering=1 << 20) as f:
+            for record in iter_capture_records(f, self.direction):
+                if self.stop_event.is_set():
+                    return False
+                if self.port_id is not None and record.port_id != self.port_id:
+                    continue
+
+                if speed != SPEED_MAX:
+                    if first_ns is None:
+                        first_ns = record.mono_ns
+                    target = start + (record.mono_ns - first_ns) / 1e9 / speed
+                    delay = target - time.perf_counter()
+                    if delay > 0 and self.stop_event.wait(delay):
+                        return False
+                    self.max_lag_ms = max(self.max_lag_ms, (time.perf_counter() - target) * 1000)
+
+                callback(record.data)
+                self.chunks += 1
+                self.bytes += len(record.data)
+        return True
+
+
+def open_output_port(spec, header, port_id):
+    """
+    打开回放输出串口
+
+    Args:
+        spec (str): "串口"或"串口:波特率"
+        header (dict): 录制文件头，未指定波特率时使用其中记录的串口参数
+        port_id (int): 回放的串口编号
+
+    Returns:
+        serial.Serial: 串口对象
+    """
+    ports = header.get('ports') or [{}]
+    port_info = ports[port_id] if port_id is not None and port_id < len(ports) else ports[0]
+    name, baudrate = parse_port_spec(spec, port_info.get('baudrate') or 9600)
+    kwargs = {key: port_info[key] for key in ('bytesize', 'parity', 'stopbits')
+              if isinstance(port_info.get(key), (int, float, str))}
+    if isinstance(kwargs.get('parity'), str) and len(kwargs['parity']) != 1:
+        kwargs.pop('parity')
+    return serial.serial_for_url(name, baudrate=baudrate, timeout=0.1, **kwargs)
+
+
+def load_protocols(config_path):
+    """
+    加载配置文件中的协议
+
+    Returns:
+        dict: 协议信息字典，加载失败返回None
+    """
+    from config_parser import ConfigParser
+
+    config_parser = ConfigParser(interactive=False)
+    if not os.path.exists(config_path):
+        print(f"配置文件不存在: {config_path}", file=sys.stderr)
+        return None
+    loaded = config_parser.load_config(config_path)
+    for error in config_parser.get_validation_errors():
+        print(error, file=sys.stderr)
+    if not loaded:
+        print(f"加载配置文件失败: {config_path}", file=sys.stderr)
+        return None
+    return config_parser.get_protocols()
+
+
+def replay(args, protocols):
+    """
+    回放直到文件结束或停止
+
+    Returns:
+        int: 退出码
+    """
+    from engine import SerialEngine
+
+    direction = {'rx': DIR_RX, 'tx': DIR_TX}[args.direction]
+    replayer = CaptureReplayer(args.capture, args.speed, direction, args.port_id)
+    engine = SerialEngine(protocols, decode=not args.no_decode)
+    if args.print:
+        engine.add_frame_callback(
+            lambda frame: print(f"{frame.protocol_id or '-'}\t{frame.message.hex(' ').upper()}"))
+
+    output = None
+    if args.port:
+        try:
+            output = open_output_port(args.port, replayer.header, args.port_id)
+        except Exception as e:
+            print(f"打开串口 {args.port} 失败: {str(e)}", file=sys.stderr)
+            return 2
+
+    def on_chunk(data):
+        if output is not None:
+            output.write(data)
+        engine.feed(data)
+
+    signal.signal(signal.SIGINT, lambda signum, frame: replayer.stop())
+    speed_text = "不限速" if args.speed == SPEED_MAX else f"{args.speed:g}倍速"
+    print(f"回放: {args.capture} ({speed_text})" + (f" -> {output.port}" if output else ""), file=sys.stderr)
+
+    start = time.perf_counter()
+    try:
+        finished = replayer.run(on_chunk)
+        if output is not None:
+            output.flush()
+    except BrokenPipeError:
+        finished = False
+    finally:
+        if output is not None:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    stats = engine.stats()
+    rate = stats['frames'] / elapsed if elapsed > 0 else 0
+    print(f"{'结束' if finished else '已停止'}: {elapsed:.3f} 秒，{replayer.chunks} 块 {replayer.bytes} 字节 "
+          f"({replayer.bytes / elapsed / 1024 / 1024 if elapsed > 0 else 0:.2f} MB/s)", file=sys.stderr)
+    print(f"  {stats['frames']} 帧，{rate:.0f} 帧/秒，CRC错误 {stats['crc_errors']}，未识别 {stats['unknown']}"
+          + (f"，最大滞后 {replayer.max_lag_ms:.1f} ms" if args.speed != SPEED_MAX else ""), file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="原始数据录制回放(命令行，不依赖Qt)")
+    parser.add_argument('capture', help="录制文件(.ydcap)")
+    parser.add_argument('--speed', type=parse_speed, default=1.0, help="回放倍速，max表示不限速")
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help="INI配置文件")
+    parser.add_argument('--port', help="同时写入该串口，可写作 串口:波特率")
+    parser.add_argument('--port-id', type=int, help="只回放该串口编号的数据，默认全部")
+    parser.add_argument('--direction', default='rx', choices=('rx', 'tx'), help="回放的方向")
+    parser.add_argument('--no-decode', action='store_true', help="只分帧，不按协议解码")
+    parser.add_argument('--print', action='store_true', help="每帧在标准输出打印一行")
+    parser.add_argument('--verbose', action='store_true', help="在标准错误输出调试日志")
+    args = parser.parse_args(argv)
+
+    configure_logging(args.verbose)
+
+    try:
+        with open(args.capture, 'rb') as f:
+            read_capture_header(f)
+    except (OSError, ValueError) as e:
+        print(f"无法读取录制文件 {args.capture}: {str(e)}", file=sys.stderr)
+        return 2
+
+    protocols = load_protocols(args.config)
+    if protocols is None:
+        return 2
+    return replay(args, protocols)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 周期调度模块，在独立线程中按最小堆中最早的截止时间触发周期任务，周期锚定在绝对时间上不累积漂移
+"""
+
+import heapq
+import itertools
+import math
+import operator
+import threading
+import time
+from log_manager import log_debug
+
+NS_PER_MS = 1000000
+
+
+class JitterStats:
+    """
+    周期任务的抖动统计
+
+    抖动为实际触发时间减去计划触发时间（纳秒，总是不小于0）。
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清零统计"""
+        self.count = 0  # 触发次数
+        self.total_ns = 0
+        self.total_sq = 0
+        self.min_ns = 0
+        self.max_ns = 0
+        self.missed = 0  # 因延迟过大而跳过的周期数
+
+    def add(self, lateness_ns):
+        """
+        记录一次触发
+
+        Args:
+            lateness_ns (int): 实际触发时间与计划时间之差(ns)
+        """
+        if self.count == 0 or lateness_ns < self.min_ns:
+            self.min_ns = lateness_ns
+        if lateness_ns > self.max_ns:
+            self.max_ns = lateness_ns
+        self.count += 1
+        self.total_ns += lateness_ns
+        self.total_sq += lateness_ns * lateness_ns
+
+    @classmethod
+    def merged(cls, stats_list):
+        """
+        合并多个统计
+
+        Args:
+            stats_list (list): JitterStats列表
+
+        Returns:
+            JitterStats: 合并后的统计
+        """
+        result = cls()
+        for stats in stats_list:
+            if not stats.count:
+                result.missed += stats.missed
+                continue
+            if result.count == 0 or stats.min_ns < result.min_ns:
+                result.min_ns = stats.min_ns
+            result.max_ns = max(result.max_ns, stats.max_ns)
+            result.count += stats.count
+            result.total_ns += stats.total_ns
+            result.total_sq += stats.total_sq
+            result.missed += stats.missed
+        return result
+
+    def snapshot(self):
+        """
+        获取统计结果
+
+        Returns:
+            dict: {count, missed, mean_ms, stdev_ms, min_ms, max_ms}
+        """
+        count = self.count
+        if count == 0:
+            return {'count': 0, 'missed': self.missed, 'mean_ms': 0.0, 'stdev_ms': 0.0, 'min_ms': 0.0, 'max_ms': 0.0}
+
+        mean = self.total_ns / count
+        variance = max(self.total_sq / count - mean * mean, 0.0)
+        return {
+            'count': count,
+            'missed': self.missed,
+            'mean_ms': mean / NS_PER_MS,
+            'stdev_ms': math.sqrt(variance) / NS_PER_MS,
+            'min_ms': self.min_ns / NS_PER_MS,
+            'max_ms': self.max_ns / NS_PER_MS,
+        }
+
+
+class ScheduledTask:
+    """调度器中的一个周期任务"""
+
+    def __init__(self, key, interval_ns, callback, offset_ns=0):
+        self.key = key
+        self.interval_ns = interval_ns
+        self.offset_ns = offset_ns  # 相位偏移，计划触发时间为 纪元 + 偏移 + k × 周期
+        self.callback = callback  # callback(key)，在调度线程中调用
+        self.next_deadline = 0  # 下一次计划触发时间(monotonic_ns)
+        self.generation = 0  # 每次重新排期加1，堆中旧的条目据此作废
+        self.stats = JitterStats()
+
+
+class PeriodicScheduler:
+    """
+    周期调度器
+
+    不依赖Qt。所有任务的下一次截止时间保存在一个最小堆中，调度线程只等待堆顶的截止时间，
+    任务数量不影响唤醒次数。时间使用time.monotonic_ns()，不受系统时间调整影响。
+
+    第k次触发的计划时间为 纪元 + 相位偏移 + k × 周期，与实际触发时间无关，因此单次延迟不会累积成漂移。
+    纪元为调度线程启动的时间，所有任务共用，相位偏移（见assign_phase_offsets）因此在任务之间保持不变。
+    延迟超过一个周期时跳过已错过的周期并计数，不会连续补发。
+    """
+
+    def __init__(self, name="PeriodicScheduler"):
+        """
+        初始化调度器
+
+        Args:
+            name (str): 调度线程名称
+        """
+        self.name = name
+        self.condition = threading.Condition()
+        self.tasks = {}  # {key: ScheduledTask}
+        self.heap = []  # [(deadline_ns, seq, generation, task)]
+        self.sequence = itertools.count()  # 截止时间相同时按加入顺序触发
+        self.thread = None
+        self.is_running = False
+        self.epoch_ns = time.monotonic_ns()  # 所有任务共用的时间原点
+
+    def schedule(self, key, interval_ms, callback, offset_ms=0):
+        """
+        添加或更新周期任务
+
+        任务已存在且周期、相位偏移不变时保持原有排期，只更新回调；
+        否则从当前时间之后第一个满足 纪元 + 偏移 + k × 周期 的时刻起重新排期。
+
+        Args:
+            key: 任务标识
+            interval_ms (float): 周期(ms)
+            callback (callable): 触发时调用 callback(key)
+            offset_ms (float): 相位偏移(ms)
+        """
+        interval_ns = max(1, int(interval_ms * NS_PER_MS))
+        offset_ns = int(offset_ms * NS_PER_MS) % interval_ns
+        with self.condition:
+            task = self.tasks.get(key)
+            if task is not None and task.interval_ns == interval_ns and task.offset_ns == offset_ns:
+                task.callback = callback
+                return
+
+            if task is None:
+                task = self.tasks[key] = ScheduledTask(key, interval_ns, callback, offset_ns)
+            else:
+                task.interval_ns = interval_ns
+                task.offset_ns = offset_ns
+                task.callback = callback
+                task.stats.reset()
+
+            self._push(task, self._first_deadline(task, time.monotonic_ns()))
+
+    def offset(self, key):
+        """
+        获取任务的相位偏移
+
+        Args:
+            key: 任务标识
+
+        Returns:
+            float: 相位偏移(ms)，任务不存在时返回None
+        """
+        task = self.tasks.get(key)
+        return task.offset_ns / NS_PER_MS if task is not None else None
+
+    def _first_deadline(self, task, now):
+        """计算不早于now的第一个计划触发时间"""
+        anchor = self.epoch_ns + task.offset_ns
+        if now <= anchor:
+            return anchor
+        return anchor + -(-(now - anchor) // task.interval_ns) * task.interval_ns
+
+    def remove(self, key):
+        """
+        移除周期任务
+
+        Args:
+            key: 任务标识
+        """
+        with self.condition:
+            task = self.tasks.pop(key, None)
+            if task is not None:
+                # 堆中的条目在出堆时作废
+                task.generation += 1
+
+    def keys(self):
+        """
+        获取所有任务标识
+
+        Returns:
+            list: 任务标识列表
+        """
+        with self.condition:
+            return list(self.tasks)
+
+    def stats(self, key):
+        """
+        获取任务的抖动统计
+
+        Args:
+            key: 任务标识
+
+        Returns:
+            dict: 见JitterStats.snapshot，任务不存在时返回None
+        """
+        task = self.tasks.get(key)
+        return task.stats.snapshot() if task is not None else None
+
+    def reset_stats(self):
+        """清零所有任务的抖动统计"""
+        with self.condition:
+            for task in self.tasks.values():
+                task.stats.reset()
+
+    def _push(self, task, deadline):
+        """按截止时间排期，调用时需持有锁"""
+        task.generation += 1
+        task.next_deadline = deadline
+        heapq.heappush(self.heap, (deadline, next(self.sequence), task.generation, task))
+        self.condition.notify()
+
+    def start(self):
+        """启动调度线程，以当前时间为纪元重新排期所有任务"""
+        with self.condition:
+            if self.is_running:
+                return
+            self.is_running = True
+
+            self.epoch_ns = time.monotonic_ns()
+            self.heap = []
+            for task in self.tasks.values():
+                task.stats.reset()
+                self._push(task, self.epoch_ns + task.offset_ns)
+
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止调度线程，等待正在执行的回调结束"""
+        with self.condition:
+            self.is_running = False
+            self.condition.notify()
+
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.thread = None
+
+    def run(self):
+        while True:
+            with self.condition:
+                heap = self.heap
+                while self.is_running:
+                    # 丢弃已作废的条目
+                    while heap and heap[0][2] != heap[0][3].generation:
+                        heapq.heappop(heap)
+
+                    if not heap:
+                        self.condition.wait()
+                        continue
+
+                    wait_ns = heap[0][0] - time.monotonic_ns()
+                    if wait_ns > 0:
+                        self.condition.wait(wait_ns / 1e9)
+                        continue
+
+                    deadline, _, _, task = heapq.heappop(heap)
+                    break
+
+                if not self.is_running:
+                    return
+
+                # 下一次计划时间锚定在本次计划时间上，已错过的周期直接跳过
+                now = time.monotonic_ns()
+                interval = task.interval_ns
+                missed = (now - deadline) // interval
+                task.stats.missed += missed
+                self._push(task, deadline + (missed + 1) * interval)
+                callback = task.callback
+                key = task.key
+
+            # 在锁外调用回调，回调中可以修改排期
+            task.stats.add(time.monotonic_ns() - deadline)
+            try:
+                callback(key)
+            except Exception as e:
+                log_debug(f"周期任务 {key} 执行错误: {str(e)}")
+
+
+def schedule_horizon(intervals, max_horizon=10000):
+    """
+    计算一组周期的超周期（最小公倍数），超过上限时取上限
+
+    Args:
+        intervals (list): 周期列表（整数）
+        max_horizon (int): 上限
+
+    Returns:
+        int: 超周期
+    """
+    horizon = 1
+    for interval in intervals:
+        horizon = horizon * interval // math.gcd(horizon, interval)
+        if horizon >= max_horizon:
+            return max_horizon
+    return horizon
+
+
+def assign_phase_offsets(tasks, fixed=None, resolution_ms=1, max_horizon_ms=10000):
+    """
+    为周期任务分配相位偏移，使线路占用在时间上尽量均匀
+
+    在超周期上按resolution_ms划分时间格，统计每格已被占用的线路时间。按周期从短到长（周期相同时
+    占用长的优先）逐个放置任务，每个任务在[0, 周期)内选择偏移：
+    1. 首先使各次触发所在时间格的最大已占用量最小（尽量不与已有报文重叠）；
+    2. 其次使各次触发与已有报文重叠的总量最小；
+    3. 再次使与已有报文的最小距离最大（落在最大空隙的中间，同周期的报文均匀分布）；
+    4. 最后取较小的偏移。
+    已在fixed中的任务保持原偏移，只参与占用统计，新启用报文时已有报文的相位不会跳变。
+    超周期超过max_horizon_ms时按上限截断，结果是近似的。
+    每个任务的计算量与时间格数成正比，与占用时间基本无关，可以在界面线程中调用。
+
+    Args:
+        tasks (list): [(key, interval_ms, slot_ms)]，slot_ms为每次触发占用线路的时间
+        fixed (dict): 保持不变的偏移 {key: offset_ms}
+        resolution_ms (float): 时间格宽度(ms)
+        max_horizon_ms (int): 超周期上限(ms)
+
+    Returns:
+        dict: {key: offset_ms}
+    """
+    fixed = fixed or {}
+    if not tasks:
+        return {}
+
+    # 周期、占用时间换算为时间格数，占用量按整数纳秒累计，比较时没有浮点误差
+    entries = []
+    for key, interval_ms, slot_ms in tasks:
+        step = max(1, int(round(interval_ms / resolution_ms)))
+        width = max(1, int(math.ceil(slot_ms / resolution_ms)))
+        share = max(1, int(round(slot_ms * NS_PER_MS / width)))
+        entries.append((key, step, width, share))
+
+    horizon = schedule_horizon([step for _, step, _, _ in entries], max(1, int(max_horizon_ms / resolution_ms)))
+    occupancy = [0] * horizon
+
+    def occupy(start, step, width, share):
+        for first in range(start, horizon, step):
+            for index in range(first, first + width):
+                occupancy[index % horizon] += share
+
+    offsets = {}
+    pending = []
+    for key, step, width, share in entries:
+        if key in fixed:
+            start = int(round(fixed[key] / resolution_ms)) % step
+            occupy(start, step, width, share)
+            offsets[key] = fixed[key]
+        else:
+            pending.append((key, step, width, share))
+
+    pending.sort(key=lambda entry: (entry[1], -entry[2]))
+    for key, step, width, share in pending:
+        # 从每个时间格开始放置时覆盖范围内的最大占用量和总占用量
+        window_max, window_sum = _window_stats(occupancy, width)
+        scores = [(max(window_max[start::step]), sum(window_sum[start::step])) for start in range(step)]
+        best = min(scores)
+        starts = [start for start, score in enumerate(scores) if score == best]
+
+        # 只有前两项相同时才需要比较与已有报文的距离
+        if len(starts) > 1:
+            distance = _distance_to_occupied(occupancy)
+            start = min(starts, key=lambda start: (-min(distance[start::step]), start))
+        else:
+            start = starts[0]
+        occupy(start, step, width, share)
+        offsets[key] = start * resolution_ms
+    return offsets
+
+
+def _window_stats(occupancy, width):
+    """
+    计算从每个时间格开始、宽度为width的循环窗口内的最大值和总和
+
+    总和由前缀和相减得到；最大值先按宽度翻倍逐次对错开的数组取最大，再用两个重叠的窗口拼出任意宽度，
+    每个时间格只做O(log width)次比较。
+
+    Args:
+        occupancy (list): 每格的占用量
+        width (int): 窗口宽度（格数）
+
+    Returns:
+        tuple: (window_max, window_sum) 均按起始时间格排列
+    """
+    horizon = len(occupancy)
+    length = horizon + width - 1
+    # 展开为线性数组，窗口超过一圈时重复多次
+    extended = (occupancy * (-(-length // horizon)))[:length]
+
+    prefix = [0]
+    prefix.extend(itertools.accumulate(extended))
+    window_sum = list(map(operator.sub, prefix[width:width + horizon], prefix[:horizon]))
+
+    if width == 1:
+        return list(occupancy), window_sum
+
+    # covered[i]为从i开始、宽度为span的窗口内的最大值
+    covered = extended
+    span = 1
+    while span * 2 <= width:
+        covered = [a if a >= b else b for a, b in zip(covered, covered[span:])]
+        span *= 2
+    window_max = [a if a >= b else b for a, b in zip(covered[:horizon], covered[width - span:width - span + horizon])]
+    return window_max, window_sum
+
+
+def _distance_to_occupied(occupancy):
+    """
+    计算每个时间格到最近的已占用时间格的距离（循环）
+
+    Args:
+        occupancy (list): 每格的占用量
+
+    Returns:
+        list: 距离，没有已占用时间格时均为格数
+    """
+    horizon = len(occupancy)
+    first = next((index for index, value in enumerate(occupancy) if value), None)
+    if first is None:
+        return [horizon] * horizon
+
+    # 从第一个已占用时间格开始转一圈，每段空闲时间格两端都是已占用的时间格，按到两端的较近距离填充
+    distance = []
+    for occupied, group in itertools.groupby(occupancy[first:] + occupancy[:first], bool):
+        length = sum(1 for _ in group)
+        if occupied:
+            distance.extend([0] * length)
+        else:
+            distance.extend(map(min, range(1, length + 1), range(length, 0, -1)))
+    return distance[horizon - first:] + distance[:horizon - first]
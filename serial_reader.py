@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 串口读取模块，不依赖Qt，按阻塞或轮询方式读取串口，把读到的数据块交给回调
+"""
+
+import os
+import select
+import time
+from log_manager import log_debug
+
+
+class SerialReader:
+    """
+    串口读取循环
+
+    read_loop在调用线程中循环读取直到stop，每读到一块数据调用一次callback(data)。
+    界面使用的SerialReceiveThread在QThread中运行本循环并把数据块转换为信号。
+    """
+
+    MODE_BLOCKING = 'blocking'  # 阻塞读取，数据到达即返回
+    MODE_POLLING = 'polling'  # 旧的轮询方式，每10ms检查一次
+
+    def __init__(self, serial_port, read_mode=MODE_BLOCKING, read_latency=2, max_chunk_size=4096):
+        """
+        Args:
+            serial_port (serial.Serial): 串口对象
+            read_mode (str): 接收模式 (MODE_BLOCKING/MODE_POLLING)
+            read_latency (int): 字节间隔超时(ms)，阻塞模式下收到数据后最多再等待该时长以合并后续字节，0表示立即上报
+            max_chunk_size (int): 单次上报的最大字节数
+        """
+        self.serial = serial_port
+        self.is_running = True
+        self.read_mode = read_mode
+        self.read_latency = read_latency
+        self.max_chunk_size = max_chunk_size
+        self.data_hooks = []  # 读到数据后在本线程中调用 hook(data, mono_ns)
+
+    def add_data_hook(self, hook):
+        """
+        添加数据钩子，每读到一块数据先调用钩子再调用callback，用于录制原始数据，不能阻塞
+
+        Args:
+            hook (callable): hook(data, mono_ns)
+        """
+        if hook not in self.data_hooks:
+            self.data_hooks = self.data_hooks + [hook]
+
+    def remove_data_hook(self, hook):
+        """移除数据钩子"""
+        self.data_hooks = [item for item in self.data_hooks if item != hook]
+
+    def read_loop(self, callback, error_callback=None):
+        """
+        循环读取直到stop或串口关闭
+
+        Args:
+            callback (callable): callback(data)，在本线程中调用
+            error_callback (callable): error_callback(exception)，出错时调用并结束循环，None时记录日志后继续读取
+        """
+        while self.is_running and self.serial and self.serial.isOpen():
+            try:
+                if self.read_mode == self.MODE_BLOCKING:
+                    data = self.read_blocking()
+                else:
+                    data = self.read_polling()
+
+                if data:
+                    if self.data_hooks:
+                        mono_ns = time.monotonic_ns()
+                        for hook in self.data_hooks:
+                            hook(data, mono_ns)
+                    callback(data)
+            except Exception as e:
+                if error_callback is not None:
+                    error_callback(e)
+                    break
+                log_debug(f"接收数据错误: {str(e)}")
+                # 出错时避免空转
+                time.sleep(0.01)
+
+    def read_polling(self):
+        """
+        轮询方式读取数据
+
+        Returns:
+            bytes: 读取到的数据
+        """
+        # 检查是否有可读取的数据
+        if self.serial.in_waiting:
+            return self.serial.read(self.serial.in_waiting)
+
+        # 防止CPU占用过高
+        time.sleep(0.01)
+        return b''
+
+    def read_blocking(self):
+        """
+        阻塞方式读取数据，阻塞在serial.read上直到首字节到达(最长为串口的timeout)，
+        之后在字节间隔超时内合并后续到达的字节
+
+        Returns:
+            bytes: 读取到的数据
+        """
+        data = self.serial.read(1)
+        if not data:
+            return b''
+
+        buffer = bytearray(data)
+        gap = self.read_latency / 1000.0
+        while self.is_running and len(buffer) < self.max_chunk_size:
+            waiting = self.serial.in_waiting
+            if waiting:
+                buffer.extend(self.serial.read(min(waiting, self.max_chunk_size - len(buffer))))
+                continue
+
+            if gap <= 0 or not self.wait_readable(gap):
+                break
+
+        return bytes(buffer)
+
+    def wait_readable(self, timeout):
+        """
+        等待串口可读
+
+        Args:
+            timeout (float): 超时时间(秒)
+
+        Returns:
+            bool: 超时前是否有数据到达
+        """
+        # Linux等平台直接在文件描述符上select
+        if os.name == 'posix' and hasattr(self.serial, 'fileno'):
+            ready, _, _ = select.select([self.serial.fileno()], [], [], timeout)
+            return bool(ready)
+
+        # 其他平台在间隔内以短周期检查
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if self.serial.in_waiting:
+                return True
+            time.sleep(0.0002)
+        return bool(self.serial.in_waiting)
+
+    def stop(self):
+        """停止读取，中断阻塞中的读取，避免等待串口超时"""
+        self.is_running = False
+
+        if hasattr(self.serial, 'cancel_read'):
+            try:
+                self.serial.cancel_read()
+            except Exception as e:
+                log_debug(f"中断串口读取错误: {str(e)}")
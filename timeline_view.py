@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+@Author     : T01284
+@Date       : 2025-05-10
+@Python     : 3.10
+@Description: 定时报文时间线模块，按周期和相位偏移绘制各报文的发送时刻以及线路占用
+"""
+
+import math
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QColor, QPainter, QPen, QBrush
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QWidget, QScrollArea, QSpinBox
+from scheduler import schedule_horizon
+
+# 报文行的颜色，按行循环使用
+ROW_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#17becf"]
+
+
+def compute_occupancy(entries, window_ms, resolution_ms=1.0):
+    """
+    计算时间窗口内每个时间格被占用的比例
+
+    Args:
+        entries (list): [(name, interval_ms, offset_ms, slot_ms)]
+        window_ms (float): 时间窗口(ms)
+        resolution_ms (float): 时间格宽度(ms)
+
+    Returns:
+        list: 每格的占用比例，大于1表示报文重叠
+    """
+    bins = max(1, int(window_ms / resolution_ms))
+    occupancy = [0.0] * bins
+    for name, interval_ms, offset_ms, slot_ms in entries:
+        if interval_ms <= 0:
+            continue
+        start = offset_ms
+        while start < window_ms:
+            # 把[start, start + slot_ms)按时间格拆分累加
+            end = start + slot_ms
+            first = int(start / resolution_ms)
+            last = max(first, int(math.ceil(end / resolution_ms)) - 1)
+            for index in range(first, last + 1):
+                portion = min(end, (index + 1) * resolution_ms) - max(start, index * resolution_ms)
+                if portion > 0:
+                    occupancy[index % bins] += portion / resolution_ms
+            start += interval_ms
+    return occupancy
+
+
+class ScheduleTimeline(QWidget):
+    """
+    定时报文时间线
+
+    每个报文一行，按周期和相位偏移绘制发送时刻，矩形宽度为报文占用线路的时间（含帧间隔）。
+    最下方一行为线路占用，超过100%（报文重叠）的部分为红色。
+    """
+
+    LABEL_WIDTH = 160
+    ROW_HEIGHT = 18
+    LOAD_HEIGHT = 48
+    AXIS_HEIGHT = 18
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []  # [(name, interval_ms, offset_ms, slot_ms)]
+        self.window_ms = 1000
+        self.occupancy = []
+        self.setMinimumHeight(self.AXIS_HEIGHT + self.LOAD_HEIGHT + 10)
+
+    def set_schedule(self, entries, window_ms):
+        """
+        设置要绘制的排期
+
+        Args:
+            entries (list): [(name, interval_ms, offset_ms, slot_ms)]
+            window_ms (float): 时间窗口(ms)
+        """
+        self.entries = list(entries)
+        self.window_ms = max(1, window_ms)
+        self.occupancy = compute_occupancy(self.entries, self.window_ms, self.resolution_ms())
+        self.setMinimumHeight(self.AXIS_HEIGHT + len(self.entries) * self.ROW_HEIGHT + self.LOAD_HEIGHT + 10)
+        self.update()
+
+    def resolution_ms(self):
+        """线路占用的时间格宽度，约为一个像素"""
+        plot_width = max(100, self.width() - self.LABEL_WIDTH - 10)
+        return max(0.1, self.window_ms / plot_width)
+
+    def peak_load(self):
+        """
+        获取时间窗口内的最大瞬时占用比例
+
+        Returns:
+            float: 最大占用比例
+        """
+        return max(self.occupancy) if self.occupancy else 0.0
+
+    def resizeEvent(self, event):
+        self.occupancy = compute_occupancy(self.entries, self.window_ms, self.resolution_ms())
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+
+        left = self.LABEL_WIDTH
+        plot_width = max(100, self.width() - left - 10)
+        scale = plot_width / self.window_ms
+
+        # 时间轴
+        painter.setPen(QPen(QColor("gray")))
+        tick_ms = self.tick_interval()
+        tick = 0.0
+        while tick <= self.window_ms:
+            x = left + tick * scale
+            painter.drawLine(int(x), self.AXIS_HEIGHT - 4, int(x), self.height())
+            painter.drawText(int(x) + 2, self.AXIS_HEIGHT - 6, f"{tick:g}")
+            tick += tick_ms
+
+        # 每个报文一行
+        for row, (name, interval_ms, offset_ms, slot_ms) in enumerate(self.entries):
+            top = self.AXIS_HEIGHT + row * self.ROW_HEIGHT
+            painter.setPen(QPen(Qt.black))
+            painter.drawText(QRectF(4, top, left - 8, self.ROW_HEIGHT), Qt.AlignVCenter | Qt.AlignLeft,
+                             f"{name} ({interval_ms}ms +{offset_ms:g})")
+
+            color = QColor(ROW_COLORS[row % len(ROW_COLORS)])
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QBrush(color))
+            width = max(1.0, slot_ms * scale)
+            start = offset_ms
+            while interval_ms > 0 and start < self.window_ms:
+                painter.drawRect(QRectF(left + start * scale, top + 3, width, self.ROW_HEIGHT - 6))
+                start += interval_ms
+
+        # 线路占用
+        top = self.AXIS_HEIGHT + len(self.entries) * self.ROW_HEIGHT + 4
+        painter.setPen(QPen(Qt.black))
+        painter.drawText(QRectF(4, top, left - 8, self.LOAD_HEIGHT), Qt.AlignVCenter | Qt.AlignLeft,
+                         f"线路占用 (峰值 {self.peak_load() * 100:.0f}%)")
+        painter.drawLine(left, top + self.LOAD_HEIGHT, left + plot_width, top + self.LOAD_HEIGHT)
+
+        if self.occupancy:
+            bin_width = plot_width / len(self.occupancy)
+            painter.setPen(Qt.NoPen)
+            for index, value in enumerate(self.occupancy):
+                if value <= 0:
+                    continue
+                height = min(value, 1.0) * (self.LOAD_HEIGHT - 4)
+                # 浮点累加误差不算重叠
+                painter.setBrush(QBrush(QColor("red" if value > 1.0 + 1e-6 else "gray")))
+                painter.drawRect(QRectF(left + index * bin_width, top + self.LOAD_HEIGHT - height,
+                                        max(1.0, bin_width), height))
+        painter.end()
+
+    def tick_interval(self):
+        """时间轴刻度间隔，约10个刻度"""
+        raw = self.window_ms / 10
+        for tick in (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000):
+            if tick >= raw:
+                return tick
+        return raw
+
+
+class TimelineDialog(QDialog):
+    """定时报文时间线对话框，非模态，排期变化时由定时报文管理器刷新"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("定时报文时间线")
+        self.resize(900, 400)
+        self.entries = []
+
+        layout = QVBoxLayout(self)
+
+        option_layout = QHBoxLayout()
+        option_layout.addWidget(QLabel("时间窗口(ms):"))
+        self.window_spin = QSpinBox()
+        self.window_spin.setRange(0, 60000)
+        self.window_spin.setSpecialValueText("超周期")
+        self.window_spin.setValue(0)
+        self.window_spin.setToolTip("0表示显示一个超周期（所有间隔的最小公倍数，最多10秒）")
+        self.window_spin.valueChanged.connect(self.refresh)
+        option_layout.addWidget(self.window_spin)
+        self.summary_label = QLabel()
+        option_layout.addWidget(self.summary_label)
+        option_layout.addStretch()
+        layout.addLayout(option_layout)
+
+        self.timeline = ScheduleTimeline()
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setWidget(self.timeline)
+        layout.addWidget(scroll_area)
+
+    def set_schedule(self, entries):
+        """
+        设置排期
+
+        Args:
+            entries (list): [(name, interval_ms, offset_ms, slot_ms)]
+        """
+        self.entries = entries
+        self.refresh()
+
+    def refresh(self):
+        """按当前时间窗口重新绘制"""
+        window_ms = self.window_spin.value()
+        if not window_ms:
+            intervals = [int(interval_ms) for _, interval_ms, _, _ in self.entries if interval_ms > 0]
+            window_ms = schedule_horizon(intervals) if intervals else 1000
+
+        self.timeline.set_schedule(self.entries, window_ms)
+        self.summary_label.setText(f"报文数: {len(self.entries)}    峰值瞬时占用: {self.timeline.peak_load() * 100:.0f}%")
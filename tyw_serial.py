@@ -12,12 +12,13 @@ import time
 import json
 from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QLabel, QComboBox, QPushButton, QTextEdit, QLineEdit,
+                             QLabel, QComboBox, QPushButton, QLineEdit,
                              QGridLayout, QGroupBox, QCheckBox, QSpinBox, QSplitter,
                              QTabWidget, QFileDialog, QMessageBox, QStatusBar, QTableWidget,
-                             QTableWidgetItem, QHeaderView, QAbstractItemView, QDialog)
+                             QTableWidgetItem, QHeaderView, QAbstractItemView, QDialog, QTableView,
+                             QDoubleSpinBox, QInputDialog)
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
-from PyQt5.QtGui import QColor, QBrush, QTextCharFormat, QFont, QIcon
+from PyQt5.QtGui import QColor, QBrush, QIcon
 import serial
 import serial.tools.list_ports
 from log_manager import LogManager, log_debug, log_info, log_error, log_exception
@@ -28,56 +29,120 @@ LogManager(log_dir='logs', file_name='tyw_serial.log', console_level='DEBUG', fi
 from config_parser import ConfigParser
 from protocol_ui_generator import ProtocolUIGenerator
 from protocol_parser import ProtocolParser
-from message_transceiver import MessageSender, MessageReceiver, TimedMessage
+from message_transceiver import MessageSender, MessageReceiver, TimedMessage, PRIORITY_RESPONSE, PRIORITY_PERIODIC
+from scheduler import PeriodicScheduler, assign_phase_offsets
+from line_timing import LineTiming
+from receive_pipeline import ReceiveWorker, RESULT_DATA, RESULT_FRAME, RESULT_CRC_ERROR
+from message_table_model import GeneralMessageModel, ProtocolMessageModel, DEFAULT_RETENTION
+from log_view import CommLogView
+from timeline_view import TimelineDialog
+from correlator import ResponseCorrelator
+from correlation_view import CorrelationView
+from polling_view import PollingManager
+from echo_filter import EchoFilter
+from serial_reader import SerialReader
+from raw_capture import CaptureWriter, DIR_RX, DIR_TX, describe_port
+from replay import CaptureReplayer, SPEED_MAX
+
+
+class SerialReceiveThread(QThread, SerialReader):
+    """串口接收线程，在QThread中运行SerialReader的读取循环，读到的数据块通过信号发出"""
+    receive_signal = pyqtSignal(bytes)
 
+    def __init__(self, serial_port, read_mode=SerialReader.MODE_BLOCKING, read_latency=2, max_chunk_size=4096):
+        """
+        初始化接收线程
 
-class SerialReceiveThread(QThread):
-    """串口接收线程"""
-    receive_signal = pyqtSignal(bytes)
+        Args:
+            serial_port (serial.Serial): 串口对象
+            read_mode (str): 接收模式 (MODE_BLOCKING/MODE_POLLING)
+            read_latency (int): 字节间隔超时(ms)，阻塞模式下收到数据后最多再等待该时长以合并后续字节，0表示立即上报
+            max_chunk_size (int): 单次上报的最大字节数
+        """
+        # PyQt的多继承按关键字参数把构造参数转交给SerialReader
+        super().__init__(serial_port=serial_port, read_mode=read_mode, read_latency=read_latency,
+                         max_chunk_size=max_chunk_size)
+
+    def run(self):
+        self.read_loop(self.receive_signal.emit)
+
+    def stop(self):
+        SerialReader.stop(self)
+        self.wait()
 
-    def __init__(self, serial_port):
-        super().__init__()
-        self.serial = serial_port
-        self.is_running = True
+
+class CaptureReplayThread(QThread, CaptureReplayer):
+    """
+    录制回放线程，把录制文件中的接收数据像串口接收线程一样交给接收处理线程
+
+    通过ReceiveWorker.put_data_wait提交，接收处理线程积压较多时等待，不限速回放时速度受界面显示速度限制，
+    不会像实时接收那样因队列溢出而丢弃数据。
+    """
+    replay_done = pyqtSignal(bool)  # 回放结束，参数为是否回放到文件结束
+
+    def __init__(self, path, receive_worker, speed=1.0):
+        """
+        Args:
+            path (str): 录制文件路径
+            receive_worker (ReceiveWorker): 接收处理线程
+            speed (float): 回放倍速，SPEED_MAX表示不限速
+        """
+        super().__init__(path=path, speed=speed)
+        self.receive_worker = receive_worker
+        self.frames = 0  # 分帧得到的CRC正确的报文数
 
     def run(self):
-        while self.is_running and self.serial and self.serial.isOpen():
-            try:
-                # 检查是否有可读取的数据
-                if self.serial.in_waiting:
-                    data = self.serial.read(self.serial.in_waiting)
-                    if data:
-                        self.receive_signal.emit(data)
-            except Exception as e:
-                log_debug(f"接收数据错误: {str(e)}")
+        self.replay_done.emit(CaptureReplayer.run(self, self.put_data))
+
+    def put_data(self, data):
+        # 等待时定期检查是否已停止回放
+        while not self.receive_worker.put_data_wait(data, 0.1):
+            if self.stop_event.is_set():
+                return
 
-            # 防止CPU占用过高
-            self.msleep(10)
+    def count_frame(self, message, arrival_ns):
+        """接收处理线程的报文观察者，统计回放得到的报文数"""
+        self.frames += 1
 
     def stop(self):
-        self.is_running = False
+        CaptureReplayer.stop(self)
         self.wait()
 
 
 class TimedMessagesManager(QWidget):
-    """定时报文管理器"""
+    """
+    定时报文管理器
+
+    启用的定时报文交给周期调度器，在调度线程中按绝对时间表直接写入串口，
+    发送周期不受界面线程繁忙程度影响，也不会因轮询间隔而累积漂移。
+    定时报文以周期优先级加入发送队列，与手动发送共用同一发送队列时手动报文优先发送。
+    设置了字段生成器的动态报文在调度线程中每次发送前通过协议的编码模板重新生成。
+    """
 
     send_message_signal = pyqtSignal(bytes, str)  # 发送报文信号，包含报文名称
+    send_failed_signal = pyqtSignal(object)  # 发送失败信号 (TimedMessage)
 
     def __init__(self, parent=None):
         super().__init__(parent)
 
         self.timed_messages = []  # 定时报文列表
         self.message_sender = MessageSender()  # 报文发送管理器
-        self.timer = QTimer()  # 用于检查报文发送时间
-        self.timer.timeout.connect(self.check_messages)
+        self.protocol_parser = None  # 协议解析器，提供动态报文的协议定义和编码模板
+        self.scheduler = PeriodicScheduler("TimedMessageScheduler")  # 定时报文调度器
+        self.scheduled_messages = {}  # 已排期的报文 {id(message): TimedMessage}
+        self.line_timing = None  # 线路时间，用于计算总线负载率
+        self.phase_offsets = {}  # 已分配的相位偏移 {id(message): (interval, offset_ms)}
+        self.timeline_dialog = None
+        self.stats_timer = QTimer()  # 定时刷新抖动统计
+        self.stats_timer.timeout.connect(self.update_jitter)
+        self.send_failed_signal.connect(self.on_send_failed)
 
         # 创建布局
         layout = QVBoxLayout(self)
 
         # 创建报文列表
-        self.message_table = QTableWidget(0, 5)
-        self.message_table.setHorizontalHeaderLabels(["名称", "内容", "间隔(ms)", "状态", "操作"])
+        self.message_table = QTableWidget(0, 7)
+        self.message_table.setHorizontalHeaderLabels(["名称", "内容", "间隔(ms)", "相位(ms)", "状态", "抖动(ms)", "操作"])
         self.message_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.message_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.message_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
@@ -85,6 +150,8 @@ class TimedMessagesManager(QWidget):
         self.message_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
         self.message_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeToContents)
         self.message_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeToContents)
+        self.message_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
+        self.message_table.horizontalHeader().setSectionResizeMode(6, QHeaderView.ResizeToContents)
         layout.addWidget(self.message_table)
 
         # 创建按钮布局
@@ -110,6 +177,30 @@ class TimedMessagesManager(QWidget):
         self.disable_all_button.clicked.connect(self.disable_all)
         button_layout.addWidget(self.disable_all_button)
 
+        # 自动错开相位
+        self.stagger_check = QCheckBox("错开相位")
+        self.stagger_check.setChecked(True)
+        self.stagger_check.setToolTip("自动为启用的报文分配相位偏移，避免多个报文在同一时刻发送造成突发")
+        self.stagger_check.toggled.connect(self.restagger)
+        button_layout.addWidget(self.stagger_check)
+
+        # 丢弃过期帧
+        self.drop_stale_check = QCheckBox("丢弃过期帧")
+        self.drop_stale_check.setChecked(True)
+        self.drop_stale_check.setToolTip("同一报文的上一帧还在发送队列中时用新的一帧替换，线路繁忙时不积压过期数据")
+        self.drop_stale_check.toggled.connect(self.set_drop_stale)
+        button_layout.addWidget(self.drop_stale_check)
+
+        # 时间线
+        self.timeline_button = QPushButton("时间线")
+        self.timeline_button.clicked.connect(self.show_timeline)
+        button_layout.addWidget(self.timeline_button)
+
+        # 总线负载率
+        self.bus_load_label = QLabel("总线负载: -")
+        self.bus_load_label.setToolTip("启用的定时报文在当前波特率下占用线路时间的比例（含帧间隔）")
+        button_layout.addWidget(self.bus_load_label)
+
         # 保存/加载配置按钮
         self.save_button = QPushButton("保存配置")
         self.save_button.clicked.connect(self.save_config)
@@ -120,18 +211,48 @@ class TimedMessagesManager(QWidget):
         button_layout.addWidget(self.load_button)
 
         # 连接信号
-        self.message_sender.message_sent.connect(self.on_message_sent)
+        self.message_sender.messages_sent.connect(self.on_messages_sent)
+
+    def set_message_sender(self, message_sender):
+        """
+        设置报文发送管理器，与手动发送共用时定时报文按周期优先级排在手动报文之后
+
+        Args:
+            message_sender (MessageSender): 报文发送管理器
+        """
+        self.message_sender.messages_sent.disconnect(self.on_messages_sent)
+        self.message_sender = message_sender
+        self.message_sender.drop_stale = self.drop_stale_check.isChecked()
+        self.message_sender.set_line_timing(self.line_timing)
+        self.message_sender.messages_sent.connect(self.on_messages_sent)
+
+    def set_protocol_parser(self, protocol_parser):
+        """
+        设置协议解析器，用于生成动态报文
+
+        Args:
+            protocol_parser (ProtocolParser): 协议解析器
+        """
+        self.protocol_parser = protocol_parser
+
+    def set_drop_stale(self, checked):
+        """设置是否丢弃发送队列中过期的定时报文"""
+        self.message_sender.drop_stale = checked
 
     def set_serial(self, serial):
         """设置串口对象"""
-        self.message_sender.set_serial(serial)
-
-        # 如果串口已打开，启动定时器
+        # 如果串口已打开，启动调度器，所有报文从现在起重新排期
         if serial and serial.isOpen():
-            # 每10ms检查一次是否有报文需要发送
-            self.timer.start(10)
+            if self.message_sender.serial is not serial:
+                self.message_sender.set_serial(serial)
+            self.sync_schedule()
+            self.scheduler.start()
+            self.stats_timer.start(1000)
         else:
-            self.timer.stop()
+            # 先停止调度线程，避免关闭过程中报文加入队列失败而被禁用
+            self.scheduler.stop()
+            self.stats_timer.stop()
+            self.message_sender.set_serial(serial)
             self.update_table()  # 更新表格状态显示
 
     def add_message(self):
@@ -141,6 +262,7 @@ class TimedMessagesManager(QWidget):
         if dialog.exec_() == QDialog.Accepted:
             # 添加到列表
             self.timed_messages.append(dialog.timed_message)
+            self.confirm_bus_load([dialog.timed_message])
             # 更新表格
             self.update_table()
 
@@ -172,6 +294,7 @@ class TimedMessagesManager(QWidget):
                 if message_dialog.exec_() == QDialog.Accepted:
                     # 添加到列表
                     self.timed_messages.append(message_dialog.timed_message)
+                    self.confirm_bus_load([message_dialog.timed_message])
                     # 更新表格
                     self.update_table()
 
@@ -183,9 +306,31 @@ class TimedMessagesManager(QWidget):
         from message_dialog import TimedMessageDialog
         dialog = TimedMessageDialog(self, self.timed_messages[row])
         if dialog.exec_() == QDialog.Accepted:
+            self.confirm_bus_load([self.timed_messages[row]])
             # 更新表格
             self.update_table()
 
+    def edit_generators(self, row):
+        """设置定时报文的字段生成器"""
+        if row < 0 or row >= len(self.timed_messages):
+            return
+
+        message = self.timed_messages[row]
+        protocol_data = self.protocol_parser.protocols.get(message.protocol_id) if self.protocol_parser else None
+        if not protocol_data:
+            QMessageBox.warning(self, "错误", f"未找到协议 {message.protocol_id}，请先加载协议配置!")
+            return
+
+        from message_dialog import FieldGeneratorDialog
+        dialog = FieldGeneratorDialog(message, protocol_data, self)
+        if dialog.exec_() == QDialog.Accepted:
+            # 按新的字段值重新生成报文，用于显示和计算总线负载
+            encode_plan = self.protocol_parser.get_encode_plan(message.protocol_id)
+            if encode_plan is not None and encode_plan.error is None:
+                message.message = encode_plan.encode(message.field_values, use_defaults=True)
+            self.confirm_bus_load([message])
+            self.update_table()
+
     def remove_message(self, row):
         """删除定时报文"""
         if row < 0 or row >= len(self.timed_messages):
@@ -209,13 +354,16 @@ class TimedMessagesManager(QWidget):
 
         # 切换状态
         self.timed_messages[row].enabled = not self.timed_messages[row].enabled
+        self.confirm_bus_load([self.timed_messages[row]])
         # 更新表格
         self.update_table()
 
     def enable_all(self):
         """启用所有定时报文"""
-        for message in self.timed_messages:
+        enabled = [message for message in self.timed_messages if not message.enabled]
+        for message in enabled:
             message.enabled = True
+        self.confirm_bus_load(enabled)
         self.update_table()
 
     def disable_all(self):
@@ -224,8 +372,80 @@ class TimedMessagesManager(QWidget):
             message.enabled = False
         self.update_table()
 
+    def set_line_timing(self, line_timing):
+        """
+        设置线路时间，用于计算总线负载率和发送时的帧间隔
+
+        Args:
+            line_timing (LineTiming): 线路时间
+        """
+        self.line_timing = line_timing
+        self.message_sender.set_line_timing(line_timing)
+        self.update_bus_load()
+        self.update_timeline()
+
+    def bus_load(self):
+        """
+        计算启用的定时报文的总线负载率
+
+        Returns:
+            float: 负载率，1.0表示线路满载；未设置线路时间时返回None
+        """
+        if self.line_timing is None:
+            return None
+        return self.line_timing.bus_load(
+            [(len(message.message), message.interval) for message in self.timed_messages if message.enabled])
+
+    def update_bus_load(self):
+        """刷新总线负载率显示"""
+        load = self.bus_load()
+        if load is None:
+            self.bus_load_label.setText("总线负载: -")
+            self.bus_load_label.setStyleSheet("")
+            return
+
+        self.bus_load_label.setText(f"总线负载: {load * 100:.1f}%")
+        if load > 1.0:
+            self.bus_load_label.setStyleSheet("color: red; font-weight: bold;")
+        elif load > 0.8:
+            self.bus_load_label.setStyleSheet("color: orange;")
+        else:
+            self.bus_load_label.setStyleSheet("")
+
+    def confirm_bus_load(self, messages):
+        """
+        启用报文后检查总线负载率，超过100%时询问是否仍然启用，否则恢复为禁用
+
+        Args:
+            messages (list): 刚启用或修改的报文
+
+        Returns:
+            bool: 报文是否保持启用
+        """
+        messages = [message for message in messages if message.enabled]
+        load = self.bus_load()
+        if not messages or load is None or load <= 1.0:
+            return True
+
+        reply = QMessageBox.question(
+            self, "总线负载过高",
+            f"启用后定时报文的总线负载将达到 {load * 100:.1f}%，超过线路容量，"
+            f"报文将无法按设定的间隔发送。\n\n是否仍然启用?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            return True
+
+        for message in messages:
+            message.enabled = False
+        return False
+
     def update_table(self):
         """更新报文表格"""
+        # 报文的启用状态、间隔可能已修改，同步到调度器
+        self.sync_schedule()
+        self.update_bus_load()
+
         # 设置行数
         self.message_table.setRowCount(len(self.timed_messages))
 
@@ -238,18 +458,32 @@ class TimedMessagesManager(QWidget):
             content = " ".join([f"{b:02X}" for b in message.message])
             if len(content) > 30:
                 content = content[:30] + "..."
+            if message.generators:
+                # 动态报文显示最近一次生成的内容
+                content = "[动态] " + content
             content_item = QTableWidgetItem(content)
+            if message.generators:
+                content_item.setToolTip("\n".join(f"{field_id}: {generator.describe()}"
+                                                   for field_id, generator in message.generators.items()))
             self.message_table.setItem(row, 1, content_item)
 
             # 间隔
             interval_item = QTableWidgetItem(f"{message.interval}")
             self.message_table.setItem(row, 2, interval_item)
 
+            # 相位偏移
+            offset = self.scheduler.offset(id(message)) if message.enabled else None
+            phase_item = QTableWidgetItem("-" if offset is None else f"{offset:g}")
+            self.message_table.setItem(row, 3, phase_item)
+
             # 状态
             status_text = "启用" if message.enabled else "禁用"
             status_item = QTableWidgetItem(status_text)
             status_item.setForeground(QBrush(QColor("green" if message.enabled else "red")))
-            self.message_table.setItem(row, 3, status_item)
+            self.message_table.setItem(row, 4, status_item)
+
+            # 抖动统计
+            self.message_table.setItem(row, 5, QTableWidgetItem())
 
             # 操作按钮
             operation_widget = QWidget()
@@ -261,6 +495,13 @@ class TimedMessagesManager(QWidget):
             edit_button.clicked.connect(lambda checked, r=row: self.edit_message(r))
             operation_layout.addWidget(edit_button)
 
+            # 字段生成器按钮，协议报文可以设置每次发送时生成的字段
+            if message.protocol_id:
+                generator_button = QPushButton("字段")
+                generator_button.setToolTip("设置每次发送时自动生成的字段（计数、斜坡、时钟、随机、列表）")
+                generator_button.clicked.connect(lambda checked, r=row: self.edit_generators(r))
+                operation_layout.addWidget(generator_button)
+
             # 启用/禁用按钮
             toggle_button =toggle_button = QPushButton("禁用" if message.enabled else "启用")
             toggle_button.clicked.connect(lambda checked, r=row: self.toggle_message(r))
@@ -271,31 +512,180 @@ class TimedMessagesManager(QWidget):
             delete_button.clicked.connect(lambda checked, r=row: self.remove_message(r))
             operation_layout.addWidget(delete_button)
 
-            self.message_table.setCellWidget(row, 4, operation_widget)
+            self.message_table.setCellWidget(row, 6, operation_widget)
+
+        self.update_jitter()
+        self.update_timeline()
+
+    def sync_schedule(self):
+        """
+        把启用的报文同步到调度器
+
+        间隔未变的报文保持原有相位和排期；新启用或修改了间隔的报文分配相位偏移后，
+        从下一个满足该相位的时刻起发送。
+        """
+        scheduled = {id(message): message for message in self.timed_messages
+                     if message.enabled and message.interval > 0}
+        self.bind_generators(self.timed_messages)
+
+        for key in self.scheduler.keys():
+            if key not in scheduled:
+                self.scheduler.remove(key)
+
+        offsets = self.assign_offsets(scheduled)
+        for key, message in scheduled.items():
+            self.scheduler.schedule(key, message.interval, self.on_schedule, offsets.get(key, 0))
+        self.scheduled_messages = scheduled
+
+    def bind_generators(self, messages):
+        """
+        为从配置加载的动态报文按协议字段定义创建字段生成器
+
+        Args:
+            messages (iterable): 定时报文
+        """
+        if self.protocol_parser is None:
+            return
+
+        for message in messages:
+            if not message.is_dynamic() or message.generators:
+                continue
+            protocol_data = self.protocol_parser.protocols.get(message.protocol_id)
+            if not protocol_data:
+                continue
+            for field_id, error in message.bind_protocol(protocol_data):
+                main_window = self.window()
+                if hasattr(main_window, 'add_log_message'):
+                    main_window.add_log_message(
+                        f"错误: 定时报文 '{message.name}' 的字段 {field_id} 生成器无效: {str(error)}", "error")
+
+    def assign_offsets(self, scheduled):
+        """
+        为启用的报文分配相位偏移，已分配且间隔未变的报文保持原偏移
+
+        Args:
+            scheduled (dict): {id(message): TimedMessage}
+
+        Returns:
+            dict: {id(message): offset_ms}
+        """
+        if not self.stagger_check.isChecked():
+            self.phase_offsets = {}
+            return {}
+
+        fixed = {key: offset for key, (interval, offset) in self.phase_offsets.items()
+                 if key in scheduled and scheduled[key].interval == interval}
+        tasks = [(key, message.interval, self.slot_time_ms(message)) for key, message in scheduled.items()]
+        offsets = assign_phase_offsets(tasks, fixed)
+        self.phase_offsets = {key: (scheduled[key].interval, offset) for key, offset in offsets.items()}
+        return offsets
+
+    def slot_time_ms(self, message):
+        """
+        报文占用线路的时间（含帧间隔），未设置线路时间时按1ms计算
 
-    def check_messages(self):
-        """检查并发送定时报文"""
-        current_time = int(time.time() * 1000)  # 当前时间(毫秒)
+        Args:
+            message (TimedMessage): 定时报文
 
+        Returns:
+            float: 占用时间(ms)
+        """
+        if self.line_timing is None:
+            return 1.0
+        return self.line_timing.slot_time_ns(len(message.message)) / 1e6
+
+    def restagger(self):
+        """重新为所有启用的报文分配相位偏移"""
+        self.phase_offsets = {}
+        self.update_table()
+
+    def show_timeline(self):
+        """显示定时报文时间线"""
+        if self.timeline_dialog is None:
+            self.timeline_dialog = TimelineDialog(self)
+        self.timeline_dialog.show()
+        self.timeline_dialog.raise_()
+        self.update_timeline()
+
+    def update_timeline(self):
+        """时间线对话框打开时按当前排期刷新"""
+        if self.timeline_dialog is None or not self.timeline_dialog.isVisible():
+            return
+
+        entries = []
         for message in self.timed_messages:
-            if not message.enabled:
+            offset = self.scheduler.offset(id(message)) if message.enabled else None
+            if offset is not None:
+                entries.append((message.name, message.interval, offset, self.slot_time_ms(message)))
+        self.timeline_dialog.set_schedule(entries)
+
+    def on_schedule(self, key):
+        """
+        调度器触发，在调度线程中放入发送队列
+
+        Args:
+            key (int): 报文标识
+        """
+        message = self.scheduled_messages.get(key)
+        if message is None or not message.enabled:
+            return
+
+        message.last_sent = int(time.time() * 1000)
+
+        # 动态报文按当前时刻生成
+        frame = message.message
+        if message.generators:
+            encode_plan = None
+            if self.protocol_parser is not None:
+                encode_plan = self.protocol_parser.encode_plans.get(message.protocol_id)
+            try:
+                if encode_plan is None:
+                    raise ValueError(f"协议 {message.protocol_id} 未加载")
+                frame = message.next_message(encode_plan)
+            except Exception as e:
+                # 生成失败时不重发上一次的报文，停止排期并在界面线程中禁用该报文
+                log_error(f"定时报文 '{message.name}' 生成失败: {str(e)}")
+                self.scheduler.remove(key)
+                self.send_failed_signal.emit(message)
+                return
+
+        if not self.message_sender.add_message(frame, message.name,
+                                               priority=PRIORITY_PERIODIC, replace_key=key):
+            # 停止排期，在界面线程中禁用该报文
+            self.scheduler.remove(key)
+            self.send_failed_signal.emit(message)
+
+    def update_jitter(self):
+        """刷新表格中各报文的抖动统计"""
+        for row, message in enumerate(self.timed_messages):
+            item = self.message_table.item(row, 5)
+            if item is None:
+                continue
+
+            stats = self.scheduler.stats(id(message)) if message.enabled else None
+            if not stats or not stats['count']:
+                item.setText("-")
+                item.setToolTip("")
                 continue
 
-            # 计算下次发送时间
-            if message.last_sent == 0:  # 首次发送
-                message.last_sent = current_time
-                self.send_message(message)
-            elif current_time - message.last_sent >= message.interval:
-                message.last_sent = current_time
-                self.send_message(message)
-
-    def send_message(self, message):
-        """发送报文"""
-        success = self.message_sender.add_message(message.message, message.name)
-        if success:
-            # 发送报文信号，包含报文名称
-            self.send_message_signal.emit(message.message, message.name)
-        elif message.enabled:
+            item.setText(f"{stats['mean_ms']:.2f} / {stats['max_ms']:.2f}")
+            item.setToolTip(
+                f"实际发送时间与计划时间之差\n"
+                f"发送次数: {stats['count']}\n"
+                f"平均: {stats['mean_ms']:.3f} ms\n"
+                f"标准差: {stats['stdev_ms']:.3f} ms\n"
+                f"最小: {stats['min_ms']:.3f} ms\n"
+                f"最大: {stats['max_ms']:.3f} ms\n"
+                f"跳过周期: {stats['missed']}")
+
+    def on_send_failed(self, message):
+        """
+        定时报文发送失败处理
+
+        Args:
+            message (TimedMessage): 发送失败的报文
+        """
+        if message.enabled:
             # 如果发送失败，禁用该报文
             message.enabled = False
             self.update_table()
@@ -305,9 +695,18 @@ class TimedMessagesManager(QWidget):
             if hasattr(main_window, 'add_log_message'):
                 main_window.add_log_message(f"错误: 无法发送报文 '{message.name}', 已禁用", "error")
 
-    def on_message_sent(self, message, name):
-        """报文发送完成处理"""
-        pass  # 已通过send_message_signal处理
+    def on_messages_sent(self, sent):
+        """
+        报文写入完成处理
+
+        Args:
+            sent (list): [(message, name, latency_ms, priority)]
+        """
+        for message, name, latency_ms, priority in sent:
+            # 共用发送队列时只处理定时报文
+            if priority == PRIORITY_PERIODIC:
+                # 发送报文信号，包含报文名称
+                self.send_message_signal.emit(message, name)
 
     def save_config(self):
         """保存定时报文配置"""
@@ -388,9 +787,13 @@ class MessageDisplayManager(QTabWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.protocol_tabs = {}  # 协议标签页字典 {protocol_id: tab_widget}
+        self.protocol_tabs = {}  # 协议接收列表字典 {protocol_id: QTableView}
+        self.protocol_models = {}  # 协议接收列表模型字典 {protocol_id: ProtocolMessageModel}
         self.protocol_data = {}  # 协议数据字典 {protocol_id: protocol_data}
-        self.received_messages = {}  # 接收到的报文字典 {protocol_id: [messages]}
+        self.retention = DEFAULT_RETENTION  # 每个接收列表最多保留的记录条数
+
+        # 加载协议前也显示通用接收页面
+        self.setup_protocols({})
 
     def setup_protocols(self, protocols):
         """
@@ -402,21 +805,18 @@ class MessageDisplayManager(QTabWidget):
         # 清空现有标签页
         self.clear()
         self.protocol_tabs.clear()
+        self.protocol_models.clear()
         self.protocol_data.clear()
-        self.received_messages.clear()
 
         # 添加通用接收标签页
         general_tab = QWidget()
         general_layout = QVBoxLayout(general_tab)
 
         # 创建通用接收列表
-        self.general_list = QTableWidget(0, 3)
-        self.general_list.setHorizontalHeaderLabels(["时间", "协议ID", "内容"])
-        self.general_list.setEditTriggers(QAbstractItemView.NoEditTriggers)
-        self.general_list.setSelectionBehavior(QAbstractItemView.SelectRows)
-        self.general_list.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        self.general_list.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        self.general_list.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.general_model = GeneralMessageModel(self.retention, self)
+        self.general_model.protocol_names = {
+            protocol_id: protocol_data.get('protocol_name', '') for protocol_id, protocol_data in protocols.items()}
+        self.general_list = self.create_record_view(self.general_model, [170, 80])
         general_layout.addWidget(self.general_list)
 
         # 添加按钮区域
@@ -438,25 +838,28 @@ class MessageDisplayManager(QTabWidget):
         export_btn.clicked.connect(self.export_general_log)
         button_layout.addWidget(export_btn)
 
+        # 保留条数
+        button_layout.addWidget(QLabel("保留条数:"))
+        retention_spin = QSpinBox()
+        retention_spin.setRange(1000, 1000000)
+        retention_spin.setSingleStep(10000)
+        retention_spin.setValue(self.retention)
+        retention_spin.setToolTip("每个接收列表最多保留的记录条数，超出后丢弃最旧的记录")
+        retention_spin.valueChanged.connect(self.set_retention)
+        button_layout.addWidget(retention_spin)
+
         self.addTab(general_tab, "通用接收")
 
         # 为每个协议创建标签页
         for protocol_id, protocol_data in protocols.items():
             self.protocol_data[protocol_id] = protocol_data
-            self.received_messages[protocol_id] = []
 
             protocol_tab = QWidget()
             protocol_layout = QVBoxLayout(protocol_tab)
 
             # 创建协议接收列表
-            protocol_list = QTableWidget(0, 4)
-            protocol_list.setHorizontalHeaderLabels(["时间", "报文ID", "类型", "字段"])
-            protocol_list.setEditTriggers(QAbstractItemView.NoEditTriggers)
-            protocol_list.setSelectionBehavior(QAbstractItemView.SelectRows)
-            protocol_list.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
-            protocol_list.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
-            protocol_list.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
-            protocol_list.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+            protocol_model = ProtocolMessageModel(self.retention, self)
+            protocol_list = self.create_record_view(protocol_model, [170, 70, 70])
             protocol_layout.addWidget(protocol_list)
 
             # 添加按钮区域
@@ -494,6 +897,62 @@ class MessageDisplayManager(QTabWidget):
 
             # 保存标签页引用
             self.protocol_tabs[protocol_id] = protocol_list
+            self.protocol_models[protocol_id] = protocol_model
+
+    def create_record_view(self, model, column_widths):
+        """
+        创建接收列表视图
+
+        行高固定、前几列宽度固定，视图只需要格式化可见的行，不会因记录数增加而变慢。
+
+        Args:
+            model (RecordTableModel): 表格模型
+            column_widths (list): 除最后一列外各列的宽度，最后一列自动拉伸
+
+        Returns:
+            QTableView: 视图
+        """
+        view = QTableView()
+        view.setModel(model)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        view.setSelectionMode(QAbstractItemView.SingleSelection)
+        view.setWordWrap(False)
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        view.verticalHeader().setDefaultSectionSize(view.fontMetrics().height() + 6)
+
+        header = view.horizontalHeader()
+        for column, width in enumerate(column_widths):
+            header.setSectionResizeMode(column, QHeaderView.Interactive)
+            view.setColumnWidth(column, width)
+        header.setSectionResizeMode(len(column_widths), QHeaderView.Stretch)
+        return view
+
+    def set_retention(self, retention):
+        """
+        设置每个接收列表最多保留的记录条数
+
+        Args:
+            retention (int): 记录条数
+        """
+        self.retention = retention
+        self.general_model.set_retention(retention)
+        for model in self.protocol_models.values():
+            model.set_retention(retention)
+
+    @staticmethod
+    def selected_row(view):
+        """
+        获取视图中选中的行
+
+        Args:
+            view (QTableView): 视图
+
+        Returns:
+            int: 行号，未选中返回-1
+        """
+        rows = view.selectionModel().selectedRows()
+        return rows[0].row() if rows else -1
 
     def add_general_message(self, timestamp, protocol_id, message_bytes):
         """
@@ -504,25 +963,19 @@ class MessageDisplayManager(QTabWidget):
             protocol_id (str): 协议ID
             message_bytes (bytes): 报文数据
         """
-        row = self.general_list.rowCount()
-        self.general_list.insertRow(row)
-
-        # 设置时间
-        self.general_list.setItem(row, 0, QTableWidgetItem(timestamp))
+        self.add_general_messages([(timestamp, protocol_id, message_bytes)])
 
-        # 设置协议ID
-        protocol_name = ""
-        if protocol_id in self.protocol_data:
-            protocol_name = self.protocol_data[protocol_id].get('protocol_name', '')
+    def add_general_messages(self, messages):
+        """
+        批量添加通用接收报文，单元格在显示时才格式化
 
-        protocol_item = QTableWidgetItem(f"{protocol_id}")
-        if protocol_name:
-            protocol_item.setToolTip(protocol_name)
-        self.general_list.setItem(row, 1, protocol_item)
+        Args:
+            messages (list): [(timestamp, protocol_id, message_bytes)]
+        """
+        if not messages:
+            return
 
-        # 设置内容
-        content = " ".join([f"{b:02X}" for b in message_bytes])
-        self.general_list.setItem(row, 2, QTableWidgetItem(content))
+        self.general_model.append_records(messages)
 
         # 滚动到最新行
         self.general_list.scrollToBottom()
@@ -535,64 +988,38 @@ class MessageDisplayManager(QTabWidget):
             protocol_id (str): 协议ID
             message_data (dict): 解析后的报文数据
         """
-        if protocol_id not in self.protocol_tabs:
-            return
+        self.add_protocol_messages([(protocol_id, message_data)])
 
-        # 保存报文数据
-        self.received_messages[protocol_id].append(message_data)
-
-        # 获取协议标签页
-        protocol_list = self.protocol_tabs[protocol_id]
-
-        # 添加新行
-        row = protocol_list.rowCount()
-        protocol_list.insertRow(row)
-
-        # 设置时间
-        timestamp = message_data.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3])
-        protocol_list.setItem(row, 0, QTableWidgetItem(timestamp))
-
-        # 设置报文ID
-        message_id = message_data.get('message_id', '')
-        protocol_list.setItem(row, 1, QTableWidgetItem(message_id))
-
-        # 设置类型
-        message_type = message_data.get('message_type', '')
-        protocol_list.setItem(row, 2, QTableWidgetItem(message_type))
-
-        # 设置字段
-        fields = message_data.get('fields', {})
-        field_text = ""
-        for field_id, field_info in fields.items():
-            field_name = field_info.get('name', field_id)
-            field_value = field_info.get('value', '')
-            description = field_info.get('description', '')
-
-            if description:
-                field_text += f"{field_name}: {field_value} ({description}), "
-            else:
-                field_text += f"{field_name}: {field_value}, "
-
-        if field_text:
-            field_text = field_text[:-2]  # 去掉最后的逗号和空格
-
-        protocol_list.setItem(row, 3, QTableWidgetItem(field_text))
-
-        # 滚动到最新行
-        protocol_list.scrollToBottom()
+    def add_protocol_messages(self, messages):
+        """
+        批量添加协议解析后的报文，按协议分组后每个协议列表只追加一次、滚动一次
 
-        # 高亮显示标签页
-        for i in range(self.count()):
-            if self.tabText(i).startswith(protocol_id):
-                # 如果当前不是这个标签页，设置字体为粗体
-                if self.currentIndex() != i:
-                    tab_text = self.tabText(i)
-                    self.setTabText(i, "* " + tab_text.lstrip("* "))
-                break
+        Args:
+            messages (list): [(protocol_id, message_data)]
+        """
+        grouped = {}
+        for protocol_id, message_data in messages:
+            if protocol_id in self.protocol_models:
+                grouped.setdefault(protocol_id, []).append(message_data)
+
+        for protocol_id, message_list in grouped.items():
+            self.protocol_models[protocol_id].append_records(message_list)
+
+            # 滚动到最新行
+            self.protocol_tabs[protocol_id].scrollToBottom()
+
+            # 高亮显示标签页
+            for i in range(self.count()):
+                if self.tabText(i).startswith(protocol_id):
+                    # 如果当前不是这个标签页，设置字体为粗体
+                    if self.currentIndex() != i:
+                        tab_text = self.tabText(i)
+                        self.setTabText(i, "* " + tab_text.lstrip("* "))
+                    break
 
     def clear_general_list(self):
         """清空通用接收列表"""
-        self.general_list.setRowCount(0)
+        self.general_model.clear()
 
     def clear_protocol_list(self, protocol_id):
         """
@@ -601,33 +1028,24 @@ class MessageDisplayManager(QTabWidget):
         Args:
             protocol_id (str): 协议ID
         """
-        if protocol_id in self.protocol_tabs:
-            self.protocol_tabs[protocol_id].setRowCount(0)
-            self.received_messages[protocol_id].clear()
+        if protocol_id in self.protocol_models:
+            self.protocol_models[protocol_id].clear()
 
     def parse_selected_message(self):
         """解析选中的通用接收报文"""
-        selected_rows = self.general_list.selectedItems()
-        if not selected_rows:
-            return
-
-        # 获取选中行
-        row = selected_rows[0].row()
-
-        # 获取报文内容
-        content_item = self.general_list.item(row, 2)
-        if not content_item:
+        # 获取选中行的报文内容
+        record = self.general_model.record(self.selected_row(self.general_list))
+        if record is None:
             return
 
         try:
-            # 将十六进制字符串转换为字节
-            hex_content = content_item.text().replace(" ", "")
-            message_bytes = bytes.fromhex(hex_content)
+            message_bytes = record[2]
 
             # 解析报文
             main_window = self.window()
             if hasattr(main_window, 'protocol_parser') and main_window.protocol_parser:
-                protocol_id, parsed_data = main_window.protocol_parser.parse_message(message_bytes)
+                # 手动解析时启用启发式模式，尝试所有协议
+                protocol_id, parsed_data = main_window.protocol_parser.parse_message(message_bytes, heuristic=True)
 
                 if protocol_id and parsed_data:
                     # 显示解析结果
@@ -646,27 +1064,20 @@ class MessageDisplayManager(QTabWidget):
         Args:
             protocol_id (str): 协议ID
         """
-        if protocol_id not in self.protocol_tabs:
+        if protocol_id not in self.protocol_models:
             return
 
-        protocol_list = self.protocol_tabs[protocol_id]
-        selected_items = protocol_list.selectedItems()
+        # 获取选中行对应的报文数据
+        message_data = self.protocol_models[protocol_id].record(self.selected_row(self.protocol_tabs[protocol_id]))
 
-        if not selected_items:
+        if message_data is None:
             QMessageBox.information(self, "提示", "请先选择一条报文记录。")
             return
 
-        # 获取选中行
-        row = selected_items[0].row()
-
-        # 获取对应的报文数据
-        if row < len(self.received_messages[protocol_id]):
-            message_data = self.received_messages[protocol_id][row]
-
-            # 显示详情对话框
-            from message_dialog import MessageDetailDialog
-            dialog = MessageDetailDialog(message_data, self)
-            dialog.exec_()
+        # 显示详情对话框
+        from message_dialog import MessageDetailDialog
+        dialog = MessageDetailDialog(message_data, self)
+        dialog.exec_()
 
     def copy_to_send_area(self, protocol_id):
         """
@@ -675,36 +1086,29 @@ class MessageDisplayManager(QTabWidget):
         Args:
             protocol_id (str): 协议ID
         """
-        if protocol_id not in self.protocol_tabs:
+        if protocol_id not in self.protocol_models:
             return
 
-        protocol_list = self.protocol_tabs[protocol_id]
-        selected_items = protocol_list.selectedItems()
+        # 获取选中行对应的报文数据
+        message_data = self.protocol_models[protocol_id].record(self.selected_row(self.protocol_tabs[protocol_id]))
 
-        if not selected_items:
+        if message_data is None:
             QMessageBox.information(self, "提示", "请先选择一条报文记录。")
             return
 
-        # 获取选中行
-        row = selected_items[0].row()
-
-        # 获取对应的报文数据
-        if row < len(self.received_messages[protocol_id]):
-            message_data = self.received_messages[protocol_id][row]
+        # 提取原始报文
+        raw_message = message_data.get('raw_message', '')
 
-            # 提取原始报文
-            raw_message = message_data.get('raw_message', '')
-
-            # 复制到快速发送区
-            main_window = self.window()
-            if hasattr(main_window, 'quick_send_text'):
-                main_window.quick_send_text.setText(raw_message.replace(" ", ""))
+        # 复制到快速发送区
+        main_window = self.window()
+        if hasattr(main_window, 'quick_send_text'):
+            main_window.quick_send_text.setText(raw_message.replace(" ", ""))
 
-                # 添加日志
-                if hasattr(main_window, 'add_log_message'):
-                    main_window.add_log_message("报文已复制到快速发送区", "system")
-            else:
-                QMessageBox.information(self, "提示", f"报文已复制，但未找到快速发送区。\n\n报文内容：{raw_message}")
+            # 添加日志
+            if hasattr(main_window, 'add_log_message'):
+                main_window.add_log_message("报文已复制到快速发送区", "system")
+        else:
+            QMessageBox.information(self, "提示", f"报文已复制，但未找到快速发送区。\n\n报文内容：{raw_message}")
 
     def add_to_timed_task(self, protocol_id):
         """
@@ -713,107 +1117,98 @@ class MessageDisplayManager(QTabWidget):
         Args:
             protocol_id (str): 协议ID
         """
-        if protocol_id not in self.protocol_tabs:
+        if protocol_id not in self.protocol_models:
             return
 
-        protocol_list = self.protocol_tabs[protocol_id]
-        selected_items = protocol_list.selectedItems()
+        # 获取选中行对应的报文数据
+        message_data = self.protocol_models[protocol_id].record(self.selected_row(self.protocol_tabs[protocol_id]))
 
-        if not selected_items:
+        if message_data is None:
             QMessageBox.information(self, "提示", "请先选择一条报文记录。")
             return
 
-        # 获取选中行
-        row = selected_items[0].row()
+        # 弹出定时设置对话框
+        from PyQt5.QtWidgets import QInputDialog
+        interval, ok = QInputDialog.getInt(
+            self, "设置定时间隔", "请输入定时发送间隔(毫秒):",
+            1000, 10, 60000, 100)
 
-        # 获取对应的报文数据
-        if row < len(self.received_messages[protocol_id]):
-            message_data = self.received_messages[protocol_id][row]
+        if ok:
+            # 获取原始报文
+            raw_message = message_data.get('raw_message', '')
 
-            # 弹出定时设置对话框
-            from PyQt5.QtWidgets import QInputDialog
-            interval, ok = QInputDialog.getInt(
-                self, "设置定时间隔", "请输入定时发送间隔(毫秒):",
-                1000, 10, 60000, 100)
+            if not raw_message:
+                QMessageBox.warning(self, "错误", "无有效报文可添加")
+                return
 
-            if ok:
-                # 获取原始报文
-                raw_message = message_data.get('raw_message', '')
+            # 移除空格
+            raw_message = raw_message.replace(" ", "")
 
-                if not raw_message:
-                    QMessageBox.warning(self, "错误", "无有效报文可添加")
+            try:
+                # 将十六进制字符串转换为字节
+                message_bytes = bytes.fromhex(raw_message)
+
+                # 获取主窗口
+                main_window = self.window()
+                if not hasattr(main_window, 'timed_messages_manager'):
+                    QMessageBox.warning(self, "错误", "找不到定时任务管理器")
                     return
 
-                # 移除空格
-                raw_message = raw_message.replace(" ", "")
-
-                try:
-                    # 将十六进制字符串转换为字节
-                    message_bytes = bytes.fromhex(raw_message)
-
-                    # 获取主窗口
-                    main_window = self.window()
-                    if not hasattr(main_window, 'timed_messages_manager'):
-                        QMessageBox.warning(self, "错误", "找不到定时任务管理器")
-                        return
-
-                    # 获取报文信息
-                    message_id = message_data.get('message_id', '')
-                    protocol_name = message_data.get('protocol_name', '')
-
-                    # 创建任务名称
-                    task_name = f"{protocol_id}-{message_id}"
-                    if protocol_name:
-                        task_name += f"-{protocol_name}"
-
-                    # 检查是否已有相同协议ID的任务
-                    from message_transceiver import TimedMessage
-
-                    # 查找是否已存在相同协议ID的任务
-                    found = False
-                    for msg in main_window.timed_messages_manager.timed_messages:
-                        if msg.protocol_id == protocol_id:
-                            # 更新已存在的任务
-                            msg.name = task_name
-                            msg.message = message_bytes
-                            msg.interval = interval
-                            msg.enabled = True
-                            found = True
-
-                            # 添加日志
-                            if hasattr(main_window, 'add_log_message'):
-                                main_window.add_log_message(f"已更新协议 {protocol_id} 的定时任务", "system")
-                            else:
-                                QMessageBox.information(self, "成功", f"已更新协议 {protocol_id} 的定时任务")
-                            break
-
-                    # 如果不存在则创建新任务
-                    if not found:
-                        timed_message = TimedMessage(
-                            name=task_name,
-                            message=message_bytes,
-                            interval=interval,
-                            enabled=True,
-                            protocol_id=protocol_id
-                        )
-                        main_window.timed_messages_manager.timed_messages.append(timed_message)
+                # 获取报文信息
+                message_id = message_data.get('message_id', '')
+                protocol_name = message_data.get('protocol_name', '')
+
+                # 创建任务名称
+                task_name = f"{protocol_id}-{message_id}"
+                if protocol_name:
+                    task_name += f"-{protocol_name}"
+
+                # 检查是否已有相同协议ID的任务
+                from message_transceiver import TimedMessage
+
+                # 查找是否已存在相同协议ID的任务
+                found = False
+                for msg in main_window.timed_messages_manager.timed_messages:
+                    if msg.protocol_id == protocol_id:
+                        # 更新已存在的任务
+                        msg.name = task_name
+                        msg.message = message_bytes
+                        msg.interval = interval
+                        msg.enabled = True
+                        found = True
 
                         # 添加日志
                         if hasattr(main_window, 'add_log_message'):
-                            main_window.add_log_message(f"已创建协议 {protocol_id} 的定时任务", "system")
+                            main_window.add_log_message(f"已更新协议 {protocol_id} 的定时任务", "system")
                         else:
-                            QMessageBox.information(self, "成功", f"已创建协议 {protocol_id} 的定时任务")
-
-                    # 更新表格显示
-                    main_window.timed_messages_manager.update_table()
+                            QMessageBox.information(self, "成功", f"已更新协议 {protocol_id} 的定时任务")
+                        break
+
+                # 如果不存在则创建新任务
+                if not found:
+                    timed_message = TimedMessage(
+                        name=task_name,
+                        message=message_bytes,
+                        interval=interval,
+                        enabled=True,
+                        protocol_id=protocol_id
+                    )
+                    main_window.timed_messages_manager.timed_messages.append(timed_message)
+
+                    # 添加日志
+                    if hasattr(main_window, 'add_log_message'):
+                        main_window.add_log_message(f"已创建协议 {protocol_id} 的定时任务", "system")
+                    else:
+                        QMessageBox.information(self, "成功", f"已创建协议 {protocol_id} 的定时任务")
 
-                    # 如果串口已打开，启动定时器
-                    if main_window.timed_messages_manager.timer and not main_window.timed_messages_manager.timer.isActive():
-                        if hasattr(main_window, 'serial') and main_window.serial and main_window.serial.isOpen():
-                            main_window.timed_messages_manager.timer.start(10)
+                # 检查总线负载，更新表格显示，同时同步到调度器
+                for msg in main_window.timed_messages_manager.timed_messages:
+                    if msg.protocol_id == protocol_id:
+                        main_window.timed_messages_manager.confirm_bus_load([msg])
+                main_window.timed_messages_manager.update_table()
 
-                except Exception as e:
-                    QMessageBox.critical(self, "错误", f"添加定时任务失败: {str(e)}")
+            except Exception as e:
+                QMessageBox.critical(self, "错误", f"添加定时任务失败: {str(e)}")
 
     def export_general_log(self):
         """导出通用接收日志"""
@@ -832,16 +1227,10 @@ class MessageDisplayManager(QTabWidget):
                     f.write("时间\t协议ID\t内容\n")
 
                 # 写入数据
-                for row in range(self.general_list.rowCount()):
-                    time_item = self.general_list.item(row, 0)
-                    protocol_item = self.general_list.item(row, 1)
-                    content_item = self.general_list.item(row, 2)
-
-                    if time_item and protocol_item and content_item:
-                        if file_path.lower().endswith('.csv'):
-                            f.write(f"{time_item.text()},{protocol_item.text()},{content_item.text()}\n")
-                        else:
-                            f.write(f"{time_item.text()}\t{protocol_item.text()}\t{content_item.text()}\n")
+                separator = ',' if file_path.lower().endswith('.csv') else '\t'
+                model = self.general_model
+                for record in model.records():
+                    f.write(separator.join(model.format_cell(record, column) for column in range(3)) + "\n")
 
             QMessageBox.information(self, "导出成功", f"日志已导出到: {file_path}")
         except Exception as e:
@@ -854,7 +1243,7 @@ class MessageDisplayManager(QTabWidget):
         Args:
             protocol_id (str): 协议ID
         """
-        if protocol_id not in self.protocol_tabs:
+        if protocol_id not in self.protocol_models:
             return
 
         file_path, _ = QFileDialog.getSaveFileName(
@@ -864,7 +1253,7 @@ class MessageDisplayManager(QTabWidget):
             return
 
         try:
-            protocol_list = self.protocol_tabs[protocol_id]
+            model = self.protocol_models[protocol_id]
 
             with open(file_path, 'w', encoding='utf-8') as f:
                 # 写入标题
@@ -874,19 +1263,13 @@ class MessageDisplayManager(QTabWidget):
                     f.write("时间\t报文ID\t类型\t字段\n")
 
                 # 写入数据
-                for row in range(protocol_list.rowCount()):
-                    time_item = protocol_list.item(row, 0)
-                    message_id_item = protocol_list.item(row, 1)
-                    type_item = protocol_list.item(row, 2)
-                    fields_item = protocol_list.item(row, 3)
-
-                    if time_item and message_id_item and type_item and fields_item:
-                        if file_path.lower().endswith('.csv'):
-                            f.write(
-                                f"{time_item.text()},{message_id_item.text()},{type_item.text()},\"{fields_item.text()}\"\n")
-                        else:
-                            f.write(
-                                f"{time_item.text()}\t{message_id_item.text()}\t{type_item.text()}\t{fields_item.text()}\n")
+                for record in model.records():
+                    time_text, message_id, message_type, fields_text = (
+                        model.format_cell(record, column) for column in range(4))
+                    if file_path.lower().endswith('.csv'):
+                        f.write(f"{time_text},{message_id},{message_type},\"{fields_text}\"\n")
+                    else:
+                        f.write(f"{time_text}\t{message_id}\t{message_type}\t{fields_text}\n")
 
             QMessageBox.information(self, "导出成功", f"日志已导出到: {file_path}")
         except Exception as e:
@@ -931,6 +1314,25 @@ class SerialToolUI(QMainWindow):
         self.statusBar.addPermanentWidget(self.receivedCountLabel)
         self.statusBar.addPermanentWidget(self.sentCountLabel)
 
+        # CRC错误计数
+        self.crcErrorCountLabel = QLabel("CRC错误: 0")
+        self.statusBar.addPermanentWidget(self.crcErrorCountLabel)
+
+        # 发送延迟（加入发送队列到写入完成）
+        self.sendLatencyLabel = QLabel("发送延迟: -")
+        self.sendLatencyLabel.setToolTip("报文从加入发送队列到离开串口的延迟，平均/最大")
+        self.statusBar.addPermanentWidget(self.sendLatencyLabel)
+
+        # 回波抑制去掉的字节数
+        self.echoCountLabel = QLabel("回波: 0 字节")
+        self.echoCountLabel.setVisible(False)
+        self.statusBar.addPermanentWidget(self.echoCountLabel)
+
+        # 原始数据录制的字节数
+        self.captureLabel = QLabel("录制: 0 字节")
+        self.captureLabel.setVisible(False)
+        self.statusBar.addPermanentWidget(self.captureLabel)
+
         # 添加重置计数器按钮到状态栏
         self.resetCounterBtn = QPushButton("计数器清零")
         self.resetCounterBtn.setFixedWidth(100)
@@ -1007,14 +1409,76 @@ class SerialToolUI(QMainWindow):
         self.stop_bits_combo.setCurrentText("1")  # 默认值
         serial_config_layout.addWidget(self.stop_bits_combo, 5, 1)
 
+        # 接收模式
+        serial_config_layout.addWidget(QLabel("接收模式:"), 6, 0)
+        self.read_mode_combo = QComboBox()
+        self.read_mode_combo.addItem("事件驱动", SerialReceiveThread.MODE_BLOCKING)
+        self.read_mode_combo.addItem("轮询(10ms)", SerialReceiveThread.MODE_POLLING)
+        serial_config_layout.addWidget(self.read_mode_combo, 6, 1)
+
+        # 接收合并延迟（字节间隔超时）
+        serial_config_layout.addWidget(QLabel("接收延迟(ms):"), 7, 0)
+        self.read_latency_spin = QSpinBox()
+        self.read_latency_spin.setRange(0, 100)
+        self.read_latency_spin.setValue(2)  # 默认值
+        self.read_latency_spin.setToolTip("收到数据后等待后续字节的最长间隔，0表示立即上报")
+        serial_config_layout.addWidget(self.read_latency_spin, 7, 1)
+
+        # 接收结果批量提交给界面的条数上限
+        serial_config_layout.addWidget(QLabel("批量上限(条):"), 8, 0)
+        self.batch_size_spin = QSpinBox()
+        self.batch_size_spin.setRange(1, 5000)
+        self.batch_size_spin.setValue(500)  # 默认值
+        self.batch_size_spin.setToolTip("接收结果每批最多提交给界面的条数")
+        self.batch_size_spin.valueChanged.connect(self.update_batch_options)
+        serial_config_layout.addWidget(self.batch_size_spin, 8, 1)
+
+        # 接收结果批量提交的最长等待时间
+        serial_config_layout.addWidget(QLabel("批量延迟(ms):"), 9, 0)
+        self.batch_delay_spin = QSpinBox()
+        self.batch_delay_spin.setRange(0, 1000)
+        self.batch_delay_spin.setValue(50)  # 默认值
+        self.batch_delay_spin.setToolTip("接收结果不足一批时最多等待的时间，0表示立即提交")
+        self.batch_delay_spin.valueChanged.connect(self.update_batch_options)
+        serial_config_layout.addWidget(self.batch_delay_spin, 9, 1)
+
+        # 发送帧间隔（字符时间），RS485总线上报文之间的静默时间
+        serial_config_layout.addWidget(QLabel("帧间隔(字符):"), 10, 0)
+        self.frame_gap_spin = QDoubleSpinBox()
+        self.frame_gap_spin.setRange(0, 100)
+        self.frame_gap_spin.setDecimals(1)
+        self.frame_gap_spin.setSingleStep(0.5)
+        self.frame_gap_spin.setValue(0)  # 默认值
+        self.frame_gap_spin.setToolTip("发送的报文之间至少间隔的字符时间，0表示连续发送；Modbus RTU要求3.5")
+        serial_config_layout.addWidget(self.frame_gap_spin, 10, 1)
+
+        # RS485本地回波抑制，半双工适配器把本机发送的数据回送到接收端时开启
+        self.echo_suppress_check = QCheckBox("回波抑制(ms):")
+        self.echo_suppress_check.setChecked(False)
+        self.echo_suppress_check.setToolTip("去掉接收数据中本机发送的回波，用于会回送发送数据的RS485适配器")
+        serial_config_layout.addWidget(self.echo_suppress_check, 11, 0)
+        self.echo_window_spin = QDoubleSpinBox()
+        self.echo_window_spin.setRange(1, 1000)
+        self.echo_window_spin.setDecimals(1)
+        self.echo_window_spin.setValue(20)  # 默认值
+        self.echo_window_spin.setToolTip("回波在发送完成后最晚到达的时间，包括USB适配器的延迟")
+        serial_config_layout.addWidget(self.echo_window_spin, 11, 1)
+
         # 打开/关闭串口按钮
         self.open_serial_btn = QPushButton("打开串口")
         self.open_serial_btn.clicked.connect(self.open_serial)
         self.close_serial_btn = QPushButton("关闭串口")
         self.close_serial_btn.clicked.connect(self.close_serial)
         self.close_serial_btn.setEnabled(False)  # 初始时关闭按钮不可用
-        serial_config_layout.addWidget(self.open_serial_btn, 6, 0)
-        serial_config_layout.addWidget(self.close_serial_btn, 6, 1)
+        serial_config_layout.addWidget(self.open_serial_btn, 12, 0)
+        serial_config_layout.addWidget(self.close_serial_btn, 12, 1)
+
+        # 串口参数变化时重新计算线路时间
+        self.baud_rate_combo.currentTextChanged.connect(self.update_line_timing)
+        self.data_bits_combo.currentTextChanged.connect(self.update_line_timing)
+        self.parity_combo.currentTextChanged.connect(self.update_line_timing)
+        self.stop_bits_combo.currentTextChanged.connect(self.update_line_timing)
+        self.frame_gap_spin.valueChanged.connect(self.update_line_timing)
 
         # ========== 左侧中部：快速发送区 ==========
         quick_send_group = QGroupBox("快速发送")
@@ -1047,11 +1511,14 @@ class SerialToolUI(QMainWindow):
         self.timed_messages_manager = TimedMessagesManager()
         timed_layout.addWidget(self.timed_messages_manager)
 
-        # 将定时发送管理器发送的报文连接到日志
-        self.timed_messages_manager.send_message_signal.connect(self.on_timed_message_sent)
 
         # 添加到选项卡
         send_tabs.addTab(timed_send_tab, "定时任务")
+
+        # 轮询主站，请求按应答优先级加入发送队列
+        self.polling_manager = PollingManager(
+            lambda message, name: self.send_queue.add_message(message, name, PRIORITY_RESPONSE))
+        send_tabs.addTab(self.polling_manager, "轮询")
         left_layout.addWidget(send_tabs)
 
         # ========== 日志显示区 ==========
@@ -1060,8 +1527,7 @@ class SerialToolUI(QMainWindow):
         left_layout.addWidget(log_group)
 
         # 日志显示框
-        self.log_display = QTextEdit()
-        self.log_display.setReadOnly(True)
+        self.log_display = CommLogView(max_lines=5000)
         log_layout.addWidget(self.log_display)
 
         # 日志控制区域
@@ -1076,11 +1542,13 @@ class SerialToolUI(QMainWindow):
         # 显示时间选项
         self.show_time = QCheckBox("显示时间")
         self.show_time.setChecked(True)
+        self.show_time.toggled.connect(lambda checked: setattr(self.log_display, 'show_time', checked))
         log_control_layout.addWidget(self.show_time)
 
         # 自动滚动选项
         self.auto_scroll = QCheckBox("自动滚动")
         self.auto_scroll.setChecked(True)
+        self.auto_scroll.toggled.connect(lambda checked: setattr(self.log_display, 'auto_scroll', checked))
         log_control_layout.addWidget(self.auto_scroll)
 
         # 添加协议解析选项
@@ -1089,6 +1557,19 @@ class SerialToolUI(QMainWindow):
         self.enable_protocol_parse.stateChanged.connect(self.toggle_protocol_parse)
         log_control_layout.addWidget(self.enable_protocol_parse)
 
+        # 启发式解析选项：未知报文ID时尝试所有协议
+        self.enable_heuristic_parse = QCheckBox("尝试所有协议")
+        self.enable_heuristic_parse.setChecked(False)
+        self.enable_heuristic_parse.setToolTip("报文ID未匹配任何协议时，依次尝试用所有协议解析(较慢)")
+        self.enable_heuristic_parse.stateChanged.connect(self.toggle_heuristic_parse)
+        log_control_layout.addWidget(self.enable_heuristic_parse)
+
+        # CRC校验选项
+        self.enable_crc_check = QCheckBox("CRC校验")
+        self.enable_crc_check.setChecked(True)
+        self.enable_crc_check.setToolTip("校验接收报文的CRC16(Modbus)，校验失败的报文不参与协议解析")
+        self.enable_crc_check.stateChanged.connect(self.toggle_crc_check)
+        log_control_layout.addWidget(self.enable_crc_check)
 
         # 清空日志按钮
         self.clear_log_btn = QPushButton("清空日志")
@@ -1100,6 +1581,18 @@ class SerialToolUI(QMainWindow):
         self.save_log_btn.clicked.connect(self.save_log)
         log_control_layout.addWidget(self.save_log_btn)
 
+        # 原始数据录制按钮
+        self.capture_btn = QPushButton("开始录制")
+        self.capture_btn.setToolTip("把收发的原始数据连同时间戳写入二进制录制文件(.ydcap)")
+        self.capture_btn.clicked.connect(self.toggle_capture)
+        log_control_layout.addWidget(self.capture_btn)
+
+        # 录制回放按钮
+        self.replay_btn = QPushButton("回放")
+        self.replay_btn.setToolTip("把录制文件中的接收数据按原始时间、倍速或不限速送入接收处理，串口关闭时可用")
+        self.replay_btn.clicked.connect(self.toggle_replay)
+        log_control_layout.addWidget(self.replay_btn)
+
         # ========== 右侧：协议配置区 ==========
         # 添加配置文件选择区域
         config_group = QGroupBox("协议配置")
@@ -1156,21 +1649,55 @@ class SerialToolUI(QMainWindow):
         # 初始化变量
         self.serial = None
         self.receive_thread = None
+        self.capture_writer = None  # 原始数据录制，录制期间重新打开串口继续写入同一文件
+        self.capture_hooks = None
+        self.replay_thread = None
+        self.replay_start = 0.0
         self.config_parser = ConfigParser()
         self.protocol_ui_generator = ProtocolUIGenerator()
         self.protocol_parser = ProtocolParser()
         self.message_receiver = MessageReceiver()
         self.received_count = 0
         self.sent_count = 0
+        self.crc_error_count = 0
         self.send_queue = MessageSender()
+        # 定时报文与手动发送共用发送队列，按优先级调度，统一记录日志
+        self.timed_messages_manager.set_message_sender(self.send_queue)
+        self.timed_messages_manager.set_protocol_parser(self.protocol_parser)
         self.protocol_widgets = {}  # 协议生成界面 {protocol_id: widget}
 
+        # 分帧和解析线程，串口打开时启动，结果按批提交给界面
+        self.receive_worker = ReceiveWorker(self.message_receiver, self.protocol_parser,
+                                            max_batch_size=self.batch_size_spin.value(),
+                                            max_batch_delay=self.batch_delay_spin.value())
+        self.receive_worker.results_batch.connect(self.process_receive_batch)
+
+        # 本地回波抑制：写入前记录发送的数据，分帧前从接收数据中去掉
+        self.echo_filter = EchoFilter(self.echo_window_spin.value())
+        self.send_queue.add_write_hook(self.echo_filter.on_transmit)
+        self.receive_worker.echo_filter = self.echo_filter
+        self.echo_suppress_check.toggled.connect(self.update_echo_filter)
+        self.echo_window_spin.valueChanged.connect(self.update_echo_filter)
+
+        # 请求/响应配对，在写线程和分帧线程中直接记录报文时间，超时的请求按应答优先级重发
+        self.correlator = ResponseCorrelator(resend=lambda message, rule: self.send_queue.add_message(
+            message, f"{rule.request_id} 重发", PRIORITY_RESPONSE))
+        self.send_queue.add_observer(self.correlator.on_sent)
+        self.receive_worker.add_frame_observer(self.correlator.on_received)
+        self.correlation_view = CorrelationView(self.correlator)
+        self.send_queue.add_observer(self.polling_manager.master.on_sent)
+        self.receive_worker.add_frame_observer(self.polling_manager.master.on_received)
+        self.protocol_tabs.addTab(self.correlation_view, "应答统计")
+
         # 初始化串口列表
         self.update_serial_ports()
 
+        # 按默认串口参数计算线路时间
+        self.update_line_timing()
+
         # 连接信号和槽
-        self.send_queue.message_sent.connect(self.on_message_sent)
-        self.message_receiver.message_received.connect(self.on_message_received)
+        self.send_queue.messages_sent.connect(self.on_messages_sent)
+        # 手动解析的结果（接收数据的解析结果由接收处理线程批量提交）
         self.protocol_parser.message_parsed.connect(self.on_message_parsed)
 
 
@@ -1191,11 +1718,44 @@ class SerialToolUI(QMainWindow):
             state (int): 复选框状态 (Qt.Checked/Qt.Unchecked)
         """
         is_enabled = state == Qt.Checked
+        self.receive_worker.parse_enabled = is_enabled
         if is_enabled:
             self.add_log_message("已启用协议解析功能", "system")
         else:
             self.add_log_message("已禁用协议解析功能", "system")
 
+    def toggle_heuristic_parse(self, state):
+        """
+        切换启发式解析模式
+
+        Args:
+            state (int): 复选框状态 (Qt.Checked/Qt.Unchecked)
+        """
+        is_enabled = state == Qt.Checked
+        self.protocol_parser.set_heuristic_mode(is_enabled)
+        if is_enabled:
+            self.add_log_message("已启用启发式解析：未知报文ID将尝试所有协议", "system")
+        else:
+            self.add_log_message("已禁用启发式解析：未知报文ID将直接忽略", "system")
+
+    def update_batch_options(self):
+        """批量提交参数改变时通知接收处理线程"""
+        self.receive_worker.set_batch_options(self.batch_size_spin.value(), self.batch_delay_spin.value())
+
+    def toggle_crc_check(self, state):
+        """
+        切换接收报文CRC校验
+
+        Args:
+            state (int): 复选框状态 (Qt.Checked/Qt.Unchecked)
+        """
+        is_enabled = state == Qt.Checked
+        self.message_receiver.set_verify_crc(is_enabled)
+        if is_enabled:
+            self.add_log_message("已启用CRC校验", "system")
+        else:
+            self.add_log_message("已禁用CRC校验", "system")
+
     def open_serial(self):
         """打开串口"""
         try:
@@ -1228,41 +1788,100 @@ class SerialToolUI(QMainWindow):
                 self.statusLabel.setText(
                     f"串口: {port} ({baud_rate},{data_bits},{self.parity_combo.currentText()},{self.stop_bits_combo.currentText()})")
 
-                # 启动接收线程
-                self.receive_thread = SerialReceiveThread(self.serial)
-                self.receive_thread.receive_signal.connect(self.process_received_data)
+                # 启动分帧和解析线程
+                self.message_receiver.clear()
+                self.receive_worker.parse_enabled = self.enable_protocol_parse.isChecked()
+                self.receive_worker.set_batch_options(self.batch_size_spin.value(), self.batch_delay_spin.value())
+                self.receive_worker.start()
+                self.correlator.start()
+
+                # 启动接收线程，数据在接收线程中直接提交给分帧和解析线程
+                self.receive_thread = SerialReceiveThread(
+                    self.serial,
+                    read_mode=self.read_mode_combo.currentData(),
+                    read_latency=self.read_latency_spin.value())
+                self.receive_thread.receive_signal.connect(self.receive_worker.put_data, Qt.DirectConnection)
+                if self.capture_hooks:
+                    self.receive_thread.add_data_hook(self.capture_hooks[0])
                 self.receive_thread.start()
 
-                # 设置定时发送管理器的串口
-                self.timed_messages_manager.set_serial(self.serial)
+                # 按实际串口参数计算线路时间
+                self.update_line_timing()
 
                 # 设置发送队列的串口
                 self.send_queue.set_serial(self.serial)
 
+                # 设置定时发送管理器的串口
+                self.timed_messages_manager.set_serial(self.serial)
+                self.polling_manager.set_serial_open(True)
+
         except Exception as e:
             self.add_log_message(f"打开串口失败: {str(e)}", "error")
             self.statusLabel.setText(f"串口: 连接失败 - {str(e)}")
 
 
+    def update_line_timing(self):
+        """按串口参数和帧间隔计算线路时间，用于发送帧间隔和定时报文的总线负载率"""
+        gap_chars = self.frame_gap_spin.value()
+        if self.serial and self.serial.isOpen():
+            line_timing = LineTiming.from_serial(self.serial, gap_chars)
+        else:
+            try:
+                line_timing = LineTiming(
+                    baudrate=int(self.baud_rate_combo.currentText()),
+                    bytesize=int(self.data_bits_combo.currentText()),
+                    parity=self.parity_combo.currentText(),
+                    stopbits=float(self.stop_bits_combo.currentText()),
+                    gap_chars=gap_chars)
+            except ValueError:
+                return
+
+        self.timed_messages_manager.set_line_timing(line_timing)
+        self.send_queue.set_line_timing(line_timing)
+        self.echo_filter.set_line_timing(line_timing)
+
+
+    def update_echo_filter(self):
+        """按界面设置开启或关闭回波抑制"""
+        enabled = self.echo_suppress_check.isChecked()
+        self.echo_filter.set_window(self.echo_window_spin.value())
+        if enabled != self.echo_filter.enabled:
+            self.echo_filter.set_enabled(enabled)
+            self.add_log_message(f"回波抑制已{'开启' if enabled else '关闭'}", "system")
+        self.echoCountLabel.setVisible(enabled)
+        self.update_status_counters()
+
+
     def close_serial(self):
         """关闭串口"""
+        # 先停止轮询，接收停止后正在等待的响应不计为漏答
+        self.polling_manager.set_serial_open(False)
+
         if self.receive_thread:
             self.receive_thread.stop()
             self.receive_thread = None
 
+        if self.receive_worker.isRunning():
+            # 处理完剩余数据并全部提交后停止
+            self.receive_worker.stop()
+
+        # 未完成的请求不再等待响应
+        self.correlator.stop()
+
         if self.serial and self.serial.isOpen():
+            # 先停止定时发送（等待调度线程退出），再关闭串口，避免调度线程写入已关闭的串口
+            self.timed_messages_manager.set_serial(None)
+
+            # 通知发送队列
+            if self.send_queue.serial is not None:
+                self.send_queue.set_serial(None)
+
             self.serial.close()
             self.open_serial_btn.setEnabled(True)
             self.close_serial_btn.setEnabled(False)
             self.add_log_message("串口已关闭", "system")
             self.statusLabel.setText("串口: 已关闭")
 
-            # 通知定时发送管理器
-            self.timed_messages_manager.set_serial(None)
-
-            # 通知发送队列
-            self.send_queue.set_serial(None)
-
 
     def browse_config(self):
         """浏览并选择配置文件"""
@@ -1297,9 +1916,25 @@ class SerialToolUI(QMainWindow):
             # 设置协议解析器
             self.protocol_parser.set_protocols(protocols)
 
+            # 按协议的报文格式分帧
+            self.message_receiver.set_protocols(protocols)
+
             # 设置报文显示管理器
             self.message_display_manager.setup_protocols(protocols)
 
+            # 请求/响应配对
+            correlation_rules = self.config_parser.get_correlation_rules()
+            self.correlator.set_rules(correlation_rules, protocols)
+            self.polling_manager.set_protocols(protocols, self.protocol_parser, correlation_rules)
+            if correlation_rules:
+                self.add_log_message(f"应答配对: {', '.join(rule.request_id for rule in correlation_rules)}", "system")
+
+            # 定时报文中的动态报文按新的协议定义重新创建字段生成器
+            for message in self.timed_messages_manager.timed_messages:
+                if message.is_dynamic():
+                    message.generators = {}
+            self.timed_messages_manager.update_table()
+
             # 为每个协议创建界面
             for protocol_id, protocol_data in protocols.items():
                 # 创建协议界面
@@ -1451,7 +2086,7 @@ class SerialToolUI(QMainWindow):
             if message:
                 # 弹出报文预览对话框
                 from message_dialog import MessagePreviewDialog
-                dialog = MessagePreviewDialog(message, protocol_id, self)
+                dialog = MessagePreviewDialog(message, protocol_id, self, field_values=protocol_field_values)
                 if dialog.exec_() == QDialog.Accepted:
                     # 发送报文
                     self.send_message(message, f"{protocol_id}报文")
@@ -1543,58 +2178,94 @@ class SerialToolUI(QMainWindow):
             self.add_log_message(f"加载配置失败: {str(e)}", "error")
 
 
-    def process_received_data(self, data):
+    def process_receive_batch(self, results):
         """
-        处理接收到的数据
+        显示接收处理线程提交的一批结果，表格、日志和计数器整批各更新一次
 
         Args:
-            data (bytes): 接收到的数据
+            results (list): 接收结果列表，见receive_pipeline中的RESULT_*
         """
-        # 更新接收计数
-        self.received_count += len(data)
-        self.update_status_counters()
-
-        # 添加到日志
         try:
-            # 尝试转换为ASCII
-            ascii_text = data.decode('utf-8', errors='replace')
-            # 十六进制表示
-            hex_text = ' '.join([f"{b:02X}" for b in data])
-
-            # 创建日志内容
-            log_content = ascii_text
-            if self.show_hex.isChecked():
-                log_content += f" [HEX: {hex_text}]"
+            received_bytes, dropped_bytes, dropped_results = self.receive_worker.take_stats()
+
+            log_messages = []
+            if dropped_bytes:
+                log_messages.append((f"接收处理跟不上，已丢弃 {dropped_bytes} 字节未处理数据", "error"))
+            if dropped_results:
+                log_messages.append((f"界面显示跟不上，已丢弃 {dropped_results} 条接收记录", "error"))
+
+            general_messages = []
+            parsed_messages = []
+            crc_errors = 0
+            show_hex = self.show_hex.isChecked()
+            for result in results:
+                kind = result[0]
+                if kind == RESULT_DATA:
+                    log_messages.append((self.format_received_data(result[2], show_hex), "receive"))
+                elif kind == RESULT_FRAME:
+                    _, timestamp, message, protocol_id, parsed_data = result
+                    general_messages.append((timestamp, protocol_id or "未知", message))
+                    if parsed_data:
+                        parsed_messages.append((protocol_id, parsed_data))
+                        log_messages.append((self.format_parsed_message(protocol_id, parsed_data), "system"))
+                elif kind == RESULT_CRC_ERROR:
+                    _, timestamp, message = result
+                    # CRC错误的报文在通用接收列表中单独标记
+                    crc_errors += 1
+                    general_messages.append((timestamp, "CRC错误", message))
+                    log_messages.append((f"CRC校验失败: {message.hex(' ').upper()}", "error"))
+
+            # 更新接收计数
+            self.received_count += received_bytes
+            self.crc_error_count += crc_errors
+            self.update_status_counters()
+
+            self.message_display_manager.add_general_messages(general_messages)
+            self.message_display_manager.add_protocol_messages(parsed_messages)
+            self.add_log_messages(log_messages)
+        finally:
+            # 通知接收处理线程可以提交下一批
+            self.receive_worker.batch_done()
+
+
+    def format_received_data(self, data, show_hex):
+        """
+        生成接收数据的日志内容
 
-            # 添加到日志
-            self.add_log_message(log_content, "receive")
-        except Exception as e:
-            self.add_log_message(f"处理接收数据错误: {str(e)}", "error")
+        Args:
+            data (bytes): 接收到的数据
+            show_hex (bool): 是否附加十六进制
 
-        # 根据协议解析开关状态决定是否解析数据
-        if self.enable_protocol_parse.isChecked():
-            # 交给报文接收器处理
-            self.message_receiver.process_data(data)
+        Returns:
+            str: 日志内容
+        """
+        # 尝试转换为ASCII
+        log_content = data.decode('utf-8', errors='replace')
+        if show_hex:
+            # 十六进制表示
+            log_content += f" [HEX: {data.hex(' ').upper()}]"
+        return log_content
 
 
-    def on_message_received(self, message):
+    def format_parsed_message(self, protocol_id, parsed_data):
         """
-        报文接收完成处理
+        生成解析完成报文的日志内容
 
         Args:
-            message (bytes): 接收到的完整报文
-        """
-        # 尝试解析报文
-        protocol_id, parsed_data = self.protocol_parser.parse_message(message)
+            protocol_id (str): 协议ID
+            parsed_data (dict): 解析后的报文数据
 
-        # 添加到通用接收列表
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-        self.message_display_manager.add_general_message(timestamp, protocol_id or "未知", message)
+        Returns:
+            str: 日志内容
+        """
+        message_id = parsed_data.get('message_id', '')
+        message_type = parsed_data.get('message_type', '')
+        return f"接收到 {protocol_id} 报文 - ID: {message_id}, 类型: {message_type}"
 
 
     def on_message_parsed(self, protocol_id, parsed_data):
         """
-        报文解析完成处理
+        报文解析完成处理（手动解析）
 
         Args:
             protocol_id (str): 协议ID
@@ -1604,9 +2275,7 @@ class SerialToolUI(QMainWindow):
         self.message_display_manager.add_protocol_message(protocol_id, parsed_data)
 
         # 添加日志
-        message_id = parsed_data.get('message_id', '')
-        message_type = parsed_data.get('message_type', '')
-        self.add_log_message(f"接收到 {protocol_id} 报文 - ID: {message_id}, 类型: {message_type}", "system")
+        self.add_log_message(self.format_parsed_message(protocol_id, parsed_data), "system")
 
 
     def send_quick_data(self):
@@ -1661,9 +2330,34 @@ class SerialToolUI(QMainWindow):
         self.sent_count += len(message)
         self.update_status_counters()
 
-        # 记录发送信息
-        hex_text = ' '.join([f"{b:02X}" for b in message])
+        # 添加到日志
+        self.add_log_message(self.format_sent_message(message, name), "send")
 
+
+    def on_messages_sent(self, sent):
+        """
+        发送队列写入完成处理，一次写入的报文统一更新计数和日志
+
+        Args:
+            sent (list): [(message, name, latency_ms, priority)]
+        """
+        self.sent_count += sum(len(entry[0]) for entry in sent)
+        self.update_status_counters()
+        self.add_log_messages([(self.format_sent_message(message, name), "send")
+                               for message, name, latency_ms, priority in sent])
+
+
+    def format_sent_message(self, message, name):
+        """
+        格式化发送的报文用于日志显示
+
+        Args:
+            message (bytes): 发送的报文
+            name (str): 报文名称
+
+        Returns:
+            str: 日志内容
+        """
         try:
             # 尝试将字节转换为ASCII
             ascii_text = message.decode('utf-8', errors='replace')
@@ -1674,96 +2368,29 @@ class SerialToolUI(QMainWindow):
 
         # 如果需要显示十六进制，添加到日志内容
         if self.show_hex.isChecked():
-            log_content += f" [HEX: {hex_text}]"
-
-        # 添加到日志
-        self.add_log_message(log_content, "send")
+            log_content += f" [HEX: {' '.join([f'{b:02X}' for b in message])}]"
+        return log_content
 
 
-    def on_timed_message_sent(self, message, name):
+    def add_log_message(self, message, message_type="system"):
         """
-        定时报文发送完成处理
+        添加消息到日志区域
 
         Args:
-            message (bytes): 发送的报文
-            name (str): 报文名称
+            message (str): 日志消息内容
+            message_type (str): 消息类型（"send"/"receive"/"system"/"error"）
         """
-        # 直接调用通用发送完成处理
-        self.on_message_sent(message, name)
+        self.add_log_messages([(message, message_type)])
 
 
-    def add_log_message(self, message, message_type="system"):
+    def add_log_messages(self, messages):
         """
-        添加消息到日志区域
+        批量添加消息到日志区域，日志控件在下一个周期统一显示
 
         Args:
-            message (str): 日志消息内容
-            message_type (str): 消息类型（"send"/"receive"/"system"/"error"）
+            messages (list): [(message, message_type)]
         """
-        # 检查日志条数，如果超过500条则清空
-        current_text = self.log_display.toPlainText()
-        line_count = current_text.count('\n') + 1
-        if line_count > 500:
-            self.log_display.clear()
-            self.add_log_message("日志超过500条，已自动清空", "system")
-            # 递归调用结束后直接返回，避免重复添加当前消息
-            return
-        # 获取当前光标
-        cursor = self.log_display.textCursor()
-
-        # 移动到文档末尾
-        #cursor.movePosition(QTextCursor.End)
-
-        # 添加时间戳（如果需要）
-        if self.show_time.isChecked():
-            timestamp = datetime.now().strftime('[%H:%M:%S.%f]')[:-3]
-            cursor.insertText(timestamp + " ")
-
-        # 添加消息类型标签
-        type_labels = {
-            "send": "[发送] ",
-            "receive": "[接收] ",
-            "system": "[系统] ",
-            "error": "[错误] "
-        }
-
-        # 创建消息格式
-        format = QTextCharFormat()
-
-        # 设置不同消息类型的颜色
-        if message_type == "send":
-            format.setForeground(QBrush(QColor("blue")))
-        elif message_type == "receive":
-            format.setForeground(QBrush(QColor("green")))
-        elif message_type == "system":
-            format.setForeground(QBrush(QColor("gray")))
-
-            # 系统消息使用粗体
-            font = QFont()
-            font.setBold(True)
-            format.setFont(font)
-        elif message_type == "error":
-            format.setForeground(QBrush(QColor("red")))
-
-            # 错误消息使用粗体
-            font = QFont()
-            font.setBold(True)
-            format.setFont(font)
-
-        # 插入消息类型标签
-        cursor.setCharFormat(format)
-        cursor.insertText(type_labels.get(message_type, ""))
-
-        # 插入消息内容
-        cursor.insertText(message)
-
-        # 添加换行
-        cursor.insertText("\n")
-
-        # 如果启用了自动滚动，滚动到底部
-        if self.auto_scroll.isChecked():
-            self.log_display.setTextCursor(cursor)
-            self.log_display.ensureCursorVisible()
+        self.log_display.append_messages(messages)
 
 
     def clear_log(self):
@@ -1781,22 +2408,163 @@ class SerialToolUI(QMainWindow):
             return
 
         try:
-            # 获取日志文本
-            text = self.log_display.toPlainText()
-
-            # 保存到文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(text)
+            # 保存完整历史，包括已滚出日志区域的行
+            self.log_display.save_history(file_path)
 
             self.add_log_message(f"日志已保存到 {file_path}", "system")
         except Exception as e:
             self.add_log_message(f"保存日志失败: {str(e)}", "error")
 
 
+    def toggle_capture(self):
+        """开始或停止录制原始数据"""
+        if self.capture_writer is not None:
+            self.stop_capture()
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "开始录制", datetime.now().strftime("capture_%Y%m%d_%H%M%S.ydcap"),
+            "录制文件 (*.ydcap);;所有文件 (*.*)")
+        if file_path:
+            self.start_capture(file_path)
+
+
+    def start_capture(self, file_path):
+        """
+        开始录制原始数据，接收线程和发送队列的写线程直接把数据块交给录制器
+
+        Args:
+            file_path (str): 录制文件路径
+        """
+        if self.serial and self.serial.isOpen():
+            port_info = describe_port(self.serial)
+        else:
+            port_info = {'name': self.serial_port_combo.currentText(),
+                         'baudrate': int(self.baud_rate_combo.currentText()),
+                         'bytesize': int(self.data_bits_combo.currentText()),
+                         'parity': self.parity_combo.currentText(),
+                         'stopbits': float(self.stop_bits_combo.currentText())}
+        try:
+            self.capture_writer = CaptureWriter(file_path, [port_info])
+        except OSError as e:
+            self.add_log_message(f"开始录制失败: {str(e)}", "error")
+            return
+
+        self.capture_hooks = (self.capture_writer.hook(0, DIR_RX), self.capture_writer.hook(0, DIR_TX))
+        if self.receive_thread:
+            self.receive_thread.add_data_hook(self.capture_hooks[0])
+        self.send_queue.add_write_hook(self.capture_hooks[1])
+        self.capture_btn.setText("停止录制")
+        self.captureLabel.setVisible(True)
+        self.update_status_counters()
+        self.add_log_message(f"开始录制: {file_path}", "system")
+
+
+    def stop_capture(self):
+        """停止录制，写入剩余数据并关闭文件"""
+        if self.capture_writer is None:
+            return
+
+        rx_hook, tx_hook = self.capture_hooks
+        if self.receive_thread:
+            self.receive_thread.remove_data_hook(rx_hook)
+        self.send_queue.remove_write_hook(tx_hook)
+        writer = self.capture_writer
+        self.capture_writer = None
+        self.capture_hooks = None
+        writer.close()
+
+        stats = writer.stats()
+        self.capture_btn.setText("开始录制")
+        self.captureLabel.setVisible(False)
+        if stats['error']:
+            self.add_log_message(f"录制写入失败: {stats['error']}", "error")
+        message = f"录制已保存: {writer.path} ({stats['chunks']} 块, {stats['data_bytes']} 字节)"
+        if stats['dropped_chunks']:
+            message += f"，磁盘写入不及时丢弃 {stats['dropped_chunks']} 块"
+        self.add_log_message(message, "system")
+
+
+    def toggle_replay(self):
+        """开始或停止回放录制文件"""
+        if self.replay_thread is not None:
+            self.replay_thread.stop()
+            return
+
+        if self.serial and self.serial.isOpen():
+            self.add_log_message("请先关闭串口再回放", "error")
+            return
+
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "回放录制文件", "", "录制文件 (*.ydcap);;所有文件 (*.*)")
+        if not file_path:
+            return
+
+        speeds = {"原始时间": 1.0, "2倍速": 2.0, "10倍速": 10.0, "100倍速": 100.0, "不限速": SPEED_MAX}
+        speed_name, ok = QInputDialog.getItem(self, "回放速度", "速度:", list(speeds), 0, False)
+        if ok:
+            self.start_replay(file_path, speeds[speed_name])
+
+
+    def start_replay(self, file_path, speed=1.0):
+        """
+        开始回放，录制的接收数据经接收处理线程分帧、解析后像实时接收一样显示
+
+        Args:
+            file_path (str): 录制文件路径
+            speed (float): 回放倍速，SPEED_MAX表示不限速
+        """
+        try:
+            self.replay_thread = CaptureReplayThread(file_path, self.receive_worker, speed)
+        except (OSError, ValueError) as e:
+            self.add_log_message(f"回放失败: {str(e)}", "error")
+            return
+
+        # 与打开串口时相同，启动分帧和解析线程
+        self.message_receiver.clear()
+        self.receive_worker.parse_enabled = self.enable_protocol_parse.isChecked()
+        self.receive_worker.set_batch_options(self.batch_size_spin.value(), self.batch_delay_spin.value())
+        self.receive_worker.add_frame_observer(self.replay_thread.count_frame)
+        self.receive_worker.start()
+
+        self.replay_thread.replay_done.connect(self.on_replay_done)
+        self.open_serial_btn.setEnabled(False)
+        self.replay_btn.setText("停止回放")
+        self.statusLabel.setText(f"回放: {os.path.basename(file_path)}")
+        self.add_log_message(f"开始回放: {file_path} ({'不限速' if speed == SPEED_MAX else f'{speed:g}倍速'})",
+                             "system")
+        self.replay_start = time.perf_counter()
+        self.replay_thread.start()
+
+
+    def on_replay_done(self, finished):
+        """回放结束，等待接收处理线程处理完剩余数据后统计端到端的帧速率"""
+        replay_thread = self.replay_thread
+        if replay_thread is None:
+            return
+        replay_thread.wait()
+        self.receive_worker.stop()
+        self.receive_worker.remove_frame_observer(replay_thread.count_frame)
+        elapsed = time.perf_counter() - self.replay_start
+        self.replay_thread = None
+
+        self.open_serial_btn.setEnabled(True)
+        self.replay_btn.setText("回放")
+        self.statusLabel.setText("串口: 已关闭")
+        rate = replay_thread.frames / elapsed if elapsed > 0 else 0
+        self.add_log_message(
+            f"回放{'结束' if finished else '已停止'}: {replay_thread.chunks} 块 {replay_thread.bytes} 字节，"
+            f"{replay_thread.frames} 帧，用时 {elapsed:.2f} 秒，{rate:.0f} 帧/秒", "system")
+
+
     def reset_counters(self):
         """重置计数器"""
         self.received_count = 0
         self.sent_count = 0
+        self.crc_error_count = 0
+        self.send_queue.reset_stats()
+        self.correlator.reset_stats()
+        self.echo_filter.reset_stats()
         self.update_status_counters()
         self.add_log_message("计数器已重置", "system")
 
@@ -1805,12 +2573,52 @@ class SerialToolUI(QMainWindow):
         """更新状态栏中的计数器显示"""
         self.receivedCountLabel.setText(f"接收: {self.received_count} 字节")
         self.sentCountLabel.setText(f"发送: {self.sent_count} 字节")
+        self.crcErrorCountLabel.setText(f"CRC错误: {self.crc_error_count}")
+
+        latency = self.send_queue.latency_stats.snapshot()
+        if latency['count']:
+            self.sendLatencyLabel.setText(f"发送延迟: {latency['mean_ms']:.2f}/{latency['max_ms']:.2f} ms")
+        else:
+            self.sendLatencyLabel.setText("发送延迟: -")
+
+        # 各优先级队列的排队情况
+        lines = ["报文从加入发送队列到离开串口的延迟，平均/最大"]
+        for lane in self.send_queue.lane_stats():
+            lane_latency = lane['latency']
+            latency_text = (f"{lane_latency['mean_ms']:.2f}/{lane_latency['max_ms']:.2f} ms"
+                            if lane_latency['count'] else "-")
+            lines.append(f"{lane['name']}: 排队 {lane['depth']} (最大 {lane['max_depth']})  "
+                         f"延迟 {latency_text}  丢弃过期 {lane['replaced']}")
+        self.sendLatencyLabel.setToolTip("\n".join(lines))
+
+        if self.echo_filter.enabled:
+            echo = self.echo_filter.snapshot()
+            self.echoCountLabel.setText(f"回波: {echo['suppressed_bytes']} 字节")
+            self.echoCountLabel.setToolTip(
+                f"去掉的回波: {echo['suppressed_bytes']} 字节，完整回波 {echo['echoed_writes']} 次\n"
+                f"回波不一致: {echo['mismatched_writes']} 次\n"
+                f"未收到回波: {echo['missing_bytes']} 字节\n"
+                f"等待回波: {echo['pending_bytes']} 字节")
+
+        if self.capture_writer is not None:
+            capture = self.capture_writer.stats()
+            self.captureLabel.setText(f"录制: {capture['data_bytes']} 字节")
+            self.captureLabel.setToolTip(
+                f"{self.capture_writer.path}\n数据块: {capture['chunks']}  文件: {capture['file_bytes']} 字节\n"
+                f"丢弃: {capture['dropped_chunks']} 块" + (f"\n写入失败: {capture['error']}" if capture['error'] else ""))
 
 
     def closeEvent(self, event):
         """关闭窗口事件处理"""
         # 关闭串口
         self.close_serial()
+        self.stop_capture()
+        if self.replay_thread is not None:
+            self.replay_thread.stop()
+            self.on_replay_done(False)
+
+        # 写入剩余日志并关闭历史文件
+        self.log_display.close_history()
         event.accept()
 
 